@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+Measure how fast the quality control stage compares the A and B channels of a batch of
+synthetic sensors, with the scalar Python and the NumPy implementation.
+
+Usage: python3 benchmarks/benchmark_ab_channel_quality_control.py [-sensors SENSORS] [-batches BATCHES]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+REPOSITORY_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(REPOSITORY_ROOT)
+
+from purpleair_data_logger.PurpleAirDataLoggerQualityControl import (
+    PurpleAirDataLoggerQualityControl,
+    QUALITY_CONTROL_CHANNEL_FIELD_NAMES,
+    numpy,
+)
+
+
+def make_batches(sensor_count, batch_count):
+    """
+    Make batches with a reading of every sensor. About one sensor in a hundred has a B
+    channel that is out of range.
+
+    :return: The batches.
+    :rtype: list
+    """
+
+    random_generator = random.Random(1)
+    batches = []
+    for _ in range(batch_count):
+        batch = []
+        for sensor_index in range(sensor_count):
+            reading = {
+                "sensor_index": sensor_index,
+                "hardware": "2.0+BME280+PMSX003-B+PMSX003-A",
+            }
+            for field_name in QUALITY_CONTROL_CHANNEL_FIELD_NAMES:
+                value_a = random_generator.uniform(0, 100)
+                value_b = value_a * random_generator.uniform(0.5, 1.5)
+                if random_generator.random() < 0.001:
+                    value_b = 5000.0
+
+                reading[f"{field_name}_a"] = value_a
+                reading[f"{field_name}_b"] = value_b
+                reading[field_name] = (value_a + value_b) / 2
+
+            batch.append(reading)
+
+        batches.append(batch)
+
+    return batches
+
+
+def run_benchmark(use_numpy, batches):
+    """
+    Time checking every batch with a new quality control stage.
+
+    :return: The number of sensors checked per second.
+    :rtype: float
+    """
+
+    quality_control = PurpleAirDataLoggerQualityControl(use_numpy)
+    start_time = time.perf_counter()
+    for batch in batches:
+        quality_control.check(batch)
+
+    return sum(len(batch) for batch in batches) / (time.perf_counter() - start_time)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument(
+        "-sensors",
+        required=False,
+        default=25000,
+        dest="sensors",
+        type=int,
+        help="""The number of sensors per batch""",
+    )
+    parser.add_argument(
+        "-batches",
+        required=False,
+        default=4,
+        dest="batches",
+        type=int,
+        help="""The number of batches""",
+    )
+    args = parser.parse_args()
+
+    implementations = [("scalar", False)]
+    if numpy is not None:
+        implementations.append(("numpy", True))
+
+    else:
+        print("NumPy is not installed, only the scalar implementation is measured")
+
+    for implementation_name, use_numpy in implementations:
+        sensors_per_second = run_benchmark(
+            use_numpy, make_batches(args.sensors, args.batches)
+        )
+        print(f"{implementation_name:>10}: {sensors_per_second:12.1f} sensors/s")
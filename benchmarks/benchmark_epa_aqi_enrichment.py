@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+Measure how fast the enrichment stage adds the EPA corrected PM2.5, NowCast and AQI to a
+batch of synthetic sensors, with the scalar Python and the NumPy implementation.
+
+Usage: python3 benchmarks/benchmark_epa_aqi_enrichment.py [-sensors SENSORS] [-batches BATCHES]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+REPOSITORY_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(REPOSITORY_ROOT)
+
+from purpleair_data_logger.PurpleAirDataLoggerEnrichment import (
+    PurpleAirDataLoggerEnrichment,
+    numpy,
+)
+
+
+def make_batches(sensor_count, batch_count):
+    """
+    Make one batch per hour with a reading of every sensor.
+
+    :return: The batches.
+    :rtype: list
+    """
+
+    random_generator = random.Random(1)
+    return [
+        [
+            {
+                "sensor_index": sensor_index,
+                "data_time_stamp": hour * 3600,
+                "pm2.5_cf_1": random_generator.uniform(0, 300),
+                "humidity": random_generator.uniform(0, 100),
+            }
+            for sensor_index in range(sensor_count)
+        ]
+        for hour in range(batch_count)
+    ]
+
+
+def run_benchmark(use_numpy, batches):
+    """
+    Time enriching every batch with a new enrichment stage.
+
+    :return: The number of sensors enriched per second.
+    :rtype: float
+    """
+
+    enrichment = PurpleAirDataLoggerEnrichment(use_numpy)
+    start_time = time.perf_counter()
+    for batch in batches:
+        enrichment.enrich(batch)
+
+    return sum(len(batch) for batch in batches) / (time.perf_counter() - start_time)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument(
+        "-sensors",
+        required=False,
+        default=25000,
+        dest="sensors",
+        type=int,
+        help="""The number of sensors per batch""",
+    )
+    parser.add_argument(
+        "-batches",
+        required=False,
+        default=12,
+        dest="batches",
+        type=int,
+        help="""The number of batches, one per hour""",
+    )
+    args = parser.parse_args()
+
+    implementations = [("scalar", False)]
+    if numpy is not None:
+        implementations.append(("numpy", True))
+
+    else:
+        print("NumPy is not installed, only the scalar implementation is measured")
+
+    for implementation_name, use_numpy in implementations:
+        sensors_per_second = run_benchmark(
+            use_numpy, make_batches(args.sensors, args.batches)
+        )
+        print(f"{implementation_name:>10}: {sensors_per_second:12.1f} sensors/s")
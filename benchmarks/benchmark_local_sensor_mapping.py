@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+Measure how fast the local sensor mapping converts each internal network hardware
+variant sample, with and without 'validate_sensor_data_before_insert'.
+
+Usage: python3 benchmarks/benchmark_local_sensor_mapping.py [-iterations ITERATIONS]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+REPOSITORY_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(REPOSITORY_ROOT)
+
+from purpleair_data_logger.PurpleAirDataLoggerHelpers import (
+    validate_sensor_data_before_insert,
+)
+from purpleair_data_logger.PurpleAirLocalSensorMapping import (
+    convert_local_sensor_data,
+)
+
+
+def run_benchmark(convert, sensor_dict, iterations):
+    """
+    Time converting ``sensor_dict`` ``iterations`` times.
+
+    :return: The number of conversions per second.
+    :rtype: float
+    """
+
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        convert(sensor_dict)
+
+    return iterations / (time.perf_counter() - start_time)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument(
+        "-iterations",
+        required=False,
+        default=100000,
+        dest="iterations",
+        type=int,
+        help="""The number of conversions per sample""",
+    )
+    args = parser.parse_args()
+
+    for json_sample_file_path in sorted(
+        glob.glob(
+            os.path.join(
+                REPOSITORY_ROOT,
+                "internal_network_hardware_variant_json_samples",
+                "*.json",
+            )
+        )
+    ):
+        with open(json_sample_file_path, "r") as json_sample_file:
+            sensor_dict = json.load(json_sample_file)
+
+        print(sensor_dict["hardwarediscovered"])
+        conversions_per_second = run_benchmark(
+            convert_local_sensor_data, sensor_dict, args.iterations
+        )
+        print(f"{'convert':>20}: {conversions_per_second:12.1f} sensors/s")
+        conversions_per_second = run_benchmark(
+            lambda sensor_dict: validate_sensor_data_before_insert(
+                convert_local_sensor_data(sensor_dict)
+            ),
+            sensor_dict,
+            args.iterations,
+        )
+        print(f"{'convert + validate':>20}: {conversions_per_second:12.1f} sensors/s")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+Measure how fast the rolling statistics keep a 24 hour mean and the NowCast up to date,
+compared to scanning the last 24 hours of readings after every reading.
+
+Usage: python3 benchmarks/benchmark_rolling_statistics.py [-sensors SENSORS] [-hours HOURS]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+REPOSITORY_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(REPOSITORY_ROOT)
+
+from purpleair_data_logger.PurpleAirDataLoggerRollingStatistics import (
+    PurpleAirDataLoggerRollingStatistics,
+)
+from purpleair_data_logger.PurpleAirDataLoggerEnrichment import (
+    NOWCAST_HOURS,
+    compute_nowcast,
+)
+
+#: Readings per sensor and hour, i.e. a poll every 2 minutes
+READINGS_PER_HOUR = 30
+
+
+def make_readings(sensor_count, hour_count):
+    """
+    Make the readings of every sensor, in the order they are polled.
+
+    :return: The readings.
+    :rtype: list
+    """
+
+    random_generator = random.Random(1)
+    return [
+        {
+            "sensor_index": sensor_index,
+            "data_time_stamp": poll * 3600 // READINGS_PER_HOUR,
+            "pm2.5": random_generator.uniform(0, 100),
+        }
+        for poll in range(hour_count * READINGS_PER_HOUR)
+        for sensor_index in range(sensor_count)
+    ]
+
+
+def run_incremental(readings):
+    """
+    Time updating the rolling statistics and reading the 24 hour mean and NowCast.
+
+    :return: The number of readings per second.
+    :rtype: float
+    """
+
+    rolling_statistics = PurpleAirDataLoggerRollingStatistics(
+        window_hours=(24,), field_names=("pm2.5",)
+    )
+    start_time = time.perf_counter()
+    for reading in readings:
+        rolling_statistics.update(reading)
+        rolling_statistics.get_mean(reading["sensor_index"], "pm2.5", 24)
+        rolling_statistics.get_nowcast(reading["sensor_index"], "pm2.5")
+
+    return len(readings) / (time.perf_counter() - start_time)
+
+
+def run_scan(readings):
+    """
+    Time keeping the last 24 hours of readings per sensor and scanning them for the
+    24 hour mean and NowCast after every reading.
+
+    :return: The number of readings per second.
+    :rtype: float
+    """
+
+    readings_by_sensor_index = {}
+    start_time = time.perf_counter()
+    for reading in readings:
+        sensor_readings = readings_by_sensor_index.setdefault(
+            reading["sensor_index"], []
+        )
+        sensor_readings.append(reading)
+        latest_hour = reading["data_time_stamp"] // 3600
+        del sensor_readings[: -24 * READINGS_PER_HOUR]
+        values = [
+            sensor_reading["pm2.5"]
+            for sensor_reading in sensor_readings
+            if sensor_reading["data_time_stamp"] // 3600 > latest_hour - 24
+        ]
+        sum(values) / len(values)
+        hourly_values = [[] for _ in range(NOWCAST_HOURS)]
+        for sensor_reading in sensor_readings:
+            age = latest_hour - sensor_reading["data_time_stamp"] // 3600
+            if age < NOWCAST_HOURS:
+                hourly_values[age].append(sensor_reading["pm2.5"])
+
+        compute_nowcast(
+            [sum(values) / len(values) if values else None for values in hourly_values]
+        )
+
+    return len(readings) / (time.perf_counter() - start_time)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument(
+        "-sensors",
+        required=False,
+        default=100,
+        dest="sensors",
+        type=int,
+        help="""The number of sensors""",
+    )
+    parser.add_argument(
+        "-hours",
+        required=False,
+        default=48,
+        dest="hours",
+        type=int,
+        help="""The number of hours of readings""",
+    )
+    args = parser.parse_args()
+
+    readings = make_readings(args.sensors, args.hours)
+    for implementation_name, run_benchmark in (
+        ("incremental", run_incremental),
+        ("scan", run_scan),
+    ):
+        readings_per_second = run_benchmark(readings)
+        print(f"{implementation_name:>11}: {readings_per_second:12.1f} readings/s")
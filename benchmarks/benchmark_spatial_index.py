@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+Measure how fast the spatial index finds the sensors within 10 km of a point, compared
+to computing the distance to every sensor.
+
+Usage: python3 benchmarks/benchmark_spatial_index.py [-sensors SENSORS] [-queries QUERIES]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+REPOSITORY_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(REPOSITORY_ROOT)
+
+from purpleair_data_logger.PurpleAirDataLoggerSpatialIndex import (
+    PurpleAirDataLoggerSpatialIndex,
+    compute_distance_km,
+)
+
+#: The radius of every query in km
+QUERY_RADIUS_KM = 10
+
+#: The (south, north, west, east) bounds of the contiguous United States
+BOUNDS = (24.5, 49.4, -124.8, -66.9)
+
+
+def make_positions(count, random_generator):
+    """
+    Make random positions within ``BOUNDS``.
+
+    :return: A list of (latitude, longitude) tuples.
+    :rtype: list
+    """
+
+    south, north, west, east = BOUNDS
+    return [
+        (random_generator.uniform(south, north), random_generator.uniform(west, east))
+        for _ in range(count)
+    ]
+
+
+def run_index(sensor_positions, query_positions):
+    """
+    Time the radius queries of the spatial index.
+
+    :return: The number of queries per second.
+    :rtype: float
+    """
+
+    spatial_index = PurpleAirDataLoggerSpatialIndex()
+    for sensor_index, (latitude, longitude) in enumerate(sensor_positions):
+        spatial_index.update(
+            {"sensor_index": sensor_index, "latitude": latitude, "longitude": longitude}
+        )
+
+    start_time = time.perf_counter()
+    for latitude, longitude in query_positions:
+        spatial_index.query_radius(latitude, longitude, QUERY_RADIUS_KM)
+
+    return len(query_positions) / (time.perf_counter() - start_time)
+
+
+def run_scan(sensor_positions, query_positions):
+    """
+    Time computing the distance to every sensor for each query.
+
+    :return: The number of queries per second.
+    :rtype: float
+    """
+
+    start_time = time.perf_counter()
+    for latitude, longitude in query_positions:
+        results = []
+        for sensor_index, (sensor_latitude, sensor_longitude) in enumerate(
+            sensor_positions
+        ):
+            distance_km = compute_distance_km(
+                latitude, longitude, sensor_latitude, sensor_longitude
+            )
+            if distance_km <= QUERY_RADIUS_KM:
+                results.append((sensor_index, distance_km))
+
+        results.sort(key=lambda result: (result[1], result[0]))
+
+    return len(query_positions) / (time.perf_counter() - start_time)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument(
+        "-sensors",
+        required=False,
+        default=25000,
+        dest="sensors",
+        type=int,
+        help="""The number of sensors""",
+    )
+    parser.add_argument(
+        "-queries",
+        required=False,
+        default=1000,
+        dest="queries",
+        type=int,
+        help="""The number of radius queries""",
+    )
+    args = parser.parse_args()
+
+    random_generator = random.Random(1)
+    sensor_positions = make_positions(args.sensors, random_generator)
+    query_positions = make_positions(args.queries, random_generator)
+    for implementation_name, run_benchmark in (
+        ("index", run_index),
+        ("scan", run_scan),
+    ):
+        queries_per_second = run_benchmark(sensor_positions, query_positions)
+        print(f"{implementation_name:>5}: {queries_per_second:12.1f} queries/s")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+Compare PurpleAirSQLiteDataLogger insert throughput under each SQLite performance
+profile. Every profile writes the same synthetic rows into a fresh database file.
+
+Usage: python3 benchmarks/benchmark_sqlite_performance_profiles.py [-rows ROWS]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from purpleair_data_logger.PurpleAirDataLoggerHelpers import (
+    validate_sensor_data_before_insert,
+)
+from purpleair_data_logger.PurpleAirSQLiteDataLogger import PurpleAirSQLiteDataLogger
+from purpleair_data_logger.PurpleAirSQLiteQueryStatements import (
+    SQLITE_PERFORMANCE_PROFILES,
+)
+
+
+def make_sensor_data(row_count):
+    """
+    Build ``row_count`` sensor data dicts spread across 100 sensors.
+
+    :param int row_count: The number of rows to build.
+
+    :return: A list of python dictionaries as expected by 'store_sensor_data'.
+    :rtype: list
+    """
+
+    return [
+        validate_sensor_data_before_insert(
+            {
+                "sensor_index": row_number % 100,
+                "data_time_stamp": 1700000000 + (row_number // 100) * 120,
+                "pm2.5": float(row_number % 500),
+            }
+        )
+        for row_number in range(row_count)
+    ]
+
+
+def run_benchmark(performance_profile, sensor_data_list, temp_dir):
+    """
+    Time storing ``sensor_data_list`` with one performance profile.
+
+    :return: The number of rows stored per second.
+    :rtype: float
+    """
+
+    # The benchmark never talks to the PurpleAir API
+    with patch("purpleair_data_logger.PurpleAirDataLogger.PurpleAirAPI"):
+        the_logger = PurpleAirSQLiteDataLogger(
+            None,
+            None,
+            os.path.join(temp_dir, f"{performance_profile}.db"),
+            performance_profile=performance_profile,
+        )
+
+    start_time = time.perf_counter()
+    for sensor_data in sensor_data_list:
+        the_logger.store_sensor_data(sensor_data)
+
+    elapsed_time = time.perf_counter() - start_time
+    the_logger._db_conn.close()
+    return len(sensor_data_list) / elapsed_time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument(
+        "-rows",
+        required=False,
+        default=2000,
+        dest="rows",
+        type=int,
+        help="""The number of rows to store per profile""",
+    )
+    args = parser.parse_args()
+
+    sensor_data_list = make_sensor_data(args.rows)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for performance_profile in SQLITE_PERFORMANCE_PROFILES:
+            rows_per_second = run_benchmark(
+                performance_profile, sensor_data_list, temp_dir
+            )
+            print(f"{performance_profile:>10}: {rows_per_second:10.1f} rows/s")
@@ -17,6 +17,12 @@ from purpleair_data_logger.PurpleAirDataLogger import (
     PurpleAirDataLogger,
 )
 
+from purpleair_data_logger.PurpleAirDataLoggerSupervisor import (
+    PurpleAirDataLoggerSupervisor,
+    add_shard_placeholder,
+    make_shard_data_logger,
+)
+
 from purpleair_data_logger.PurpleAirDataLoggerHelpers import (
     generate_common_arg_parser,
 )
@@ -25,6 +31,7 @@ from purpleair_data_logger.PurpleAirDataLoggerHelpers import (
 from purpleair_data_logger.PurpleAirCSVDataLoggerConstants import (
     STATION_INFORMATION_AND_STATUS_FIELDS_FILE_NAME,
     STATION_INFORMATION_AND_STATUS_FIELDS_HEADER,
+    STATION_INFORMATION_AND_STATUS_QUALITY_CONTROL_FIELDS_HEADER,
     ENVIRONMENTAL_FIELDS_FILE_NAME,
     ENVIRONMENTAL_FIELDS_HEADER,
     MISCELLANEOUS_FIELDS_FILE_NAME,
@@ -33,6 +40,7 @@ from purpleair_data_logger.PurpleAirCSVDataLoggerConstants import (
     PM1_0_FIELDS_HEADER,
     PM2_5_FIELDS_FILE_NAME,
     PM2_5_FIELDS_HEADER,
+    PM2_5_ENRICHMENT_FIELDS_HEADER,
     PM2_5_PSEUDO_AVERAGE_FIELDS_FILE_NAME,
     PM2_5_PSEUDO_AVERAGE_FIELDS_HEADER,
     PM10_0_FIELDS_FILE_NAME,
@@ -41,8 +49,20 @@ from purpleair_data_logger.PurpleAirCSVDataLoggerConstants import (
     PARTICLE_COUNT_FIELDS_HEADER,
     THINGSPEAK_FIELDS_FILE_NAME,
     THINGSPEAK_FIELDS_HEADER,
+    WINDOW_STATISTICS_FIELDS_FILE_NAME,
+    WINDOW_STATISTICS_FIELDS_HEADER,
+)
+from purpleair_data_logger.PurpleAirDataLoggerDownsampler import (
+    WINDOW_STATISTICS_FIELD_NAMES,
+)
+from purpleair_data_logger.PurpleAirDataLoggerEnrichment import (
+    ENRICHMENT_FIELD_NAMES,
+)
+from purpleair_data_logger.PurpleAirDataLoggerQualityControl import (
+    QUALITY_CONTROL_FIELD_NAMES,
 )
 from os import makedirs
+from functools import partial
 from os.path import exists
 
 
@@ -91,6 +111,19 @@ class PurpleAirCSVDataLogger(PurpleAirDataLogger):
         the_file_stream = open(file_path_and_name, "a")
         return the_file_stream
 
+    @staticmethod
+    def _format_optional_csv_value(value):
+        """
+        Format a value that may be missing. ``None`` is written as an empty value
+        rather than the string 'None'.
+
+        :param value: The value to format.
+        :return: The value as a CSV field.
+        :rtype: str
+        """
+
+        return "" if value is None else str(value)
+
     @staticmethod
     def _close_and_flush_csv_file(the_file_stream):
         """
@@ -101,6 +134,42 @@ class PurpleAirCSVDataLogger(PurpleAirDataLogger):
         the_file_stream.flush()
         the_file_stream.close()
 
+    def _store_window_statistics(self, single_sensor_data_dict):
+        """
+        Append the window statistics of a downsampled row to the window_statistics_fields
+        file. The header is written when the file is new. Missing statistics, e.g. of a
+        field the sensor doesn't report, are written as empty values.
+
+        :param dict single_sensor_data_dict: A python dictionary as emitted by a
+                                             PurpleAirDataLoggerDownsampler.
+        """
+
+        file_path_and_name = (
+            self._path_to_save_csv_files_in + "/" + WINDOW_STATISTICS_FIELDS_FILE_NAME
+        )
+        is_new_file = exists(file_path_and_name) == False
+        window_statistics_fields_file_stream = self._open_csv_file(file_path_and_name)
+        if is_new_file:
+            window_statistics_fields_file_stream.write(
+                WINDOW_STATISTICS_FIELDS_HEADER + "\n"
+            )
+
+        window_statistics_fields_file_stream.write(
+            ",".join(
+                self._format_optional_csv_value(value)
+                for value in (
+                    single_sensor_data_dict["data_time_stamp"],
+                    single_sensor_data_dict["sensor_index"],
+                    *(
+                        single_sensor_data_dict.get(field_name)
+                        for field_name in WINDOW_STATISTICS_FIELD_NAMES
+                    ),
+                )
+            )
+            + "\n"
+        )
+        self._close_and_flush_csv_file(window_statistics_fields_file_stream)
+
     def store_sensor_data(self, single_sensor_data_dict):
         """
         Insert the sensor data into CSV files.
@@ -161,8 +230,17 @@ class PurpleAirCSVDataLogger(PurpleAirDataLogger):
 
             if self._did_we_write_the_header_bool == False:
                 # Write the headers
+                station_information_and_status_fields_header = (
+                    STATION_INFORMATION_AND_STATUS_FIELDS_HEADER
+                )
+                if self._quality_control is not None:
+                    station_information_and_status_fields_header += (
+                        ","
+                        + STATION_INFORMATION_AND_STATUS_QUALITY_CONTROL_FIELDS_HEADER
+                    )
+
                 station_information_and_status_fields_file_stream.write(
-                    STATION_INFORMATION_AND_STATUS_FIELDS_HEADER + "\n"
+                    station_information_and_status_fields_header + "\n"
                 )
 
                 environmental_fields_file_steam.write(
@@ -175,7 +253,11 @@ class PurpleAirCSVDataLogger(PurpleAirDataLogger):
 
                 pm1_0_fields_file_stream.write(PM1_0_FIELDS_HEADER + "\n")
 
-                pm2_5_fields_file_stream.write(PM2_5_FIELDS_HEADER + "\n")
+                pm2_5_fields_header = PM2_5_FIELDS_HEADER
+                if self._enrichment is not None:
+                    pm2_5_fields_header += "," + PM2_5_ENRICHMENT_FIELDS_HEADER
+
+                pm2_5_fields_file_stream.write(pm2_5_fields_header + "\n")
 
                 pm2_5_pseudo_average_fields_file_stream.write(
                     PM2_5_PSEUDO_AVERAGE_FIELDS_HEADER + "\n"
@@ -191,7 +273,18 @@ class PurpleAirCSVDataLogger(PurpleAirDataLogger):
 
                 self._did_we_write_the_header_bool = True
 
-            # Step three write data to all files.
+            # Step three write data to all files. The quality control and enrichment
+            # columns are only written when those stages are configured.
+            station_quality_control_fields = ""
+            if self._quality_control is not None:
+                station_quality_control_fields = "".join(
+                    ","
+                    + self._format_optional_csv_value(
+                        single_sensor_data_dict.get(field_name)
+                    )
+                    for field_name in QUALITY_CONTROL_FIELD_NAMES
+                )
+
             station_information_and_status_fields_file_stream.write(
                 str(single_sensor_data_dict["data_time_stamp"])
                 + ","
@@ -250,6 +343,7 @@ class PurpleAirCSVDataLogger(PurpleAirDataLogger):
                 + str(single_sensor_data_dict["confidence_manual"])
                 + ","
                 + str(single_sensor_data_dict["confidence_auto"])
+                + station_quality_control_fields
                 + "\n"
             )
 
@@ -320,6 +414,16 @@ class PurpleAirCSVDataLogger(PurpleAirDataLogger):
                 + "\n"
             )
 
+            pm2_5_enrichment_fields = ""
+            if self._enrichment is not None:
+                pm2_5_enrichment_fields = "".join(
+                    ","
+                    + self._format_optional_csv_value(
+                        single_sensor_data_dict.get(field_name)
+                    )
+                    for field_name in ENRICHMENT_FIELD_NAMES
+                )
+
             pm2_5_fields_file_stream.write(
                 str(single_sensor_data_dict["data_time_stamp"])
                 + ","
@@ -348,6 +452,7 @@ class PurpleAirCSVDataLogger(PurpleAirDataLogger):
                 + str(single_sensor_data_dict["pm2.5_cf_1_a"])
                 + ","
                 + str(single_sensor_data_dict["pm2.5_cf_1_b"])
+                + pm2_5_enrichment_fields
                 + "\n"
             )
 
@@ -503,6 +608,10 @@ class PurpleAirCSVDataLogger(PurpleAirDataLogger):
         self._close_and_flush_csv_file(particle_count_fields_file_stream)
         self._close_and_flush_csv_file(thingspeak_fields_file_stream)
 
+        # Only rows emitted by a downsampler carry window statistics
+        if "sample_count" in single_sensor_data_dict:
+            self._store_window_statistics(single_sensor_data_dict)
+
 
 if __name__ == "__main__":
     parser = generate_common_arg_parser(
@@ -517,8 +626,35 @@ if __name__ == "__main__":
         help="""The path to save CSV files in.""",
     )
 
+    parser.add_argument(
+        "-shards",
+        required=False,
+        default=1,
+        dest="shards",
+        type=int,
+        help="""The number of worker processes to split the sensors of the json
+                        config file across. Every worker makes its own data logger. '{shard}'
+                        in save_file_path and dedup_cache_file is replaced by the worker's
+                        shard number, so every worker writes its own CSV files. A 'shard_{shard}'
+                        directory is added to save_file_path if it doesn't have it. Each worker
+                        of a local sensors request only requests its own sensors. Default is 1,
+                        i.e. no worker processes.""",
+    )
+
     args = parser.parse_args()
 
+    # Workers mustn't append to the same CSV files
+    if args.shards > 1 and (
+        add_shard_placeholder(args.save_file_path, is_directory=True)
+        != args.save_file_path
+    ):
+        args.save_file_path = add_shard_placeholder(
+            args.save_file_path, is_directory=True
+        )
+        print(
+            f"save_file_path has no '{{shard}}', using {args.save_file_path} instead..."
+        )
+
     # Place holders that are used later down
     the_json_file = None
     file_obj = None
@@ -535,15 +671,48 @@ if __name__ == "__main__":
         ipv4_address_list = the_json_file["sensor_ip_list"]  # LOAD THIS IN MAYBE ???
         del the_json_file
 
-    the_paa_csv_data_logger = PurpleAirCSVDataLogger(
-        args.paa_read_key, args.paa_write_key, ipv4_address_list, args.save_file_path
+    data_logger_args = (
+        args.paa_read_key,
+        args.paa_write_key,
+        ipv4_address_list,
+        args.save_file_path,
     )
+    if args.shards > 1:
+        # Every worker process makes its own data logger, see make_shard_data_logger
+        the_paa_data_logger_supervisor = PurpleAirDataLoggerSupervisor(
+            partial(
+                make_shard_data_logger, PurpleAirCSVDataLogger, data_logger_args, args
+            ),
+            args.shards,
+        )
+        the_paa_data_logger_supervisor.validate_parameters_and_run(
+            args.paa_multiple_sensor_request_json_file,
+            args.paa_single_sensor_request_json_file,
+            args.paa_group_sensor_request_json_file,
+            args.paa_local_sensor_request_json_file,
+        )
 
-    # Third choose what run method to execute depending on
-    # paa_multiple_sensor_request_json_file/paa_single_sensor_request_json_file/paa_group_sensor_request_json_file
-    the_paa_csv_data_logger.validate_parameters_and_run(
-        args.paa_multiple_sensor_request_json_file,
-        args.paa_single_sensor_request_json_file,
-        args.paa_group_sensor_request_json_file,
-        args.paa_local_sensor_request_json_file,
-    )
+    else:
+        the_paa_csv_data_logger = PurpleAirCSVDataLogger(*data_logger_args)
+
+        # Configure the deduplication cache that sits in front of store_sensor_data
+        the_paa_csv_data_logger.configure_deduplication_cache(
+            args.dedup_cache_size, args.dedup_cache_file
+        )
+
+        # Check the A and B channels of every row if asked to
+        if args.qc_ab_channels:
+            the_paa_csv_data_logger.configure_quality_control()
+
+        # Add the EPA corrected PM2.5, NowCast and AQI to every row if asked to
+        if args.enrich_epa_aqi:
+            the_paa_csv_data_logger.configure_enrichment()
+
+        # Third choose what run method to execute depending on
+        # paa_multiple_sensor_request_json_file/paa_single_sensor_request_json_file/paa_group_sensor_request_json_file
+        the_paa_csv_data_logger.validate_parameters_and_run(
+            args.paa_multiple_sensor_request_json_file,
+            args.paa_single_sensor_request_json_file,
+            args.paa_group_sensor_request_json_file,
+            args.paa_local_sensor_request_json_file,
+        )
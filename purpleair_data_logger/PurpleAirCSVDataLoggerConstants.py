@@ -5,6 +5,16 @@ Copyright 2022 carlkidcrypto, All rights reserved.
 A file containing CSVDataLogger constants.
 """
 
+from purpleair_data_logger.PurpleAirDataLoggerDownsampler import (
+    WINDOW_STATISTICS_FIELD_NAMES,
+)
+from purpleair_data_logger.PurpleAirDataLoggerEnrichment import (
+    ENRICHMENT_FIELD_NAMES,
+)
+from purpleair_data_logger.PurpleAirDataLoggerQualityControl import (
+    QUALITY_CONTROL_FIELD_NAMES,
+)
+
 #: Standard file name for station_information_and_status_fields data
 STATION_INFORMATION_AND_STATUS_FIELDS_FILE_NAME = (
     """station_information_and_status_fields.csv"""
@@ -43,6 +53,13 @@ STATION_INFORMATION_AND_STATUS_FIELDS_HEADER = (
     "confidence_auto"
 )
 
+#: CSV header of the station_information_and_status_fields columns added by the quality
+#: control stage. They're only written when the stage is configured, so files from
+#: before the stage keep their column layout.
+STATION_INFORMATION_AND_STATUS_QUALITY_CONTROL_FIELDS_HEADER = ",".join(
+    QUALITY_CONTROL_FIELD_NAMES
+)
+
 #: Standard file name for environmental_fields data
 ENVIRONMENTAL_FIELDS_FILE_NAME = """environmental_fields.csv"""
 
@@ -108,6 +125,11 @@ PM2_5_FIELDS_HEADER = (
     "pm2.5_cf_1_b"
 )
 
+#: CSV header of the pm2.5_fields columns added by the enrichment stage. They're only
+#: written when the stage is configured, so files from before the stage keep their
+#: column layout.
+PM2_5_ENRICHMENT_FIELDS_HEADER = ",".join(ENRICHMENT_FIELD_NAMES)
+
 #: Standard file name for pm2.5_pseudo_average_fields data
 PM2_5_PSEUDO_AVERAGE_FIELDS_FILE_NAME = """pm2.5_pseudo_average_fields.csv"""
 
@@ -196,3 +218,11 @@ THINGSPEAK_FIELDS_HEADER = (
     "secondary_id_b,"
     "secondary_key_b"
 )
+
+#: Standard file name for window_statistics_fields data
+WINDOW_STATISTICS_FIELDS_FILE_NAME = """window_statistics_fields.csv"""
+
+#: Standard CSV header for window_statistics_fields data
+WINDOW_STATISTICS_FIELDS_HEADER = ",".join(
+    ("data_time_stamp", "sensor_index") + WINDOW_STATISTICS_FIELD_NAMES
+)
@@ -11,6 +11,33 @@ from purpleair_data_logger.PurpleAirDataLoggerHelpers import (
     logic_for_storing_multiple_sensors_data,
     logic_for_storing_group_sensors_data,
     logic_for_storing_local_sensors_data,
+    store_new_sensor_data,
+)
+from purpleair_data_logger.PurpleAirDataLoggerDeduplicationCache import (
+    PurpleAirDataLoggerDeduplicationCache,
+)
+from purpleair_data_logger.PurpleAirDataLoggerDownsampler import (
+    PurpleAirDataLoggerDownsampler,
+    DOWNSAMPLER_DEFAULT_RAW_SAMPLE_BUFFER_SIZE,
+)
+from purpleair_data_logger.PurpleAirDataLoggerRingBuffer import (
+    PurpleAirDataLoggerRingBuffer,
+    RING_BUFFER_DEFAULT_CAPACITY,
+)
+from purpleair_data_logger.PurpleAirDataLoggerRollingStatistics import (
+    PurpleAirDataLoggerRollingStatistics,
+    ROLLING_STATISTICS_DEFAULT_WINDOW_HOURS,
+    ROLLING_STATISTICS_DEFAULT_FIELD_NAMES,
+)
+from purpleair_data_logger.PurpleAirDataLoggerSpatialIndex import (
+    PurpleAirDataLoggerSpatialIndex,
+    SPATIAL_INDEX_DEFAULT_CELL_SIZE_DEGREES,
+)
+from purpleair_data_logger.PurpleAirDataLoggerEnrichment import (
+    PurpleAirDataLoggerEnrichment,
+)
+from purpleair_data_logger.PurpleAirDataLoggerQualityControl import (
+    PurpleAirDataLoggerQualityControl,
 )
 from time import sleep
 import json
@@ -55,6 +82,59 @@ class PurpleAirDataLogger:
         # Define how often we send requests
         self._send_request_every_x_seconds = 65
 
+        # The 'data_time_stamp' of the previous multiple/group sensors response. It is
+        # sent as 'modified_since' on the next request so only sensors that reported
+        # new data are returned.
+        self._last_data_time_stamp = None
+
+        # Maps a 'sensor_index' to the last 'last_seen' value we stored for it. Rows
+        # whose 'last_seen' didn't advance are duplicates and are not stored again.
+        self._last_seen_by_sensor_index = {}
+
+        # Recently stored (sensor_index, data_time_stamp) keys. Duplicates are dropped
+        # before they reach 'store_sensor_data'.
+        self._deduplication_cache = PurpleAirDataLoggerDeduplicationCache()
+
+        # The last readings of every stored sensor, shared by everything that needs
+        # recent readings. None until 'configure_ring_buffer' is called, so loggers
+        # that don't read it don't pay for its per sensor arrays.
+        self._ring_buffer = None
+
+        # Rolling means and the NowCast of every stored sensor, updated one reading at
+        # a time
+        self._rolling_statistics = PurpleAirDataLoggerRollingStatistics()
+
+        # The latest position of every stored sensor, for radius, bounding box and
+        # nearest neighbor queries
+        self._spatial_index = PurpleAirDataLoggerSpatialIndex()
+
+        # Folds high rate local samples into one row per window. None stores every
+        # sample as is.
+        self._local_sensor_downsampler = None
+
+        # Compares the A and B channels of every batch. None stores the channels as
+        # they are reported.
+        self._quality_control = None
+
+        # Adds the EPA corrected PM2.5, NowCast and AQI to every batch. None leaves the
+        # derived fields empty.
+        self._enrichment = None
+
+        # True when 'store_sensor_data' only queues sensor data for a background
+        # writer. Such sensor data is remembered as stored by
+        # 'collect_stored_sensor_data' once it is committed.
+        self._stores_sensor_data_in_background = False
+
+        # Called without arguments after every polling cycle of a run loop, e.g. so a
+        # supervisor can tell a live worker from a stuck one. None calls nothing.
+        self._polling_cycle_callback = None
+
+        # The pool local sensors are requested from, created on the first local polling
+        # cycle and shut down by 'stop'. The requests a previous cycle gave up on but
+        # that are still running are kept so a hung sensor ties up only one worker.
+        self._local_sensor_executor = None
+        self._running_local_sensor_requests = {}
+
     @property
     def send_request_every_x_seconds(self):
         """
@@ -86,6 +166,181 @@ class PurpleAirDataLogger:
                 f"new_value ({new_value}) shall not be less than 60."
             )
 
+    def configure_deduplication_cache(self, max_size, file_path=None):
+        """
+        Replace the deduplication cache that sits in front of 'store_sensor_data'.
+
+        :param int max_size: The maximum number of (sensor_index, data_time_stamp) keys
+                             to remember. Value shall be greater than 0.
+        :param str file_path: An optional path to a JSON file used to persist the keys
+                              across restarts.
+        :raises PurpleAirDataLoggerError: If ``max_size`` is less than 1.
+        """
+
+        if max_size < 1:
+            raise PurpleAirDataLoggerError(
+                f"max_size ({max_size}) shall not be less than 1."
+            )
+
+        self._deduplication_cache = PurpleAirDataLoggerDeduplicationCache(
+            max_size, file_path
+        )
+
+    @property
+    def ring_buffer(self):
+        """
+        A getter method for the ring buffer of the last readings of every stored sensor.
+
+        :return: The ring buffer, populated after every successful 'store_sensor_data',
+                 or ``None`` if 'configure_ring_buffer' wasn't called.
+        :rtype: PurpleAirDataLoggerRingBuffer
+        """
+
+        return self._ring_buffer
+
+    def configure_ring_buffer(self, capacity=RING_BUFFER_DEFAULT_CAPACITY):
+        """
+        Keep the last readings of every stored sensor in a ring buffer. Readings already
+        in a previous ring buffer are dropped.
+
+        :param int capacity: The number of readings to keep per sensor. Value shall be
+                             greater than 0.
+        :raises PurpleAirDataLoggerError: If ``capacity`` is less than 1.
+        """
+
+        if capacity < 1:
+            raise PurpleAirDataLoggerError(
+                f"capacity ({capacity}) shall not be less than 1."
+            )
+
+        self._ring_buffer = PurpleAirDataLoggerRingBuffer(capacity)
+
+    @property
+    def rolling_statistics(self):
+        """
+        A getter method for the rolling statistics of every stored sensor.
+
+        :return: The rolling statistics, updated after every successful 'store_sensor_data'.
+        :rtype: PurpleAirDataLoggerRollingStatistics
+        """
+
+        return self._rolling_statistics
+
+    def configure_rolling_statistics(
+        self,
+        window_hours=ROLLING_STATISTICS_DEFAULT_WINDOW_HOURS,
+        field_names=ROLLING_STATISTICS_DEFAULT_FIELD_NAMES,
+    ):
+        """
+        Replace the rolling statistics. Statistics already kept are dropped.
+
+        :param tuple window_hours: The windows, in hours, to keep a rolling mean for.
+                                   Values shall be greater than 0.
+        :param tuple field_names: The numeric fields to keep statistics for.
+        :raises PurpleAirDataLoggerError: If a value of ``window_hours`` is less than 1.
+        """
+
+        try:
+            self._rolling_statistics = PurpleAirDataLoggerRollingStatistics(
+                window_hours, field_names
+            )
+
+        except ValueError as error:
+            raise PurpleAirDataLoggerError(str(error)) from error
+
+    @property
+    def spatial_index(self):
+        """
+        A getter method for the spatial index of the positions of every stored sensor.
+
+        :return: The spatial index, updated after every successful 'store_sensor_data'.
+        :rtype: PurpleAirDataLoggerSpatialIndex
+        """
+
+        return self._spatial_index
+
+    def configure_spatial_index(
+        self, cell_size_degrees=SPATIAL_INDEX_DEFAULT_CELL_SIZE_DEGREES
+    ):
+        """
+        Replace the spatial index. Positions already in it are dropped.
+
+        :param float cell_size_degrees: The size of a grid cell in degrees. Value shall
+                                        be greater than 0 and not greater than 90.
+        :raises PurpleAirDataLoggerError: If ``cell_size_degrees`` is out of range.
+        """
+
+        try:
+            self._spatial_index = PurpleAirDataLoggerSpatialIndex(cell_size_degrees)
+
+        except ValueError as error:
+            raise PurpleAirDataLoggerError(str(error)) from error
+
+    def configure_local_sensor_downsampler(
+        self,
+        window_seconds,
+        raw_sample_buffer_size=DOWNSAMPLER_DEFAULT_RAW_SAMPLE_BUFFER_SIZE,
+    ):
+        """
+        Store one aggregated row per local sensor and window instead of every sample.
+
+        :param int window_seconds: The length of a window. Value shall be greater than 0.
+        :param int raw_sample_buffer_size: How many raw samples to keep per sensor.
+                                           Value shall be greater than 0.
+        :raises PurpleAirDataLoggerError: If ``window_seconds`` or ``raw_sample_buffer_size``
+                                          is less than 1.
+        """
+
+        if window_seconds < 1:
+            raise PurpleAirDataLoggerError(
+                f"window_seconds ({window_seconds}) shall not be less than 1."
+            )
+
+        if raw_sample_buffer_size < 1:
+            raise PurpleAirDataLoggerError(
+                f"raw_sample_buffer_size ({raw_sample_buffer_size}) shall not be less than 1."
+            )
+
+        self._local_sensor_downsampler = PurpleAirDataLoggerDownsampler(
+            window_seconds, raw_sample_buffer_size
+        )
+
+    def configure_quality_control(self, use_numpy=None):
+        """
+        Compare the A and B channels of every row before it is stored, downgrade
+        channels that are out of range and store the findings in 'qc_flags'.
+
+        :param bool use_numpy: If None, use NumPy when it is installed. If True, NumPy
+                               must be installed. If False, always use the scalar Python
+                               implementation.
+        :raises PurpleAirDataLoggerError: If ``use_numpy`` is True and NumPy isn't
+                                          installed.
+        """
+
+        try:
+            self._quality_control = PurpleAirDataLoggerQualityControl(use_numpy)
+
+        except ImportError as error:
+            raise PurpleAirDataLoggerError(str(error)) from error
+
+    def configure_enrichment(self, use_numpy=None):
+        """
+        Add the US EPA corrected PM2.5, its NowCast and the PM2.5 AQI to every row
+        before it is stored.
+
+        :param bool use_numpy: If None, use NumPy when it is installed. If True, NumPy
+                               must be installed. If False, always use the scalar Python
+                               implementation.
+        :raises PurpleAirDataLoggerError: If ``use_numpy`` is True and NumPy isn't
+                                          installed.
+        """
+
+        try:
+            self._enrichment = PurpleAirDataLoggerEnrichment(use_numpy)
+
+        except ImportError as error:
+            raise PurpleAirDataLoggerError(str(error)) from error
+
     def store_sensor_data(self, single_sensor_data_dict):
         """
         Insert the sensor data into the database.
@@ -101,6 +356,52 @@ class PurpleAirDataLogger:
             "Must be implemented by class that is inheriting PurpleAirDataLogger!"
         )
 
+    def finish_storing_sensor_data(self):
+        """
+        Called once after each batch of 'store_sensor_data' calls that stored at least
+        one row. Data loggers that do per batch work (e.g. refreshing rollups) override
+        this. The default does nothing.
+        """
+
+        pass
+
+    def collect_stored_sensor_data(self):
+        """
+        Called before each batch is filtered. Data loggers that store sensor data in
+        the background override this to remember what they committed since the last
+        call. The default does nothing, since sensor data is stored by the time
+        'store_sensor_data' returns.
+        """
+
+        pass
+
+    def stop(self) -> None:
+        """
+        Called once when the data logger stops running. Shuts down the pool local
+        sensors are requested from without waiting for requests still running, and
+        stores the windows the local sensor downsampler still has open.
+
+        :return: None
+        """
+
+        if self._local_sensor_executor is not None:
+            self._local_sensor_executor.shutdown(wait=False, cancel_futures=True)
+            self._local_sensor_executor = None
+            self._running_local_sensor_requests = {}
+
+        if self._local_sensor_downsampler is not None:
+            store_new_sensor_data(self, self._local_sensor_downsampler.flush())
+
+    def _finish_polling_cycle(self) -> None:
+        """
+        A method the run loops call after every polling cycle.
+
+        :return: None
+        """
+
+        if self._polling_cycle_callback is not None:
+            self._polling_cycle_callback()
+
     def _run_loop_for_storing_single_sensor_data(self, json_config_file) -> None:
         """
         A method containing the run loop for inserting a single sensor's data into the data logger.
@@ -117,6 +418,7 @@ class PurpleAirDataLogger:
                 "_run_loop_for_storing_single_sensor_data - Beep boop I am alive...\n\n"
             )
             logic_for_storing_single_sensor_data(self, json_config_file)
+            self._finish_polling_cycle()
             sleep(self.send_request_every_x_seconds)
 
     def _run_loop_for_storing_multiple_sensors_data(self, json_config_file) -> None:
@@ -130,11 +432,35 @@ class PurpleAirDataLogger:
         # Set the polling interval
         self.send_request_every_x_seconds = json_config_file["poll_interval_seconds"]
 
+        tile_rows = json_config_file.get("tile_rows", 1)
+        tile_columns = json_config_file.get("tile_columns", 1)
+        if tile_rows < 1 or tile_columns < 1:
+            raise PurpleAirDataLoggerError(
+                f"tile_rows ({tile_rows}) and tile_columns ({tile_columns}) shall not be less than 1."
+            )
+
+        # 'show_only' requests may leave the bounding box out or null
+        if tile_rows * tile_columns > 1 and None in (
+            json_config_file.get("nwlng"),
+            json_config_file.get("nwlat"),
+            json_config_file.get("selng"),
+            json_config_file.get("selat"),
+        ):
+            raise PurpleAirDataLoggerError(
+                "'nwlng', 'nwlat', 'selng' and 'selat' are needed to split the bounding box into tiles."
+            )
+
+        if json_config_file.get("max_concurrent_tile_requests", 1) < 1:
+            raise PurpleAirDataLoggerError(
+                f"max_concurrent_tile_requests ({json_config_file['max_concurrent_tile_requests']}) shall not be less than 1."
+            )
+
         while True:
             print(
                 "_run_loop_for_storing_multiple_sensors_data - Beep boop I am alive...\n\n"
             )
             logic_for_storing_multiple_sensors_data(self, json_config_file)
+            self._finish_polling_cycle()
             sleep(self.send_request_every_x_seconds)
 
     def _run_loop_for_storing_group_sensors_data(self, json_config_file) -> None:
@@ -156,6 +482,7 @@ class PurpleAirDataLogger:
             group_id_to_use = logic_for_storing_group_sensors_data(
                 self, group_id_to_use, json_config_file
             )
+            self._finish_polling_cycle()
             sleep(self.send_request_every_x_seconds)
 
     def _run_loop_for_storing_local_sensors_data(self, json_config_file) -> None:
@@ -166,12 +493,25 @@ class PurpleAirDataLogger:
         :return: None
         """
 
-        while True:
-            print(
-                "_run_loop_for_storing_local_sensors_data - Beep boop I am alive...\n\n"
+        if "downsample_window_seconds" in json_config_file:
+            self.configure_local_sensor_downsampler(
+                json_config_file["downsample_window_seconds"],
+                json_config_file.get(
+                    "raw_sample_buffer_size", DOWNSAMPLER_DEFAULT_RAW_SAMPLE_BUFFER_SIZE
+                ),
             )
-            logic_for_storing_local_sensors_data(self, json_config_file)
-            sleep(json_config_file["poll_interval_seconds"])
+
+        try:
+            while True:
+                print(
+                    "_run_loop_for_storing_local_sensors_data - Beep boop I am alive...\n\n"
+                )
+                logic_for_storing_local_sensors_data(self, json_config_file)
+                self._finish_polling_cycle()
+                sleep(json_config_file["poll_interval_seconds"])
+
+        finally:
+            self.stop()
 
     def validate_parameters_and_run(
         self,
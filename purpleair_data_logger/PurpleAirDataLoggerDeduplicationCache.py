@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+A bounded LRU cache of recently stored (sensor_index, data_time_stamp) keys. It sits in
+front of every data logger's 'store_sensor_data' method so duplicate rows are dropped
+before any I/O happens.
+"""
+
+from collections import OrderedDict
+import json
+import os
+
+#: The default number of (sensor_index, data_time_stamp) keys to remember.
+DEDUPLICATION_CACHE_DEFAULT_MAX_SIZE = 100000
+
+#: The persisted file is compacted once it holds this many times ``max_size`` keys.
+DEDUPLICATION_CACHE_COMPACTION_FACTOR = 2
+
+
+class PurpleAirDataLoggerDeduplicationCache:
+    """
+    A least recently used cache of stored row keys with optional on-disk persistence
+    so duplicates are still recognized after a restart. The file is a log with one JSON
+    key per line. Saving appends the keys added since the last save, and the log is
+    rewritten with only the cached keys once it grows too long.
+    """
+
+    def __init__(self, max_size=DEDUPLICATION_CACHE_DEFAULT_MAX_SIZE, file_path=None):
+        """
+        :param int max_size: The maximum number of keys to remember. The least recently
+                             used key is evicted first.
+        :param str file_path: An optional path to a file used to persist the keys
+                              across restarts. If ``None`` the cache is in memory only.
+        """
+
+        self._max_size = max_size
+        self._file_path = file_path
+        self._keys = OrderedDict()
+
+        # The keys added since the last save and the number of keys in the file
+        self._unsaved_keys = []
+        self._saved_key_count = 0
+
+        if self._file_path is not None:
+            self.load()
+
+    def __len__(self):
+        return len(self._keys)
+
+    @staticmethod
+    def make_key(single_sensor_data_dict):
+        """
+        Build the cache key for a single sensor's data.
+
+        :param dict single_sensor_data_dict: A python dictionary as expected by 'store_sensor_data'.
+
+        :return: A (sensor_index, data_time_stamp) tuple.
+        :rtype: tuple
+        """
+
+        return (
+            single_sensor_data_dict.get("sensor_index"),
+            single_sensor_data_dict.get("data_time_stamp"),
+        )
+
+    def contains(self, key):
+        """
+        Check if a key was recently stored. A hit marks the key as recently used.
+
+        :param tuple key: A key built by ``make_key``.
+
+        :return: True if the key is in the cache.
+        :rtype: bool
+        """
+
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return True
+
+        return False
+
+    def add(self, key):
+        """
+        Remember a stored key, evicting the least recently used key when full.
+
+        :param tuple key: A key built by ``make_key``.
+        """
+
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        if len(self._keys) > self._max_size:
+            self._keys.popitem(last=False)
+
+        if self._file_path is not None:
+            self._unsaved_keys.append(key)
+
+    def load(self):
+        """
+        Load persisted keys from ``file_path`` if the file exists. A line that isn't a
+        (sensor_index, data_time_stamp) pair, e.g. one cut short by a crash, is skipped
+        and the file is compacted so new keys aren't appended to it.
+        """
+
+        if not os.path.exists(self._file_path):
+            return
+
+        persisted_keys = []
+        has_broken_line = False
+        with open(self._file_path, "r") as file_obj:
+            for line in file_obj:
+                try:
+                    persisted_key = json.loads(line)
+
+                except ValueError:
+                    persisted_key = None
+
+                if (
+                    not isinstance(persisted_key, list)
+                    or len(persisted_key) != 2
+                    or any(isinstance(value, (list, dict)) for value in persisted_key)
+                ):
+                    has_broken_line = True
+                    continue
+
+                persisted_keys.append(persisted_key)
+
+        # Only keep the most recent keys that fit
+        for sensor_index, data_time_stamp in persisted_keys[-self._max_size :]:
+            key = (sensor_index, data_time_stamp)
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+
+        self._unsaved_keys = []
+        self._saved_key_count = len(persisted_keys)
+        if has_broken_line:
+            self.compact()
+
+    def save(self):
+        """
+        Persist the keys added since the last save to ``file_path``. They are appended,
+        so a save costs as much as the new keys rather than the whole cache. Once the
+        file holds ``DEDUPLICATION_CACHE_COMPACTION_FACTOR`` times ``max_size`` keys it
+        is rewritten with only the cached keys, atomically so a crash never leaves it
+        half written.
+        """
+
+        if self._file_path is None or not self._unsaved_keys:
+            return
+
+        if (
+            self._saved_key_count + len(self._unsaved_keys)
+            > DEDUPLICATION_CACHE_COMPACTION_FACTOR * self._max_size
+        ):
+            self.compact()
+            return
+
+        with open(self._file_path, "a") as file_obj:
+            file_obj.writelines(
+                f"{json.dumps(list(key))}\n" for key in self._unsaved_keys
+            )
+
+        self._saved_key_count += len(self._unsaved_keys)
+        self._unsaved_keys = []
+
+    def compact(self):
+        """
+        Rewrite ``file_path`` with only the cached keys, least recently used first.
+        """
+
+        if self._file_path is None:
+            return
+
+        temp_file_path = self._file_path + ".tmp"
+        with open(temp_file_path, "w") as file_obj:
+            file_obj.writelines(f"{json.dumps(list(key))}\n" for key in self._keys)
+
+        os.replace(temp_file_path, self._file_path)
+        self._saved_key_count = len(self._keys)
+        self._unsaved_keys = []
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+An aggregation stage between a high rate local sensor poll and 'store_sensor_data'.
+Samples are folded into fixed windows per sensor and one row with the mean, min, max and
+standard deviation of each reading is emitted per window. The raw samples are only kept
+in a PurpleAirDataLoggerRingBuffer.
+"""
+
+from purpleair_data_logger.PurpleAirLocalSensorMapping import (
+    LOCAL_SENSOR_AB_FIELD_MAPPING,
+)
+from purpleair_data_logger.PurpleAirDataLoggerRingBuffer import (
+    PurpleAirDataLoggerRingBuffer,
+)
+import math
+from time import monotonic
+
+#: The default number of raw samples to keep per sensor
+DOWNSAMPLER_DEFAULT_RAW_SAMPLE_BUFFER_SIZE = 3600
+
+#: The fields that are aggregated. Every other field keeps the value of the latest
+#: sample in the window.
+DOWNSAMPLED_FIELD_NAMES = tuple(
+    field_name
+    for base_field_name, _, _ in LOCAL_SENSOR_AB_FIELD_MAPPING
+    for field_name in (base_field_name, f"{base_field_name}_a", f"{base_field_name}_b")
+)
+
+#: The statistics kept next to the mean of each aggregated field
+DOWNSAMPLED_STATISTIC_NAMES = ("min", "max", "stddev")
+
+#: The keys a window row has on top of the fields 'store_sensor_data' expects. Data
+#: loggers store them in their window_statistics_fields table, file or stream.
+WINDOW_STATISTICS_FIELD_NAMES = ("sample_count",) + tuple(
+    f"{field_name}_{statistic_name}"
+    for field_name in DOWNSAMPLED_FIELD_NAMES
+    for statistic_name in DOWNSAMPLED_STATISTIC_NAMES
+)
+
+
+class PurpleAirDataLoggerDownsampler:
+    """
+    Folds high rate samples into one row per sensor and window. An emitted row has the
+    window start as its 'data_time_stamp', the window mean in each aggregated field,
+    <field>_min, <field>_max and <field>_stddev (population) next to it, and the number
+    of samples in 'sample_count'. Data loggers store the mean like any other reading and
+    the extra keys, ``WINDOW_STATISTICS_FIELD_NAMES``, in their window_statistics_fields
+    table, file or stream.
+    """
+
+    def __init__(
+        self,
+        window_seconds,
+        raw_sample_buffer_size=DOWNSAMPLER_DEFAULT_RAW_SAMPLE_BUFFER_SIZE,
+    ):
+        """
+        :param int window_seconds: The length of a window, i.e. one row per sensor is
+                                   emitted every ``window_seconds``.
+        :param int raw_sample_buffer_size: How many raw samples to keep per sensor. The
+                                           oldest sample is dropped first.
+        """
+
+        self._window_seconds = window_seconds
+        self._raw_samples = PurpleAirDataLoggerRingBuffer(raw_sample_buffer_size)
+
+        # Maps a 'sensor_index' to its open window
+        self._open_windows = {}
+
+    def add_sample(self, single_sensor_data_dict, received_at=None) -> list:
+        """
+        Add one sample. A sample from a later window closes the sensor's open window.
+
+        :param dict single_sensor_data_dict: A python dictionary as expected by 'store_sensor_data'.
+        :param float received_at: When the sample was received, in ``time.monotonic()``
+                                  seconds. Defaults to now.
+
+        :return: The rows of the windows this sample closed. Empty or a single row.
+        :rtype: list
+        """
+
+        sensor_index = single_sensor_data_dict["sensor_index"]
+        self._raw_samples.append(single_sensor_data_dict)
+
+        data_time_stamp = int(single_sensor_data_dict["data_time_stamp"])
+        window_start = data_time_stamp - data_time_stamp % self._window_seconds
+        closed_rows = []
+        open_window = self._open_windows.get(sensor_index)
+        if open_window is not None and open_window["window_start"] != window_start:
+            closed_rows.append(self._make_window_row(open_window))
+            open_window = None
+
+        if open_window is None:
+            open_window = {
+                "window_start": window_start,
+                "sample_count": 0,
+                "statistics": {},
+            }
+            self._open_windows[sensor_index] = open_window
+
+        open_window["sample_count"] += 1
+        open_window["latest_sample"] = single_sensor_data_dict
+        open_window["received_at"] = monotonic() if received_at is None else received_at
+        statistics = open_window["statistics"]
+        for field_name in DOWNSAMPLED_FIELD_NAMES:
+            value = single_sensor_data_dict.get(field_name)
+            if value is None:
+                continue
+
+            # Welford's algorithm keeps the mean and variance stable in one pass
+            value = float(value)
+            field_statistics = statistics.get(field_name)
+            if field_statistics is None:
+                statistics[field_name] = [1, value, 0.0, value, value]
+                continue
+
+            field_statistics[0] += 1
+            delta = value - field_statistics[1]
+            field_statistics[1] += delta / field_statistics[0]
+            field_statistics[2] += delta * (value - field_statistics[1])
+            field_statistics[3] = min(field_statistics[3], value)
+            field_statistics[4] = max(field_statistics[4], value)
+
+        return closed_rows
+
+    def flush(self) -> list:
+        """
+        Close every open window, e.g. before shutting down.
+
+        :return: One row per sensor that had an open window.
+        :rtype: list
+        """
+
+        closed_rows = [
+            self._make_window_row(open_window)
+            for open_window in self._open_windows.values()
+        ]
+        self._open_windows = {}
+        return closed_rows
+
+    def close_idle_windows(self, now=None) -> list:
+        """
+        Close the windows of sensors that haven't sent a sample for longer than one
+        window, so a sensor that went quiet doesn't hold back its last window. Idle
+        time is measured on this host's clock, since a sensor's clock may be off.
+
+        :param float now: The current ``time.monotonic()`` seconds. Defaults to now.
+
+        :return: One row per window that was closed.
+        :rtype: list
+        """
+
+        if now is None:
+            now = monotonic()
+
+        closed_rows = []
+        for sensor_index, open_window in list(self._open_windows.items()):
+            if now - open_window["received_at"] > self._window_seconds:
+                closed_rows.append(self._make_window_row(open_window))
+                del self._open_windows[sensor_index]
+
+        return closed_rows
+
+    def get_raw_samples(self, sensor_index) -> list:
+        """
+        Get the raw samples still in a sensor's ring buffer. Only their numeric fields
+        are kept.
+
+        :param int sensor_index: The sensor to get the raw samples of.
+
+        :return: The raw samples, oldest first.
+        :rtype: list
+        """
+
+        return self._raw_samples.get_last(sensor_index, self._raw_samples.capacity)
+
+    @staticmethod
+    def _make_window_row(open_window) -> dict:
+        """
+        Build the row for a closed window.
+
+        :param dict open_window: The window to build the row for.
+
+        :return: A python dictionary as expected by 'store_sensor_data'.
+        :rtype: dict
+        """
+
+        window_row = dict(open_window["latest_sample"])
+        window_row["data_time_stamp"] = open_window["window_start"]
+        window_row["sample_count"] = open_window["sample_count"]
+        for field_name, (
+            count,
+            mean,
+            m2,
+            minimum,
+            maximum,
+        ) in open_window["statistics"].items():
+            window_row[field_name] = mean
+            window_row[f"{field_name}_min"] = minimum
+            window_row[f"{field_name}_max"] = maximum
+            window_row[f"{field_name}_stddev"] = math.sqrt(m2 / count)
+
+        return window_row
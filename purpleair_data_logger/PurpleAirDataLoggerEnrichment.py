@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+An optional enrichment stage that adds the US EPA corrected PM2.5, its NowCast and the
+PM2.5 AQI to every row of a batch before it is stored. With NumPy installed the whole
+batch is computed in one vectorized pass, otherwise a scalar Python implementation with
+the same results is used.
+"""
+
+import math
+
+try:
+    import numpy
+
+except ImportError:
+    numpy = None
+
+#: The fields the enrichment stage adds to every row. They are None when the
+#: enrichment stage is off or a value can't be computed.
+ENRICHMENT_FIELD_NAMES = ("pm2.5_epa_corrected", "pm2.5_nowcast", "aqi")
+
+#: The number of hourly averages the NowCast is computed over
+NOWCAST_HOURS = 12
+
+#: The US EPA PM2.5 AQI breakpoints (2024 revision) as (concentration low,
+#: concentration high, AQI low, AQI high). Concentrations above the last breakpoint
+#: are reported as AQI 500.
+AQI_PM2_5_BREAKPOINTS = (
+    (0.0, 9.0, 0, 50),
+    (9.1, 35.4, 51, 100),
+    (35.5, 55.4, 101, 150),
+    (55.5, 125.4, 151, 200),
+    (125.5, 225.4, 201, 300),
+    (225.5, 325.4, 301, 500),
+)
+
+
+def correct_pm2_5_epa(pm2_5_cf_1, humidity):
+    """
+    Apply the 2021 US EPA correction for PurpleAir sensors.
+    https://www.epa.gov/air-sensor-toolbox/technical-approaches-sensor-data-airnow-fire-and-smoke-map
+
+    :param float pm2_5_cf_1: The A/B averaged PM2.5 CF=1 concentration.
+    :param float humidity: The relative humidity.
+
+    :return: The corrected PM2.5 concentration, or None if an input is missing.
+    :rtype: float or None
+    """
+
+    if pm2_5_cf_1 is None or humidity is None:
+        return None
+
+    pa = float(pm2_5_cf_1)
+    rh = float(humidity)
+    if pa < 30:
+        corrected = 0.524 * pa - 0.0862 * rh + 5.75
+
+    elif pa < 50:
+        blend = pa / 20 - 3 / 2
+        corrected = (0.786 * blend + 0.524 * (1 - blend)) * pa - 0.0862 * rh + 5.75
+
+    elif pa < 210:
+        corrected = 0.786 * pa - 0.0862 * rh + 5.75
+
+    elif pa < 260:
+        blend = pa / 50 - 21 / 5
+        corrected = (
+            (0.69 * blend + 0.786 * (1 - blend)) * pa
+            - 0.0862 * rh * (1 - blend)
+            + 2.966 * blend
+            + 5.75 * (1 - blend)
+            + 8.84e-4 * pa**2 * blend
+        )
+
+    else:
+        corrected = 2.966 + 0.69 * pa + 8.84e-4 * pa**2
+
+    return max(corrected, 0.0)
+
+
+def compute_nowcast(hourly_averages):
+    """
+    Compute the NowCast of a series of hourly averages.
+
+    :param list hourly_averages: Up to ``NOWCAST_HOURS`` hourly averages, the current
+                                 hour first. Hours without data are None.
+
+    :return: The NowCast, or None if two of the three most recent hours are missing.
+    :rtype: float or None
+    """
+
+    if sum(average is not None for average in hourly_averages[:3]) < 2:
+        return None
+
+    known_averages = [average for average in hourly_averages if average is not None]
+    maximum = max(known_averages)
+    weight = (
+        1.0 if maximum <= 0 else max(1 - (maximum - min(known_averages)) / maximum, 0.5)
+    )
+    weighted_sum = 0.0
+    weight_sum = 0.0
+    for hour, average in enumerate(hourly_averages):
+        if average is not None:
+            weighted_sum += weight**hour * average
+            weight_sum += weight**hour
+
+    return weighted_sum / weight_sum
+
+
+def compute_aqi_pm2_5(concentration):
+    """
+    Convert a PM2.5 concentration to the US EPA AQI.
+
+    :param float concentration: The PM2.5 concentration, e.g. a NowCast.
+
+    :return: The AQI, or None if ``concentration`` is None.
+    :rtype: int or None
+    """
+
+    if concentration is None:
+        return None
+
+    # The EPA truncates PM2.5 to one decimal before looking up the breakpoints
+    concentration = math.floor(concentration * 10) / 10
+    for (
+        concentration_low,
+        concentration_high,
+        aqi_low,
+        aqi_high,
+    ) in AQI_PM2_5_BREAKPOINTS:
+        if concentration <= concentration_high:
+            return round(
+                (aqi_high - aqi_low)
+                / (concentration_high - concentration_low)
+                * (max(concentration, concentration_low) - concentration_low)
+                + aqi_low
+            )
+
+    return AQI_PM2_5_BREAKPOINTS[-1][3]
+
+
+class PurpleAirDataLoggerEnrichment:
+    """
+    Adds ``ENRICHMENT_FIELD_NAMES`` to the rows of a batch. It keeps the hourly sums of
+    the corrected PM2.5 of the last ``NOWCAST_HOURS`` hours per sensor to compute the
+    NowCast.
+    """
+
+    def __init__(self, use_numpy=None):
+        """
+        :param bool use_numpy: If None, use NumPy when it is installed. If True, NumPy
+                               must be installed. If False, always use the scalar Python
+                               implementation.
+
+        :raises ImportError: If ``use_numpy`` is True and NumPy isn't installed.
+        """
+
+        if use_numpy and numpy is None:
+            raise ImportError("NumPy is needed for the vectorized enrichment stage")
+
+        self._use_numpy = numpy is not None if use_numpy is None else use_numpy
+
+        # Maps a 'sensor_index' to its row in the hourly history. Column 0 is the
+        # sensor's latest hour, column i the hour i hours before it.
+        self._history_rows = {}
+        if self._use_numpy:
+            self._hourly_sums = numpy.zeros((0, NOWCAST_HOURS))
+            self._hourly_counts = numpy.zeros((0, NOWCAST_HOURS))
+            self._latest_hours = numpy.zeros(0, dtype=numpy.int64)
+
+        else:
+            self._hourly_sums = []
+            self._hourly_counts = []
+            self._latest_hours = []
+
+    @property
+    def uses_numpy(self):
+        """
+        :return: True if batches are enriched with NumPy.
+        :rtype: bool
+        """
+
+        return self._use_numpy
+
+    def enrich(self, store_sensor_data_type_list) -> list:
+        """
+        Add ``ENRICHMENT_FIELD_NAMES`` to every row, in place.
+
+        :param list store_sensor_data_type_list: A list of the dict data type that the
+                                                 store_sensor_data method expects.
+
+        :return: ``store_sensor_data_type_list``
+        :rtype: list
+        """
+
+        if not store_sensor_data_type_list:
+            return store_sensor_data_type_list
+
+        if self._use_numpy:
+            self._enrich_vectorized(store_sensor_data_type_list)
+
+        else:
+            for store_sensor_data_type in store_sensor_data_type_list:
+                self._enrich_scalar(store_sensor_data_type)
+
+        return store_sensor_data_type_list
+
+    def _get_history_row(self, sensor_index, data_hour):
+        """
+        Get the history row of a sensor, adding one when it is new.
+
+        :return: The row.
+        :rtype: int
+        """
+
+        history_row = self._history_rows.get(sensor_index)
+        if history_row is not None:
+            return history_row
+
+        history_row = len(self._history_rows)
+        self._history_rows[sensor_index] = history_row
+        if self._use_numpy:
+            if history_row == len(self._latest_hours):
+                # Grow by doubling so adding sensors is amortized O(1)
+                new_row_count = max(2 * history_row, 64)
+                for attribute_name in ("_hourly_sums", "_hourly_counts"):
+                    grown = numpy.zeros((new_row_count, NOWCAST_HOURS))
+                    grown[:history_row] = getattr(self, attribute_name)
+                    setattr(self, attribute_name, grown)
+
+                grown = numpy.zeros(new_row_count, dtype=numpy.int64)
+                grown[:history_row] = self._latest_hours
+                self._latest_hours = grown
+
+            self._latest_hours[history_row] = data_hour
+
+        else:
+            self._hourly_sums.append([0.0] * NOWCAST_HOURS)
+            self._hourly_counts.append([0] * NOWCAST_HOURS)
+            self._latest_hours.append(data_hour)
+
+        return history_row
+
+    def _enrich_scalar(self, store_sensor_data_type):
+        """
+        The scalar Python implementation, one row at a time.
+        """
+
+        corrected = correct_pm2_5_epa(
+            store_sensor_data_type.get("pm2.5_cf_1"),
+            store_sensor_data_type.get("humidity"),
+        )
+        data_hour = int(store_sensor_data_type["data_time_stamp"]) // 3600
+        history_row = self._get_history_row(
+            store_sensor_data_type["sensor_index"], data_hour
+        )
+        hourly_sums = self._hourly_sums[history_row]
+        hourly_counts = self._hourly_counts[history_row]
+
+        # Move the history forward when a new hour started
+        shift = data_hour - self._latest_hours[history_row]
+        if shift > 0:
+            keep = max(NOWCAST_HOURS - shift, 0)
+            hourly_sums[:] = [0.0] * (NOWCAST_HOURS - keep) + hourly_sums[:keep]
+            hourly_counts[:] = [0] * (NOWCAST_HOURS - keep) + hourly_counts[:keep]
+            self._latest_hours[history_row] = data_hour
+
+        # Samples older than the latest hour don't change the history
+        if corrected is not None and shift >= 0:
+            hourly_sums[0] += corrected
+            hourly_counts[0] += 1
+
+        nowcast = compute_nowcast(
+            [
+                hourly_sum / hourly_count if hourly_count else None
+                for hourly_sum, hourly_count in zip(hourly_sums, hourly_counts)
+            ]
+        )
+        store_sensor_data_type["pm2.5_epa_corrected"] = corrected
+        store_sensor_data_type["pm2.5_nowcast"] = nowcast
+        store_sensor_data_type["aqi"] = compute_aqi_pm2_5(nowcast)
+
+    def _enrich_vectorized(self, store_sensor_data_type_list):
+        """
+        The NumPy implementation, one pass over the whole batch. A batch is expected to
+        have one row per sensor. Repeated sensors are split off into their own pass.
+        """
+
+        sensor_indexes = [row["sensor_index"] for row in store_sensor_data_type_list]
+        if len(set(sensor_indexes)) != len(sensor_indexes):
+            seen_sensor_indexes = set()
+            for row_number, sensor_index in enumerate(sensor_indexes):
+                if sensor_index in seen_sensor_indexes:
+                    self._enrich_vectorized(store_sensor_data_type_list[:row_number])
+                    self._enrich_vectorized(store_sensor_data_type_list[row_number:])
+                    return
+
+                seen_sensor_indexes.add(sensor_index)
+
+        # None becomes NaN
+        pa = numpy.array(
+            [row.get("pm2.5_cf_1") for row in store_sensor_data_type_list], dtype=float
+        )
+        rh = numpy.array(
+            [row.get("humidity") for row in store_sensor_data_type_list], dtype=float
+        )
+        data_hours = (
+            numpy.array(
+                [row["data_time_stamp"] for row in store_sensor_data_type_list],
+                dtype=numpy.int64,
+            )
+            // 3600
+        )
+        history_rows = [
+            self._history_rows.get(sensor_index) for sensor_index in sensor_indexes
+        ]
+        for row_number, history_row in enumerate(history_rows):
+            if history_row is None:
+                history_rows[row_number] = self._get_history_row(
+                    sensor_indexes[row_number], data_hours[row_number]
+                )
+
+        history_rows = numpy.array(history_rows, dtype=numpy.int64)
+
+        # The EPA correction, every range at once
+        with numpy.errstate(invalid="ignore"):
+            low_blend = pa / 20 - 3 / 2
+            high_blend = pa / 50 - 21 / 5
+            corrected = numpy.select(
+                [pa < 30, pa < 50, pa < 210, pa < 260],
+                [
+                    0.524 * pa - 0.0862 * rh + 5.75,
+                    (0.786 * low_blend + 0.524 * (1 - low_blend)) * pa
+                    - 0.0862 * rh
+                    + 5.75,
+                    0.786 * pa - 0.0862 * rh + 5.75,
+                    (0.69 * high_blend + 0.786 * (1 - high_blend)) * pa
+                    - 0.0862 * rh * (1 - high_blend)
+                    + 2.966 * high_blend
+                    + 5.75 * (1 - high_blend)
+                    + 8.84e-4 * pa**2 * high_blend,
+                ],
+                2.966 + 0.69 * pa + 8.84e-4 * pa**2,
+            )
+            corrected = numpy.where(
+                numpy.isnan(pa) | numpy.isnan(rh),
+                numpy.nan,
+                numpy.maximum(corrected, 0),
+            )
+
+        # Move every history forward to its sensor's current hour
+        shifts = data_hours - self._latest_hours[history_rows]
+        moved = shifts > 0
+        if moved.any():
+            moved_rows = history_rows[moved]
+            source_columns = (
+                numpy.arange(NOWCAST_HOURS)[None, :] - shifts[moved][:, None]
+            )
+            in_range = source_columns >= 0
+            source_columns = numpy.clip(source_columns, 0, NOWCAST_HOURS - 1)
+            for attribute_name in ("_hourly_sums", "_hourly_counts"):
+                history = getattr(self, attribute_name)
+                history[moved_rows] = numpy.where(
+                    in_range,
+                    numpy.take_along_axis(history[moved_rows], source_columns, axis=1),
+                    0,
+                )
+
+            self._latest_hours[moved_rows] = data_hours[moved]
+
+        # Samples older than the latest hour don't change the history
+        accumulate = ~numpy.isnan(corrected) & (shifts >= 0)
+        self._hourly_sums[history_rows[accumulate], 0] += corrected[accumulate]
+        self._hourly_counts[history_rows[accumulate], 0] += 1
+
+        # The NowCast of every sensor in the batch
+        hourly_counts = self._hourly_counts[history_rows]
+        known = hourly_counts > 0
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            hourly_averages = numpy.where(
+                known, self._hourly_sums[history_rows] / hourly_counts, numpy.nan
+            )
+            maximum = numpy.nanmax(
+                numpy.where(known, hourly_averages, -numpy.inf), axis=1
+            )
+            minimum = numpy.nanmin(
+                numpy.where(known, hourly_averages, numpy.inf), axis=1
+            )
+            weight = numpy.where(
+                maximum <= 0, 1.0, numpy.maximum(1 - (maximum - minimum) / maximum, 0.5)
+            )
+            weights = numpy.where(
+                known, weight[:, None] ** numpy.arange(NOWCAST_HOURS)[None, :], 0
+            )
+            nowcast = (weights * numpy.nan_to_num(hourly_averages)).sum(
+                axis=1
+            ) / weights.sum(axis=1)
+
+        nowcast = numpy.where(known[:, :3].sum(axis=1) >= 2, nowcast, numpy.nan)
+
+        # The AQI, looking up every breakpoint at once
+        truncated = numpy.floor(nowcast * 10) / 10
+        breakpoints = numpy.array(AQI_PM2_5_BREAKPOINTS, dtype=float)
+        segments = numpy.searchsorted(breakpoints[:, 1], truncated, side="left")
+        over_range = segments >= len(breakpoints)
+        segments = numpy.minimum(segments, len(breakpoints) - 1)
+        concentration_low, concentration_high, aqi_low, aqi_high = breakpoints[
+            segments
+        ].T
+        aqi = numpy.where(
+            over_range,
+            breakpoints[-1, 3],
+            numpy.round(
+                (aqi_high - aqi_low)
+                / (concentration_high - concentration_low)
+                * (numpy.maximum(truncated, concentration_low) - concentration_low)
+                + aqi_low
+            ),
+        )
+
+        # Converting whole arrays is much cheaper than converting NumPy scalars
+        for store_sensor_data_type, corrected_value, nowcast_value, aqi_value in zip(
+            store_sensor_data_type_list,
+            corrected.tolist(),
+            nowcast.tolist(),
+            aqi.tolist(),
+        ):
+            if math.isnan(nowcast_value):
+                nowcast_value = None
+                aqi_value = None
+
+            else:
+                aqi_value = int(aqi_value)
+
+            store_sensor_data_type["pm2.5_epa_corrected"] = (
+                None if math.isnan(corrected_value) else corrected_value
+            )
+            store_sensor_data_type["pm2.5_nowcast"] = nowcast_value
+            store_sensor_data_type["aqi"] = aqi_value
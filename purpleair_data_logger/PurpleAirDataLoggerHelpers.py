@@ -7,9 +7,32 @@ A helper file that contains functions for PurpleAirDataLogger* files.
 
 from purpleair_api.PurpleAirAPIConstants import ACCEPTED_FIELD_NAMES_DICT
 from purpleair_api.PurpleAirAPI import debug_log, PurpleAirAPIError
+from purpleair_api.PurpleAirLocalAPI import PurpleAirLocalAPI
+from purpleair_data_logger.PurpleAirDataLoggerDeduplicationCache import (
+    DEDUPLICATION_CACHE_DEFAULT_MAX_SIZE,
+)
+from purpleair_data_logger.PurpleAirLocalSensorMapping import (
+    convert_local_sensor_data,
+)
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import argparse
+import math
 import time
 
+#: The conflict modes the SQLite and PSQL data loggers can insert rows with.
+#: 'insert' raises on a duplicate (data_time_stamp, sensor_index), 'ignore' keeps the
+#: stored row and 'update' overwrites the stored row with the new values.
+INSERT_CONFLICT_MODES = ("insert", "ignore", "update")
+
+#: The default seconds a local sensor has to answer before it is skipped for the cycle
+LOCAL_SENSOR_DEFAULT_REQUEST_TIMEOUT_SECONDS = 2
+
+#: The default number of local sensors that are requested at the same time
+LOCAL_SENSOR_DEFAULT_MAX_CONCURRENT_REQUESTS = 16
+
+#: The default number of bounding box tiles that are requested at the same time
+BOUNDING_BOX_DEFAULT_MAX_CONCURRENT_TILE_REQUESTS = 4
+
 
 def generate_common_arg_parser(argparse_description=""):
     """
@@ -84,9 +107,86 @@ def generate_common_arg_parser(argparse_description=""):
                             sensor request.""",
     )
 
+    parser.add_argument(
+        "-dedup_cache_size",
+        required=False,
+        default=DEDUPLICATION_CACHE_DEFAULT_MAX_SIZE,
+        dest="dedup_cache_size",
+        type=int,
+        help="""The number of recently stored (sensor_index, data_time_stamp)
+                            keys to remember. Duplicate rows are dropped before they are stored.""",
+    )
+
+    parser.add_argument(
+        "-dedup_cache_file",
+        required=False,
+        default=None,
+        dest="dedup_cache_file",
+        type=str,
+        help="""The
+                            path to a json file used to persist the deduplication cache
+                            across restarts.""",
+    )
+
+    parser.add_argument(
+        "-qc_ab_channels",
+        required=False,
+        default=False,
+        dest="qc_ab_channels",
+        action="store_true",
+        help="""Compare the A and B channels of every row before it is stored,
+                            downgrade channels that are out of range and store the findings
+                            in qc_flags. Uses NumPy when it is installed.""",
+    )
+
+    parser.add_argument(
+        "-enrich_epa_aqi",
+        required=False,
+        default=False,
+        dest="enrich_epa_aqi",
+        action="store_true",
+        help="""Add the US EPA corrected PM2.5, its NowCast and the PM2.5 AQI
+                            to every row before it is stored. Uses NumPy when it is installed.""",
+    )
+
     return parser
 
 
+def add_on_conflict_clause(insert_statement, conflict_mode) -> str:
+    """
+    A function to turn one of our INSERT statements into an upsert. The same
+    ``ON CONFLICT ... DO NOTHING/UPDATE`` syntax works for both SQLite and PSQL, which
+    makes retrying a partially stored batch idempotent.
+
+    :param str insert_statement: One of the ``*_INSERT_STATEMENT_*`` constants.
+    :param str conflict_mode: One of ``INSERT_CONFLICT_MODES``. This function does no
+                              error checking. That is up to the caller.
+
+    :return: The insert statement with the matching ``ON CONFLICT`` clause appended.
+    """
+
+    if conflict_mode == "insert":
+        return insert_statement
+
+    elif conflict_mode == "ignore":
+        return insert_statement + """
+    ON CONFLICT (data_time_stamp, sensor_index) DO NOTHING"""
+
+    # The column list is the first parenthesized group of the insert statement
+    column_names = [
+        column_name.strip()
+        for column_name in insert_statement.split("(", 1)[1].split(")", 1)[0].split(",")
+    ]
+    set_clause = ",\n        ".join(
+        f"{column_name} = EXCLUDED.{column_name}"
+        for column_name in column_names
+        if column_name not in ("data_time_stamp", "sensor_index")
+    )
+    return insert_statement + f"""
+    ON CONFLICT (data_time_stamp, sensor_index) DO UPDATE SET
+        {set_clause}"""
+
+
 def validate_sensor_data_before_insert(the_modified_sensor_data) -> dict:
     """
     Before we store the data, we must make sure all fields have been included.
@@ -151,6 +251,155 @@ def construct_store_sensor_data_type(raw_data) -> list:
     return store_sensor_data_type_list
 
 
+def determine_modified_since(padl_obj, json_config_file):
+    """
+    A function to choose the 'modified_since' value for a multiple or group sensors request.
+    The previous response's 'data_time_stamp' is used so sensors that haven't reported since
+    the last cycle are left out of the response. The configured value acts as a floor.
+
+    :param PurpleAirDataLogger padl_obj: A valid instance of PurpleAirDataLogger.
+
+    :param dict json_config_file: A dictionary object of the json config file using json load.
+
+    :return: The 'modified_since' unix epoch timestamp to send or ``None``.
+    """
+
+    configured_modified_since = json_config_file["modified_since"]
+    previous_data_time_stamp = padl_obj._last_data_time_stamp
+
+    if previous_data_time_stamp is None:
+        return configured_modified_since
+
+    elif configured_modified_since is None:
+        return previous_data_time_stamp
+
+    else:
+        return max(int(configured_modified_since), int(previous_data_time_stamp))
+
+
+def remove_sensor_data_without_new_last_seen(
+    padl_obj, store_sensor_data_type_list
+) -> list:
+    """
+    A function to drop sensor data whose 'last_seen' didn't advance since it was last stored.
+    Sensor data without a 'last_seen' value (``None`` or the ``0`` default filled in by
+    ``validate_sensor_data_before_insert``, i.e. local sensors) is always kept. The
+    'last_seen' values are recorded by ``store_new_sensor_data`` once the data is stored.
+
+    :param PurpleAirDataLogger padl_obj: A valid instance of PurpleAirDataLogger.
+
+    :param list store_sensor_data_type_list: A list of the dict data type that the
+                                             store_sensor_data method expects.
+
+    :return: A list with only the sensor data that has a new 'last_seen' value.
+    """
+
+    # Sensor data stored in the background since the last cycle counts too
+    padl_obj.collect_stored_sensor_data()
+
+    new_store_sensor_data_type_list = []
+    for store_sensor_data_type in store_sensor_data_type_list:
+        last_seen = store_sensor_data_type.get("last_seen")
+        sensor_index = store_sensor_data_type.get("sensor_index")
+
+        if last_seen:
+            previous_last_seen = padl_obj._last_seen_by_sensor_index.get(sensor_index)
+            if previous_last_seen is not None and last_seen <= previous_last_seen:
+                continue
+
+        new_store_sensor_data_type_list.append(store_sensor_data_type)
+
+    return new_store_sensor_data_type_list
+
+
+def remember_stored_sensor_data(padl_obj, store_sensor_data_type) -> None:
+    """
+    A function to remember sensor data once it is stored. Its key goes into the
+    deduplication cache, its 'last_seen' value is recorded and it is added to the ring
+    buffer if one is configured, the rolling statistics and the spatial index.
+
+    :param PurpleAirDataLogger padl_obj: A valid instance of PurpleAirDataLogger.
+
+    :param dict store_sensor_data_type: The dict data type that the store_sensor_data
+                                        method expects.
+
+    :return: None
+    """
+
+    padl_obj._deduplication_cache.add(
+        padl_obj._deduplication_cache.make_key(store_sensor_data_type)
+    )
+    last_seen = store_sensor_data_type.get("last_seen")
+    if last_seen:
+        padl_obj._last_seen_by_sensor_index[
+            store_sensor_data_type.get("sensor_index")
+        ] = last_seen
+
+    if padl_obj._ring_buffer is not None:
+        padl_obj._ring_buffer.append(store_sensor_data_type)
+
+    padl_obj._rolling_statistics.update(store_sensor_data_type)
+    padl_obj._spatial_index.update(store_sensor_data_type)
+
+
+def store_new_sensor_data(padl_obj, store_sensor_data_type_list) -> int:
+    """
+    A function to store sensor data that wasn't recently stored already. Sensor data is
+    only remembered after 'store_sensor_data' succeeds so a failed store can be
+    retried. Data loggers that store in the background remember it once it is committed.
+
+    :param PurpleAirDataLogger padl_obj: A valid instance of PurpleAirDataLogger.
+
+    :param list store_sensor_data_type_list: A list of the dict data type that the
+                                             store_sensor_data method expects.
+
+    :return: The number of sensor data dicts that were stored.
+    """
+
+    deduplication_cache = padl_obj._deduplication_cache
+
+    # Sensor data stored in the background since the last batch isn't new anymore
+    padl_obj.collect_stored_sensor_data()
+
+    # Drop the rows that were stored already, including repeats within this batch
+    new_sensor_data = []
+    batch_keys = set()
+    for store_sensor_data_type in store_sensor_data_type_list:
+        key = deduplication_cache.make_key(store_sensor_data_type)
+        if key in batch_keys or deduplication_cache.contains(key):
+            continue
+
+        batch_keys.add(key)
+        new_sensor_data.append(store_sensor_data_type)
+
+    # The whole batch goes through each stage at once so they can be vectorized. The
+    # channels are checked first since a downgrade changes what is enriched.
+    if padl_obj._quality_control is not None:
+        padl_obj._quality_control.check(new_sensor_data)
+
+    if padl_obj._enrichment is not None:
+        padl_obj._enrichment.enrich(new_sensor_data)
+
+    stored_count = 0
+    try:
+        for store_sensor_data_type in new_sensor_data:
+            # Store the current data
+            padl_obj.store_sensor_data(store_sensor_data_type)
+            if not padl_obj._stores_sensor_data_in_background:
+                remember_stored_sensor_data(padl_obj, store_sensor_data_type)
+
+            stored_count += 1
+
+    finally:
+        deduplication_cache.save()
+
+        # Let the data logger do its per batch work for whatever was stored
+        if stored_count:
+            padl_obj.finish_storing_sensor_data()
+
+    return stored_count
+
+
 def flatten_single_sensor_data(raw_data) -> dict:
     """
     A function to flatten the raw data from a single sensor request. This makes our logic downstream easier.
@@ -227,7 +476,13 @@ def logic_for_storing_single_sensor_data(padl_obj, json_config_file) -> None:
     the_modified_sensor_data = validate_sensor_data_before_insert(
         the_modified_sensor_data
     )
-    padl_obj.store_sensor_data(the_modified_sensor_data)
+
+    # Only store the data if the sensor has reported since the last cycle
+    store_new_sensor_data(
+        padl_obj,
+        remove_sensor_data_without_new_last_seen(padl_obj, [the_modified_sensor_data]),
+    )
+
     debug_log(f"""Waiting {padl_obj.send_request_every_x_seconds} seconds before
             requesting new data again...""")
 
@@ -236,6 +491,176 @@ def logic_for_storing_single_sensor_data(padl_obj, json_config_file) -> None:
     del the_modified_sensor_data
 
 
+def split_bounding_box_into_tiles(
+    nwlng, nwlat, selng, selat, tile_rows, tile_columns
+) -> list:
+    """
+    A function to split a bounding box into a grid of equally sized tiles.
+
+    :param float nwlng: The north west longitude of the bounding box.
+    :param float nwlat: The north west latitude of the bounding box.
+    :param float selng: The south east longitude of the bounding box.
+    :param float selat: The south east latitude of the bounding box.
+    :param int tile_rows: The number of tiles from north to south.
+    :param int tile_columns: The number of tiles from west to east.
+
+    :return: A list of (nwlng, nwlat, selng, selat) tuples, row by row starting in the
+             north west. Neighbouring tiles share their edge.
+    """
+
+    # The last row and column end exactly on the bounding box, rounding aside
+    latitudes = [
+        nwlat + (selat - nwlat) * row / tile_rows for row in range(tile_rows)
+    ] + [selat]
+    longitudes = [
+        nwlng + (selng - nwlng) * column / tile_columns
+        for column in range(tile_columns)
+    ] + [selng]
+
+    return [
+        (longitudes[column], latitudes[row], longitudes[column + 1], latitudes[row + 1])
+        for row in range(tile_rows)
+        for column in range(tile_columns)
+    ]
+
+
+def request_bounding_box_tiles_concurrently(
+    padl_obj,
+    json_config_file,
+    modified_since,
+    tile_list,
+    max_concurrent_tile_requests=BOUNDING_BOX_DEFAULT_MAX_CONCURRENT_TILE_REQUESTS,
+):
+    """
+    A generator that requests the sensors of each tile a few tiles at a time and yields
+    each tile as soon as its response arrives. A new tile is only requested when a
+    response was handed out, so at most ``max_concurrent_tile_requests`` + 1 responses
+    are held at once.
+
+    :param PurpleAirDataLogger padl_obj: A valid instance of PurpleAirDataLogger.
+    :param dict json_config_file: A dictionary object of the json config file using json load.
+    :param modified_since: The 'modified_since' unix epoch timestamp to send or ``None``.
+    :param list tile_list: The (nwlng, nwlat, selng, selat) tuples to request.
+    :param int max_concurrent_tile_requests: How many tiles are requested at the same time.
+
+    :return: Yields a (tile, sensors data, exception) tuple per tile, in the order the
+             responses arrive. Either the sensors data or the exception is ``None``.
+    """
+
+    def request_tile(tile):
+        tile_nwlng, tile_nwlat, tile_selng, tile_selat = tile
+        return padl_obj._purpleair_api_obj.request_multiple_sensors_data(
+            fields=json_config_file["fields"],
+            location_type=json_config_file["location_type"],
+            read_keys=json_config_file["read_keys"],
+            show_only=json_config_file["show_only"],
+            modified_since=modified_since,
+            max_age=json_config_file["max_age"],
+            nwlng=tile_nwlng,
+            nwlat=tile_nwlat,
+            selng=tile_selng,
+            selat=tile_selat,
+        )
+
+    if not tile_list:
+        return
+
+    max_workers = min(max_concurrent_tile_requests, len(tile_list))
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    tile_iterator = iter(tile_list)
+    future_to_tile = {}
+
+    def request_next_tile():
+        tile = next(tile_iterator, None)
+        if tile is not None:
+            future_to_tile[executor.submit(request_tile, tile)] = tile
+
+    try:
+        for _ in range(max_workers):
+            request_next_tile()
+
+        while future_to_tile:
+            done_futures, _ = wait(future_to_tile, return_when=FIRST_COMPLETED)
+            for future in done_futures:
+                tile = future_to_tile.pop(future)
+
+                # Keep the workers busy while the caller stores this tile
+                request_next_tile()
+                if future.exception() is not None:
+                    yield tile, None, future.exception()
+
+                else:
+                    yield tile, future.result(), None
+
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def logic_for_storing_multiple_sensors_data_in_tiles(
+    padl_obj, json_config_file
+) -> None:
+    """
+    A function that performs one data retrieval and storage cycle for multiple sensors,
+    with the bounding box split into 'tile_rows' x 'tile_columns' tiles. Each tile is
+    stored as soon as it arrives, and a tile that fails is skipped for the cycle.
+
+    :param PurpleAirDataLogger padl_obj: A valid instance of PurpleAirDataLogger.
+
+    :param dict json_config_file: A dictionary object of the json config file using json load.
+
+    :return: None
+    """
+
+    tile_list = split_bounding_box_into_tiles(
+        json_config_file["nwlng"],
+        json_config_file["nwlat"],
+        json_config_file["selng"],
+        json_config_file["selat"],
+        json_config_file.get("tile_rows", 1),
+        json_config_file.get("tile_columns", 1),
+    )
+    debug_log(f"""Requesting new data from multiple sensors in {len(tile_list)} tiles
+                    with fields {json_config_file["fields"]}...""")
+
+    data_time_stamp_list = []
+    failed_tile_count = 0
+    for tile, sensors_data, error in request_bounding_box_tiles_concurrently(
+        padl_obj,
+        json_config_file,
+        determine_modified_since(padl_obj, json_config_file),
+        tile_list,
+        json_config_file.get(
+            "max_concurrent_tile_requests",
+            BOUNDING_BOX_DEFAULT_MAX_CONCURRENT_TILE_REQUESTS,
+        ),
+    ):
+        if error is not None:
+            failed_tile_count += 1
+            print(f"Bounding box tile {tile} was skipped this cycle: {error}")
+            continue
+
+        # A sensor on a shared edge shows up in both tiles. Its 'last_seen' didn't
+        # advance the second time, so it is only stored once.
+        store_sensor_data_type_list = construct_store_sensor_data_type(sensors_data)
+        store_sensor_data_type_list = remove_sensor_data_without_new_last_seen(
+            padl_obj, store_sensor_data_type_list
+        )
+        store_new_sensor_data(padl_obj, store_sensor_data_type_list)
+        data_time_stamp_list.append(sensors_data["data_time_stamp"])
+
+        # Delete some stuff
+        del sensors_data
+        del store_sensor_data_type_list
+
+    # Only move 'modified_since' forward when every tile arrived and was stored,
+    # otherwise the next cycle would miss what the failed tiles reported in the meantime
+    if data_time_stamp_list and not failed_tile_count:
+        padl_obj._last_data_time_stamp = min(data_time_stamp_list)
+
+    debug_log(f"""Waiting {padl_obj.send_request_every_x_seconds} seconds before
+                requesting new data again...""")
+
+
 def logic_for_storing_multiple_sensors_data(padl_obj, json_config_file) -> None:
     """
     A function that performs one data retrieval and storage cycle for multiple sensors.
@@ -247,6 +672,14 @@ def logic_for_storing_multiple_sensors_data(padl_obj, json_config_file) -> None:
     :return: None
     """
 
+    # Large bounding boxes are requested tile by tile if asked to
+    if (
+        json_config_file.get("tile_rows", 1) * json_config_file.get("tile_columns", 1)
+        > 1
+    ):
+        logic_for_storing_multiple_sensors_data_in_tiles(padl_obj, json_config_file)
+        return
+
     # Request data from multiple sensors and store the results.
     debug_log(f"""Requesting new data from multiple sensors with fields
                     {json_config_file["fields"]}...""")
@@ -257,7 +690,7 @@ def logic_for_storing_multiple_sensors_data(padl_obj, json_config_file) -> None:
         location_type=json_config_file["location_type"],
         read_keys=json_config_file["read_keys"],
         show_only=json_config_file["show_only"],
-        modified_since=json_config_file["modified_since"],
+        modified_since=determine_modified_since(padl_obj, json_config_file),
         max_age=json_config_file["max_age"],
         nwlng=json_config_file["nwlng"],
         nwlat=json_config_file["nwlat"],
@@ -275,9 +708,14 @@ def logic_for_storing_multiple_sensors_data(padl_obj, json_config_file) -> None:
     # Now let's build and feed what the store_sensor_data() method expects.
     store_sensor_data_type_list = construct_store_sensor_data_type(sensors_data)
 
-    for store_sensor_data_type in store_sensor_data_type_list:
-        # Store the current data
-        padl_obj.store_sensor_data(store_sensor_data_type)
+    # Skip the sensors that haven't reported since the last cycle. Only once the rest
+    # is stored, remember this cycle's data time stamp for the next request's
+    # 'modified_since', so a failed store is asked for again.
+    store_sensor_data_type_list = remove_sensor_data_without_new_last_seen(
+        padl_obj, store_sensor_data_type_list
+    )
+    store_new_sensor_data(padl_obj, store_sensor_data_type_list)
+    padl_obj._last_data_time_stamp = sensors_data["data_time_stamp"]
 
     debug_log(f"""Waiting {padl_obj.send_request_every_x_seconds} seconds before
                 requesting new data again...""")
@@ -378,7 +816,7 @@ def logic_for_storing_group_sensors_data(
         location_type=json_config_file["location_type"],
         read_keys=json_config_file["read_keys"],
         show_only=json_config_file["show_only"],
-        modified_since=json_config_file["modified_since"],
+        modified_since=determine_modified_since(padl_obj, json_config_file),
         max_age=json_config_file["max_age"],
         nwlng=json_config_file["nwlng"],
         nwlat=json_config_file["nwlat"],
@@ -397,9 +835,14 @@ def logic_for_storing_group_sensors_data(
     # Now let's build and feed what the store_sensor_data() method expects.
     store_sensor_data_type_list = construct_store_sensor_data_type(members_data)
 
-    for store_sensor_data_type in store_sensor_data_type_list:
-        # Store the current data
-        padl_obj.store_sensor_data(store_sensor_data_type)
+    # Skip the sensors that haven't reported since the last cycle. Only once the rest
+    # is stored, remember this cycle's data time stamp for the next request's
+    # 'modified_since', so a failed store is asked for again.
+    store_sensor_data_type_list = remove_sensor_data_without_new_last_seen(
+        padl_obj, store_sensor_data_type_list
+    )
+    store_new_sensor_data(padl_obj, store_sensor_data_type_list)
+    padl_obj._last_data_time_stamp = members_data["data_time_stamp"]
 
     debug_log(f"""Waiting {padl_obj.send_request_every_x_seconds} seconds before
                 requesting new data again...""")
@@ -407,274 +850,146 @@ def logic_for_storing_group_sensors_data(
     return members_data["group_id"]
 
 
-def logic_for_storing_local_sensors_data(padl_obj, json_config_file) -> None:
+def request_local_sensors_data_concurrently(
+    executor,
+    ipv4_address_list,
+    request_timeout_seconds=LOCAL_SENSOR_DEFAULT_REQUEST_TIMEOUT_SECONDS,
+    max_concurrent_requests=LOCAL_SENSOR_DEFAULT_MAX_CONCURRENT_REQUESTS,
+    running_future_dict=None,
+) -> tuple:
     """
-    A function that performs one data retrieval and storage cycle for local sensors.
-
-    :param PurpleAirDataLogger padl_obj: A valid instance of PurpleAirDataLogger.
-
-    :param dict json_config_file: A dictionary object of the json config file using json load.
-
-    :return: None
+    A function to request data from local sensors a few at a time. A sensor that
+    doesn't answer within its deadline doesn't hold up the others.
+
+    :param ThreadPoolExecutor executor: The pool the requests are sent from.
+    :param list ipv4_address_list: The IPv4 addresses of the local sensors.
+    :param float request_timeout_seconds: How long each sensor has to answer.
+    :param int max_concurrent_requests: How many sensors are requested at the same time.
+    :param dict running_future_dict: An optional dict mapping an IPv4 address to its
+                                     request that was still running when an earlier
+                                     call returned. It is updated in place and such a
+                                     sensor isn't requested again until that request
+                                     is done, so a sensor that hangs holds up at most
+                                     one worker.
+
+    :return: A dict mapping each IPv4 address that answered to its sensor data, and a
+             dict mapping each IPv4 address that didn't to the reason why.
+    :rtype: tuple
     """
 
-    # Ask for our local sensor data
-    local_sensor_dict = padl_obj._purpleair_api_obj.request_local_sensor_data()
-
-    # The data that is returned via an internal network API is different than the data returned via an external network API.
-    # With that in mind let's try to map internal network API values to external network API values. That way we don't have to
-    # write more code in the PADL's.
-    for ip, sensor_dict in local_sensor_dict.items():
-        the_modified_sensor_data = {}
-
-        # This timestamp appears to be a unix epoch timestamp (seconds) type.
-        the_modified_sensor_data["data_time_stamp"] = sensor_dict["response_date"]
-
-        # Since we want this to work for all loggers let's make an assumption. The 'SensorId' is the 'name' since it is just a MAC address.
-        # The 'Id' is not the `sensor_index` it increments when the data changes. It is more of a `sample_id`. Let's just use the mac as a base
-        # 10 number. That should be unique.
-        the_modified_sensor_data["sensor_index"] = int(
-            str(sensor_dict["SensorId"]).replace(":", ""), 16
-        )
-
-        ###### Station information and status fields: ######
-        the_modified_sensor_data["name"] = sensor_dict["SensorId"]
-        # "icon": 0,
-        # "model": "",
-        the_modified_sensor_data["hardware"] = sensor_dict["hardwarediscovered"]
-        if sensor_dict["place"] == "inside":
-            the_modified_sensor_data["location_type"] = 1
-
-        elif sensor_dict["place"] == "outside":
-            the_modified_sensor_data["location_type"] = 0
-
-        # "private": 0,
-        the_modified_sensor_data["latitude"] = sensor_dict["lat"]
-        the_modified_sensor_data["longitude"] = sensor_dict["lon"]
-        # "altitude": 0.0,
-        # "position_rating": 0,
-        # "led_brightness": 0,
-        the_modified_sensor_data["firmware_version"] = sensor_dict["version"]
-        # "firmware_upgrade": "",
-        the_modified_sensor_data["rssi"] = sensor_dict["rssi"]
-        the_modified_sensor_data["uptime"] = sensor_dict["uptime"]
-        the_modified_sensor_data["pa_latency"] = sensor_dict["latency"]
-        # "last_seen": 0,
-        # "last_modified": 0,
-        # "date_created": 0,
-        # "channel_state": 0,
-        # "channel_flags": 0,
-        # "channel_flags_manual": 0,
-        # "channel_flags_auto": 0,
-        # "confidence": 0,
-        # "confidence_manual": 0,
-        # "confidence_auto": 0,
-
-        ###### Environmental fields: ######
-        if "current_humidity_680" not in sensor_dict.keys():
-            the_modified_sensor_data["humidity"] = sensor_dict["current_humidity"]
-            the_modified_sensor_data["humidity_a"] = sensor_dict["current_humidity"]
-
-        else:
-            the_modified_sensor_data["humidity_a"] = sensor_dict["current_humidity"]
-            the_modified_sensor_data["humidity_b"] = sensor_dict["current_humidity_680"]
-            the_modified_sensor_data["humidity"] = float(
-                (sensor_dict["current_humidity"] + sensor_dict["current_humidity_680"])
-                / 2
-            )
-
-        if "current_temp_f_680" not in sensor_dict.keys():
-            the_modified_sensor_data["temperature"] = sensor_dict["current_temp_f"]
-            the_modified_sensor_data["temperature_a"] = sensor_dict["current_temp_f"]
-
-        else:
-            the_modified_sensor_data["temperature_a"] = sensor_dict["current_temp_f"]
-            the_modified_sensor_data["temperature_b"] = sensor_dict[
-                "current_temp_f_680"
-            ]
-            the_modified_sensor_data["temperature"] = float(
-                (sensor_dict["current_temp_f"] + sensor_dict["current_temp_f_680"]) / 2
-            )
-
-        if "pressure_680" not in sensor_dict.keys():
-            the_modified_sensor_data["pressure"] = sensor_dict["pressure"]
-            the_modified_sensor_data["pressure_a"] = sensor_dict["pressure"]
-
-        else:
-            the_modified_sensor_data["pressure_a"] = sensor_dict["pressure"]
-            the_modified_sensor_data["pressure_b"] = sensor_dict["pressure_680"]
-            the_modified_sensor_data["pressure"] = float(
-                (sensor_dict["pressure"] + sensor_dict["pressure_680"]) / 2
-            )
-
-        ###### Miscellaneous fields: ######
-        # "voc": 0.0,
-        # "voc_a": 0.0,
-        # "voc_b": 0.0,
-        # "ozone1": 0.0,
-        # "analog_input": 0.0,
-
-        ###### PM1.0 fields: ######
-        if "p_1_0_um_b" not in sensor_dict.keys():
-            the_modified_sensor_data["pm1.0"] = sensor_dict["p_1_0_um"]
-            the_modified_sensor_data["pm1.0_a"] = sensor_dict["p_1_0_um"]
+    def request_local_sensor_data(ipv4_address):
+        return PurpleAirLocalAPI([ipv4_address]).request_local_sensor_data()[
+            ipv4_address
+        ]
 
-        else:
-            the_modified_sensor_data["pm1.0"] = float(
-                (sensor_dict["p_1_0_um"] + sensor_dict["p_1_0_um_b"]) / 2
-            )
-            the_modified_sensor_data["pm1.0_a"] = sensor_dict["p_1_0_um"]
-            the_modified_sensor_data["pm1.0_b"] = sensor_dict["p_1_0_um_b"]
+    if running_future_dict is None:
+        running_future_dict = {}
+
+    local_sensor_dict = {}
+    laggard_dict = {}
+    future_to_ipv4_address = {}
+    for ipv4_address in ipv4_address_list:
+        running_future = running_future_dict.get(ipv4_address)
+        if running_future is not None and not running_future.done():
+            laggard_dict[ipv4_address] = "its previous request is still running"
+            continue
+
+        running_future_dict.pop(ipv4_address, None)
+        future_to_ipv4_address[
+            executor.submit(request_local_sensor_data, ipv4_address)
+        ] = ipv4_address
+
+    if not future_to_ipv4_address:
+        return local_sensor_dict, laggard_dict
+
+    # Sensors queue up behind each other when there are more sensors than workers
+    max_workers = min(max_concurrent_requests, len(future_to_ipv4_address))
+    deadline_seconds = request_timeout_seconds * math.ceil(
+        len(future_to_ipv4_address) / max_workers
+    )
+    done_futures, _ = wait(future_to_ipv4_address, timeout=deadline_seconds)
 
-        if "pm1_0_atm_b" not in sensor_dict.keys():
-            the_modified_sensor_data["pm1.0_atm"] = sensor_dict["pm1_0_atm"]
-            the_modified_sensor_data["pm1.0_atm_a"] = sensor_dict["pm1_0_atm"]
+    for future, ipv4_address in future_to_ipv4_address.items():
+        if future not in done_futures:
+            laggard_dict[ipv4_address] = f"no answer within {deadline_seconds} seconds"
 
-        else:
-            the_modified_sensor_data["pm1.0_atm"] = float(
-                (sensor_dict["pm1_0_atm"] + sensor_dict["pm1_0_atm_b"]) / 2
-            )
-            the_modified_sensor_data["pm1.0_atm_a"] = sensor_dict["pm1_0_atm"]
-            the_modified_sensor_data["pm1.0_atm_b"] = sensor_dict["pm1_0_atm_b"]
+            # Don't wait for the laggards, only remember the ones already running
+            if not future.cancel():
+                running_future_dict[ipv4_address] = future
 
-        if "pm1_0_cf_1_b" not in sensor_dict.keys():
-            the_modified_sensor_data["pm1.0_cf_1"] = sensor_dict["pm1_0_cf_1"]
-            the_modified_sensor_data["pm1.0_cf_1_a"] = sensor_dict["pm1_0_cf_1"]
+        elif future.exception() is not None:
+            laggard_dict[ipv4_address] = str(future.exception())
 
         else:
-            the_modified_sensor_data["pm1.0_cf_1"] = float(
-                (sensor_dict["pm1_0_cf_1"] + sensor_dict["pm1_0_cf_1_b"]) / 2
-            )
-            the_modified_sensor_data["pm1.0_cf_1_a"] = sensor_dict["pm1_0_cf_1"]
-            the_modified_sensor_data["pm1.0_cf_1_b"] = sensor_dict["pm1_0_cf_1_b"]
+            local_sensor_dict[ipv4_address] = future.result()
 
-        ###### PM2.5 fields: ######
-        # "pm2.5_alt": 0.0,
-        # "pm2.5_alt_a": 0.0,
-        # "pm2.5_alt_b": 0.0,
-        if "p_2_5_um_b" not in sensor_dict.keys():
-            the_modified_sensor_data["pm2.5"] = sensor_dict["p_2_5_um"]
-            the_modified_sensor_data["pm2.5_a"] = sensor_dict["p_2_5_um"]
+    return local_sensor_dict, laggard_dict
 
-        else:
-            the_modified_sensor_data["pm2.5"] = float(
-                (sensor_dict["p_2_5_um"] + sensor_dict["p_2_5_um_b"]) / 2
-            )
-            the_modified_sensor_data["pm2.5_a"] = sensor_dict["p_2_5_um"]
-            the_modified_sensor_data["pm2.5_b"] = sensor_dict["p_2_5_um_b"]
-
-        if "pm2_5_atm_b" not in sensor_dict.keys():
-            the_modified_sensor_data["pm2.5_atm"] = sensor_dict["pm2_5_atm"]
-            the_modified_sensor_data["pm2.5_atm_a"] = sensor_dict["pm2_5_atm"]
 
-        else:
-            the_modified_sensor_data["pm2.5_atm"] = float(
-                (sensor_dict["pm2_5_atm"] + sensor_dict["pm2_5_atm_b"]) / 2
-            )
-            the_modified_sensor_data["pm2.5_atm_a"] = sensor_dict["pm2_5_atm"]
-            the_modified_sensor_data["pm2.5_atm_b"] = sensor_dict["pm2_5_atm_b"]
+def logic_for_storing_local_sensors_data(padl_obj, json_config_file) -> None:
+    """
+    A function that performs one data retrieval and storage cycle for local sensors.
 
-        if "pm2_5_cf_1_b" not in sensor_dict.keys():
-            the_modified_sensor_data["pm2.5_cf_1"] = sensor_dict["pm2_5_cf_1"]
-            the_modified_sensor_data["pm2.5_cf_1_a"] = sensor_dict["pm2_5_cf_1"]
+    :param PurpleAirDataLogger padl_obj: A valid instance of PurpleAirDataLogger.
 
-        else:
-            the_modified_sensor_data["pm2.5_cf_1"] = float(
-                (sensor_dict["pm2_5_cf_1"] + sensor_dict["pm2_5_cf_1_b"]) / 2
-            )
-            the_modified_sensor_data["pm2.5_cf_1_a"] = sensor_dict["pm2_5_cf_1"]
-            the_modified_sensor_data["pm2.5_cf_1_b"] = sensor_dict["pm2_5_cf_1_b"]
-
-        # # PM2.5 pseudo (simple running) average fields:
-        # # Note: These are inside the return json as json["sensor"]["stats"]. They are averages of the two sensors.
-        # # sensor 'a' and sensor 'b'. Each sensors data is inside json["sensor"]["stats_a"] and json["sensor"]["stats_b"]
-        # "pm2.5_10minute": 0.0,
-        # "pm2.5_10minute_a": 0.0,
-        # "pm2.5_10minute_b": 0.0,
-        # "pm2.5_30minute": 0.0,
-        # "pm2.5_30minute_a": 0.0,
-        # "pm2.5_30minute_b": 0.0,
-        # "pm2.5_60minute": 0.0,
-        # "pm2.5_60minute_a": 0.0,
-        # "pm2.5_60minute_b": 0.0,
-        # "pm2.5_6hour": 0.0,
-        # "pm2.5_6hour_a": 0.0,
-        # "pm2.5_6hour_b": 0.0,
-        # "pm2.5_24hour": 0.0,
-        # "pm2.5_24hour_a": 0.0,
-        # "pm2.5_24hour_b": 0.0,
-        # "pm2.5_1week": 0.0,
-        # "pm2.5_1week_a": 0.0,
-        # "pm2.5_1week_b": 0.0,
-
-        ###### PM10.0 fields: ######
-        if "p_10_0_um_b" not in sensor_dict.keys():
-            the_modified_sensor_data["pm10.0"] = sensor_dict["p_10_0_um"]
-            the_modified_sensor_data["pm10.0_a"] = sensor_dict["p_10_0_um"]
+    :param dict json_config_file: A dictionary object of the json config file using json load.
 
-        else:
-            the_modified_sensor_data["pm10.0"] = float(
-                (sensor_dict["p_10_0_um"] + sensor_dict["p_10_0_um_b"]) / 2
-            )
-            the_modified_sensor_data["pm10.0_a"] = sensor_dict["p_10_0_um"]
-            the_modified_sensor_data["pm10.0_b"] = sensor_dict["p_10_0_um_b"]
+    :return: None
+    """
 
-        if "pm10_0_atm_b" not in sensor_dict.keys():
-            the_modified_sensor_data["pm10.0_atm"] = sensor_dict["pm10_0_atm"]
-            the_modified_sensor_data["pm10.0_atm_a"] = sensor_dict["pm10_0_atm"]
+    max_concurrent_requests = json_config_file.get(
+        "max_concurrent_requests", LOCAL_SENSOR_DEFAULT_MAX_CONCURRENT_REQUESTS
+    )
 
-        else:
-            the_modified_sensor_data["pm10.0_atm"] = float(
-                (sensor_dict["pm10_0_atm"] + sensor_dict["pm10_0_atm_b"]) / 2
+    # One pool is kept for the life of the data logger and shut down by its 'stop'
+    if padl_obj._local_sensor_executor is None:
+        padl_obj._local_sensor_executor = ThreadPoolExecutor(
+            max_workers=max(
+                1, min(max_concurrent_requests, len(json_config_file["sensor_ip_list"]))
             )
-            the_modified_sensor_data["pm10.0_atm_a"] = sensor_dict["pm10_0_atm"]
-            the_modified_sensor_data["pm10.0_atm_b"] = sensor_dict["pm10_0_atm_b"]
-
-        if "pm10_0_cf_1_b" not in sensor_dict.keys():
-            the_modified_sensor_data["pm10.0_cf_1"] = sensor_dict["pm10_0_cf_1"]
-            the_modified_sensor_data["pm10.0_cf_1_a"] = sensor_dict["pm10_0_cf_1"]
+        )
 
-        else:
-            the_modified_sensor_data["pm10.0_cf_1"] = float(
-                (sensor_dict["pm10_0_cf_1"] + sensor_dict["pm10_0_cf_1_b"]) / 2
-            )
-            the_modified_sensor_data["pm10.0_cf_1_a"] = sensor_dict["pm10_0_cf_1"]
-            the_modified_sensor_data["pm10.0_cf_1_b"] = sensor_dict["pm10_0_cf_1_b"]
-
-        ###### Particle count fields: #####
-        # "0.3_um_count": 0.0,
-        # "0.3_um_count_a": 0.0,
-        # "0.3_um_count_b": 0.0,
-        # "0.5_um_count": 0.0,
-        # "0.5_um_count_a": 0.0,
-        # "0.5_um_count_b": 0.0,
-        # "1.0_um_count": 0.0,
-        # "1.0_um_count_a": 0.0,
-        # "1.0_um_count_b": 0.0,
-        # "2.5_um_count": 0.0,
-        # "2.5_um_count_a": 0.0,
-        # "2.5_um_count_b": 0.0,
-        # "5.0_um_count": 0.0,
-        # "5.0_um_count_a": 0.0,
-        # "5.0_um_count_b": 0.0,
-        # "10.0_um_count": 0.0,
-        # "10.0_um_count_a": 0.0,
-        # "10.0_um_count_b": 0.0,
-
-        ###### ThingSpeak fields, used to retrieve data from api.thingspeak.com: #####
-        # "primary_id_a": 0,
-        # "primary_key_a": "",
-        # "secondary_id_a": 0,
-        # "secondary_key_a": "",
-        # "primary_id_b": 0,
-        # "primary_key_b": "",
-        # "secondary_id_b": 0,
-        # "secondary_key_b": "",
+    # Ask all our local sensors for data at once and skip the ones that are too slow
+    local_sensor_dict, laggard_dict = request_local_sensors_data_concurrently(
+        padl_obj._local_sensor_executor,
+        json_config_file["sensor_ip_list"],
+        json_config_file.get(
+            "request_timeout_seconds", LOCAL_SENSOR_DEFAULT_REQUEST_TIMEOUT_SECONDS
+        ),
+        max_concurrent_requests,
+        padl_obj._running_local_sensor_requests,
+    )
+    for ip, reason in laggard_dict.items():
+        debug_log(f"Local sensor {ip} was skipped this cycle: {reason}")
 
+    # The data that is returned via an internal network API is different than the data returned via an external network API.
+    # With that in mind let's try to map internal network API values to external network API values. That way we don't have to
+    # write more code in the PADL's.
+    # The mapping lives in PurpleAirLocalSensorMapping and is compiled once on import.
+    store_sensor_data_type_list = []
+    for ip, sensor_dict in local_sensor_dict.items():
+        the_modified_sensor_data = convert_local_sensor_data(sensor_dict)
         the_modified_sensor_data = validate_sensor_data_before_insert(
             the_modified_sensor_data
         )
-        padl_obj.store_sensor_data(the_modified_sensor_data)
+        store_sensor_data_type_list.append(the_modified_sensor_data)
+
+    # Only the rows of closed windows are stored when downsampling
+    if padl_obj._local_sensor_downsampler is not None:
+        store_sensor_data_type_list = [
+            window_row
+            for the_modified_sensor_data in store_sensor_data_type_list
+            for window_row in padl_obj._local_sensor_downsampler.add_sample(
+                the_modified_sensor_data
+            )
+        ]
+
+        # A sensor that stopped answering doesn't hold back its last window
+        store_sensor_data_type_list += (
+            padl_obj._local_sensor_downsampler.close_idle_windows()
+        )
+
+    store_new_sensor_data(padl_obj, store_sensor_data_type_list)
 
     debug_log(f"""Waiting {json_config_file["poll_interval_seconds"]} seconds before
             requesting new data again...""")
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+An optional quality control stage that compares the A and B channels of every PM field
+of a batch before it is stored. A channel with out of range readings is downgraded, i.e.
+the averaged fields are replaced by the other channel, and a compact bitmask of what was
+found is stored in 'qc_flags'. With NumPy installed the whole batch is checked in one
+vectorized pass, otherwise a scalar Python implementation with the same results is used.
+"""
+
+try:
+    import numpy
+
+except ImportError:
+    numpy = None
+
+#: The fields the quality control stage adds to every row
+QUALITY_CONTROL_FIELD_NAMES = ("qc_flags",)
+
+#: The PM fields with an A (<field>_a) and a B (<field>_b) channel that are compared
+QUALITY_CONTROL_CHANNEL_FIELD_NAMES = (
+    "pm1.0",
+    "pm1.0_atm",
+    "pm1.0_cf_1",
+    "pm2.5",
+    "pm2.5_atm",
+    "pm2.5_cf_1",
+    "pm10.0",
+    "pm10.0_atm",
+    "pm10.0_cf_1",
+)
+
+#: Channels disagree when they differ by more than this many μg/m³ ...
+QUALITY_CONTROL_MAX_ABSOLUTE_DIFFERENCE = 5.0
+
+#: ... and by more than this fraction of their average
+QUALITY_CONTROL_MAX_RELATIVE_DIFFERENCE = 0.7
+
+#: The highest reading a PMSX003 channel can report. Readings above it or below 0 put
+#: the channel out of range.
+QUALITY_CONTROL_MAX_CHANNEL_VALUE = 1000.0
+
+#: qc_flags bit: The sensor only has an A channel, nothing was compared
+QC_FLAG_SINGLE_CHANNEL = 1 << 0
+
+#: qc_flags bit: The A channel was out of range. If the B channel wasn't, the averaged
+#: fields hold the B channel.
+QC_FLAG_A_CHANNEL_DOWNGRADED = 1 << 1
+
+#: qc_flags bit: The B channel was out of range. If the A channel wasn't, the averaged
+#: fields hold the A channel.
+QC_FLAG_B_CHANNEL_DOWNGRADED = 1 << 2
+
+#: qc_flags bits: The A and B channels of a field disagree, one bit per field
+QC_FLAG_CHANNELS_DISAGREE_BY_FIELD_NAME = {
+    field_name: 1 << (3 + offset)
+    for offset, field_name in enumerate(QUALITY_CONTROL_CHANNEL_FIELD_NAMES)
+}
+
+# The A and then the B channel field names, in the order '_check_vectorized' reads them
+_CHANNEL_FIELD_NAMES = tuple(
+    field_name + channel_suffix
+    for channel_suffix in ("_a", "_b")
+    for field_name in QUALITY_CONTROL_CHANNEL_FIELD_NAMES
+)
+
+
+def has_b_channel(single_sensor_data_dict) -> bool:
+    """
+    Find out if a sensor has a B channel. Missing B channels are filled out with 0 by
+    'validate_sensor_data_before_insert', so the hardware is the only reliable hint.
+
+    :param dict single_sensor_data_dict: A python dictionary as expected by 'store_sensor_data'.
+
+    :return: False if the sensor reports its hardware and it has no PMSX003-B.
+    :rtype: bool
+    """
+
+    hardware = single_sensor_data_dict.get("hardware")
+    return not hardware or "PMSX003-B" in hardware
+
+
+def check_sensor_channels(single_sensor_data_dict) -> int:
+    """
+    Compare the channels of one sensor and downgrade a channel that is out of range.
+
+    :param dict single_sensor_data_dict: A python dictionary as expected by
+                                         'store_sensor_data'. The averaged fields are
+                                         changed in place when a channel is downgraded.
+
+    :return: The ``QC_FLAG_*`` bits that apply.
+    :rtype: int
+    """
+
+    qc_flags = 0
+    a_channel_out_of_range = False
+    b_channel_out_of_range = False
+    two_channels = has_b_channel(single_sensor_data_dict)
+    for field_name in QUALITY_CONTROL_CHANNEL_FIELD_NAMES:
+        value_a = single_sensor_data_dict.get(f"{field_name}_a")
+        value_b = single_sensor_data_dict.get(f"{field_name}_b")
+        if (
+            value_a is not None
+            and not 0 <= value_a <= QUALITY_CONTROL_MAX_CHANNEL_VALUE
+        ):
+            a_channel_out_of_range = True
+
+        if not two_channels or value_a is None or value_b is None:
+            continue
+
+        if not 0 <= value_b <= QUALITY_CONTROL_MAX_CHANNEL_VALUE:
+            b_channel_out_of_range = True
+
+        difference = abs(value_a - value_b)
+        if (
+            difference > QUALITY_CONTROL_MAX_ABSOLUTE_DIFFERENCE
+            and difference
+            > QUALITY_CONTROL_MAX_RELATIVE_DIFFERENCE * (value_a + value_b) / 2
+        ):
+            qc_flags |= QC_FLAG_CHANNELS_DISAGREE_BY_FIELD_NAME[field_name]
+
+    if not two_channels:
+        qc_flags |= QC_FLAG_SINGLE_CHANNEL
+
+    if a_channel_out_of_range:
+        qc_flags |= QC_FLAG_A_CHANNEL_DOWNGRADED
+
+    if b_channel_out_of_range:
+        qc_flags |= QC_FLAG_B_CHANNEL_DOWNGRADED
+
+    if two_channels and a_channel_out_of_range != b_channel_out_of_range:
+        _use_one_channel(
+            single_sensor_data_dict, "_a" if b_channel_out_of_range else "_b"
+        )
+
+    return qc_flags
+
+
+def _use_one_channel(single_sensor_data_dict, channel_suffix):
+    """
+    Replace the averaged fields with one channel, where that channel has a reading.
+
+    :param dict single_sensor_data_dict: A python dictionary as expected by 'store_sensor_data'.
+    :param str channel_suffix: '_a' or '_b'.
+    """
+
+    for field_name in QUALITY_CONTROL_CHANNEL_FIELD_NAMES:
+        value = single_sensor_data_dict.get(field_name + channel_suffix)
+        if value is not None:
+            single_sensor_data_dict[field_name] = value
+
+
+class PurpleAirDataLoggerQualityControl:
+    """
+    Adds ``QUALITY_CONTROL_FIELD_NAMES`` to the rows of a batch and downgrades channels
+    that are out of range. It keeps no state between batches.
+    """
+
+    def __init__(self, use_numpy=None):
+        """
+        :param bool use_numpy: If None, use NumPy when it is installed. If True, NumPy
+                               must be installed. If False, always use the scalar Python
+                               implementation.
+
+        :raises ImportError: If ``use_numpy`` is True and NumPy isn't installed.
+        """
+
+        if use_numpy and numpy is None:
+            raise ImportError(
+                "NumPy is needed for the vectorized quality control stage"
+            )
+
+        self._use_numpy = numpy is not None if use_numpy is None else use_numpy
+        if self._use_numpy:
+            self._disagree_bits = numpy.array(
+                list(QC_FLAG_CHANNELS_DISAGREE_BY_FIELD_NAME.values()),
+                dtype=numpy.int64,
+            )
+
+    @property
+    def uses_numpy(self):
+        """
+        :return: True if batches are checked with NumPy.
+        :rtype: bool
+        """
+
+        return self._use_numpy
+
+    def check(self, store_sensor_data_type_list) -> list:
+        """
+        Add ``QUALITY_CONTROL_FIELD_NAMES`` to every row, in place.
+
+        :param list store_sensor_data_type_list: A list of the dict data type that the
+                                                 store_sensor_data method expects.
+
+        :return: ``store_sensor_data_type_list``
+        :rtype: list
+        """
+
+        if not store_sensor_data_type_list:
+            return store_sensor_data_type_list
+
+        if self._use_numpy:
+            self._check_vectorized(store_sensor_data_type_list)
+
+        else:
+            for store_sensor_data_type in store_sensor_data_type_list:
+                store_sensor_data_type["qc_flags"] = check_sensor_channels(
+                    store_sensor_data_type
+                )
+
+        return store_sensor_data_type_list
+
+    def _check_vectorized(self, store_sensor_data_type_list):
+        """
+        The NumPy implementation, one pass over the whole batch.
+        """
+
+        # One row per sensor, the A channels and then the B channels of every field.
+        # None becomes NaN, which never counts as out of range or disagreeing.
+        channels = numpy.array(
+            [
+                row.get(channel_field_name)
+                for row in store_sensor_data_type_list
+                for channel_field_name in _CHANNEL_FIELD_NAMES
+            ],
+            dtype=float,
+        ).reshape(len(store_sensor_data_type_list), 2, -1)
+        channels_a = channels[:, 0]
+        channels_b = channels[:, 1]
+        two_channels = numpy.array(
+            [has_b_channel(row) for row in store_sensor_data_type_list], dtype=bool
+        )
+
+        with numpy.errstate(invalid="ignore"):
+            a_channel_out_of_range = (
+                (channels_a < 0) | (channels_a > QUALITY_CONTROL_MAX_CHANNEL_VALUE)
+            ).any(axis=1)
+            b_out_of_range = (
+                (channels_b < 0) | (channels_b > QUALITY_CONTROL_MAX_CHANNEL_VALUE)
+            ) & ~numpy.isnan(channels_a)
+            b_channel_out_of_range = b_out_of_range.any(axis=1) & two_channels
+            difference = numpy.abs(channels_a - channels_b)
+            disagree = (difference > QUALITY_CONTROL_MAX_ABSOLUTE_DIFFERENCE) & (
+                difference
+                > QUALITY_CONTROL_MAX_RELATIVE_DIFFERENCE
+                * (channels_a + channels_b)
+                / 2
+            )
+
+        qc_flags = disagree.astype(numpy.int64) @ self._disagree_bits
+        qc_flags = numpy.where(two_channels, qc_flags, QC_FLAG_SINGLE_CHANNEL)
+        qc_flags |= numpy.where(a_channel_out_of_range, QC_FLAG_A_CHANNEL_DOWNGRADED, 0)
+        qc_flags |= numpy.where(b_channel_out_of_range, QC_FLAG_B_CHANNEL_DOWNGRADED, 0)
+        for store_sensor_data_type, row_qc_flags in zip(
+            store_sensor_data_type_list, qc_flags.tolist()
+        ):
+            store_sensor_data_type["qc_flags"] = row_qc_flags
+
+        # Downgrades are rare, so they are applied row by row
+        for row_number in numpy.flatnonzero(
+            two_channels & (a_channel_out_of_range != b_channel_out_of_range)
+        ).tolist():
+            _use_one_channel(
+                store_sensor_data_type_list[row_number],
+                "_a" if b_channel_out_of_range[row_number] else "_b",
+            )
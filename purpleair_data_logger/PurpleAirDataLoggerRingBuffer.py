@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+A fixed capacity ring buffer of the most recent readings of each sensor. Each sensor gets
+one preallocated array of doubles the first time it is seen, so appending a reading and
+reading the latest values don't allocate.
+"""
+
+from purpleair_api.PurpleAirAPIConstants import ACCEPTED_FIELD_NAMES_DICT
+from array import array
+import math
+
+#: The default number of readings to keep per sensor
+RING_BUFFER_DEFAULT_CAPACITY = 60
+
+#: The numeric fields kept in the ring buffer. The ThingSpeak ids are left out since
+#: they aren't readings.
+RING_BUFFER_FIELD_NAMES = ("data_time_stamp",) + tuple(
+    field_name
+    for field_name, default_value in ACCEPTED_FIELD_NAMES_DICT.items()
+    if isinstance(default_value, (int, float))
+    and not field_name.startswith(("primary_id", "secondary_id"))
+)
+
+
+class _SensorRing:
+    """
+    The readings of one sensor. ``values`` holds ``capacity`` rows of
+    ``len(RING_BUFFER_FIELD_NAMES)`` doubles each, with NaN for a missing value.
+    """
+
+    __slots__ = ("values", "next_row", "row_count", "sequence")
+
+    def __init__(self, capacity, field_count):
+        self.values = array("d", [math.nan]) * (capacity * field_count)
+        self.next_row = 0
+        self.row_count = 0
+
+        # Odd while a row is being written. Readers retry when it changed under them.
+        self.sequence = 0
+
+
+class PurpleAirDataLoggerRingBuffer:
+    """
+    The last ``capacity`` readings of every sensor, numeric fields only. There is a
+    single writer (the data logger storing a batch) and any number of readers, e.g. a
+    HTTP thread. Readers don't take a lock, they retry if a row was written while they
+    were copying it.
+    """
+
+    def __init__(self, capacity=RING_BUFFER_DEFAULT_CAPACITY):
+        """
+        :param int capacity: The number of readings to keep per sensor. The oldest
+                             reading is overwritten first.
+        """
+
+        self._capacity = capacity
+        self._field_count = len(RING_BUFFER_FIELD_NAMES)
+        self._field_offsets = {
+            field_name: offset
+            for offset, field_name in enumerate(RING_BUFFER_FIELD_NAMES)
+        }
+        self._sensor_rings = {}
+
+    def __contains__(self, sensor_index):
+        return sensor_index in self._sensor_rings
+
+    def __len__(self):
+        return len(self._sensor_rings)
+
+    @property
+    def capacity(self):
+        """
+        :return: The number of readings kept per sensor.
+        :rtype: int
+        """
+
+        return self._capacity
+
+    def append(self, single_sensor_data_dict):
+        """
+        Add a reading, overwriting the sensor's oldest reading when its ring is full.
+
+        :param dict single_sensor_data_dict: A python dictionary as expected by 'store_sensor_data'.
+        """
+
+        sensor_index = single_sensor_data_dict["sensor_index"]
+        sensor_ring = self._sensor_rings.get(sensor_index)
+        if sensor_ring is None:
+            sensor_ring = _SensorRing(self._capacity, self._field_count)
+            self._sensor_rings[sensor_index] = sensor_ring
+
+        values = sensor_ring.values
+        offset = sensor_ring.next_row * self._field_count
+        sensor_ring.sequence += 1
+        for field_name in RING_BUFFER_FIELD_NAMES:
+            value = single_sensor_data_dict.get(field_name)
+            values[offset] = (
+                value
+                if isinstance(value, (int, float)) and not isinstance(value, bool)
+                else math.nan
+            )
+            offset += 1
+
+        sensor_ring.next_row = (sensor_ring.next_row + 1) % self._capacity
+        sensor_ring.row_count = min(sensor_ring.row_count + 1, self._capacity)
+        sensor_ring.sequence += 1
+
+    def get_latest(self, sensor_index, field_name):
+        """
+        Get the latest value of one field.
+
+        :param int sensor_index: The sensor to read.
+        :param str field_name: One of ``RING_BUFFER_FIELD_NAMES``.
+
+        :return: The value, or None if the sensor has no readings or the value is missing.
+        :rtype: float or None
+        """
+
+        sensor_ring = self._sensor_rings.get(sensor_index)
+        if sensor_ring is None:
+            return None
+
+        field_offset = self._field_offsets[field_name]
+        while True:
+            sequence = sensor_ring.sequence
+            latest_row = (sensor_ring.next_row - 1) % self._capacity
+            value = sensor_ring.values[latest_row * self._field_count + field_offset]
+            if sequence % 2 == 0 and sequence == sensor_ring.sequence:
+                break
+
+        return None if math.isnan(value) else value
+
+    def copy_last(self, sensor_index, field_name, out) -> int:
+        """
+        Copy the last ``len(out)`` values of one field into ``out``, oldest first, e.g.
+        into an ``array('d')`` the caller reuses. Missing values are NaN.
+
+        :param int sensor_index: The sensor to read.
+        :param str field_name: One of ``RING_BUFFER_FIELD_NAMES``.
+        :param object out: A mutable sequence of floats to copy into.
+
+        :return: The number of values copied. Less than ``len(out)`` when the sensor has
+                 fewer readings.
+        :rtype: int
+        """
+
+        sensor_ring = self._sensor_rings.get(sensor_index)
+        if sensor_ring is None:
+            return 0
+
+        field_offset = self._field_offsets[field_name]
+        while True:
+            sequence = sensor_ring.sequence
+            copy_count = min(len(out), sensor_ring.row_count)
+            row = (sensor_ring.next_row - copy_count) % self._capacity
+            for out_index in range(copy_count):
+                out[out_index] = sensor_ring.values[
+                    row * self._field_count + field_offset
+                ]
+                row = (row + 1) % self._capacity
+
+            if sequence % 2 == 0 and sequence == sensor_ring.sequence:
+                return copy_count
+
+    def get_last(self, sensor_index, count) -> list:
+        """
+        Get the last ``count`` readings as dicts. Unlike ``copy_last`` this allocates,
+        it is meant for occasional reads such as a HTTP endpoint.
+
+        :param int sensor_index: The sensor to read.
+        :param int count: The maximum number of readings to return.
+
+        :return: The readings, oldest first, keyed by ``RING_BUFFER_FIELD_NAMES`` with
+                 None for missing values.
+        :rtype: list
+        """
+
+        sensor_ring = self._sensor_rings.get(sensor_index)
+        if sensor_ring is None:
+            return []
+
+        while True:
+            sequence = sensor_ring.sequence
+            copy_count = min(count, sensor_ring.row_count)
+            row = (sensor_ring.next_row - copy_count) % self._capacity
+            readings = []
+            for _ in range(copy_count):
+                offset = row * self._field_count
+                reading = {}
+                for field_name in RING_BUFFER_FIELD_NAMES:
+                    value = sensor_ring.values[offset]
+                    reading[field_name] = None if math.isnan(value) else value
+                    offset += 1
+
+                reading["sensor_index"] = sensor_index
+                readings.append(reading)
+                row = (row + 1) % self._capacity
+
+            if sequence % 2 == 0 and sequence == sensor_ring.sequence:
+                return readings
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+Rolling window statistics of each sensor, maintained incrementally. Every reading is
+added to the hourly sum of its hour and to running sums over each window, so updating
+a sensor is O(1) per reading no matter how long the windows are. The NowCast is computed
+from the hourly sums when it is read, i.e. without scanning any stored readings.
+"""
+
+from purpleair_data_logger.PurpleAirDataLoggerEnrichment import (
+    NOWCAST_HOURS,
+    compute_nowcast,
+)
+from array import array
+import math
+
+#: The default windows, in hours, that a rolling mean is kept for
+ROLLING_STATISTICS_DEFAULT_WINDOW_HOURS = (1, 6, 24)
+
+#: The default fields that rolling statistics are kept for
+ROLLING_STATISTICS_DEFAULT_FIELD_NAMES = ("pm2.5", "pm10.0")
+
+
+class _SensorStatistics:
+    """
+    The running sums of one sensor. ``hourly_sums`` and ``hourly_counts`` hold one slot
+    per field and hour, the hour ``h`` in slot ``h % hour_count``. ``window_sums`` and
+    ``window_counts`` hold one slot per field and window.
+    """
+
+    __slots__ = (
+        "latest_hour",
+        "hourly_sums",
+        "hourly_counts",
+        "window_sums",
+        "window_counts",
+    )
+
+    def __init__(self, latest_hour, field_count, hour_count, window_count):
+        self.latest_hour = latest_hour
+        self.hourly_sums = array("d", [0.0]) * (field_count * hour_count)
+        self.hourly_counts = array("q", [0]) * (field_count * hour_count)
+        self.window_sums = array("d", [0.0]) * (field_count * window_count)
+        self.window_counts = array("q", [0]) * (field_count * window_count)
+
+
+class PurpleAirDataLoggerRollingStatistics:
+    """
+    Rolling means over ``window_hours`` and the NowCast of ``field_names`` for every
+    sensor. Windows are aligned to the hour and end with the hour of the sensor's latest
+    reading, e.g. the 1 hour mean is the mean of the current clock hour. Readings older
+    than the longest window (or the NowCast) are ignored. The statistics of a sensor that stopped
+    reporting stay at its last hour. It isn't thread safe; callers that read from
+    another thread hold a lock.
+    """
+
+    def __init__(
+        self,
+        window_hours=ROLLING_STATISTICS_DEFAULT_WINDOW_HOURS,
+        field_names=ROLLING_STATISTICS_DEFAULT_FIELD_NAMES,
+    ):
+        """
+        :param tuple window_hours: The windows, in hours, to keep a rolling mean for.
+        :param tuple field_names: The numeric fields to keep statistics for.
+
+        :raises ValueError: If a window is shorter than 1 hour.
+        """
+
+        if any(hours < 1 for hours in window_hours):
+            raise ValueError(f"window_hours ({window_hours}) shall not be less than 1.")
+
+        self._window_hours = tuple(window_hours)
+        self._field_names = tuple(field_names)
+        self._field_offsets = {
+            field_name: offset for offset, field_name in enumerate(self._field_names)
+        }
+        self._window_offsets = {
+            hours: offset for offset, hours in enumerate(self._window_hours)
+        }
+
+        # Enough hours for the longest window and for the NowCast
+        self._hour_count = max(self._window_hours + (NOWCAST_HOURS,))
+        self._sensor_statistics = {}
+
+    def __contains__(self, sensor_index):
+        return sensor_index in self._sensor_statistics
+
+    def __len__(self):
+        return len(self._sensor_statistics)
+
+    @property
+    def window_hours(self):
+        """
+        :return: The windows, in hours, a rolling mean is kept for.
+        :rtype: tuple
+        """
+
+        return self._window_hours
+
+    @property
+    def field_names(self):
+        """
+        :return: The fields statistics are kept for.
+        :rtype: tuple
+        """
+
+        return self._field_names
+
+    def update(self, single_sensor_data_dict):
+        """
+        Add a reading to the statistics of its sensor.
+
+        :param dict single_sensor_data_dict: A python dictionary as expected by
+                                             'store_sensor_data'. Only 'sensor_index',
+                                             'data_time_stamp' and ``field_names`` are
+                                             read.
+        """
+
+        data_hour = int(single_sensor_data_dict["data_time_stamp"]) // 3600
+        sensor_index = single_sensor_data_dict["sensor_index"]
+        sensor_statistics = self._sensor_statistics.get(sensor_index)
+        if sensor_statistics is None:
+            sensor_statistics = _SensorStatistics(
+                data_hour,
+                len(self._field_names),
+                self._hour_count,
+                len(self._window_hours),
+            )
+            self._sensor_statistics[sensor_index] = sensor_statistics
+
+        elif data_hour > sensor_statistics.latest_hour:
+            self._advance(sensor_statistics, data_hour)
+
+        age = sensor_statistics.latest_hour - data_hour
+        if age >= self._hour_count:
+            return
+
+        hour_slot = data_hour % self._hour_count
+        for field_offset, field_name in enumerate(self._field_names):
+            value = single_sensor_data_dict.get(field_name)
+            if (
+                not isinstance(value, (int, float))
+                or isinstance(value, bool)
+                or math.isnan(value)
+            ):
+                continue
+
+            hourly_offset = field_offset * self._hour_count + hour_slot
+            sensor_statistics.hourly_sums[hourly_offset] += value
+            sensor_statistics.hourly_counts[hourly_offset] += 1
+
+            # A late reading only counts for the windows that still cover its hour
+            window_offset = field_offset * len(self._window_hours)
+            for hours in self._window_hours:
+                if age < hours:
+                    sensor_statistics.window_sums[window_offset] += value
+                    sensor_statistics.window_counts[window_offset] += 1
+
+                window_offset += 1
+
+    def _advance(self, sensor_statistics, data_hour):
+        """
+        Move a sensor's latest hour forward to ``data_hour``. Each hour that starts
+        takes the hour that falls out of every window off that window's running sums,
+        so this costs O(1) per hour and at most ``hour_count`` hours are walked.
+        """
+
+        hourly_sums = sensor_statistics.hourly_sums
+        hourly_counts = sensor_statistics.hourly_counts
+        window_sums = sensor_statistics.window_sums
+        window_counts = sensor_statistics.window_counts
+        if data_hour - sensor_statistics.latest_hour >= self._hour_count:
+            # Every hour is older than the longest window
+            for statistics in (hourly_sums, hourly_counts, window_sums, window_counts):
+                for offset in range(len(statistics)):
+                    statistics[offset] = 0
+
+            sensor_statistics.latest_hour = data_hour
+            return
+
+        for new_hour in range(sensor_statistics.latest_hour + 1, data_hour + 1):
+            for field_offset in range(len(self._field_names)):
+                hourly_base = field_offset * self._hour_count
+                window_offset = field_offset * len(self._window_hours)
+                for hours in self._window_hours:
+                    # Slots still hold the hours 'new_hour - hour_count' and up
+                    expired_offset = hourly_base + (new_hour - hours) % self._hour_count
+                    window_sums[window_offset] -= hourly_sums[expired_offset]
+                    window_counts[window_offset] -= hourly_counts[expired_offset]
+                    if not window_counts[window_offset]:
+                        # Don't let rounding errors pile up in an empty window
+                        window_sums[window_offset] = 0.0
+
+                    window_offset += 1
+
+                new_offset = hourly_base + new_hour % self._hour_count
+                hourly_sums[new_offset] = 0.0
+                hourly_counts[new_offset] = 0
+
+        sensor_statistics.latest_hour = data_hour
+
+    def get_mean(self, sensor_index, field_name, window_hours) -> float:
+        """
+        Get the rolling mean of one field.
+
+        :param int sensor_index: The sensor to read.
+        :param str field_name: One of ``field_names``.
+        :param int window_hours: One of ``window_hours``.
+
+        :return: The mean, or None if the sensor has no readings of the field in the
+                 window.
+        :rtype: float or None
+        """
+
+        sensor_statistics = self._sensor_statistics.get(sensor_index)
+        if sensor_statistics is None:
+            return None
+
+        window_offset = (
+            self._field_offsets[field_name] * len(self._window_hours)
+            + self._window_offsets[window_hours]
+        )
+        window_count = sensor_statistics.window_counts[window_offset]
+        if not window_count:
+            return None
+
+        return sensor_statistics.window_sums[window_offset] / window_count
+
+    def get_nowcast(self, sensor_index, field_name) -> float:
+        """
+        Get the NowCast of one field from its last ``NOWCAST_HOURS`` hourly means.
+
+        :param int sensor_index: The sensor to read.
+        :param str field_name: One of ``field_names``.
+
+        :return: The NowCast, or None if two of the three most recent hours are missing.
+        :rtype: float or None
+        """
+
+        sensor_statistics = self._sensor_statistics.get(sensor_index)
+        if sensor_statistics is None:
+            return None
+
+        hourly_base = self._field_offsets[field_name] * self._hour_count
+        hourly_averages = []
+        for hour in range(
+            sensor_statistics.latest_hour,
+            sensor_statistics.latest_hour - NOWCAST_HOURS,
+            -1,
+        ):
+            hourly_offset = hourly_base + hour % self._hour_count
+            hourly_count = sensor_statistics.hourly_counts[hourly_offset]
+            hourly_averages.append(
+                sensor_statistics.hourly_sums[hourly_offset] / hourly_count
+                if hourly_count
+                else None
+            )
+
+        return compute_nowcast(hourly_averages)
+
+    def get_statistics(self, sensor_index) -> dict:
+        """
+        Get every statistic of a sensor, e.g. for a HTTP endpoint.
+
+        :param int sensor_index: The sensor to read.
+
+        :return: None if the sensor has no readings, otherwise a dict with the sensor's
+                 latest hour ('data_hour_time_stamp') and, per field, the rolling means
+                 ('mean_<hours>h') and the NowCast ('nowcast').
+        :rtype: dict or None
+        """
+
+        sensor_statistics = self._sensor_statistics.get(sensor_index)
+        if sensor_statistics is None:
+            return None
+
+        fields = {}
+        for field_name in self._field_names:
+            field_statistics = {
+                f"mean_{hours}h": self.get_mean(sensor_index, field_name, hours)
+                for hours in self._window_hours
+            }
+            field_statistics["nowcast"] = self.get_nowcast(sensor_index, field_name)
+            fields[field_name] = field_statistics
+
+        return {
+            "data_hour_time_stamp": sensor_statistics.latest_hour * 3600,
+            "fields": fields,
+        }
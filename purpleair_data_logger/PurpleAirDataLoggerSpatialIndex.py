@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+An in-memory spatial index of sensor positions for radius, bounding box and nearest
+neighbor queries. Sensors are hashed into a grid of ``cell_size_degrees`` cells, so a
+query only visits the cells that overlap its area instead of scanning every sensor.
+Positions are kept up to date from the 'latitude' and 'longitude' of stored rows.
+"""
+
+import math
+
+#: The default size, in degrees of latitude and longitude, of a grid cell. About 11 km
+#: north to south.
+SPATIAL_INDEX_DEFAULT_CELL_SIZE_DEGREES = 0.1
+
+#: The mean radius of the earth, in km, used for distances
+EARTH_RADIUS_KM = 6371.0088
+
+# Half the circumference of the earth, no two points are further apart
+_MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+
+
+def compute_distance_km(latitude_1, longitude_1, latitude_2, longitude_2) -> float:
+    """
+    Compute the great circle distance between two points with the haversine formula.
+
+    :param float latitude_1: The latitude of the first point.
+    :param float longitude_1: The longitude of the first point.
+    :param float latitude_2: The latitude of the second point.
+    :param float longitude_2: The longitude of the second point.
+
+    :return: The distance in km.
+    :rtype: float
+    """
+
+    phi_1 = math.radians(latitude_1)
+    phi_2 = math.radians(latitude_2)
+    haversine = (
+        math.sin((phi_2 - phi_1) / 2) ** 2
+        + math.cos(phi_1)
+        * math.cos(phi_2)
+        * math.sin(math.radians(longitude_2 - longitude_1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(haversine)))
+
+
+class PurpleAirDataLoggerSpatialIndex:
+    """
+    The latest position of every sensor, hashed into a grid of ``cell_size_degrees``
+    cells. Longitudes wrap around the antimeridian. It isn't thread safe; callers that
+    read from another thread hold a lock.
+    """
+
+    def __init__(self, cell_size_degrees=SPATIAL_INDEX_DEFAULT_CELL_SIZE_DEGREES):
+        """
+        :param float cell_size_degrees: The size of a grid cell in degrees. Smaller cells
+                                        make small queries cheaper and large queries
+                                        more expensive.
+
+        :raises ValueError: If ``cell_size_degrees`` isn't greater than 0 or is larger
+                            than 90.
+        """
+
+        if not 0 < cell_size_degrees <= 90:
+            raise ValueError(
+                f"cell_size_degrees ({cell_size_degrees}) shall be greater than 0 and not greater than 90."
+            )
+
+        self._cell_size_degrees = cell_size_degrees
+        self._column_count = math.ceil(360 / cell_size_degrees)
+
+        # Maps a sensor_index to its (latitude, longitude, cell)
+        self._positions = {}
+
+        # Maps a (row, column) cell to the set of sensor indexes in it
+        self._cells = {}
+
+    def __contains__(self, sensor_index):
+        return sensor_index in self._positions
+
+    def __len__(self):
+        return len(self._positions)
+
+    @property
+    def cell_size_degrees(self):
+        """
+        :return: The size of a grid cell in degrees.
+        :rtype: float
+        """
+
+        return self._cell_size_degrees
+
+    def _get_row(self, latitude):
+        return math.floor((latitude + 90) / self._cell_size_degrees)
+
+    def _get_column(self, longitude):
+        return (
+            math.floor((longitude + 180) / self._cell_size_degrees) % self._column_count
+        )
+
+    def update(self, single_sensor_data_dict):
+        """
+        Move a sensor to the position of a reading. Readings without a position keep
+        the sensor where it was.
+
+        :param dict single_sensor_data_dict: A python dictionary as expected by
+                                             'store_sensor_data'. Only 'sensor_index',
+                                             'latitude' and 'longitude' are read.
+        """
+
+        latitude = single_sensor_data_dict.get("latitude")
+        longitude = single_sensor_data_dict.get("longitude")
+        if latitude is None or longitude is None:
+            return
+
+        latitude = float(latitude)
+        longitude = float(longitude)
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return
+
+        sensor_index = single_sensor_data_dict["sensor_index"]
+        cell = (self._get_row(latitude), self._get_column(longitude))
+        position = self._positions.get(sensor_index)
+        if position is not None and position[2] != cell:
+            self._remove_from_cell(sensor_index, position[2])
+
+        if position is None or position[2] != cell:
+            self._cells.setdefault(cell, set()).add(sensor_index)
+
+        self._positions[sensor_index] = (latitude, longitude, cell)
+
+    def remove(self, sensor_index):
+        """
+        Remove a sensor from the index. Unknown sensors are ignored.
+
+        :param int sensor_index: The sensor to remove.
+        """
+
+        position = self._positions.pop(sensor_index, None)
+        if position is not None:
+            self._remove_from_cell(sensor_index, position[2])
+
+    def _remove_from_cell(self, sensor_index, cell):
+        sensor_indexes = self._cells[cell]
+        sensor_indexes.discard(sensor_index)
+        if not sensor_indexes:
+            del self._cells[cell]
+
+    def get_position(self, sensor_index) -> tuple:
+        """
+        Get the latest position of a sensor.
+
+        :param int sensor_index: The sensor to look up.
+
+        :return: The (latitude, longitude) of the sensor, or None if it has no position.
+        :rtype: tuple or None
+        """
+
+        position = self._positions.get(sensor_index)
+        return None if position is None else position[:2]
+
+    def _get_cells(
+        self, south_latitude, north_latitude, west_longitude, east_longitude
+    ):
+        """
+        Yield the occupied cells that overlap a latitude and longitude range. The
+        longitude range wraps around the antimeridian when ``west_longitude`` is
+        greater than ``east_longitude``. When the range covers more cells than are
+        occupied, the occupied cells are walked instead.
+        """
+
+        first_row = self._get_row(max(-90.0, south_latitude))
+        last_row = self._get_row(min(90.0, north_latitude))
+        first_column = math.floor((west_longitude + 180) / self._cell_size_degrees)
+        last_column = math.floor((east_longitude + 180) / self._cell_size_degrees)
+        if last_column < first_column:
+            last_column += self._column_count
+
+        column_count = min(last_column - first_column + 1, self._column_count)
+        if (last_row - first_row + 1) * column_count > len(self._cells):
+            for cell in self._cells:
+                if first_row <= cell[0] <= last_row and (
+                    (cell[1] - first_column) % self._column_count < column_count
+                ):
+                    yield cell
+
+            return
+
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, first_column + column_count):
+                cell = (row, column % self._column_count)
+                if cell in self._cells:
+                    yield cell
+
+    def query_radius(self, latitude, longitude, radius_km) -> list:
+        """
+        Find the sensors within a distance of a point.
+
+        :param float latitude: The latitude of the point.
+        :param float longitude: The longitude of the point.
+        :param float radius_km: The distance in km.
+
+        :return: A list of (sensor_index, distance_km) tuples, nearest first.
+        :rtype: list
+        """
+
+        if radius_km < 0:
+            return []
+
+        # The bounding box of the circle. Near the poles, or when the circle is large,
+        # every longitude may be inside it.
+        radius_degrees = math.degrees(radius_km / EARTH_RADIUS_KM)
+        south_latitude = latitude - radius_degrees
+        north_latitude = latitude + radius_degrees
+        if south_latitude <= -90 or north_latitude >= 90:
+            west_longitude, east_longitude = -180.0, 180.0 - 1e-9
+
+        else:
+            longitude_degrees = math.degrees(
+                math.asin(
+                    min(
+                        1.0,
+                        math.sin(radius_km / EARTH_RADIUS_KM)
+                        / math.cos(math.radians(latitude)),
+                    )
+                )
+            )
+            if radius_km >= _MAX_DISTANCE_KM / 2 or longitude_degrees >= 180:
+                west_longitude, east_longitude = -180.0, 180.0 - 1e-9
+
+            else:
+                west_longitude = (longitude - longitude_degrees + 180) % 360 - 180
+                east_longitude = (longitude + longitude_degrees + 180) % 360 - 180
+
+        results = []
+        for cell in self._get_cells(
+            south_latitude, north_latitude, west_longitude, east_longitude
+        ):
+            for sensor_index in self._cells[cell]:
+                sensor_latitude, sensor_longitude, _ = self._positions[sensor_index]
+                distance_km = compute_distance_km(
+                    latitude, longitude, sensor_latitude, sensor_longitude
+                )
+                if distance_km <= radius_km:
+                    results.append((sensor_index, distance_km))
+
+        results.sort(key=lambda result: (result[1], result[0]))
+        return results
+
+    def query_bounding_box(self, nwlng, nwlat, selng, selat) -> list:
+        """
+        Find the sensors within a bounding box, defined like the PurpleAir API's. The box
+        crosses the antimeridian when ``nwlng`` is greater than ``selng``.
+
+        :param float nwlng: The north west longitude of the bounding box.
+        :param float nwlat: The north west latitude of the bounding box.
+        :param float selng: The south east longitude of the bounding box.
+        :param float selat: The south east latitude of the bounding box.
+
+        :return: The sorted sensor indexes.
+        :rtype: list
+        """
+
+        if selat > nwlat:
+            return []
+
+        crosses_antimeridian = nwlng > selng
+        results = []
+        for cell in self._get_cells(selat, nwlat, nwlng, selng):
+            for sensor_index in self._cells[cell]:
+                sensor_latitude, sensor_longitude, _ = self._positions[sensor_index]
+                if not selat <= sensor_latitude <= nwlat:
+                    continue
+
+                if crosses_antimeridian:
+                    if nwlng <= sensor_longitude or sensor_longitude <= selng:
+                        results.append(sensor_index)
+
+                elif nwlng <= sensor_longitude <= selng:
+                    results.append(sensor_index)
+
+        results.sort()
+        return results
+
+    def query_nearest(self, latitude, longitude, count=1) -> list:
+        """
+        Find the sensors nearest to a point. The search radius doubles, starting from one
+        cell, until it holds ``count`` sensors.
+
+        :param float latitude: The latitude of the point.
+        :param float longitude: The longitude of the point.
+        :param int count: The number of sensors to find.
+
+        :return: Up to ``count`` (sensor_index, distance_km) tuples, nearest first.
+        :rtype: list
+        """
+
+        if count < 1 or not self._positions:
+            return []
+
+        radius_km = math.radians(self._cell_size_degrees) * EARTH_RADIUS_KM
+        while True:
+            results = self.query_radius(latitude, longitude, radius_km)
+            if len(results) >= count or radius_km >= _MAX_DISTANCE_KM:
+                return results[:count]
+
+            radius_km *= 2
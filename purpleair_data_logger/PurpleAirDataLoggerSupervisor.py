@@ -0,0 +1,561 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+A supervisor that splits the sensors of one json config file across worker processes.
+Every worker makes its own data logger, i.e. its own PurpleAirAPI client and sink
+connection, and runs the usual run loop on its shard of the sensors. The supervisor
+restarts workers that exit and aggregates their health from a heartbeat each worker
+sends after every polling cycle.
+"""
+
+from purpleair_data_logger.PurpleAirDataLogger import PurpleAirDataLoggerError
+from purpleair_data_logger.PurpleAirDataLoggerHelpers import (
+    split_bounding_box_into_tiles,
+)
+import json
+import multiprocessing
+import os
+import queue
+import time
+
+#: The default seconds to wait before a worker that exited is started again
+SUPERVISOR_DEFAULT_RESTART_DELAY_SECONDS = 10
+
+#: The default number of times a worker is started again before its shard is given up
+SUPERVISOR_DEFAULT_MAX_RESTARTS = 5
+
+#: A worker is stale when it hasn't finished a polling cycle for this many poll intervals
+SUPERVISOR_STALE_POLL_INTERVALS = 3
+
+#: The seconds the supervisor waits for heartbeats before it checks on its workers
+SUPERVISOR_CHECK_INTERVAL_SECONDS = 1
+
+#: Replaced by the shard number in the file paths of a shard's data logger
+SHARD_PLACEHOLDER = "{shard}"
+
+#: The run loop of each kind of json config file
+SUPERVISOR_RUN_METHOD_NAMES = {
+    "multiple": "_run_loop_for_storing_multiple_sensors_data",
+    "single": "_run_loop_for_storing_single_sensor_data",
+    "group": "_run_loop_for_storing_group_sensors_data",
+    "local": "_run_loop_for_storing_local_sensors_data",
+}
+
+
+def _split_list(item_list, shard_count) -> list:
+    """
+    Split a list into at most ``shard_count`` contiguous, nearly equally long chunks.
+    """
+
+    chunk_count = min(shard_count, len(item_list))
+    return [
+        item_list[
+            len(item_list)
+            * chunk_number
+            // chunk_count : len(item_list)
+            * (chunk_number + 1)
+            // chunk_count
+        ]
+        for chunk_number in range(chunk_count)
+    ]
+
+
+def _split_show_only(show_only, shard_count) -> list:
+    """
+    Split a comma separated 'show_only' string of sensor indexes into chunks.
+    """
+
+    sensor_indexes = [
+        sensor_index.strip()
+        for sensor_index in str(show_only).split(",")
+        if sensor_index.strip()
+    ]
+    return [",".join(chunk) for chunk in _split_list(sensor_indexes, shard_count)]
+
+
+def split_json_config_file(json_config_file, config_type, shard_count) -> list:
+    """
+    A function to split the sensors of a json config file into shards.
+
+    - multiple: The sensor indexes in 'show_only' are split. Without 'show_only', the
+      bounding box is split into strips from west to east.
+    - group: The sensor indexes in 'show_only', or else in 'sensor_index_list', are
+      split and each shard only shows its own. Only the first shard adds sensors to the
+      group.
+    - local: 'sensor_ip_list' is split.
+    - single: A single sensor can't be split.
+
+    :param dict json_config_file: A dictionary object of the json config file using json load.
+    :param str config_type: One of the keys of ``SUPERVISOR_RUN_METHOD_NAMES``.
+    :param int shard_count: The number of shards to split into. There are fewer shards
+                            when there are fewer sensors.
+
+    :raises PurpleAirDataLoggerError: If the json config file can't be split.
+
+    :return: A list of json config files, one per shard.
+    """
+
+    if shard_count == 1:
+        return [json_config_file]
+
+    if config_type == "multiple":
+        if json_config_file.get("show_only"):
+            return [
+                dict(json_config_file, show_only=show_only)
+                for show_only in _split_show_only(
+                    json_config_file["show_only"], shard_count
+                )
+            ]
+
+        bounding_box = tuple(
+            json_config_file.get(key) for key in ("nwlng", "nwlat", "selng", "selat")
+        )
+        if None in bounding_box:
+            raise PurpleAirDataLoggerError(
+                "'show_only' or 'nwlng', 'nwlat', 'selng' and 'selat' are needed to split a multiple sensors request into shards."
+            )
+
+        return [
+            dict(json_config_file, nwlng=nwlng, nwlat=nwlat, selng=selng, selat=selat)
+            for nwlng, nwlat, selng, selat in split_bounding_box_into_tiles(
+                *bounding_box, 1, shard_count
+            )
+        ]
+
+    elif config_type == "group":
+        if json_config_file.get("show_only"):
+            show_only_list = _split_show_only(
+                json_config_file["show_only"], shard_count
+            )
+
+        else:
+            show_only_list = [
+                ",".join(str(sensor_index) for sensor_index in chunk)
+                for chunk in _split_list(
+                    json_config_file["sensor_index_list"], shard_count
+                )
+            ]
+
+        return [
+            dict(
+                json_config_file,
+                show_only=show_only,
+                add_sensors_to_group=(
+                    json_config_file["add_sensors_to_group"] and shard_number == 0
+                ),
+            )
+            for shard_number, show_only in enumerate(show_only_list)
+        ]
+
+    elif config_type == "local":
+        return [
+            dict(json_config_file, sensor_ip_list=sensor_ip_list)
+            for sensor_ip_list in _split_list(
+                json_config_file["sensor_ip_list"], shard_count
+            )
+        ]
+
+    raise PurpleAirDataLoggerError(
+        f"A {config_type} sensor request can't be split into shards."
+    )
+
+
+def add_shard_placeholder(path, is_directory=False):
+    """
+    A function that makes sure a file or directory path contains '{shard}', so the
+    shards don't write to the same file. If it doesn't, '_{shard}' is added before the
+    file extension, e.g. 'sensors.db' becomes 'sensors_{shard}.db', or a 'shard_{shard}'
+    directory is added to a directory path.
+
+    :param str path: A file or directory path, or ``None``.
+    :param bool is_directory: True if ``path`` is a directory.
+
+    :return: ``path`` with '{shard}' in it, or ``None`` if ``path`` is ``None``.
+    :rtype: str
+    """
+
+    if path is None or SHARD_PLACEHOLDER in path:
+        return path
+
+    if is_directory:
+        return os.path.join(path, f"shard_{SHARD_PLACEHOLDER}")
+
+    root, extension = os.path.splitext(path)
+    return f"{root}_{SHARD_PLACEHOLDER}{extension}"
+
+
+def make_shard_data_logger(
+    data_logger_class, data_logger_args, common_args, shard_number
+):
+    """
+    A function that makes and configures the data logger of one shard, e.g. as a
+    ``functools.partial`` for ``PurpleAirDataLoggerSupervisor``. '{shard}' in string
+    arguments and in the deduplication cache file path is replaced by the shard number,
+    so every shard can write to its own file. '{shard}' is added to a deduplication
+    cache file path that lacks it. For a local sensors request, a list argument is the
+    IPv4 address list and is replaced by the shard's slice of it, the same slice
+    'split_json_config_file' gives the shard's json config file.
+
+    :param type data_logger_class: A PurpleAirDataLogger class, e.g. PurpleAirSQLiteDataLogger.
+    :param tuple data_logger_args: The positional arguments of ``data_logger_class``.
+    :param argparse.Namespace common_args: The parsed arguments of
+                                           'generate_common_arg_parser'.
+    :param int shard_number: The shard the data logger is made for.
+
+    :return: The configured data logger.
+    """
+
+    def replace_shard(value):
+        if isinstance(value, str):
+            return value.replace(SHARD_PLACEHOLDER, str(shard_number))
+
+        if isinstance(value, list) and common_args.paa_local_sensor_request_json_file:
+            return _split_list(value, common_args.shards)[shard_number]
+
+        return value
+
+    data_logger = data_logger_class(*(replace_shard(arg) for arg in data_logger_args))
+    data_logger.configure_deduplication_cache(
+        common_args.dedup_cache_size,
+        replace_shard(add_shard_placeholder(common_args.dedup_cache_file)),
+    )
+
+    if common_args.qc_ab_channels:
+        data_logger.configure_quality_control()
+
+    if common_args.enrich_epa_aqi:
+        data_logger.configure_enrichment()
+
+    return data_logger
+
+
+def _run_shard(
+    data_logger_factory, shard_number, run_method_name, json_config_file, health_queue
+):
+    """
+    The entry point of a worker process. Runs until the run loop raises.
+    """
+
+    def send_heartbeat():
+        health_queue.put((shard_number, time.time()))
+
+    data_logger = data_logger_factory(shard_number)
+    data_logger._polling_cycle_callback = send_heartbeat
+    getattr(data_logger, run_method_name)(json_config_file)
+
+
+class PurpleAirDataLoggerSupervisor:
+    """
+    Runs one worker process per shard of a json config file and keeps them running.
+    Workers are started with the 'spawn' start method, so ``data_logger_factory`` must
+    be picklable (e.g. a module level function or a ``functools.partial`` of one) and
+    the calling script must guard its entry point with ``if __name__ == "__main__":``.
+    """
+
+    def __init__(
+        self,
+        data_logger_factory,
+        shard_count,
+        restart_delay_seconds=SUPERVISOR_DEFAULT_RESTART_DELAY_SECONDS,
+        max_restarts=SUPERVISOR_DEFAULT_MAX_RESTARTS,
+    ):
+        """
+        :param callable data_logger_factory: Called with the shard number in each worker
+                                             process to make that worker's data logger.
+        :param int shard_count: The number of worker processes. Value shall be greater
+                                than 0.
+        :param int restart_delay_seconds: The seconds to wait before a worker that
+                                          exited is started again.
+        :param int max_restarts: The number of times a worker is started again before
+                                 its shard is given up.
+
+        :raises PurpleAirDataLoggerError: If ``shard_count`` is less than 1.
+        """
+
+        if shard_count < 1:
+            raise PurpleAirDataLoggerError(
+                f"shard_count ({shard_count}) shall not be less than 1."
+            )
+
+        self._data_logger_factory = data_logger_factory
+        self._shard_count = shard_count
+        self._restart_delay_seconds = restart_delay_seconds
+        self._max_restarts = max_restarts
+        self._context = multiprocessing.get_context("spawn")
+        self._health_queue = None
+        self._run_method_name = None
+        self._shard_json_config_files = []
+        self._stale_after_seconds = None
+
+        # One dict per shard, see 'get_health'
+        self._shards = []
+        self._processes = []
+        self._last_status = None
+
+    def get_health(self) -> dict:
+        """
+        Get the aggregated health of the workers.
+
+        :return: A dict with the overall 'status' and one dict per shard in 'shards'.
+                 'status' is 'ok' when every worker is alive and not stale, 'failed'
+                 when no worker is left and 'degraded' otherwise. A worker is stale when
+                 it hasn't finished a polling cycle for ``SUPERVISOR_STALE_POLL_INTERVALS``
+                 poll intervals.
+        :rtype: dict
+        """
+
+        now = time.time()
+        shards = []
+        for shard, process in zip(self._shards, self._processes):
+            alive = process is not None and process.is_alive()
+            last_sign_of_life = shard["last_cycle_time_stamp"] or shard["start_time"]
+            shards.append(
+                dict(
+                    shard,
+                    pid=process.pid if process is not None else None,
+                    alive=alive,
+                    stale=alive and now - last_sign_of_life > self._stale_after_seconds,
+                )
+            )
+
+        healthy_count = sum(shard["alive"] and not shard["stale"] for shard in shards)
+        if shards and healthy_count == len(shards):
+            status = "ok"
+
+        elif any(shard["alive"] for shard in shards) or any(
+            not shard["given_up"] for shard in shards
+        ):
+            status = "degraded"
+
+        else:
+            status = "failed"
+
+        return {"status": status, "shards": shards}
+
+    def _start_shard(self, shard_number):
+        """
+        Start, or start again, the worker of a shard.
+        """
+
+        process = self._context.Process(
+            target=_run_shard,
+            args=(
+                self._data_logger_factory,
+                shard_number,
+                self._run_method_name,
+                self._shard_json_config_files[shard_number],
+                self._health_queue,
+            ),
+            name=f"PurpleAirDataLoggerShard{shard_number}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[shard_number] = process
+        self._shards[shard_number]["start_time"] = time.time()
+        self._shards[shard_number]["exit_time"] = None
+
+    def start(self, config_type, json_config_file) -> None:
+        """
+        Split a json config file and start one worker per shard.
+
+        :param str config_type: One of the keys of ``SUPERVISOR_RUN_METHOD_NAMES``.
+        :param dict json_config_file: A dictionary object of the json config file using json load.
+
+        :raises PurpleAirDataLoggerError: If the json config file can't be split.
+        :return: None
+        """
+
+        self._run_method_name = SUPERVISOR_RUN_METHOD_NAMES[config_type]
+        self._shard_json_config_files = split_json_config_file(
+            json_config_file, config_type, self._shard_count
+        )
+        self._stale_after_seconds = (
+            SUPERVISOR_STALE_POLL_INTERVALS * json_config_file["poll_interval_seconds"]
+        )
+        self._health_queue = self._context.Queue()
+        self._shards = [
+            {
+                "shard_number": shard_number,
+                "cycle_count": 0,
+                "last_cycle_time_stamp": None,
+                "restart_count": 0,
+                "exit_code": None,
+                "exit_time": None,
+                "given_up": False,
+                "start_time": None,
+            }
+            for shard_number in range(len(self._shard_json_config_files))
+        ]
+        self._processes = [None] * len(self._shards)
+
+        # The first group worker finds or creates the group. The others wait for its
+        # first cycle so they don't create the group a second time.
+        if config_type == "group":
+            self._start_shard(0)
+            while self._shards[0]["cycle_count"] == 0 and self._processes[0].is_alive():
+                self.check()
+
+        for shard_number in range(len(self._shards)):
+            if self._processes[shard_number] is None:
+                self._start_shard(shard_number)
+
+        print(
+            f"Supervisor: started {len(self._shards)} workers for a {config_type} sensor request..."
+        )
+
+    def _collect_heartbeats(self, timeout):
+        """
+        Count the heartbeats in the health queue, waiting up to ``timeout`` seconds for
+        the first one.
+        """
+
+        try:
+            heartbeat = (
+                self._health_queue.get(timeout=timeout)
+                if timeout
+                else self._health_queue.get_nowait()
+            )
+            while True:
+                shard_number, cycle_time_stamp = heartbeat
+                self._shards[shard_number]["cycle_count"] += 1
+                self._shards[shard_number]["last_cycle_time_stamp"] = cycle_time_stamp
+                heartbeat = self._health_queue.get_nowait()
+
+        except queue.Empty:
+            pass
+
+    def check(self, timeout=SUPERVISOR_CHECK_INTERVAL_SECONDS) -> dict:
+        """
+        Collect heartbeats for up to ``timeout`` seconds, start workers that exited
+        again and report changes of the overall status.
+
+        :param float timeout: The seconds to wait for the first heartbeat.
+
+        :return: The health, see 'get_health'.
+        :rtype: dict
+        """
+
+        self._collect_heartbeats(timeout)
+        now = time.time()
+        for shard_number, process in enumerate(self._processes):
+            shard = self._shards[shard_number]
+            if process is None or process.is_alive() or shard["given_up"]:
+                continue
+
+            if shard["exit_time"] is None:
+                shard["exit_code"] = process.exitcode
+                shard["exit_time"] = now
+                if shard["restart_count"] >= self._max_restarts:
+                    shard["given_up"] = True
+                    print(
+                        f"Supervisor: shard {shard_number} exited with code {process.exitcode} and is given up after {shard['restart_count']} restarts..."
+                    )
+
+                else:
+                    print(
+                        f"Supervisor: shard {shard_number} exited with code {process.exitcode}. It will be restarted in {self._restart_delay_seconds} seconds..."
+                    )
+
+            elif now - shard["exit_time"] >= self._restart_delay_seconds:
+                shard["restart_count"] += 1
+                self._start_shard(shard_number)
+
+        health = self.get_health()
+        if health["status"] != self._last_status:
+            self._last_status = health["status"]
+            alive_count = sum(shard["alive"] for shard in health["shards"])
+            print(
+                f"Supervisor: {health['status']} - {alive_count} of {len(health['shards'])} workers are alive..."
+            )
+
+        return health
+
+    def stop(self) -> None:
+        """
+        Stop every worker.
+
+        :return: None
+        """
+
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+
+        for process in self._processes:
+            if process is not None:
+                process.join()
+
+        # Heartbeats sent right before a worker exited
+        if self._health_queue is not None:
+            self._collect_heartbeats(0)
+
+    def run(self, config_type, json_config_file) -> None:
+        """
+        Start the workers and keep them running until every shard is given up.
+
+        :param str config_type: One of the keys of ``SUPERVISOR_RUN_METHOD_NAMES``.
+        :param dict json_config_file: A dictionary object of the json config file using json load.
+
+        :raises PurpleAirDataLoggerError: If the json config file can't be split or every
+                                          shard was given up.
+        :return: None
+        """
+
+        try:
+            self.start(config_type, json_config_file)
+            while self.check()["status"] != "failed":
+                pass
+
+        finally:
+            self.stop()
+
+        raise PurpleAirDataLoggerError(
+            "Every worker exited too often and was given up."
+        )
+
+    def validate_parameters_and_run(
+        self,
+        paa_multiple_sensor_request_json_file=None,
+        paa_single_sensor_request_json_file=None,
+        paa_group_sensor_request_json_file=None,
+        paa_local_sensor_request_json_file=None,
+    ) -> None:
+        """
+        The sharded counterpart of 'PurpleAirDataLogger.validate_parameters_and_run'.
+        Exactly one json config file shall be provided.
+
+        :param str paa_multiple_sensor_request_json_file: The path to a json file containing
+                                                          the parameters to send a multiple sensor request(s).
+        :param str paa_single_sensor_request_json_file: The path to a json file containing
+                                                        the parameters to send a single sensor request(s).
+        :param str paa_group_sensor_request_json_file: The path to a json file containing
+                                                        the parameters to send a group sensor request(s).
+        :param str paa_local_sensor_request_json_file: The path to a json file containing
+                                                        the parameters to send a local sensor request(s).
+
+        :raises PurpleAirDataLoggerError: If not exactly one json config file was provided.
+        :return: None
+        """
+
+        json_config_file_paths = {
+            "multiple": paa_multiple_sensor_request_json_file,
+            "single": paa_single_sensor_request_json_file,
+            "group": paa_group_sensor_request_json_file,
+            "local": paa_local_sensor_request_json_file,
+        }
+        provided = {
+            config_type: path
+            for config_type, path in json_config_file_paths.items()
+            if path is not None
+        }
+        if len(provided) != 1:
+            raise PurpleAirDataLoggerError(
+                """Exactly one of '-paa_multiple_sensor_request_json_file', '-paa_single_sensor_request_json_file', '-paa_group_sensor_request_json_file', or '-paa_local_sensor_request_json_file' must be provided."""
+            )
+
+        ((config_type, path),) = provided.items()
+        with open(path, "r") as file_obj:
+            the_json_file = json.load(file_obj)
+
+        self.run(config_type, the_json_file)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+A declarative mapping from the data returned by the internal (local) network PurpleAir
+API to the field names of the external network API. The mapping is compiled once into a
+converter that the PurpleAirDataLogger* files share.
+"""
+
+#: Local fields copied as is, as (external field name, local field name) pairs.
+#: The 'SensorId' is the 'name' since it is just a MAC address.
+LOCAL_SENSOR_FIELD_MAPPING = (
+    ("data_time_stamp", "response_date"),
+    ("name", "SensorId"),
+    ("hardware", "hardwarediscovered"),
+    ("latitude", "lat"),
+    ("longitude", "lon"),
+    ("firmware_version", "version"),
+    ("rssi", "rssi"),
+    ("uptime", "uptime"),
+    ("pa_latency", "latency"),
+)
+
+#: Local fields that may have a second (B) channel, as (external field name, local A
+#: field name, local B field name). The A and B channels are stored as <name>_a and
+#: <name>_b, and <name> gets their average. Without a B channel <name> is the A channel.
+LOCAL_SENSOR_AB_FIELD_MAPPING = (
+    ("humidity", "current_humidity", "current_humidity_680"),
+    ("temperature", "current_temp_f", "current_temp_f_680"),
+    ("pressure", "pressure", "pressure_680"),
+    ("pm1.0", "p_1_0_um", "p_1_0_um_b"),
+    ("pm1.0_atm", "pm1_0_atm", "pm1_0_atm_b"),
+    ("pm1.0_cf_1", "pm1_0_cf_1", "pm1_0_cf_1_b"),
+    ("pm2.5", "p_2_5_um", "p_2_5_um_b"),
+    ("pm2.5_atm", "pm2_5_atm", "pm2_5_atm_b"),
+    ("pm2.5_cf_1", "pm2_5_cf_1", "pm2_5_cf_1_b"),
+    ("pm10.0", "p_10_0_um", "p_10_0_um_b"),
+    ("pm10.0_atm", "pm10_0_atm", "pm10_0_atm_b"),
+    ("pm10.0_cf_1", "pm10_0_cf_1", "pm10_0_cf_1_b"),
+)
+
+#: The external 'location_type' for each local 'place'
+LOCAL_SENSOR_LOCATION_TYPES = {"inside": 1, "outside": 0}
+
+
+def compile_local_sensor_converter(
+    field_mapping=LOCAL_SENSOR_FIELD_MAPPING,
+    ab_field_mapping=LOCAL_SENSOR_AB_FIELD_MAPPING,
+):
+    """
+    Compile a mapping into a converter function. All field names are worked out here,
+    so converting a sensor is a single pass over flat tuples.
+
+    :param tuple field_mapping: (external field name, local field name) pairs.
+    :param tuple ab_field_mapping: (external field name, local A field name, local B
+                                   field name) triples.
+
+    :return: A function that takes the dict of one local sensor and returns a dict
+             keyed by external field names. Fields the sensor didn't report are None,
+             except the B channels which are left out. It raises KeyError if the
+             sensor has no 'SensorId'.
+    :rtype: callable
+    """
+
+    field_mapping = tuple(field_mapping)
+    ab_field_mapping = tuple(
+        (field_name, f"{field_name}_a", f"{field_name}_b", local_a_name, local_b_name)
+        for field_name, local_a_name, local_b_name in ab_field_mapping
+    )
+
+    def convert_local_sensor_data(sensor_dict) -> dict:
+        get = sensor_dict.get
+
+        # The 'Id' is not the `sensor_index` it increments when the data changes. It is
+        # more of a `sample_id`. Let's just use the mac as a base 10 number. That should
+        # be unique.
+        converted_sensor_data = {
+            "sensor_index": int(str(sensor_dict["SensorId"]).replace(":", ""), 16)
+        }
+
+        for field_name, local_name in field_mapping:
+            converted_sensor_data[field_name] = get(local_name)
+
+        location_type = LOCAL_SENSOR_LOCATION_TYPES.get(get("place"))
+        if location_type is not None:
+            converted_sensor_data["location_type"] = location_type
+
+        for (
+            field_name,
+            field_name_a,
+            field_name_b,
+            local_a_name,
+            local_b_name,
+        ) in ab_field_mapping:
+            value_a = get(local_a_name)
+            value_b = get(local_b_name)
+            converted_sensor_data[field_name_a] = value_a
+            if value_a is None or value_b is None:
+                converted_sensor_data[field_name] = value_a
+
+            else:
+                converted_sensor_data[field_name_b] = value_b
+                converted_sensor_data[field_name] = (
+                    float(value_a) + float(value_b)
+                ) / 2
+
+        return converted_sensor_data
+
+    return convert_local_sensor_data
+
+
+#: The converter for the default mapping, compiled once on import
+convert_local_sensor_data = compile_local_sensor_converter()
@@ -17,10 +17,19 @@ from purpleair_data_logger.PurpleAirDataLogger import (
     PurpleAirDataLogger,
 )
 
+from purpleair_data_logger.PurpleAirDataLoggerSupervisor import (
+    PurpleAirDataLoggerSupervisor,
+    make_shard_data_logger,
+)
+
 from purpleair_data_logger.PurpleAirDataLoggerHelpers import (
     generate_common_arg_parser,
 )
 
+from purpleair_data_logger.PurpleAirDataLoggerDownsampler import (
+    WINDOW_STATISTICS_FIELD_NAMES,
+)
+from functools import partial
 import json
 import requests
 
@@ -60,6 +69,7 @@ _LOKI_DATA_GROUPS = [
             "confidence",
             "confidence_manual",
             "confidence_auto",
+            "qc_flags",
         ],
     ),
     (
@@ -123,6 +133,9 @@ _LOKI_DATA_GROUPS = [
             "pm2.5_cf_1",
             "pm2.5_cf_1_a",
             "pm2.5_cf_1_b",
+            "pm2.5_epa_corrected",
+            "pm2.5_nowcast",
+            "aqi",
         ],
     ),
     (
@@ -208,6 +221,13 @@ _LOKI_DATA_GROUPS = [
     ),
 ]
 
+# The data_group of the statistics a downsampled row carries next to its window means.
+# It's only pushed for rows emitted by a PurpleAirDataLoggerDownsampler.
+_LOKI_WINDOW_STATISTICS_DATA_GROUP = (
+    "window_statistics_fields",
+    ["data_time_stamp", "sensor_index", *WINDOW_STATISTICS_FIELD_NAMES],
+)
+
 
 class PurpleAirLokiDataLogger(PurpleAirDataLogger):
     """
@@ -289,9 +309,19 @@ class PurpleAirLokiDataLogger(PurpleAirDataLogger):
             ts_ns = str(int(single_sensor_data_dict["data_time_stamp"]) * 1_000_000_000)
             sensor_index = str(single_sensor_data_dict["sensor_index"])
 
+            data_groups = _LOKI_DATA_GROUPS
+            if "sample_count" in single_sensor_data_dict:
+                data_groups = data_groups + [_LOKI_WINDOW_STATISTICS_DATA_GROUP]
+
             streams = []
-            for data_group, fields in _LOKI_DATA_GROUPS:
-                log_data = {field: single_sensor_data_dict[field] for field in fields}
+            for data_group, fields in data_groups:
+                # The fields of the quality control and enrichment stages are left
+                # out of the log line unless those stages are on
+                log_data = {
+                    field: single_sensor_data_dict[field]
+                    for field in fields
+                    if field in single_sensor_data_dict
+                }
                 streams.append(
                     {
                         "stream": {
@@ -345,6 +375,20 @@ if __name__ == "__main__":  # pragma: no cover
         help="""The Loki password for basic authentication.""",
     )
 
+    parser.add_argument(
+        "-shards",
+        required=False,
+        default=1,
+        dest="shards",
+        type=int,
+        help="""The number of worker processes to split the sensors of the json
+                        config file across. Every worker makes its own data logger. '{shard}'
+                        in dedup_cache_file is replaced by the worker's shard number. It's
+                        added before the file extension if dedup_cache_file doesn't have it.
+                        Each worker of a local sensors request only requests its own sensors.
+                        Default is 1, i.e. no worker processes.""",
+    )
+
     args = parser.parse_args()
 
     # Place holders that are used later down
@@ -358,7 +402,7 @@ if __name__ == "__main__":  # pragma: no cover
             the_json_file = json.load(file_obj)
             ipv4_address_list = the_json_file["sensor_ip_list"]
 
-    the_paa_loki_data_logger = PurpleAirLokiDataLogger(
+    data_logger_args = (
         args.paa_read_key,
         args.paa_write_key,
         ipv4_address_list,
@@ -366,12 +410,42 @@ if __name__ == "__main__":  # pragma: no cover
         args.loki_usr,
         args.loki_pwd,
     )
+    if args.shards > 1:
+        # Every worker process makes its own data logger, see make_shard_data_logger
+        the_paa_data_logger_supervisor = PurpleAirDataLoggerSupervisor(
+            partial(
+                make_shard_data_logger, PurpleAirLokiDataLogger, data_logger_args, args
+            ),
+            args.shards,
+        )
+        the_paa_data_logger_supervisor.validate_parameters_and_run(
+            args.paa_multiple_sensor_request_json_file,
+            args.paa_single_sensor_request_json_file,
+            args.paa_group_sensor_request_json_file,
+            args.paa_local_sensor_request_json_file,
+        )
 
-    # Third choose what run method to execute depending on
-    # paa_multiple_sensor_request_json_file/paa_single_sensor_request_json_file/paa_group_sensor_request_json_file/paa_local_sensor_request_json_file
-    the_paa_loki_data_logger.validate_parameters_and_run(
-        args.paa_multiple_sensor_request_json_file,
-        args.paa_single_sensor_request_json_file,
-        args.paa_group_sensor_request_json_file,
-        args.paa_local_sensor_request_json_file,
-    )
+    else:
+        the_paa_loki_data_logger = PurpleAirLokiDataLogger(*data_logger_args)
+
+        # Configure the deduplication cache that sits in front of store_sensor_data
+        the_paa_loki_data_logger.configure_deduplication_cache(
+            args.dedup_cache_size, args.dedup_cache_file
+        )
+
+        # Check the A and B channels of every row if asked to
+        if args.qc_ab_channels:
+            the_paa_loki_data_logger.configure_quality_control()
+
+        # Add the EPA corrected PM2.5, NowCast and AQI to every row if asked to
+        if args.enrich_epa_aqi:
+            the_paa_loki_data_logger.configure_enrichment()
+
+        # Third choose what run method to execute depending on
+        # paa_multiple_sensor_request_json_file/paa_single_sensor_request_json_file/paa_group_sensor_request_json_file/paa_local_sensor_request_json_file
+        the_paa_loki_data_logger.validate_parameters_and_run(
+            args.paa_multiple_sensor_request_json_file,
+            args.paa_single_sensor_request_json_file,
+            args.paa_group_sensor_request_json_file,
+            args.paa_local_sensor_request_json_file,
+        )
@@ -47,10 +47,11 @@ from __future__ import annotations
 from http.server import HTTPServer, BaseHTTPRequestHandler
 import json
 import logging
+import math
 import threading
 from time import sleep
 from typing import Any
-from urllib.parse import urlsplit
+from urllib.parse import parse_qs, urlsplit
 
 from purpleair_api.PurpleAirAPI import PurpleAirAPIError
 from purpleair_api.PurpleAirMatterConverter import PurpleAirMatterConverter
@@ -59,18 +60,50 @@ from purpleair_data_logger.PurpleAirDataLogger import (
     PurpleAirDataLoggerError,
 )
 from purpleair_data_logger.PurpleAirDataLoggerHelpers import generate_common_arg_parser
+from purpleair_data_logger.PurpleAirDataLoggerRollingStatistics import (
+    PurpleAirDataLoggerRollingStatistics,
+)
+from purpleair_data_logger.PurpleAirDataLoggerSpatialIndex import (
+    PurpleAirDataLoggerSpatialIndex,
+)
+from purpleair_data_logger.PurpleAirLocalSensorMapping import (
+    convert_local_sensor_data,
+)
 from purpleair_data_logger.PurpleAirMatterDataLoggerConstants import (
     MATTER_DATA_LOGGER_DEFAULT_HOST,
     MATTER_DATA_LOGGER_DEFAULT_PORT,
     MATTER_ALL_SENSORS_PATH,
     MATTER_SENSOR_PATH_PREFIX,
+    MATTER_SENSOR_STATISTICS_PATH_SUFFIX,
+    MATTER_SENSORS_NEARBY_PATH,
+    MATTER_SENSORS_WITHIN_PATH,
     HEALTH_PATH,
     MATTER_DATA_LOGGER_LOG_LEVEL,
+    MATTER_FINGERPRINT_FIELDS,
 )
 
 logger = logging.getLogger(__name__)
 
 
+def _matter_fingerprint(reading: dict[str, Any], sensor_name: str | None = None) -> int:
+    """
+    Build a cheap fingerprint of the raw fields that feed the Matter conversion.
+
+    :param reading: A flat PurpleAir reading, or a payload with a ``"sensor"`` wrapper.
+    :param sensor_name: Optional display name override, part of the converted output.
+    :return: An integer that only changes when the converted device would change.
+    """
+    inner = reading.get("sensor", reading)
+    return hash(
+        (sensor_name,) + tuple(inner.get(field) for field in MATTER_FINGERPRINT_FIELDS)
+    )
+
+
+def _matter_etag(fingerprint: int) -> str:
+    """Format a fingerprint as a strong HTTP entity tag."""
+    return f'"{fingerprint & 0xFFFFFFFFFFFFFFFF:016x}"'
+
+
 # =============================================================================
 # HTTP Handler
 # =============================================================================
@@ -90,23 +123,143 @@ class _MatterDataLoggerHandler(BaseHTTPRequestHandler):
               ``{"sensors": [{"sensor_index": ..., "device": {...}}, ...]}``
 
         GET /matter/sensor/<sensor_index>
-            → ``200 OK`` with ``{"device": {...}}``
+            → ``200 OK`` with ``{"device": {...}}`` and an ``ETag`` header
+            → ``304 Not Modified`` if ``If-None-Match`` matches the current ``ETag``
             → ``404 Not Found`` if sensor_index not tracked
+
+        GET /matter/sensor/<sensor_index>/statistics
+            → ``200 OK`` with ``{"sensor_index": ..., "statistics": {...}}``, the
+              rolling means and NowCast of the sensor
+            → ``404 Not Found`` if the sensor has no statistics yet
+
+        GET /matter/sensors/nearby?latitude=<lat>&longitude=<lng>&radius_km=<km>
+        GET /matter/sensors/nearby?latitude=<lat>&longitude=<lng>&count=<N>
+            → ``200 OK`` with ``{"sensors": [{"sensor_index": ..., "latitude": ...,
+              "longitude": ..., "distance_km": ...}, ...], "count": <N>}``, nearest
+              first. With both ``radius_km`` and ``count``, the ``count`` nearest
+              sensors within ``radius_km``.
+            → ``400 Bad Request`` if a parameter is missing or invalid
+
+        GET /matter/sensors/within?nwlng=<lng>&nwlat=<lat>&selng=<lng>&selat=<lat>
+            → ``200 OK`` with ``{"sensors": [{"sensor_index": ..., "latitude": ...,
+              "longitude": ...}, ...], "count": <N>}``
+            → ``400 Bad Request`` if a parameter is missing or invalid
     """
 
     def log_message(self, format_: str, *args: Any) -> None:
         """Suppress default request logging; use structured logger instead."""
         pass
 
-    def _send_json(self, status: int, data: dict) -> None:
+    def _send_json(self, status: int, data: dict, etag: str | None = None) -> None:
         self.send_response(status)
         self.send_header("Content-Type", "application/json; charset=utf-8")
-        self.send_header("Cache-Control", "no-store")
+        if etag is None:
+            self.send_header("Cache-Control", "no-store")
+        else:
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("ETag", etag)
         self.end_headers()
         self.wfile.write(json.dumps(data, indent=2).encode("utf-8"))
 
+    def _get_query_parameters(
+        self, query: str, required: tuple[str, ...], optional: tuple[str, ...] = ()
+    ) -> dict[str, float] | None:
+        """
+        Parse numeric query parameters, sending ``400 Bad Request`` on failure.
+
+        :param query: The query string of the request.
+        :param required: Names of parameters that must be present.
+        :param optional: Names of parameters that may be present.
+        :return: The parsed parameters, or None if a response was already sent.
+        """
+        values = parse_qs(query)
+        parameters: dict[str, float] = {}
+        for name in required + optional:
+            if name not in values:
+                if name in required:
+                    self._send_json(400, {"error": f"Missing parameter '{name}'"})
+                    return None
+                continue
+
+            try:
+                parameters[name] = float(values[name][-1])
+            except ValueError:
+                self._send_json(400, {"error": f"Invalid parameter '{name}'"})
+                return None
+
+            if not math.isfinite(parameters[name]):
+                self._send_json(400, {"error": f"Invalid parameter '{name}'"})
+                return None
+
+        return parameters
+
+    def _send_nearby_sensors(self, query: str) -> None:
+        parameters = self._get_query_parameters(
+            query, ("latitude", "longitude"), ("radius_km", "count")
+        )
+        if parameters is None:
+            return
+
+        if "radius_km" not in parameters and "count" not in parameters:
+            self._send_json(400, {"error": "Missing parameter 'radius_km' or 'count'"})
+            return
+
+        spatial_index = self.server.spatial_index
+        with self.server.lock:
+            if "radius_km" in parameters:
+                results = spatial_index.query_radius(
+                    parameters["latitude"],
+                    parameters["longitude"],
+                    parameters["radius_km"],
+                )
+                if "count" in parameters:
+                    results = results[: max(0, int(parameters["count"]))]
+            else:
+                results = spatial_index.query_nearest(
+                    parameters["latitude"],
+                    parameters["longitude"],
+                    int(parameters["count"]),
+                )
+            sensors = [
+                {
+                    "sensor_index": idx,
+                    "latitude": spatial_index.get_position(idx)[0],
+                    "longitude": spatial_index.get_position(idx)[1],
+                    "distance_km": distance_km,
+                }
+                for idx, distance_km in results
+            ]
+
+        self._send_json(200, {"sensors": sensors, "count": len(sensors)})
+
+    def _send_sensors_within(self, query: str) -> None:
+        parameters = self._get_query_parameters(
+            query, ("nwlng", "nwlat", "selng", "selat")
+        )
+        if parameters is None:
+            return
+
+        spatial_index = self.server.spatial_index
+        with self.server.lock:
+            sensors = [
+                {
+                    "sensor_index": idx,
+                    "latitude": spatial_index.get_position(idx)[0],
+                    "longitude": spatial_index.get_position(idx)[1],
+                }
+                for idx in spatial_index.query_bounding_box(
+                    parameters["nwlng"],
+                    parameters["nwlat"],
+                    parameters["selng"],
+                    parameters["selat"],
+                )
+            ]
+
+        self._send_json(200, {"sensors": sensors, "count": len(sensors)})
+
     def do_GET(self) -> None:
-        path = urlsplit(self.path).path
+        url = urlsplit(self.path)
+        path = url.path
 
         if path == HEALTH_PATH or path == "/":
             with self.server.lock:
@@ -123,6 +276,40 @@ class _MatterDataLoggerHandler(BaseHTTPRequestHandler):
             }
             self._send_json(200, payload)
 
+        elif path == MATTER_SENSORS_NEARBY_PATH and (
+            self.server.spatial_index is not None
+        ):
+            self._send_nearby_sensors(url.query)
+
+        elif path == MATTER_SENSORS_WITHIN_PATH and (
+            self.server.spatial_index is not None
+        ):
+            self._send_sensors_within(url.query)
+
+        elif path.startswith(MATTER_SENSOR_PATH_PREFIX + "/") and path.endswith(
+            MATTER_SENSOR_STATISTICS_PATH_SUFFIX
+        ):
+            try:
+                idx = int(
+                    path[
+                        len(MATTER_SENSOR_PATH_PREFIX)
+                        + 1 : -len(MATTER_SENSOR_STATISTICS_PATH_SUFFIX)
+                    ]
+                )
+            except ValueError:
+                self._send_json(400, {"error": "Invalid sensor_index"})
+                return
+
+            statistics = None
+            if self.server.rolling_statistics is not None:
+                with self.server.lock:
+                    statistics = self.server.rolling_statistics.get_statistics(idx)
+            if statistics is None:
+                self._send_json(404, {"error": f"Sensor {idx} has no statistics yet."})
+                return
+
+            self._send_json(200, {"sensor_index": idx, "statistics": statistics})
+
         elif path.startswith(MATTER_SENSOR_PATH_PREFIX + "/"):
             try:
                 idx = int(path[len(MATTER_SENSOR_PATH_PREFIX) + 1 :])
@@ -132,13 +319,22 @@ class _MatterDataLoggerHandler(BaseHTTPRequestHandler):
 
             with self.server.lock:
                 device = self.server.matter_devices.get(idx)
+                etag = self.server.matter_etags.get(idx)
             if device is None:
                 self._send_json(
                     404, {"error": f"Sensor {idx} not found or not yet polled."}
                 )
                 return
 
-            self._send_json(200, {"device": device})
+            # The ETag only changes when the sensor's fingerprint changes, so
+            # clients can revalidate without the device JSON being re-rendered.
+            if etag is not None and self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+
+            self._send_json(200, {"device": device}, etag=etag)
 
         else:
             self._send_json(404, {"error": "Not found"})
@@ -160,9 +356,16 @@ class _MatterHTTPServer(HTTPServer):
         RequestHandlerClass: type[BaseHTTPRequestHandler],
         matter_devices: dict[int, dict[str, Any]],
         lock: threading.Lock,
+        matter_etags: dict[int, str] | None = None,
+        rolling_statistics: PurpleAirDataLoggerRollingStatistics | None = None,
+        spatial_index: PurpleAirDataLoggerSpatialIndex | None = None,
     ) -> None:
         # Share the device map across all request handlers
         self.matter_devices = matter_devices
+        self.matter_etags = matter_etags if matter_etags is not None else {}
+        # Read under ``lock``, the polling loop updates it
+        self.rolling_statistics = rolling_statistics
+        self.spatial_index = spatial_index
         self.lock = lock
         super().__init__(server_address, RequestHandlerClass)
 
@@ -243,6 +446,10 @@ class PurpleAirMatterDataLogger(PurpleAirDataLogger):
 
         # Maps sensor_index (int) → Matter device dict
         self._matter_devices: dict[int, dict[str, Any]] = {}
+        # Maps sensor_index (int) → (fingerprint, Matter device dict) of the last conversion
+        self._matter_fingerprints: dict[int, tuple[int, dict[str, Any]]] = {}
+        # Maps sensor_index (int) → HTTP ETag of the currently served device
+        self._matter_etags: dict[int, str] = {}
         self._httpd: _MatterHTTPServer | None = None
         self._http_thread: threading.Thread | None = None
         self._lock = threading.Lock()
@@ -260,6 +467,9 @@ class PurpleAirMatterDataLogger(PurpleAirDataLogger):
             RequestHandlerClass=_MatterDataLoggerHandler,
             matter_devices=self._matter_devices,
             lock=self._lock,
+            matter_etags=self._matter_etags,
+            rolling_statistics=self._rolling_statistics,
+            spatial_index=self._spatial_index,
         )
         self._http_thread = threading.Thread(
             target=self._httpd.serve_forever,
@@ -282,6 +492,25 @@ class PurpleAirMatterDataLogger(PurpleAirDataLogger):
             self._http_port,
             MATTER_SENSOR_PATH_PREFIX,
         )
+        logger.info(
+            "  → Statistics:    GET http://%s:%d%s/<sensor_index>%s",
+            self._http_host,
+            self._http_port,
+            MATTER_SENSOR_PATH_PREFIX,
+            MATTER_SENSOR_STATISTICS_PATH_SUFFIX,
+        )
+        logger.info(
+            "  → Nearby:        GET http://%s:%d%s?latitude=&longitude=&radius_km=",
+            self._http_host,
+            self._http_port,
+            MATTER_SENSORS_NEARBY_PATH,
+        )
+        logger.info(
+            "  → Within:        GET http://%s:%d%s?nwlng=&nwlat=&selng=&selat=",
+            self._http_host,
+            self._http_port,
+            MATTER_SENSORS_WITHIN_PATH,
+        )
         logger.info(
             "  → Health check:  GET http://%s:%d%s",
             self._http_host,
@@ -293,6 +522,74 @@ class PurpleAirMatterDataLogger(PurpleAirDataLogger):
     # Per-sensor conversion
     # -------------------------------------------------------------------------
 
+    def _convert_if_changed(
+        self,
+        sensor_index: int,
+        reading: dict[str, Any],
+        sensor_name: str | None = None,
+    ) -> dict[str, Any]:
+        """
+        Convert a reading to Matter format unless its fingerprint is unchanged.
+
+        When the fingerprint matches the previous conversion for ``sensor_index``
+        the previously converted device dict (the same object) is returned, so
+        callers can detect "unchanged" with an identity check. Otherwise the
+        reading is also added to the rolling statistics and the spatial index.
+
+        :param sensor_index: PurpleAir sensor index.
+        :param reading: Raw PurpleAir reading passed to the converter.
+        :param sensor_name: Optional display name override for Matter output.
+        :return: Matter device dict.
+        """
+        fingerprint = _matter_fingerprint(reading, sensor_name)
+        cached = self._matter_fingerprints.get(sensor_index)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+        # A changed fingerprint is a new reading, so it is only counted once
+        self._update_rolling_statistics(sensor_index, reading)
+        self._update_spatial_index(sensor_index, reading)
+
+        device = PurpleAirMatterConverter.to_air_quality_sensor(
+            reading,
+            sensor_name=sensor_name,
+        )
+        self._matter_fingerprints[sensor_index] = (fingerprint, device)
+        return device
+
+    def _update_rolling_statistics(
+        self, sensor_index: int, reading: dict[str, Any]
+    ) -> None:
+        """
+        Add a reading to the rolling statistics served by the HTTP API.
+
+        :param sensor_index: PurpleAir sensor index.
+        :param reading: A flat PurpleAir reading, or a payload with a ``"sensor"``
+            wrapper. Readings without ``data_time_stamp`` or ``last_seen`` are skipped.
+        """
+        inner = reading.get("sensor", reading)
+        data_time_stamp = reading.get("data_time_stamp", inner.get("last_seen"))
+        if data_time_stamp is None:
+            return
+
+        with self._lock:
+            self._rolling_statistics.update(
+                dict(inner, sensor_index=sensor_index, data_time_stamp=data_time_stamp)
+            )
+
+    def _update_spatial_index(self, sensor_index: int, reading: dict[str, Any]) -> None:
+        """
+        Move a sensor to the position of a reading in the spatial index served by the
+        HTTP API.
+
+        :param sensor_index: PurpleAir sensor index.
+        :param reading: A flat PurpleAir reading, or a payload with a ``"sensor"``
+            wrapper. Readings without a position keep the sensor where it was.
+        """
+        inner = reading.get("sensor", reading)
+        with self._lock:
+            self._spatial_index.update(dict(inner, sensor_index=sensor_index))
+
     def _poll_and_convert_sensor(
         self,
         sensor_index: int,
@@ -312,10 +609,7 @@ class PurpleAirMatterDataLogger(PurpleAirDataLogger):
                 sensor_index,
                 read_key=primary_key,
             )
-            return PurpleAirMatterConverter.to_air_quality_sensor(
-                raw,
-                sensor_name=sensor_name,
-            )
+            return self._convert_if_changed(sensor_index, raw, sensor_name)
         except PurpleAirAPIError as exc:
             logger.warning("Sensor %s: PurpleAir API error: %s", sensor_index, exc)
             return None
@@ -346,15 +640,6 @@ class PurpleAirMatterDataLogger(PurpleAirDataLogger):
                 results[idx] = device
         return results
 
-    @staticmethod
-    def _local_average(raw: dict[str, Any], primary: str, secondary: str) -> Any:
-        """Return one local reading, averaging a secondary channel when present."""
-        primary_value = raw.get(primary)
-        secondary_value = raw.get(secondary)
-        if primary_value is None or secondary_value is None:
-            return primary_value
-        return (float(primary_value) + float(secondary_value)) / 2
-
     def _poll_and_convert_local(self) -> dict[int, dict[str, Any]]:
         """Poll configured local sensors and convert their payloads to Matter JSON."""
         try:
@@ -366,33 +651,31 @@ class PurpleAirMatterDataLogger(PurpleAirDataLogger):
         results: dict[int, dict[str, Any]] = {}
         for address, raw in local_sensors.items():
             try:
-                sensor_id = str(raw["SensorId"])
-                sensor_index = int(sensor_id.replace(":", ""), 16)
-                pressure_hpa = self._local_average(raw, "pressure", "pressure_680")
+                # Shares the local to external field mapping with the other loggers
+                converted = convert_local_sensor_data(raw)
+                sensor_index = converted["sensor_index"]
+                pressure_hpa = converted["pressure"]
                 canonical = {
                     "sensor_index": sensor_index,
-                    "name": sensor_id,
-                    "hardware": raw.get("hardwarediscovered"),
-                    "firmware_version": raw.get("version"),
-                    "latitude": raw.get("lat"),
-                    "longitude": raw.get("lon"),
-                    "temperature": self._local_average(
-                        raw, "current_temp_f", "current_temp_f_680"
-                    ),
-                    "humidity": self._local_average(
-                        raw, "current_humidity", "current_humidity_680"
-                    ),
+                    "name": str(converted["name"]),
+                    "hardware": converted["hardware"],
+                    "firmware_version": converted["firmware_version"],
+                    "latitude": converted["latitude"],
+                    "longitude": converted["longitude"],
+                    "temperature": converted["temperature"],
+                    "humidity": converted["humidity"],
                     "pressure": (
                         float(pressure_hpa) / 68.9476
                         if pressure_hpa is not None
                         else None
                     ),
-                    "pm1.0": self._local_average(raw, "pm1_0_atm", "pm1_0_atm_b"),
-                    "pm2.5": self._local_average(raw, "pm2_5_atm", "pm2_5_atm_b"),
-                    "pm10.0": self._local_average(raw, "pm10_0_atm", "pm10_0_atm_b"),
+                    "pm1.0": converted["pm1.0_atm"],
+                    "pm2.5": converted["pm2.5_atm"],
+                    "pm10.0": converted["pm10.0_atm"],
+                    "data_time_stamp": converted["data_time_stamp"],
                 }
-                results[sensor_index] = PurpleAirMatterConverter.to_air_quality_sensor(
-                    canonical
+                results[sensor_index] = self._convert_if_changed(
+                    sensor_index, canonical
                 )
             except (KeyError, TypeError, ValueError) as exc:
                 logger.warning("Local sensor %s: invalid payload: %s", address, exc)
@@ -481,14 +764,28 @@ class PurpleAirMatterDataLogger(PurpleAirDataLogger):
                 )
             )
 
+            # Unchanged sensors come back as the very same device object, so only
+            # the ones that actually changed are published and get a new ETag.
+            changed = {
+                idx: device
+                for idx, device in devices.items()
+                if self._matter_devices.get(idx) is not device
+            }
+
             # Keep last-known-good readings when a sensor has a transient failure.
             with self._lock:
-                self._matter_devices.update(devices)
+                self._matter_devices.update(changed)
+                for idx in changed:
+                    cached = self._matter_fingerprints.get(idx)
+                    if cached is not None:
+                        self._matter_etags[idx] = _matter_etag(cached[0])
 
             logger.info(
-                "Matter devices updated: %d/%d sensors converted successfully.",
+                "Matter devices updated: %d/%d sensors converted successfully "
+                "(%d changed).",
                 len(devices),
                 configured_sensor_count,
+                len(changed),
             )
 
             # Optionally also persist raw PurpleAir data (non-matter_only mode)
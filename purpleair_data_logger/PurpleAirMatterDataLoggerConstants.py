@@ -30,9 +30,45 @@ MATTER_ALL_SENSORS_PATH = "/matter/sensors"
 #: Path prefix for individual sensor Matter device endpoint.
 MATTER_SENSOR_PATH_PREFIX = "/matter/sensor"
 
+#: Path suffix, after ``MATTER_SENSOR_PATH_PREFIX/<sensor_index>``, for a sensor's
+#: rolling statistics endpoint.
+MATTER_SENSOR_STATISTICS_PATH_SUFFIX = "/statistics"
+
+#: Path for the endpoint that finds the sensors within ``radius_km`` of, or the ``count``
+#: sensors nearest to, a ``latitude`` and ``longitude``.
+MATTER_SENSORS_NEARBY_PATH = "/matter/sensors/nearby"
+
+#: Path for the endpoint that finds the sensors within a ``nwlng``, ``nwlat``, ``selng``
+#: and ``selat`` bounding box.
+MATTER_SENSORS_WITHIN_PATH = "/matter/sensors/within"
+
 #: Path for the health check endpoint.
 HEALTH_PATH = "/health"
 
+# =============================================================================
+# Delta detection
+# =============================================================================
+
+#: Raw PurpleAir fields that feed ``PurpleAirMatterConverter.to_air_quality_sensor``.
+#: Together with ``last_seen`` they form the per-sensor fingerprint; a sensor whose
+#: fingerprint has not changed since the previous poll is not reconverted.
+MATTER_FINGERPRINT_FIELDS = (
+    "last_seen",
+    "name",
+    "pm1.0",
+    "pm2.5",
+    "pm10.0",
+    "voc",
+    "temperature",
+    "humidity",
+    "pressure",
+    "latitude",
+    "longitude",
+    "firmware_version",
+    "hardware",
+    "sensor_index",
+)
+
 # =============================================================================
 # Prometheus-compatible metric labels (for scraping the HTTP server itself)
 # =============================================================================
@@ -15,10 +15,18 @@ single request rather than individual requests in succession."
 
 from purpleair_data_logger.PurpleAirDataLogger import (
     PurpleAirDataLogger,
+    PurpleAirDataLoggerError,
+)
+
+from purpleair_data_logger.PurpleAirDataLoggerDownsampler import (
+    WINDOW_STATISTICS_FIELD_NAMES,
 )
 
 from purpleair_data_logger.PurpleAirDataLoggerHelpers import (
     generate_common_arg_parser,
+    add_on_conflict_clause,
+    remember_stored_sensor_data,
+    INSERT_CONFLICT_MODES,
 )
 
 
@@ -46,10 +54,90 @@ from purpleair_data_logger.PurpleAirPSQLQueryStatements import (
     PSQL_CREATE_MATERIALIZED_VIEW_SENSOR_INDEX_AND_NAME_1HOUR_AGGREGATE,
     PSQL_CREATE_CONTINUOUS_AGGREGATE_POLICY_ON_SENSOR_INDEX_AND_NAME_1HOUR_AGGREGATE,
     PSQL_CREATE_DATA_RETENTION_POLICY_ON_SENSOR_INDEX_AND_NAME_1HOUR_AGGREGATE,
+    PSQL_SCHEMA_VERSION,
+    PSQL_CREATE_SCHEMA_VERSION_TABLE,
+    PSQL_GET_SCHEMA_VERSION,
+    PSQL_INSERT_SCHEMA_VERSION,
+    CREATE_PURPLEAIR_SENSOR_DATA_TABLE,
+    PSQL_INSERT_STATEMENT_PURPLEAIR_SENSOR_DATA,
+    PSQL_CREATE_COMPATIBILITY_VIEWS,
+    PSQL_DROP_WIDE_TABLE_LAYOUT,
+    PSQL_CREATE_MATERIALIZED_VIEW_SENSOR_INDEX_AND_NAME_1HOUR_AGGREGATE_WIDE,
+    PSQL_CONTINUOUS_AGGREGATE_RESOLUTIONS,
+    PSQL_CONTINUOUS_AGGREGATE_COLUMN_NAMES,
+    PSQL_CREATE_CONTINUOUS_AGGREGATE_STATEMENTS,
+    PSQL_CREATE_CONTINUOUS_AGGREGATE_STATEMENTS_WIDE,
+    PSQL_CREATE_CONTINUOUS_AGGREGATE_REFRESH_POLICY_STATEMENTS,
+    PSQL_CREATE_CONTINUOUS_AGGREGATE_RETENTION_POLICY_STATEMENTS,
+    PSQL_ADD_ENRICHMENT_COLUMNS,
+    PSQL_ADD_ENRICHMENT_COLUMNS_WIDE,
+    PSQL_ADD_QUALITY_CONTROL_COLUMNS,
+    PSQL_ADD_QUALITY_CONTROL_COLUMNS_WIDE,
+    CREATE_WINDOW_STATISTICS_FIELDS,
+    PSQL_INSERT_STATEMENT_WINDOW_STATISTICS_FIELDS,
+    PSQL_WINDOW_STATISTICS_COLUMN_NAMES,
 )
 import pg8000
 from datetime import datetime, timezone
+from functools import partial
+from time import sleep
+import queue
 import sys
+import threading
+
+#: The default number of times to try reconnecting to the database before giving up
+PSQL_DEFAULT_RECONNECT_ATTEMPTS = 5
+
+#: The default wait in seconds before the first reconnect attempt. It doubles on every
+#: following attempt up to ``PSQL_MAX_RECONNECT_BACKOFF_SECONDS``.
+PSQL_DEFAULT_RECONNECT_BACKOFF_SECONDS = 1
+
+#: The longest wait in seconds between two reconnect attempts
+PSQL_MAX_RECONNECT_BACKOFF_SECONDS = 30
+
+#: PSQL error code prefixes that mean the connection, not the statement, is the
+#: problem. Class 08 is connection_exception, class 57P covers admin_shutdown and
+#: cannot_connect_now as seen during a failover, and 25006 is read_only_sql_transaction
+#: from a primary that was demoted to a standby.
+PSQL_CONNECTION_ERROR_CODE_PREFIXES = ("08", "57P", "25006")
+
+#: The PSQL table layouts. 'split' stores each reading in nine hypertables, one per
+#: field group. 'wide' stores one row per reading in the purpleair_sensor_data
+#: hypertable and adds views named like the nine tables.
+PSQL_TABLE_LAYOUTS = ("split", "wide")
+
+#: The default number of batches the async writer may have queued before
+#: ``finish_storing_sensor_data`` blocks and waits for the database to catch up
+PSQL_DEFAULT_WRITER_QUEUE_SIZE = 10
+
+#: The most rows the async writer keeps to retry while the database can't be reached.
+#: Past it the oldest rows are dropped.
+PSQL_MAX_WRITER_RETRY_ROWS = 100000
+
+
+def is_psql_connection_error(error) -> bool:
+    """
+    Check if an error raised by PG8000 means the database connection is broken.
+
+    :param Exception error: The error to check.
+
+    :return: True if reconnecting is worth a try.
+    :rtype: bool
+    """
+
+    if isinstance(error, (pg8000.InterfaceError, OSError)):
+        return True
+
+    if (
+        isinstance(error, pg8000.DatabaseError)
+        and error.args
+        and isinstance(error.args[0], dict)
+    ):
+        return str(error.args[0].get("C", "")).startswith(
+            PSQL_CONNECTION_ERROR_CODE_PREFIXES
+        )
+
+    return False
 
 
 class PurpleAirPSQLDataLogger(PurpleAirDataLogger):
@@ -58,18 +146,87 @@ class PurpleAirPSQLDataLogger(PurpleAirDataLogger):
     database. Grafana can then be used to visualize the stored data.
     """
 
-    def __init__(self, PurpleAirAPIReadKey, PurpleAirAPIWriteKey, psql_db_conn):
+    def __init__(
+        self,
+        PurpleAirAPIReadKey,
+        PurpleAirAPIWriteKey,
+        psql_db_conn,
+        conflict_mode="insert",
+        psql_db_conn_factory=None,
+        reconnect_attempts=PSQL_DEFAULT_RECONNECT_ATTEMPTS,
+        reconnect_backoff_seconds=PSQL_DEFAULT_RECONNECT_BACKOFF_SECONDS,
+        table_layout="split",
+        continuous_aggregate_resolutions=tuple(PSQL_CONTINUOUS_AGGREGATE_RESOLUTIONS),
+        async_writer=False,
+        writer_queue_size=PSQL_DEFAULT_WRITER_QUEUE_SIZE,
+    ):
         """
         :param str PurpleAirAPIReadKey: A valid PurpleAirAPI Read key
         :param str PurpleAirAPIWriteKey: A valid PurpleAirAPI Write key
         :param object psql_db_conn: A valid PG8000 database connection
+        :param str conflict_mode: What to do when a (data_time_stamp, sensor_index) row
+                                  already exists. One of 'insert' (raise), 'ignore'
+                                  (keep the stored row) or 'update' (overwrite it).
+        :param callable psql_db_conn_factory: An optional callable returning a new PG8000
+                                              connection, e.g. ``functools.partial(pg8000.connect, ...)``.
+                                              When given, a broken connection is replaced,
+                                              the insert statements are prepared again and
+                                              the sensor data being stored is replayed.
+        :param int reconnect_attempts: How many times to try reconnecting before giving up.
+        :param float reconnect_backoff_seconds: The wait before the first reconnect attempt.
+                                                It doubles on every following attempt.
+        :param str table_layout: One of ``PSQL_TABLE_LAYOUTS``. 'wide' needs one insert
+                                 and one index update per reading instead of nine. It
+                                 can't be changed once the database is bootstrapped.
+        :param tuple continuous_aggregate_resolutions: The keys of
+                                                       ``PSQL_CONTINUOUS_AGGREGATE_RESOLUTIONS``
+                                                       to create continuous aggregates
+                                                       for when the database is
+                                                       bootstrapped or migrated.
+        :param bool async_writer: If True, each batch is handed to a writer thread that
+                                  inserts and commits it while the next PurpleAir
+                                  request is in flight. Errors from the writer thread
+                                  are raised by the next ``store_sensor_data``,
+                                  ``finish_storing_sensor_data`` or
+                                  ``wait_for_pending_writes`` call.
+        :param int writer_queue_size: How many batches the writer thread may fall behind
+                                      before ``finish_storing_sensor_data`` blocks.
+
+        :raises PurpleAirDataLoggerError: If ``conflict_mode``, ``table_layout`` or a
+                                          continuous aggregate resolution is not known,
+                                          or the database uses another table layout or a
+                                          newer schema version.
         """
 
         # Inherit everything from the parent base class: PurpleAirDataLogger
         super().__init__(PurpleAirAPIReadKey, PurpleAirAPIWriteKey)
 
+        if conflict_mode not in INSERT_CONFLICT_MODES:
+            raise PurpleAirDataLoggerError(
+                f"conflict_mode must be one of {INSERT_CONFLICT_MODES}, not '{conflict_mode}'"
+            )
+
+        if table_layout not in PSQL_TABLE_LAYOUTS:
+            raise PurpleAirDataLoggerError(
+                f"table_layout must be one of {PSQL_TABLE_LAYOUTS}, not '{table_layout}'"
+            )
+
+        for resolution in continuous_aggregate_resolutions:
+            if resolution not in PSQL_CONTINUOUS_AGGREGATE_RESOLUTIONS:
+                raise PurpleAirDataLoggerError(
+                    f"continuous_aggregate_resolutions must be in {tuple(PSQL_CONTINUOUS_AGGREGATE_RESOLUTIONS)}, not '{resolution}'"
+                )
+
         # Make our psql database connection
         self._db_conn = psql_db_conn
+        self._psql_db_conn_factory = psql_db_conn_factory
+        self._reconnect_attempts = reconnect_attempts
+        self._reconnect_backoff_seconds = reconnect_backoff_seconds
+        self._conflict_mode = conflict_mode
+
+        # The last data_time_stamp converted for an insert and its conversion
+        self._last_unix_epoch_data_time_stamp = None
+        self._last_psql_data_time_stamp = None
 
         # A list of all acceptable table names
         self._acceptable_table_names_string_list = [
@@ -84,65 +241,279 @@ class PurpleAirPSQLDataLogger(PurpleAirDataLogger):
             "thingspeak_fields",
         ]
 
-        # Make our PSQL Tables
-        self._create_psql_db_tables()
+        # The hypertables that actually hold the data for the chosen table layout
+        self._table_layout = table_layout
+        self._continuous_aggregate_resolutions = continuous_aggregate_resolutions
+        if self._table_layout == "wide":
+            self._hypertable_names = ["purpleair_sensor_data"]
 
-        # Convert our PSQL tables to hyper tables
-        self._convert_psql_tables_to_hyper_tables()
+        else:
+            self._hypertable_names = self._acceptable_table_names_string_list
 
-        # Create compression policies
-        self._configure_data_compression_policies()
+        # An up to date database only costs us the one schema version query
+        schema_version, existing_table_layout = (
+            self._get_psql_db_schema_version_and_table_layout()
+        )
+        if schema_version and existing_table_layout != self._table_layout:
+            raise PurpleAirDataLoggerError(
+                f"The database uses the '{existing_table_layout}' table layout, not '{self._table_layout}'!"
+            )
+
+        if schema_version > PSQL_SCHEMA_VERSION:
+            raise PurpleAirDataLoggerError(
+                f"The database uses schema version {schema_version} but this data logger only knows up to {PSQL_SCHEMA_VERSION}. Please upgrade purpleair_data_logger."
+            )
 
-        # Create continuous aggregates and materialized views
-        self._configure_continuous_aggregates()
+        if schema_version < PSQL_SCHEMA_VERSION:
+            self._migrate_psql_db_schema(schema_version)
 
         # Create some prepared statements
+        self._prepare_psql_db_statements()
+
+        # Commit to the db
+        self._db_conn.commit()
+
+        # Once the writer thread runs it owns the database connection
+        self._async_writer = async_writer
+        self._stores_sensor_data_in_background = async_writer
+        self._pending_sensor_data_batch = []
+        self._writer_error = None
+
+        # The writer thread hands back the sensor data it committed, to be remembered
+        # as stored, and the sensor data it couldn't reach the database for, to be
+        # retried
+        self._writer_lock = threading.Lock()
+        self._committed_sensor_data = []
+        self._failed_sensor_data = []
+        if self._async_writer:
+            self._writer_queue = queue.Queue(maxsize=writer_queue_size)
+            self._writer_thread = threading.Thread(
+                target=self._run_psql_db_writer, daemon=True
+            )
+            self._writer_thread.start()
+
+    @property
+    def get_acceptable_table_names_string_list(self):
+        """
+        A getter method that will simply return the contents of
+        the acceptable_table_names_string_list. This is a list
+        of all the tables that this DataLogger uses and knows about.
+
+        :return: A list of acceptable table name strings.
+        :rtype: list
+        """
+
+        return self._acceptable_table_names_string_list
+
+    def _prepare_psql_db_statements(self):
+        """
+        A method to prepare our insert statements on the current connection. Prepared
+        statements belong to a connection so this has to run again after a reconnect.
+        """
+
         self._db_prepared_statements = {}
+        self._db_prepared_statements["window_statistics_fields"] = (
+            self._db_conn.prepare(
+                add_on_conflict_clause(
+                    PSQL_INSERT_STATEMENT_WINDOW_STATISTICS_FIELDS,
+                    self._conflict_mode,
+                )
+            )
+        )
+        if self._table_layout == "wide":
+            self._db_prepared_statements["purpleair_sensor_data"] = (
+                self._db_conn.prepare(
+                    add_on_conflict_clause(
+                        PSQL_INSERT_STATEMENT_PURPLEAIR_SENSOR_DATA,
+                        self._conflict_mode,
+                    )
+                )
+            )
+            return
+
         self._db_prepared_statements["station_information_and_status_fields"] = (
             self._db_conn.prepare(
-                PSQL_INSERT_STATEMENT_STATION_INFORMATION_AND_STATUS_FIELDS
+                add_on_conflict_clause(
+                    PSQL_INSERT_STATEMENT_STATION_INFORMATION_AND_STATUS_FIELDS,
+                    self._conflict_mode,
+                )
             )
         )
         self._db_prepared_statements["environmental_fields"] = self._db_conn.prepare(
-            PSQL_INSERT_STATEMENT_ENVIRONMENTAL_FIELDS
+            add_on_conflict_clause(
+                PSQL_INSERT_STATEMENT_ENVIRONMENTAL_FIELDS, self._conflict_mode
+            )
         )
         self._db_prepared_statements["miscellaneous_fields"] = self._db_conn.prepare(
-            PSQL_INSERT_STATEMENT_MISCELLANEOUS_FIELDS
+            add_on_conflict_clause(
+                PSQL_INSERT_STATEMENT_MISCELLANEOUS_FIELDS, self._conflict_mode
+            )
         )
         self._db_prepared_statements["pm1_0_fields"] = self._db_conn.prepare(
-            PSQL_INSERT_STATEMENT_PM1_0_FIELDS
+            add_on_conflict_clause(
+                PSQL_INSERT_STATEMENT_PM1_0_FIELDS, self._conflict_mode
+            )
         )
         self._db_prepared_statements["pm2_5_fields"] = self._db_conn.prepare(
-            PSQL_INSERT_STATEMENT_PM2_5_FIELDS
+            add_on_conflict_clause(
+                PSQL_INSERT_STATEMENT_PM2_5_FIELDS, self._conflict_mode
+            )
         )
         self._db_prepared_statements["pm2_5_pseudo_average_fields"] = (
-            self._db_conn.prepare(PSQL_INSERT_STATEMENT_PM2_5_PSEUDO_AVERAGE_FIELDS)
+            self._db_conn.prepare(
+                add_on_conflict_clause(
+                    PSQL_INSERT_STATEMENT_PM2_5_PSEUDO_AVERAGE_FIELDS,
+                    self._conflict_mode,
+                )
+            )
         )
         self._db_prepared_statements["pm10_0_fields"] = self._db_conn.prepare(
-            PSQL_INSERT_STATEMENT_PM10_0_FIELDS
+            add_on_conflict_clause(
+                PSQL_INSERT_STATEMENT_PM10_0_FIELDS, self._conflict_mode
+            )
         )
         self._db_prepared_statements["particle_count_fields"] = self._db_conn.prepare(
-            PSQL_INSERT_STATEMENT_PARTICLE_COUNT_FIELDS
+            add_on_conflict_clause(
+                PSQL_INSERT_STATEMENT_PARTICLE_COUNT_FIELDS, self._conflict_mode
+            )
         )
         self._db_prepared_statements["thingspeak_fields"] = self._db_conn.prepare(
-            PSQL_INSERT_STATEMENT_THINGSPEAK_FIELDS
+            add_on_conflict_clause(
+                PSQL_INSERT_STATEMENT_THINGSPEAK_FIELDS, self._conflict_mode
+            )
         )
 
-        # Commit to the db
+    def _reconnect_psql_db(self):
+        """
+        A method to replace a broken database connection, waiting longer after every
+        failed attempt, and prepare our insert statements on the new connection.
+
+        :raises PurpleAirDataLoggerError: If every reconnect attempt failed.
+        """
+
+        try:
+            self._db_conn.close()
+
+        except Exception:
+            # The old connection is already broken, there is nothing left to clean up
+            pass
+
+        for attempt in range(self._reconnect_attempts):
+            sleep(
+                min(
+                    self._reconnect_backoff_seconds * 2**attempt,
+                    PSQL_MAX_RECONNECT_BACKOFF_SECONDS,
+                )
+            )
+            try:
+                self._db_conn = self._psql_db_conn_factory()
+                self._prepare_psql_db_statements()
+                return
+
+            except Exception as e:
+                if not is_psql_connection_error(e):
+                    raise
+
+                print(
+                    f"PurpleAirPSQLDataLogger: Reconnect attempt {attempt + 1} of {self._reconnect_attempts} failed: {e}"
+                )
+
+        raise PurpleAirDataLoggerError(
+            f"Couldn't reconnect to the database after {self._reconnect_attempts} attempts!"
+        )
+
+    def _get_psql_db_schema_version_and_table_layout(self):
+        """
+        A method to get the schema version and table layout of the database in a
+        single round trip.
+
+        :return: The schema version, or 0 if the database was never bootstrapped, and
+                 the table layout, or None if the database was never bootstrapped.
+        :rtype: tuple
+        """
+
+        try:
+            query_result = self._db_conn.run(PSQL_GET_SCHEMA_VERSION)
+
+        except pg8000.DatabaseError as e:
+            # 42P01 is undefined_table, i.e. the version table doesn't exist yet
+            if e.args and isinstance(e.args[0], dict) and e.args[0].get("C") == "42P01":
+                self._db_conn.rollback()
+                return 0, None
+
+            raise
+
+        schema_version, is_wide_table_layout = query_result[0]
+        return schema_version or 0, "wide" if is_wide_table_layout else "split"
+
+    def _migrate_psql_db_schema(self, schema_version):
+        """
+        A method to bring the database from ``schema_version`` up to
+        ``PSQL_SCHEMA_VERSION`` and record the new version.
+
+        :param int schema_version: The schema version the database is at now.
+        """
+
+        if schema_version < 1:
+            # Make our PSQL Tables
+            self._create_psql_db_tables()
+
+            # Convert our PSQL tables to hyper tables
+            self._convert_psql_tables_to_hyper_tables()
+
+            # Create compression policies
+            self._configure_data_compression_policies()
+
+            # Create continuous aggregates and materialized views
+            self._configure_continuous_aggregates()
+
+        if schema_version < 2:
+            # Create the 5m/1h/1d continuous aggregates
+            self._configure_multi_resolution_continuous_aggregates()
+
+        if schema_version < 3:
+            # Add the EPA corrected PM2.5, NowCast and AQI columns
+            self._add_psql_db_columns(
+                PSQL_ADD_ENRICHMENT_COLUMNS, PSQL_ADD_ENRICHMENT_COLUMNS_WIDE
+            )
+
+        if schema_version < 4:
+            # Add the A/B channel quality control columns
+            self._add_psql_db_columns(
+                PSQL_ADD_QUALITY_CONTROL_COLUMNS, PSQL_ADD_QUALITY_CONTROL_COLUMNS_WIDE
+            )
+
+        if schema_version < 5:
+            # Add the table for the statistics of downsampled windows
+            self._db_conn.run(CREATE_WINDOW_STATISTICS_FIELDS)
+            self._db_conn.run(
+                """SELECT create_hypertable('window_statistics_fields', 'data_time_stamp', if_not_exists => TRUE)"""
+            )
+
+        # The compatibility views select every column, so they are only replaced once
+        # the last one is added
+        if schema_version >= 1 and self._table_layout == "wide":
+            self._db_conn.run(PSQL_CREATE_COMPATIBILITY_VIEWS)
+
+        self._db_conn.run(PSQL_CREATE_SCHEMA_VERSION_TABLE)
+        self._db_conn.run(PSQL_INSERT_SCHEMA_VERSION, version=PSQL_SCHEMA_VERSION)
         self._db_conn.commit()
 
-    @property
-    def get_acceptable_table_names_string_list(self):
+    def _add_psql_db_columns(self, add_columns_statement, add_columns_statement_wide):
         """
-        A getter method that will simply return the contents of
-        the acceptable_table_names_string_list. This is a list
-        of all the tables that this DataLogger uses and knows about.
+        Add columns that a later schema version introduced. Tables made by this version
+        have them already, so this only changes databases made before it. With the wide
+        table layout the caller replaces the compatibility views afterwards.
 
-        :return: A list of acceptable table name strings.
-        :rtype: list
+        :param str add_columns_statement: The ALTER TABLE statement for the split table layout.
+        :param str add_columns_statement_wide: The ALTER TABLE statement for the wide table layout.
         """
 
-        return self._acceptable_table_names_string_list
+        if self._table_layout == "wide":
+            self._db_conn.run(add_columns_statement_wide)
+
+        else:
+            self._db_conn.run(add_columns_statement)
 
     def _create_psql_db_tables(self):
         """
@@ -152,8 +523,16 @@ class PurpleAirPSQLDataLogger(PurpleAirDataLogger):
         official PurpleAir documentation. Think Station information and status fields,
         Environmental fields, etc. See website for more information.
         https://api.purpleair.com/#api-sensors-get-sensor-data
+
+        With the wide table layout all groups share one table and the groups are
+        views on top of it instead.
         """
 
+        if self._table_layout == "wide":
+            self._db_conn.run(CREATE_PURPLEAIR_SENSOR_DATA_TABLE)
+            self._db_conn.run(PSQL_CREATE_COMPATIBILITY_VIEWS)
+            return
+
         self._db_conn.run(CREATE_STATION_INFORMATION_AND_STATUS_FIELDS_TABLE)
         self._db_conn.run(CREATE_ENVIRONMENTAL_FIELDS_TABLE)
         self._db_conn.run(CREATE_MISCELLANEOUS_FIELDS)
@@ -169,7 +548,7 @@ class PurpleAirPSQLDataLogger(PurpleAirDataLogger):
         A method to convert our PSQL tables to TimeScaleDB hyper tables.
         """
 
-        for table_name in self._acceptable_table_names_string_list:
+        for table_name in self._hypertable_names:
             self._db_conn.run(
                 f"""SELECT create_hypertable('{table_name}', 'data_time_stamp', if_not_exists => TRUE)"""
             )
@@ -188,7 +567,7 @@ class PurpleAirPSQLDataLogger(PurpleAirDataLogger):
         for row in query_result:
             compression_policy_list.append(str(row[0]))
 
-        for table_name in self._acceptable_table_names_string_list:
+        for table_name in self._hypertable_names:
             if table_name not in compression_policy_list:
                 self._db_conn.run(
                     f"""ALTER TABLE {table_name} SET (timescaledb.compress, timescaledb.compress_orderby = 'data_time_stamp',
@@ -205,9 +584,16 @@ class PurpleAirPSQLDataLogger(PurpleAirDataLogger):
         can be found here: https://docs.timescale.com/timescaledb/latest/overview/core-concepts/continuous-aggregates/
         """
 
-        self._db_conn.run(
-            PSQL_CREATE_MATERIALIZED_VIEW_SENSOR_INDEX_AND_NAME_1HOUR_AGGREGATE
-        )
+        if self._table_layout == "wide":
+            self._db_conn.run(
+                PSQL_CREATE_MATERIALIZED_VIEW_SENSOR_INDEX_AND_NAME_1HOUR_AGGREGATE_WIDE
+            )
+
+        else:
+            self._db_conn.run(
+                PSQL_CREATE_MATERIALIZED_VIEW_SENSOR_INDEX_AND_NAME_1HOUR_AGGREGATE
+            )
+
         self._db_conn.run(
             PSQL_CREATE_CONTINUOUS_AGGREGATE_POLICY_ON_SENSOR_INDEX_AND_NAME_1HOUR_AGGREGATE
         )
@@ -215,25 +601,87 @@ class PurpleAirPSQLDataLogger(PurpleAirDataLogger):
             PSQL_CREATE_DATA_RETENTION_POLICY_ON_SENSOR_INDEX_AND_NAME_1HOUR_AGGREGATE
         )
 
+    def _configure_multi_resolution_continuous_aggregates(self):
+        """
+        A method to create the multi resolution continuous aggregates with their refresh
+        and retention policies, so week and month views don't have to scan the raw
+        (compressed) chunks.
+        """
+
+        if self._table_layout == "wide":
+            create_continuous_aggregate_statements = (
+                PSQL_CREATE_CONTINUOUS_AGGREGATE_STATEMENTS_WIDE
+            )
+
+        else:
+            create_continuous_aggregate_statements = (
+                PSQL_CREATE_CONTINUOUS_AGGREGATE_STATEMENTS
+            )
+
+        for table_name in PSQL_CONTINUOUS_AGGREGATE_COLUMN_NAMES:
+            for resolution in self._continuous_aggregate_resolutions:
+                key = (table_name, resolution)
+                self._db_conn.run(create_continuous_aggregate_statements[key])
+                self._db_conn.run(
+                    PSQL_CREATE_CONTINUOUS_AGGREGATE_REFRESH_POLICY_STATEMENTS[key]
+                )
+
+                # Resolutions that are kept forever don't have a retention policy
+                if key in PSQL_CREATE_CONTINUOUS_AGGREGATE_RETENTION_POLICY_STATEMENTS:
+                    self._db_conn.run(
+                        PSQL_CREATE_CONTINUOUS_AGGREGATE_RETENTION_POLICY_STATEMENTS[
+                            key
+                        ]
+                    )
+
     def _convert_unix_epoch_timestamp_to_psql_timestamp(self, unix_epoch_timestamp):
         """
-        A method to convert a unix epoch timestamp to a psql timestamp.
+        A method to convert a unix epoch timestamp to a psql timestamp. PG8000 binds
+        an aware datetime as a native timestamptz, so the server doesn't have to parse
+        any text.
 
         :param int unix_epoch_timestamp: A valid unix epoch timestamp
 
         :return: A valid psql UTC timestamp or None.
-        :rtype: str or None
+        :rtype: datetime or None
         """
 
         if unix_epoch_timestamp is None:
             return None
 
         else:
-            return str(datetime.fromtimestamp(unix_epoch_timestamp, timezone.utc))
+            return datetime.fromtimestamp(unix_epoch_timestamp, timezone.utc)
+
+    def _convert_data_time_stamp_to_psql_timestamp(self, unix_epoch_timestamp):
+        """
+        Like ``_convert_unix_epoch_timestamp_to_psql_timestamp`` but remembers the last
+        conversion, since every sensor in a multiple sensor response shares the same
+        data_time_stamp.
+
+        :param int unix_epoch_timestamp: A valid unix epoch timestamp
+
+        :return: A valid psql UTC timestamp or None.
+        :rtype: datetime or None
+        """
+
+        if unix_epoch_timestamp != self._last_unix_epoch_data_time_stamp:
+            self._last_unix_epoch_data_time_stamp = unix_epoch_timestamp
+            self._last_psql_data_time_stamp = (
+                self._convert_unix_epoch_timestamp_to_psql_timestamp(
+                    unix_epoch_timestamp
+                )
+            )
+
+        return self._last_psql_data_time_stamp
 
     def store_sensor_data(self, single_sensor_data_dict):
         """
-        Insert the sensor data into the database.
+        Insert the sensor data into the database. If the connection breaks and a
+        ``psql_db_conn_factory`` was given, reconnect and replay the sensor data. Its
+        transaction was never committed so nothing is stored twice. With the async
+        writer the sensor data is only gathered here and stored in the background after
+        ``finish_storing_sensor_data``. It is remembered as stored by
+        ``collect_stored_sensor_data`` once the writer committed it.
 
         :param dict single_sensor_data_dict: A python dictionary containing all fields
                                              for insertion. If a sensor doesn't support
@@ -242,11 +690,250 @@ class PurpleAirPSQLDataLogger(PurpleAirDataLogger):
                                              or error checking. That is up to the caller.
         """
 
-        # Run the queries
-        self._db_prepared_statements["station_information_and_status_fields"].run(
-            data_time_stamp=self._convert_unix_epoch_timestamp_to_psql_timestamp(
-                single_sensor_data_dict["data_time_stamp"]
-            ),
+        if self._async_writer:
+            # The writer thread stores it with the rest of the batch
+            self._raise_writer_error()
+            self._pending_sensor_data_batch.append(single_sensor_data_dict)
+            return
+
+        self._run_with_reconnect(self._store_sensor_data, single_sensor_data_dict)
+
+    def finish_storing_sensor_data(self):
+        """
+        Hand the batch gathered by ``store_sensor_data`` to the writer thread, along
+        with the sensor data it kept to retry after losing the database connection.
+        Only does something when the async writer is used.
+        """
+
+        if not self._async_writer:
+            return
+
+        self._raise_writer_error()
+        with self._writer_lock:
+            sensor_data_batch = (
+                self._failed_sensor_data + self._pending_sensor_data_batch
+            )
+            self._failed_sensor_data = []
+
+        self._pending_sensor_data_batch = []
+        if sensor_data_batch:
+            self._writer_queue.put(sensor_data_batch)
+
+    def collect_stored_sensor_data(self):
+        """
+        Remember the sensor data the writer thread committed since the last call as
+        stored. Only does something when the async writer is used.
+        """
+
+        if not self._async_writer:
+            return
+
+        with self._writer_lock:
+            committed_sensor_data = self._committed_sensor_data
+            self._committed_sensor_data = []
+
+        for single_sensor_data_dict in committed_sensor_data:
+            remember_stored_sensor_data(self, single_sensor_data_dict)
+
+        if committed_sensor_data:
+            self._deduplication_cache.save()
+
+    def wait_for_pending_writes(self):
+        """
+        Hand over any gathered sensor data, wait until the writer thread committed
+        everything it was given and remember it as stored. Call it before exiting so
+        no gathered sensor data is lost. Only does something when the async writer is
+        used.
+
+        :raises PurpleAirDataLoggerError: If the writer thread failed to store a batch.
+                                          After a connection error the batch is kept
+                                          and retried by the next call.
+        """
+
+        if not self._async_writer:
+            return
+
+        self.finish_storing_sensor_data()
+        self._writer_queue.join()
+        self.collect_stored_sensor_data()
+        self._raise_writer_error()
+
+    def _raise_writer_error(self):
+        """
+        Raise the error the writer thread ran into, once.
+
+        :raises PurpleAirDataLoggerError: If the writer thread failed to store a batch.
+        """
+
+        writer_error, self._writer_error = self._writer_error, None
+        if writer_error is not None:
+            raise PurpleAirDataLoggerError(
+                f"The async writer failed to store a batch: {writer_error}"
+            ) from writer_error
+
+    def _run_psql_db_writer(self):
+        """
+        The writer thread. Stores and commits one batch at a time so talking to the
+        database overlaps with waiting on the PurpleAir API. A batch that fails is
+        rolled back. If the database couldn't be reached the batch is kept and retried
+        with the next one, otherwise it is stored row by row so only the bad rows are
+        dropped.
+        """
+
+        while True:
+            sensor_data_batch = self._writer_queue.get()
+            try:
+                self._run_with_reconnect(
+                    self._store_sensor_data_batch, sensor_data_batch
+                )
+                with self._writer_lock:
+                    self._committed_sensor_data.extend(sensor_data_batch)
+
+            except Exception as e:
+                print(f"PurpleAirPSQLDataLogger: The async writer failed: {e}")
+                self._rollback_psql_db()
+                if self._is_writer_connection_error(e):
+                    self._keep_sensor_data_to_retry(sensor_data_batch)
+
+                else:
+                    self._store_sensor_data_rows(sensor_data_batch)
+
+                self._writer_error = e
+
+            finally:
+                self._writer_queue.task_done()
+
+    def _store_sensor_data_rows(self, sensor_data_batch):
+        """
+        Store and commit a batch that failed as a whole one row at a time, dropping the
+        rows that fail. Runs on the writer thread.
+
+        :param list sensor_data_batch: A list of dicts as expected by ``store_sensor_data``.
+        """
+
+        for row_number, single_sensor_data_dict in enumerate(sensor_data_batch):
+            try:
+                self._run_with_reconnect(
+                    self._store_sensor_data, single_sensor_data_dict
+                )
+
+            except Exception as e:
+                self._rollback_psql_db()
+                if self._is_writer_connection_error(e):
+                    self._keep_sensor_data_to_retry(sensor_data_batch[row_number:])
+                    return
+
+                print(
+                    f"PurpleAirPSQLDataLogger: Dropped the sensor data of sensor {single_sensor_data_dict['sensor_index']} at {single_sensor_data_dict['data_time_stamp']}: {e}"
+                )
+                continue
+
+            with self._writer_lock:
+                self._committed_sensor_data.append(single_sensor_data_dict)
+
+    def _keep_sensor_data_to_retry(self, sensor_data_batch):
+        """
+        Keep sensor data the writer thread couldn't store because the database couldn't
+        be reached. At most ``PSQL_MAX_WRITER_RETRY_ROWS`` rows are kept, the oldest
+        are dropped first.
+
+        :param list sensor_data_batch: A list of dicts as expected by ``store_sensor_data``.
+        """
+
+        with self._writer_lock:
+            self._failed_sensor_data.extend(sensor_data_batch)
+            dropped_row_count = (
+                len(self._failed_sensor_data) - PSQL_MAX_WRITER_RETRY_ROWS
+            )
+            if dropped_row_count > 0:
+                del self._failed_sensor_data[:dropped_row_count]
+
+        if dropped_row_count > 0:
+            print(
+                f"PurpleAirPSQLDataLogger: Dropped the {dropped_row_count} oldest rows kept to retry!"
+            )
+
+    @staticmethod
+    def _is_writer_connection_error(error) -> bool:
+        """
+        Check if the writer thread failed because the database couldn't be reached,
+        including a reconnect that gave up.
+
+        :param Exception error: The error to check.
+
+        :return: True if the sensor data is worth retrying as it is.
+        :rtype: bool
+        """
+
+        return is_psql_connection_error(error) or is_psql_connection_error(
+            error.__context__
+        )
+
+    def _rollback_psql_db(self):
+        """
+        Roll back the transaction of a failed store.
+        """
+
+        try:
+            self._db_conn.rollback()
+
+        except Exception:
+            # A reconnect gave up and left us a broken connection
+            pass
+
+    def _run_with_reconnect(self, store_method, sensor_data):
+        """
+        Run ``store_method``. If the connection breaks and a ``psql_db_conn_factory``
+        was given, reconnect and run it again. Its transaction was never committed so
+        nothing is stored twice.
+
+        :param callable store_method: The method that stores and commits ``sensor_data``.
+        :param object sensor_data: The sensor data to pass to ``store_method``.
+        """
+
+        try:
+            store_method(sensor_data)
+
+        except Exception as e:
+            if self._psql_db_conn_factory is None or not is_psql_connection_error(e):
+                raise
+
+            print(
+                f"PurpleAirPSQLDataLogger: Lost the database connection ({e}), reconnecting..."
+            )
+            self._reconnect_psql_db()
+            store_method(sensor_data)
+
+    def _store_sensor_data_batch(self, sensor_data_batch):
+        """
+        Run the insert statements for a batch of sensors and commit them as one
+        transaction.
+
+        :param list sensor_data_batch: A list of dicts as expected by ``store_sensor_data``.
+        """
+
+        for single_sensor_data_dict in sensor_data_batch:
+            self._store_sensor_data(single_sensor_data_dict, commit=False)
+
+        self._db_conn.commit()
+
+    def _store_sensor_data(self, single_sensor_data_dict, commit=True):
+        """
+        Run the insert statements for one sensor and commit them as one transaction.
+
+        :param dict single_sensor_data_dict: See ``store_sensor_data``.
+        :param bool commit: If False, leave committing to the caller.
+        """
+
+        # Convert once and bind the same value to every table
+        data_time_stamp = self._convert_data_time_stamp_to_psql_timestamp(
+            single_sensor_data_dict["data_time_stamp"]
+        )
+
+        # Gather the parameters for each table
+        insert_parameters = {}
+        insert_parameters["station_information_and_status_fields"] = dict(
+            data_time_stamp=data_time_stamp,
             sensor_index=single_sensor_data_dict["sensor_index"],
             name=single_sensor_data_dict["name"],
             icon=single_sensor_data_dict["icon"],
@@ -281,12 +968,11 @@ class PurpleAirPSQLDataLogger(PurpleAirDataLogger):
             confidence=single_sensor_data_dict["confidence"],
             confidence_manual=single_sensor_data_dict["confidence_manual"],
             confidence_auto=single_sensor_data_dict["confidence_auto"],
+            qc_flags=single_sensor_data_dict.get("qc_flags"),
         )
 
-        self._db_prepared_statements["environmental_fields"].run(
-            data_time_stamp=self._convert_unix_epoch_timestamp_to_psql_timestamp(
-                single_sensor_data_dict["data_time_stamp"]
-            ),
+        insert_parameters["environmental_fields"] = dict(
+            data_time_stamp=data_time_stamp,
             sensor_index=single_sensor_data_dict["sensor_index"],
             humidity=single_sensor_data_dict["humidity"],
             humidity_a=single_sensor_data_dict["humidity_a"],
@@ -299,10 +985,8 @@ class PurpleAirPSQLDataLogger(PurpleAirDataLogger):
             pressure_b=single_sensor_data_dict["pressure_b"],
         )
 
-        self._db_prepared_statements["miscellaneous_fields"].run(
-            data_time_stamp=self._convert_unix_epoch_timestamp_to_psql_timestamp(
-                single_sensor_data_dict["data_time_stamp"]
-            ),
+        insert_parameters["miscellaneous_fields"] = dict(
+            data_time_stamp=data_time_stamp,
             sensor_index=single_sensor_data_dict["sensor_index"],
             voc=single_sensor_data_dict["voc"],
             voc_a=single_sensor_data_dict["voc_a"],
@@ -311,10 +995,8 @@ class PurpleAirPSQLDataLogger(PurpleAirDataLogger):
             analog_input=single_sensor_data_dict["analog_input"],
         )
 
-        self._db_prepared_statements["pm1_0_fields"].run(
-            data_time_stamp=self._convert_unix_epoch_timestamp_to_psql_timestamp(
-                single_sensor_data_dict["data_time_stamp"]
-            ),
+        insert_parameters["pm1_0_fields"] = dict(
+            data_time_stamp=data_time_stamp,
             sensor_index=single_sensor_data_dict["sensor_index"],
             pm1_0=single_sensor_data_dict["pm1.0"],
             pm1_0_a=single_sensor_data_dict["pm1.0_a"],
@@ -327,10 +1009,8 @@ class PurpleAirPSQLDataLogger(PurpleAirDataLogger):
             pm1_0_cf_1_b=single_sensor_data_dict["pm1.0_cf_1_b"],
         )
 
-        self._db_prepared_statements["pm2_5_fields"].run(
-            data_time_stamp=self._convert_unix_epoch_timestamp_to_psql_timestamp(
-                single_sensor_data_dict["data_time_stamp"]
-            ),
+        insert_parameters["pm2_5_fields"] = dict(
+            data_time_stamp=data_time_stamp,
             sensor_index=single_sensor_data_dict["sensor_index"],
             pm2_5_alt=single_sensor_data_dict["pm2.5_alt"],
             pm2_5_alt_a=single_sensor_data_dict["pm2.5_alt_a"],
@@ -344,12 +1024,13 @@ class PurpleAirPSQLDataLogger(PurpleAirDataLogger):
             pm2_5_cf_1=single_sensor_data_dict["pm2.5_cf_1"],
             pm2_5_cf_1_a=single_sensor_data_dict["pm2.5_cf_1_a"],
             pm2_5_cf_1_b=single_sensor_data_dict["pm2.5_cf_1_b"],
+            pm2_5_epa_corrected=single_sensor_data_dict.get("pm2.5_epa_corrected"),
+            pm2_5_nowcast=single_sensor_data_dict.get("pm2.5_nowcast"),
+            aqi=single_sensor_data_dict.get("aqi"),
         )
 
-        self._db_prepared_statements["pm2_5_pseudo_average_fields"].run(
-            data_time_stamp=self._convert_unix_epoch_timestamp_to_psql_timestamp(
-                single_sensor_data_dict["data_time_stamp"]
-            ),
+        insert_parameters["pm2_5_pseudo_average_fields"] = dict(
+            data_time_stamp=data_time_stamp,
             sensor_index=single_sensor_data_dict["sensor_index"],
             pm2_5_10minute=single_sensor_data_dict["pm2.5_10minute"],
             pm2_5_10minute_a=single_sensor_data_dict["pm2.5_10minute_a"],
@@ -371,10 +1052,8 @@ class PurpleAirPSQLDataLogger(PurpleAirDataLogger):
             pm2_5_1week_b=single_sensor_data_dict["pm2.5_1week_b"],
         )
 
-        self._db_prepared_statements["pm10_0_fields"].run(
-            data_time_stamp=self._convert_unix_epoch_timestamp_to_psql_timestamp(
-                single_sensor_data_dict["data_time_stamp"]
-            ),
+        insert_parameters["pm10_0_fields"] = dict(
+            data_time_stamp=data_time_stamp,
             sensor_index=single_sensor_data_dict["sensor_index"],
             pm10_0=single_sensor_data_dict["pm10.0"],
             pm10_0_a=single_sensor_data_dict["pm10.0_a"],
@@ -387,10 +1066,8 @@ class PurpleAirPSQLDataLogger(PurpleAirDataLogger):
             pm10_0_cf_1_b=single_sensor_data_dict["pm10.0_cf_1_b"],
         )
 
-        self._db_prepared_statements["particle_count_fields"].run(
-            data_time_stamp=self._convert_unix_epoch_timestamp_to_psql_timestamp(
-                single_sensor_data_dict["data_time_stamp"]
-            ),
+        insert_parameters["particle_count_fields"] = dict(
+            data_time_stamp=data_time_stamp,
             sensor_index=single_sensor_data_dict["sensor_index"],
             um_count_0_3=single_sensor_data_dict["0.3_um_count"],
             um_count_a_0_3=single_sensor_data_dict["0.3_um_count_a"],
@@ -412,10 +1089,8 @@ class PurpleAirPSQLDataLogger(PurpleAirDataLogger):
             um_count_b_10_0=single_sensor_data_dict["10.0_um_count_b"],
         )
 
-        self._db_prepared_statements["thingspeak_fields"].run(
-            data_time_stamp=self._convert_unix_epoch_timestamp_to_psql_timestamp(
-                single_sensor_data_dict["data_time_stamp"]
-            ),
+        insert_parameters["thingspeak_fields"] = dict(
+            data_time_stamp=data_time_stamp,
             sensor_index=single_sensor_data_dict["sensor_index"],
             primary_id_a=single_sensor_data_dict["primary_id_a"],
             primary_key_a=single_sensor_data_dict["primary_key_a"],
@@ -427,11 +1102,42 @@ class PurpleAirPSQLDataLogger(PurpleAirDataLogger):
             secondary_key_b=single_sensor_data_dict["secondary_key_b"],
         )
 
-        # Commit to the db
-        self._db_conn.commit()
+        # Only rows of the local sensor downsampler have window statistics
+        window_statistics_parameters = None
+        if "sample_count" in single_sensor_data_dict:
+            window_statistics_parameters = dict(
+                data_time_stamp=data_time_stamp,
+                sensor_index=single_sensor_data_dict["sensor_index"],
+            )
+            for column_name, field_name in zip(
+                PSQL_WINDOW_STATISTICS_COLUMN_NAMES, WINDOW_STATISTICS_FIELD_NAMES
+            ):
+                window_statistics_parameters[column_name] = single_sensor_data_dict.get(
+                    field_name
+                )
+
+        # Run the queries
+        if self._table_layout == "wide":
+            wide_insert_parameters = {}
+            for table_insert_parameters in insert_parameters.values():
+                wide_insert_parameters.update(table_insert_parameters)
 
-        # Delete some stuff
-        del single_sensor_data_dict
+            self._db_prepared_statements["purpleair_sensor_data"].run(
+                **wide_insert_parameters
+            )
+
+        else:
+            for table_name, table_insert_parameters in insert_parameters.items():
+                self._db_prepared_statements[table_name].run(**table_insert_parameters)
+
+        if window_statistics_parameters is not None:
+            self._db_prepared_statements["window_statistics_fields"].run(
+                **window_statistics_parameters
+            )
+
+        # Commit to the db
+        if commit:
+            self._db_conn.commit()
 
 
 if __name__ == "__main__":
@@ -484,20 +1190,75 @@ if __name__ == "__main__":
         help="""The PSQL database password""",
     )
 
+    parser.add_argument(
+        "-db_conflict_mode",
+        required=False,
+        default="insert",
+        dest="db_conflict_mode",
+        choices=INSERT_CONFLICT_MODES,
+        help="""What to do when a row for the same data_time_stamp and sensor_index
+                        already exists. 'insert' raises an error, 'ignore' keeps the stored
+                        row and 'update' overwrites it. Default is 'insert'.""",
+    )
+
+    parser.add_argument(
+        "-db_reconnect_attempts",
+        required=False,
+        default=PSQL_DEFAULT_RECONNECT_ATTEMPTS,
+        dest="db_reconnect_attempts",
+        type=int,
+        help="""How many times to try reconnecting to the PSQL database, waiting
+                        longer after every attempt, before giving up.""",
+    )
+
+    parser.add_argument(
+        "-db_table_layout",
+        required=False,
+        default="split",
+        dest="db_table_layout",
+        choices=PSQL_TABLE_LAYOUTS,
+        help="""'split' stores each reading in nine hypertables. 'wide' stores one row
+                        per reading in the purpleair_sensor_data hypertable and adds views
+                        named like the nine tables. Default is 'split'.""",
+    )
+
+    parser.add_argument(
+        "-db_continuous_aggregates",
+        required=False,
+        default=list(PSQL_CONTINUOUS_AGGREGATE_RESOLUTIONS),
+        dest="db_continuous_aggregates",
+        nargs="*",
+        choices=list(PSQL_CONTINUOUS_AGGREGATE_RESOLUTIONS),
+        help="""The continuous aggregate resolutions to create when the database is
+                        bootstrapped. Default is all of them: 5m 1h 1d.""",
+    )
+
+    parser.add_argument(
+        "-db_async_writer",
+        action="store_true",
+        required=False,
+        dest="db_async_writer",
+        help="""Set this flag to insert and commit each batch in a writer thread while
+                        the next PurpleAir request is in flight.""",
+    )
+
     args = parser.parse_args()
 
     # Place holders that are used later down
     the_json_file = None
     file_obj = None
 
-    # Second make the PSQL DB connection with CLI args
-    the_psql_db_conn = pg8000.connect(
+    # Second make the PSQL DB connection with CLI args. Keep the factory so the data
+    # logger can reconnect on its own.
+    the_psql_db_conn_factory = partial(
+        pg8000.connect,
         user=args.db_usr,
         host=args.db_host,
         database=args.db,
         port=args.db_port,
         password=args.db_pwd,
     )
+    the_psql_db_conn = the_psql_db_conn_factory()
 
     # Before doing step three, check if we wish to drop all tables.
     if args.db_drop_all_tables:
@@ -510,7 +1271,12 @@ if __name__ == "__main__":
             sys.exit("""Stopping because you didn't want to continue...""")
 
         elif "yes" in str(user_input):
-            the_psql_db_conn.run(PSQL_DROP_ALL_TABLES)
+            if args.db_table_layout == "wide":
+                the_psql_db_conn.run(PSQL_DROP_WIDE_TABLE_LAYOUT)
+
+            else:
+                the_psql_db_conn.run(PSQL_DROP_ALL_TABLES)
+
             the_psql_db_conn.commit()
             sys.exit(
                 """All database tables have been dropped. Please rerun with a db_usr who only has insert rights provided..."""
@@ -518,14 +1284,40 @@ if __name__ == "__main__":
 
     # Third make an instance of our data logger
     the_paa_psql_data_logger = PurpleAirPSQLDataLogger(
-        args.paa_read_key, args.paa_write_key, the_psql_db_conn
+        args.paa_read_key,
+        args.paa_write_key,
+        the_psql_db_conn,
+        args.db_conflict_mode,
+        the_psql_db_conn_factory,
+        args.db_reconnect_attempts,
+        table_layout=args.db_table_layout,
+        continuous_aggregate_resolutions=tuple(args.db_continuous_aggregates),
+        async_writer=args.db_async_writer,
     )
 
+    # Configure the deduplication cache that sits in front of store_sensor_data
+    the_paa_psql_data_logger.configure_deduplication_cache(
+        args.dedup_cache_size, args.dedup_cache_file
+    )
+
+    # Check the A and B channels of every row if asked to
+    if args.qc_ab_channels:
+        the_paa_psql_data_logger.configure_quality_control()
+
+    # Add the EPA corrected PM2.5, NowCast and AQI to every row if asked to
+    if args.enrich_epa_aqi:
+        the_paa_psql_data_logger.configure_enrichment()
+
     # Fourth choose what run method to execute depending on
     # paa_multiple_sensor_request_json_file/paa_single_sensor_request_json_file/paa_group_sensor_request_json_file/paa_local_sensor_request_json_file
-    the_paa_psql_data_logger.validate_parameters_and_run(
-        args.paa_multiple_sensor_request_json_file,
-        args.paa_single_sensor_request_json_file,
-        args.paa_group_sensor_request_json_file,
-        args.paa_local_sensor_request_json_file,
-    )
+    try:
+        the_paa_psql_data_logger.validate_parameters_and_run(
+            args.paa_multiple_sensor_request_json_file,
+            args.paa_single_sensor_request_json_file,
+            args.paa_group_sensor_request_json_file,
+            args.paa_local_sensor_request_json_file,
+        )
+
+    finally:
+        # Don't lose the batches the async writer hasn't committed yet
+        the_paa_psql_data_logger.wait_for_pending_writes()
@@ -7,6 +7,10 @@ Generate the PSQL query strings. For simplicity our table names will match
 what the PurpleAir documentation says. We will do the same for table column names.
 """
 
+from purpleair_data_logger.PurpleAirDataLoggerDownsampler import (
+    WINDOW_STATISTICS_FIELD_NAMES,
+)
+
 #: PSQL statement for station_information_and_status_fields table
 CREATE_STATION_INFORMATION_AND_STATUS_FIELDS_TABLE = """
     CREATE TABLE IF NOT EXISTS station_information_and_status_fields (
@@ -39,6 +43,7 @@ CREATE_STATION_INFORMATION_AND_STATUS_FIELDS_TABLE = """
         confidence INT NULL,
         confidence_manual INT NULL,
         confidence_auto INT NULL,
+        qc_flags INT NULL,
         PRIMARY KEY(data_time_stamp, sensor_index))"""
 
 #: PSQL statement for environmental_fields table
@@ -104,6 +109,9 @@ CREATE_PM2_5_FIELDS = """
         pm2_5_cf_1 FLOAT NULL,
         pm2_5_cf_1_a FLOAT NULL,
         pm2_5_cf_1_b FLOAT NULL,
+        pm2_5_epa_corrected FLOAT NULL,
+        pm2_5_nowcast FLOAT NULL,
+        aqi INT NULL,
         PRIMARY KEY(data_time_stamp, sensor_index))"""
 
 #: Note: Since we can't have decimals in variable names, we do pm2_5 instead of pm2.5
@@ -224,7 +232,8 @@ PSQL_INSERT_STATEMENT_STATION_INFORMATION_AND_STATUS_FIELDS = """
             channel_flags_auto,
             confidence,
             confidence_manual,
-            confidence_auto
+            confidence_auto,
+            qc_flags
         )
         VALUES 
         (
@@ -256,7 +265,8 @@ PSQL_INSERT_STATEMENT_STATION_INFORMATION_AND_STATUS_FIELDS = """
             CAST(:channel_flags_auto AS INT),
             CAST(:confidence AS INT),
             CAST(:confidence_manual AS INT),
-            CAST(:confidence_auto AS INT)
+            CAST(:confidence_auto AS INT),
+            CAST(:qc_flags AS INT)
         )"""
 
 #: PSQL insert statement for environmental_fields
@@ -361,7 +371,10 @@ PSQL_INSERT_STATEMENT_PM2_5_FIELDS = """
             pm2_5_atm_b,
             pm2_5_cf_1,
             pm2_5_cf_1_a,
-            pm2_5_cf_1_b
+            pm2_5_cf_1_b,
+            pm2_5_epa_corrected,
+            pm2_5_nowcast,
+            aqi
         ) 
         VALUES
         (
@@ -378,7 +391,10 @@ PSQL_INSERT_STATEMENT_PM2_5_FIELDS = """
             CAST(:pm2_5_atm_b AS FLOAT),
             CAST(:pm2_5_cf_1 AS FLOAT),
             CAST(:pm2_5_cf_1_a AS FLOAT),
-            CAST(:pm2_5_cf_1_b AS FLOAT)
+            CAST(:pm2_5_cf_1_b AS FLOAT),
+            CAST(:pm2_5_epa_corrected AS FLOAT),
+            CAST(:pm2_5_nowcast AS FLOAT),
+            CAST(:aqi AS INT)
         )"""
 
 #: PSQL insert statement for pm2_5_pseudo_average_fields
@@ -539,6 +555,465 @@ PSQL_INSERT_STATEMENT_THINGSPEAK_FIELDS = """
         CAST(:secondary_key_b AS TEXT)
     )"""
 
+#: PSQL statement for the purpleair_sensor_data table used by the wide table layout.
+#: It holds one wide row per (data_time_stamp, sensor_index) with the columns of all nine tables.
+CREATE_PURPLEAIR_SENSOR_DATA_TABLE = """
+    CREATE TABLE IF NOT EXISTS purpleair_sensor_data (
+        data_time_stamp TIMESTAMPTZ NOT NULL,
+        sensor_index INT NOT NULL,
+        name TEXT NULL,
+        icon INT NULL,
+        model TEXT NULL,
+        hardware TEXT NULL,
+        location_type INT NULL,
+        private INT NULL,
+        latitude FLOAT NULL,
+        longitude FLOAT NULL,
+        altitude FLOAT NULL,
+        position_rating INT NULL,
+        led_brightness INT NULL,
+        firmware_version TEXT NULL,
+        firmware_upgrade TEXT NULL,
+        rssi INT NULL,
+        uptime INT NULL,
+        pa_latency INT NULL,
+        memory INT NULL,
+        last_seen TIMESTAMPTZ NULL,
+        last_modified TIMESTAMPTZ NULL,
+        date_created TIMESTAMPTZ NULL,
+        channel_state INT NULL,
+        channel_flags INT NULL,
+        channel_flags_manual INT NULL,
+        channel_flags_auto INT NULL,
+        confidence INT NULL,
+        confidence_manual INT NULL,
+        confidence_auto INT NULL,
+        qc_flags INT NULL,
+        humidity INT NULL,
+        humidity_a INT NULL,
+        humidity_b INT NULL,
+        temperature INT NULL,
+        temperature_a INT NULL,
+        temperature_b INT NULL,
+        pressure FLOAT NULL,
+        pressure_a FLOAT NULL,
+        pressure_b FLOAT NULL,
+        voc FLOAT NULL,
+        voc_a FLOAT NULL,
+        voc_b FLOAT NULL,
+        ozone1 FLOAT NULL,
+        analog_input FLOAT NULL,
+        pm1_0 FLOAT NULL,
+        pm1_0_a FLOAT NULL,
+        pm1_0_b FLOAT NULL,
+        pm1_0_atm FLOAT NULL,
+        pm1_0_atm_a FLOAT NULL,
+        pm1_0_atm_b FLOAT NULL,
+        pm1_0_cf_1 FLOAT NULL,
+        pm1_0_cf_1_a FLOAT NULL,
+        pm1_0_cf_1_b FLOAT NULL,
+        pm2_5_alt FLOAT NULL,
+        pm2_5_alt_a FLOAT NULL,
+        pm2_5_alt_b FLOAT NULL,
+        pm2_5 FLOAT NULL,
+        pm2_5_a FLOAT NULL,
+        pm2_5_b FLOAT NULL,
+        pm2_5_atm FLOAT NULL,
+        pm2_5_atm_a FLOAT NULL,
+        pm2_5_atm_b FLOAT NULL,
+        pm2_5_cf_1 FLOAT NULL,
+        pm2_5_cf_1_a FLOAT NULL,
+        pm2_5_cf_1_b FLOAT NULL,
+        pm2_5_epa_corrected FLOAT NULL,
+        pm2_5_nowcast FLOAT NULL,
+        aqi INT NULL,
+        pm2_5_10minute FLOAT NULL,
+        pm2_5_10minute_a FLOAT NULL,
+        pm2_5_10minute_b FLOAT NULL,
+        pm2_5_30minute FLOAT NULL,
+        pm2_5_30minute_a FLOAT NULL,
+        pm2_5_30minute_b FLOAT NULL,
+        pm2_5_60minute FLOAT NULL,
+        pm2_5_60minute_a FLOAT NULL,
+        pm2_5_60minute_b FLOAT NULL,
+        pm2_5_6hour FLOAT NULL,
+        pm2_5_6hour_a FLOAT NULL,
+        pm2_5_6hour_b FLOAT NULL,
+        pm2_5_24hour FLOAT NULL,
+        pm2_5_24hour_a FLOAT NULL,
+        pm2_5_24hour_b FLOAT NULL,
+        pm2_5_1week FLOAT NULL,
+        pm2_5_1week_a FLOAT NULL,
+        pm2_5_1week_b FLOAT NULL,
+        pm10_0 FLOAT NULL,
+        pm10_0_a FLOAT NULL,
+        pm10_0_b FLOAT NULL,
+        pm10_0_atm FLOAT NULL,
+        pm10_0_atm_a FLOAT NULL,
+        pm10_0_atm_b FLOAT NULL,
+        pm10_0_cf_1 FLOAT NULL,
+        pm10_0_cf_1_a FLOAT NULL,
+        pm10_0_cf_1_b FLOAT NULL,
+        um_count_0_3 FLOAT NULL,
+        um_count_a_0_3 FLOAT NULL,
+        um_count_b_0_3 FLOAT NULL,
+        um_count_0_5 FLOAT NULL,
+        um_count_a_0_5 FLOAT NULL,
+        um_count_b_0_5 FLOAT NULL,
+        um_count_1_0 FLOAT NULL,
+        um_count_a_1_0 FLOAT NULL,
+        um_count_b_1_0 FLOAT NULL,
+        um_count_2_5 FLOAT NULL,
+        um_count_a_2_5 FLOAT NULL,
+        um_count_b_2_5 FLOAT NULL,
+        um_count_5_0 FLOAT NULL,
+        um_count_a_5_0 FLOAT NULL,
+        um_count_b_5_0 FLOAT NULL,
+        um_count_10_0 FLOAT NULL,
+        um_count_a_10_0 FLOAT NULL,
+        um_count_b_10_0 FLOAT NULL,
+        primary_id_a INT NULL,
+        primary_key_a TEXT NULL,
+        secondary_id_a INT NULL,
+        secondary_key_a TEXT NULL,
+        primary_id_b INT NULL,
+        primary_key_b TEXT NULL,
+        secondary_id_b INT NULL,
+        secondary_key_b TEXT NULL,
+        PRIMARY KEY(data_time_stamp, sensor_index))"""
+
+#: PSQL insert statement for the purpleair_sensor_data table
+PSQL_INSERT_STATEMENT_PURPLEAIR_SENSOR_DATA = """
+    INSERT INTO purpleair_sensor_data
+        (
+            data_time_stamp,
+            sensor_index,
+            name,
+            icon,
+            model,
+            hardware,
+            location_type,
+            private,
+            latitude,
+            longitude,
+            altitude,
+            position_rating,
+            led_brightness,
+            firmware_version,
+            firmware_upgrade,
+            rssi,
+            uptime,
+            pa_latency,
+            memory,
+            last_seen,
+            last_modified,
+            date_created,
+            channel_state,
+            channel_flags,
+            channel_flags_manual,
+            channel_flags_auto,
+            confidence,
+            confidence_manual,
+            confidence_auto,
+            qc_flags,
+            humidity,
+            humidity_a,
+            humidity_b,
+            temperature,
+            temperature_a,
+            temperature_b,
+            pressure,
+            pressure_a,
+            pressure_b,
+            voc,
+            voc_a,
+            voc_b,
+            ozone1,
+            analog_input,
+            pm1_0,
+            pm1_0_a,
+            pm1_0_b,
+            pm1_0_atm,
+            pm1_0_atm_a,
+            pm1_0_atm_b,
+            pm1_0_cf_1,
+            pm1_0_cf_1_a,
+            pm1_0_cf_1_b,
+            pm2_5_alt,
+            pm2_5_alt_a,
+            pm2_5_alt_b,
+            pm2_5,
+            pm2_5_a,
+            pm2_5_b,
+            pm2_5_atm,
+            pm2_5_atm_a,
+            pm2_5_atm_b,
+            pm2_5_cf_1,
+            pm2_5_cf_1_a,
+            pm2_5_cf_1_b,
+            pm2_5_epa_corrected,
+            pm2_5_nowcast,
+            aqi,
+            pm2_5_10minute,
+            pm2_5_10minute_a,
+            pm2_5_10minute_b,
+            pm2_5_30minute,
+            pm2_5_30minute_a,
+            pm2_5_30minute_b,
+            pm2_5_60minute,
+            pm2_5_60minute_a,
+            pm2_5_60minute_b,
+            pm2_5_6hour,
+            pm2_5_6hour_a,
+            pm2_5_6hour_b,
+            pm2_5_24hour,
+            pm2_5_24hour_a,
+            pm2_5_24hour_b,
+            pm2_5_1week,
+            pm2_5_1week_a,
+            pm2_5_1week_b,
+            pm10_0,
+            pm10_0_a,
+            pm10_0_b,
+            pm10_0_atm,
+            pm10_0_atm_a,
+            pm10_0_atm_b,
+            pm10_0_cf_1,
+            pm10_0_cf_1_a,
+            pm10_0_cf_1_b,
+            um_count_0_3,
+            um_count_a_0_3,
+            um_count_b_0_3,
+            um_count_0_5,
+            um_count_a_0_5,
+            um_count_b_0_5,
+            um_count_1_0,
+            um_count_a_1_0,
+            um_count_b_1_0,
+            um_count_2_5,
+            um_count_a_2_5,
+            um_count_b_2_5,
+            um_count_5_0,
+            um_count_a_5_0,
+            um_count_b_5_0,
+            um_count_10_0,
+            um_count_a_10_0,
+            um_count_b_10_0,
+            primary_id_a,
+            primary_key_a,
+            secondary_id_a,
+            secondary_key_a,
+            primary_id_b,
+            primary_key_b,
+            secondary_id_b,
+            secondary_key_b
+        ) 
+        VALUES
+        (
+            CAST(:data_time_stamp AS TIMESTAMPTZ),
+            CAST(:sensor_index AS INT),
+            CAST(:name AS TEXT),
+            CAST(:icon AS INT),
+            CAST(:model AS TEXT),
+            CAST(:hardware AS TEXT),
+            CAST(:location_type AS INT),
+            CAST(:private AS INT),
+            CAST(:latitude AS FLOAT),
+            CAST(:longitude AS FLOAT),
+            CAST(:altitude AS FLOAT),
+            CAST(:position_rating AS INT),
+            CAST(:led_brightness AS INT),
+            CAST(:firmware_version AS TEXT),
+            CAST(:firmware_upgrade AS TEXT),
+            CAST(:rssi AS INT),
+            CAST(:uptime AS INT),
+            CAST(:pa_latency AS INT),
+            CAST(:memory AS INT),
+            CAST(:last_seen AS TIMESTAMPTZ),
+            CAST(:last_modified AS TIMESTAMPTZ),
+            CAST(:date_created AS TIMESTAMPTZ),
+            CAST(:channel_state AS INT),
+            CAST(:channel_flags AS INT),
+            CAST(:channel_flags_manual AS INT),
+            CAST(:channel_flags_auto AS INT),
+            CAST(:confidence AS INT),
+            CAST(:confidence_manual AS INT),
+            CAST(:confidence_auto AS INT),
+            CAST(:qc_flags AS INT),
+            CAST(:humidity AS INT),
+            CAST(:humidity_a AS INT),
+            CAST(:humidity_b AS INT),
+            CAST(:temperature AS INT),
+            CAST(:temperature_a AS INT),
+            CAST(:temperature_b AS INT),
+            CAST(:pressure AS FLOAT),
+            CAST(:pressure_a AS FLOAT),
+            CAST(:pressure_b AS FLOAT),
+            CAST(:voc AS FLOAT),
+            CAST(:voc_a AS FLOAT),
+            CAST(:voc_b AS FLOAT),
+            CAST(:ozone1 AS FLOAT),
+            CAST(:analog_input AS FLOAT),
+            CAST(:pm1_0 AS FLOAT),
+            CAST(:pm1_0_a AS FLOAT),
+            CAST(:pm1_0_b AS FLOAT),
+            CAST(:pm1_0_atm AS FLOAT),
+            CAST(:pm1_0_atm_a AS FLOAT),
+            CAST(:pm1_0_atm_b AS FLOAT),
+            CAST(:pm1_0_cf_1 AS FLOAT),
+            CAST(:pm1_0_cf_1_a AS FLOAT),
+            CAST(:pm1_0_cf_1_b AS FLOAT),
+            CAST(:pm2_5_alt AS FLOAT),
+            CAST(:pm2_5_alt_a AS FLOAT),
+            CAST(:pm2_5_alt_b AS FLOAT),
+            CAST(:pm2_5 AS FLOAT),
+            CAST(:pm2_5_a AS FLOAT),
+            CAST(:pm2_5_b AS FLOAT),
+            CAST(:pm2_5_atm AS FLOAT),
+            CAST(:pm2_5_atm_a AS FLOAT),
+            CAST(:pm2_5_atm_b AS FLOAT),
+            CAST(:pm2_5_cf_1 AS FLOAT),
+            CAST(:pm2_5_cf_1_a AS FLOAT),
+            CAST(:pm2_5_cf_1_b AS FLOAT),
+            CAST(:pm2_5_epa_corrected AS FLOAT),
+            CAST(:pm2_5_nowcast AS FLOAT),
+            CAST(:aqi AS INT),
+            CAST(:pm2_5_10minute AS FLOAT),
+            CAST(:pm2_5_10minute_a AS FLOAT),
+            CAST(:pm2_5_10minute_b AS FLOAT),
+            CAST(:pm2_5_30minute AS FLOAT),
+            CAST(:pm2_5_30minute_a AS FLOAT),
+            CAST(:pm2_5_30minute_b AS FLOAT),
+            CAST(:pm2_5_60minute AS FLOAT),
+            CAST(:pm2_5_60minute_a AS FLOAT),
+            CAST(:pm2_5_60minute_b AS FLOAT),
+            CAST(:pm2_5_6hour AS FLOAT),
+            CAST(:pm2_5_6hour_a AS FLOAT),
+            CAST(:pm2_5_6hour_b AS FLOAT),
+            CAST(:pm2_5_24hour AS FLOAT),
+            CAST(:pm2_5_24hour_a AS FLOAT),
+            CAST(:pm2_5_24hour_b AS FLOAT),
+            CAST(:pm2_5_1week AS FLOAT),
+            CAST(:pm2_5_1week_a AS FLOAT),
+            CAST(:pm2_5_1week_b AS FLOAT),
+            CAST(:pm10_0 AS FLOAT),
+            CAST(:pm10_0_a AS FLOAT),
+            CAST(:pm10_0_b AS FLOAT),
+            CAST(:pm10_0_atm AS FLOAT),
+            CAST(:pm10_0_atm_a AS FLOAT),
+            CAST(:pm10_0_atm_b AS FLOAT),
+            CAST(:pm10_0_cf_1 AS FLOAT),
+            CAST(:pm10_0_cf_1_a AS FLOAT),
+            CAST(:pm10_0_cf_1_b AS FLOAT),
+            CAST(:um_count_0_3 AS FLOAT),
+            CAST(:um_count_a_0_3 AS FLOAT),
+            CAST(:um_count_b_0_3 AS FLOAT),
+            CAST(:um_count_0_5 AS FLOAT),
+            CAST(:um_count_a_0_5 AS FLOAT),
+            CAST(:um_count_b_0_5 AS FLOAT),
+            CAST(:um_count_1_0 AS FLOAT),
+            CAST(:um_count_a_1_0 AS FLOAT),
+            CAST(:um_count_b_1_0 AS FLOAT),
+            CAST(:um_count_2_5 AS FLOAT),
+            CAST(:um_count_a_2_5 AS FLOAT),
+            CAST(:um_count_b_2_5 AS FLOAT),
+            CAST(:um_count_5_0 AS FLOAT),
+            CAST(:um_count_a_5_0 AS FLOAT),
+            CAST(:um_count_b_5_0 AS FLOAT),
+            CAST(:um_count_10_0 AS FLOAT),
+            CAST(:um_count_a_10_0 AS FLOAT),
+            CAST(:um_count_b_10_0 AS FLOAT),
+            CAST(:primary_id_a AS INT),
+            CAST(:primary_key_a AS TEXT),
+            CAST(:secondary_id_a AS INT),
+            CAST(:secondary_key_a AS TEXT),
+            CAST(:primary_id_b AS INT),
+            CAST(:primary_key_b AS TEXT),
+            CAST(:secondary_id_b AS INT),
+            CAST(:secondary_key_b AS TEXT)
+        )"""
+
+#: PSQL statement to create views named like the nine tables on top of the
+#: purpleair_sensor_data table, so dashboards written for the split table layout keep working
+PSQL_CREATE_COMPATIBILITY_VIEWS = """
+    CREATE OR REPLACE VIEW station_information_and_status_fields AS
+        SELECT data_time_stamp, sensor_index, name, icon, model, hardware, location_type, private, latitude, longitude, altitude, position_rating, led_brightness, firmware_version, firmware_upgrade, rssi, uptime, pa_latency, memory, last_seen, last_modified, date_created, channel_state, channel_flags, channel_flags_manual, channel_flags_auto, confidence, confidence_manual, confidence_auto, qc_flags
+        FROM purpleair_sensor_data;
+    CREATE OR REPLACE VIEW environmental_fields AS
+        SELECT data_time_stamp, sensor_index, humidity, humidity_a, humidity_b, temperature, temperature_a, temperature_b, pressure, pressure_a, pressure_b
+        FROM purpleair_sensor_data;
+    CREATE OR REPLACE VIEW miscellaneous_fields AS
+        SELECT data_time_stamp, sensor_index, voc, voc_a, voc_b, ozone1, analog_input
+        FROM purpleair_sensor_data;
+    CREATE OR REPLACE VIEW pm1_0_fields AS
+        SELECT data_time_stamp, sensor_index, pm1_0, pm1_0_a, pm1_0_b, pm1_0_atm, pm1_0_atm_a, pm1_0_atm_b, pm1_0_cf_1, pm1_0_cf_1_a, pm1_0_cf_1_b
+        FROM purpleair_sensor_data;
+    CREATE OR REPLACE VIEW pm2_5_fields AS
+        SELECT data_time_stamp, sensor_index, pm2_5_alt, pm2_5_alt_a, pm2_5_alt_b, pm2_5, pm2_5_a, pm2_5_b, pm2_5_atm, pm2_5_atm_a, pm2_5_atm_b, pm2_5_cf_1, pm2_5_cf_1_a, pm2_5_cf_1_b, pm2_5_epa_corrected, pm2_5_nowcast, aqi
+        FROM purpleair_sensor_data;
+    CREATE OR REPLACE VIEW pm2_5_pseudo_average_fields AS
+        SELECT data_time_stamp, sensor_index, pm2_5_10minute, pm2_5_10minute_a, pm2_5_10minute_b, pm2_5_30minute, pm2_5_30minute_a, pm2_5_30minute_b, pm2_5_60minute, pm2_5_60minute_a, pm2_5_60minute_b, pm2_5_6hour, pm2_5_6hour_a, pm2_5_6hour_b, pm2_5_24hour, pm2_5_24hour_a, pm2_5_24hour_b, pm2_5_1week, pm2_5_1week_a, pm2_5_1week_b
+        FROM purpleair_sensor_data;
+    CREATE OR REPLACE VIEW pm10_0_fields AS
+        SELECT data_time_stamp, sensor_index, pm10_0, pm10_0_a, pm10_0_b, pm10_0_atm, pm10_0_atm_a, pm10_0_atm_b, pm10_0_cf_1, pm10_0_cf_1_a, pm10_0_cf_1_b
+        FROM purpleair_sensor_data;
+    CREATE OR REPLACE VIEW particle_count_fields AS
+        SELECT data_time_stamp, sensor_index, um_count_0_3, um_count_a_0_3, um_count_b_0_3, um_count_0_5, um_count_a_0_5, um_count_b_0_5, um_count_1_0, um_count_a_1_0, um_count_b_1_0, um_count_2_5, um_count_a_2_5, um_count_b_2_5, um_count_5_0, um_count_a_5_0, um_count_b_5_0, um_count_10_0, um_count_a_10_0, um_count_b_10_0
+        FROM purpleair_sensor_data;
+    CREATE OR REPLACE VIEW thingspeak_fields AS
+        SELECT data_time_stamp, sensor_index, primary_id_a, primary_key_a, secondary_id_a, secondary_key_a, primary_id_b, primary_key_b, secondary_id_b, secondary_key_b
+        FROM purpleair_sensor_data;
+    """
+
+#: PSQL statement to drop the wide table layout. CASCADE takes the compatibility views
+#: and continuous aggregates with it.
+PSQL_DROP_WIDE_TABLE_LAYOUT = """
+    DROP TABLE purpleair_sensor_data CASCADE;
+    DROP TABLE IF EXISTS window_statistics_fields CASCADE;
+    DROP TABLE IF EXISTS purpleair_data_logger_schema_version;
+    """
+
+#: The PSQL columns of the window_statistics_fields table, named like the keys of a
+#: downsampled window row with '.' replaced by '_', e.g. pm2_5_atm_min
+PSQL_WINDOW_STATISTICS_COLUMN_NAMES = tuple(
+    field_name.replace(".", "_") for field_name in WINDOW_STATISTICS_FIELD_NAMES
+)
+
+_WINDOW_STATISTICS_COLUMN_TYPES = {
+    column_name: "INT" if column_name == "sample_count" else "FLOAT"
+    for column_name in PSQL_WINDOW_STATISTICS_COLUMN_NAMES
+}
+
+_WINDOW_STATISTICS_COLUMN_DEFINITIONS = "".join(
+    f"""
+        {column_name} {column_type} {"NOT NULL" if column_name == "sample_count" else "NULL"},"""
+    for column_name, column_type in _WINDOW_STATISTICS_COLUMN_TYPES.items()
+)
+
+#: PSQL statement for window_statistics_fields table. It holds the sample count, min,
+#: max and standard deviation of each downsampled window, with either table layout.
+#: The means are stored with the other readings.
+CREATE_WINDOW_STATISTICS_FIELDS = f"""
+    CREATE TABLE IF NOT EXISTS window_statistics_fields (
+        data_time_stamp TIMESTAMPTZ NOT NULL,
+        sensor_index INT NOT NULL,{_WINDOW_STATISTICS_COLUMN_DEFINITIONS}
+        PRIMARY KEY(data_time_stamp, sensor_index))"""
+
+#: PSQL insert statement for window_statistics_fields
+PSQL_INSERT_STATEMENT_WINDOW_STATISTICS_FIELDS = f"""
+    INSERT INTO window_statistics_fields
+        (
+            data_time_stamp,
+            sensor_index,
+            {", ".join(PSQL_WINDOW_STATISTICS_COLUMN_NAMES)}
+        )
+        VALUES
+        (
+            CAST(:data_time_stamp AS TIMESTAMPTZ),
+            CAST(:sensor_index AS INT),
+            {", ".join(f"CAST(:{column_name} AS {column_type})" for column_name, column_type in _WINDOW_STATISTICS_COLUMN_TYPES.items())}
+        )"""
+
 #: PSQL statement to drop all tables in the database
 PSQL_DROP_ALL_TABLES = """
     DROP TABLE station_information_and_status_fields CASCADE;
@@ -550,8 +1025,64 @@ PSQL_DROP_ALL_TABLES = """
     DROP TABLE pm10_0_fields CASCADE;
     DROP TABLE particle_count_fields CASCADE;
     DROP TABLE thingspeak_fields CASCADE;
+    DROP TABLE IF EXISTS window_statistics_fields CASCADE;
+    DROP TABLE IF EXISTS purpleair_data_logger_schema_version;
+    """
+
+#: The PSQL schema version this data logger bootstraps. Bump it, and add a migration
+#: step to PurpleAirPSQLDataLogger._migrate_psql_db_schema, whenever the tables,
+#: hypertables, policies or aggregates change.
+PSQL_SCHEMA_VERSION = 5
+
+#: PSQL statement to add the columns of the enrichment stage to a database made before
+#: schema version 3
+PSQL_ADD_ENRICHMENT_COLUMNS = """
+    ALTER TABLE pm2_5_fields
+        ADD COLUMN IF NOT EXISTS pm2_5_epa_corrected FLOAT NULL,
+        ADD COLUMN IF NOT EXISTS pm2_5_nowcast FLOAT NULL,
+        ADD COLUMN IF NOT EXISTS aqi INT NULL;
+    """
+
+#: PSQL statement to add the columns of the enrichment stage to a wide table layout
+#: database made before schema version 3
+PSQL_ADD_ENRICHMENT_COLUMNS_WIDE = """
+    ALTER TABLE purpleair_sensor_data
+        ADD COLUMN IF NOT EXISTS pm2_5_epa_corrected FLOAT NULL,
+        ADD COLUMN IF NOT EXISTS pm2_5_nowcast FLOAT NULL,
+        ADD COLUMN IF NOT EXISTS aqi INT NULL;
+    """
+
+#: PSQL statement to add the columns of the quality control stage to a database made
+#: before schema version 4
+PSQL_ADD_QUALITY_CONTROL_COLUMNS = """
+    ALTER TABLE station_information_and_status_fields
+        ADD COLUMN IF NOT EXISTS qc_flags INT NULL;
+    """
+
+#: PSQL statement to add the columns of the quality control stage to a wide table
+#: layout database made before schema version 4
+PSQL_ADD_QUALITY_CONTROL_COLUMNS_WIDE = """
+    ALTER TABLE purpleair_sensor_data
+        ADD COLUMN IF NOT EXISTS qc_flags INT NULL;
     """
 
+#: PSQL statement for the purpleair_data_logger_schema_version table
+PSQL_CREATE_SCHEMA_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS purpleair_data_logger_schema_version (
+        version INT NOT NULL,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"""
+
+#: PSQL statement to get the schema version of the database and whether it uses the
+#: wide table layout
+PSQL_GET_SCHEMA_VERSION = """
+    SELECT max(version), to_regclass('purpleair_sensor_data') IS NOT NULL
+    FROM purpleair_data_logger_schema_version"""
+
+#: PSQL statement to record that a schema version was applied
+PSQL_INSERT_SCHEMA_VERSION = """
+    INSERT INTO purpleair_data_logger_schema_version (version)
+    VALUES (CAST(:version AS INT))"""
+
 #: PSQL statement to see active TimescaleDB compression policies
 #: Documentation can be found here: https://docs.timescale.com/timescaledb/latest/how-to-guides/compression/about-compression/
 PSQL_GET_LIST_OF_ACTIVE_COMPRESSION_POLICIES = """
@@ -570,6 +1101,16 @@ PSQL_CREATE_MATERIALIZED_VIEW_SENSOR_INDEX_AND_NAME_1HOUR_AGGREGATE = """
     WITH NO DATA;
     """
 
+#: PSQL statement to create the sensor_index_and_name_1hour_aggregate TimescaleDB Materialized View for the wide table layout
+PSQL_CREATE_MATERIALIZED_VIEW_SENSOR_INDEX_AND_NAME_1HOUR_AGGREGATE_WIDE = """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS sensor_index_and_name_1hour_aggregate(data_time_stamp, sensor_index, name)
+    WITH (timescaledb.continuous) AS
+	    SELECT time_bucket('1h', data_time_stamp), sensor_index, name
+	    FROM purpleair_sensor_data
+	    GROUP BY time_bucket('1h', data_time_stamp), sensor_index, name
+    WITH NO DATA;
+    """
+
 #: PSQL statement to add a TimescaleDB continuous refresh policy on the sensor_index_and_name_1hour_aggregate materialized view
 #: Documentation can be found here: https://docs.timescale.com/timescaledb/latest/how-to-guides/continuous-aggregates/refresh-policies/
 PSQL_CREATE_CONTINUOUS_AGGREGATE_POLICY_ON_SENSOR_INDEX_AND_NAME_1HOUR_AGGREGATE = """
@@ -587,3 +1128,138 @@ PSQL_CREATE_DATA_RETENTION_POLICY_ON_SENSOR_INDEX_AND_NAME_1HOUR_AGGREGATE = """
     INTERVAL '8 hours',
     if_not_exists => true); 
     """
+
+#: The PSQL continuous aggregate resolutions and their bucket width
+PSQL_CONTINUOUS_AGGREGATE_RESOLUTIONS = {
+    "5m": "5 minutes",
+    "1h": "1 hour",
+    "1d": "1 day",
+}
+
+#: The refresh policy (start offset, end offset, schedule interval) of each continuous
+#: aggregate resolution. The refresh window always spans at least two buckets.
+PSQL_CONTINUOUS_AGGREGATE_REFRESH_POLICIES = {
+    "5m": ("1 hour", "5 minutes", "5 minutes"),
+    "1h": ("3 hours", "1 hour", "1 hour"),
+    "1d": ("3 days", "1 day", "1 day"),
+}
+
+#: How long each continuous aggregate resolution is kept. None keeps it forever.
+PSQL_CONTINUOUS_AGGREGATE_RETENTION_POLICIES = {
+    "5m": "30 days",
+    "1h": "1 year",
+    "1d": None,
+}
+
+#: The PSQL columns that get avg/min/max continuous aggregates, keyed by the table they
+#: come from. Continuous aggregates are named <table name>_<resolution>_aggregate,
+#: e.g. pm2_5_fields_1h_aggregate.
+PSQL_CONTINUOUS_AGGREGATE_COLUMN_NAMES = {
+    "pm2_5_fields": ("pm2_5", "pm2_5_alt", "pm2_5_atm", "pm2_5_cf_1"),
+    "pm10_0_fields": ("pm10_0", "pm10_0_atm", "pm10_0_cf_1"),
+    "environmental_fields": ("humidity", "temperature", "pressure"),
+    "particle_count_fields": (
+        "um_count_0_3",
+        "um_count_0_5",
+        "um_count_1_0",
+        "um_count_2_5",
+        "um_count_5_0",
+        "um_count_10_0",
+    ),
+}
+
+
+def _make_create_continuous_aggregate_statement(
+    table_name, resolution, source_table_name
+):
+    time_bucket = f"time_bucket(INTERVAL '{PSQL_CONTINUOUS_AGGREGATE_RESOLUTIONS[resolution]}', data_time_stamp)"
+    aggregates = "".join(
+        f""",
+        avg({column_name}) AS {column_name}_avg,
+        min({column_name}) AS {column_name}_min,
+        max({column_name}) AS {column_name}_max"""
+        for column_name in PSQL_CONTINUOUS_AGGREGATE_COLUMN_NAMES[table_name]
+    )
+    return f"""
+    CREATE MATERIALIZED VIEW IF NOT EXISTS {table_name}_{resolution}_aggregate
+    WITH (timescaledb.continuous) AS
+        SELECT {time_bucket} AS data_time_stamp,
+        sensor_index,
+        count(*) AS sample_count{aggregates}
+        FROM {source_table_name}
+        GROUP BY {time_bucket}, sensor_index
+    WITH NO DATA;
+    """
+
+
+def _make_create_continuous_aggregate_refresh_policy_statement(table_name, resolution):
+    start_offset, end_offset, schedule_interval = (
+        PSQL_CONTINUOUS_AGGREGATE_REFRESH_POLICIES[resolution]
+    )
+    return f"""
+    SELECT add_continuous_aggregate_policy('{table_name}_{resolution}_aggregate',
+    start_offset => INTERVAL '{start_offset}',
+    end_offset => INTERVAL '{end_offset}',
+    schedule_interval => INTERVAL '{schedule_interval}',
+    if_not_exists => true);
+    """
+
+
+def _make_create_continuous_aggregate_retention_policy_statement(
+    table_name, resolution
+):
+    return f"""
+    SELECT add_retention_policy('{table_name}_{resolution}_aggregate',
+    INTERVAL '{PSQL_CONTINUOUS_AGGREGATE_RETENTION_POLICIES[resolution]}',
+    if_not_exists => true);
+    """
+
+
+#: PSQL statements to create the continuous aggregates, keyed by (table name, resolution)
+#: Documentation can be found here: https://docs.timescale.com/api/latest/continuous-aggregates/create_materialized_view/
+PSQL_CREATE_CONTINUOUS_AGGREGATE_STATEMENTS = {
+    (table_name, resolution): _make_create_continuous_aggregate_statement(
+        table_name, resolution, table_name
+    )
+    for table_name in PSQL_CONTINUOUS_AGGREGATE_COLUMN_NAMES
+    for resolution in PSQL_CONTINUOUS_AGGREGATE_RESOLUTIONS
+}
+
+#: PSQL statements to create the continuous aggregates for the wide table layout, keyed
+#: by (table name, resolution). They have the same names and columns as above.
+PSQL_CREATE_CONTINUOUS_AGGREGATE_STATEMENTS_WIDE = {
+    (table_name, resolution): _make_create_continuous_aggregate_statement(
+        table_name, resolution, "purpleair_sensor_data"
+    )
+    for table_name in PSQL_CONTINUOUS_AGGREGATE_COLUMN_NAMES
+    for resolution in PSQL_CONTINUOUS_AGGREGATE_RESOLUTIONS
+}
+
+#: PSQL statements to add the refresh policies of the continuous aggregates, keyed by
+#: (table name, resolution)
+#: Documentation can be found here: https://docs.timescale.com/timescaledb/latest/how-to-guides/continuous-aggregates/refresh-policies/
+PSQL_CREATE_CONTINUOUS_AGGREGATE_REFRESH_POLICY_STATEMENTS = {
+    (
+        table_name,
+        resolution,
+    ): _make_create_continuous_aggregate_refresh_policy_statement(
+        table_name, resolution
+    )
+    for table_name in PSQL_CONTINUOUS_AGGREGATE_COLUMN_NAMES
+    for resolution in PSQL_CONTINUOUS_AGGREGATE_RESOLUTIONS
+}
+
+#: PSQL statements to add the retention policies of the continuous aggregates, keyed by
+#: (table name, resolution). Resolutions that are kept forever have no statement.
+#: Documentation can be found here: https://docs.timescale.com/timescaledb/latest/how-to-guides/data-retention/data-retention-with-continuous-aggregates/
+PSQL_CREATE_CONTINUOUS_AGGREGATE_RETENTION_POLICY_STATEMENTS = {
+    (
+        table_name,
+        resolution,
+    ): _make_create_continuous_aggregate_retention_policy_statement(
+        table_name, resolution
+    )
+    for table_name in PSQL_CONTINUOUS_AGGREGATE_COLUMN_NAMES
+    for resolution in PSQL_CONTINUOUS_AGGREGATE_RESOLUTIONS
+    if PSQL_CONTINUOUS_AGGREGATE_RETENTION_POLICIES[resolution] is not None
+}
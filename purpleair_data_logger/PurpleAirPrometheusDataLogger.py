@@ -69,6 +69,8 @@ from purpleair_data_logger.PurpleAirPrometheusDataLoggerConstants import (
     STATION_CONFIDENCE_MANUAL_METRIC_DESCRIPTION,
     STATION_CONFIDENCE_AUTO_METRIC_NAME,
     STATION_CONFIDENCE_AUTO_METRIC_DESCRIPTION,
+    STATION_QC_FLAGS_METRIC_NAME,
+    STATION_QC_FLAGS_METRIC_DESCRIPTION,
     ENVIRONMENTAL_HUMIDITY_METRIC_NAME,
     ENVIRONMENTAL_HUMIDITY_METRIC_DESCRIPTION,
     ENVIRONMENTAL_HUMIDITY_A_METRIC_NAME,
@@ -139,6 +141,12 @@ from purpleair_data_logger.PurpleAirPrometheusDataLoggerConstants import (
     PM2_5_CF_1_A_METRIC_DESCRIPTION,
     PM2_5_CF_1_B_METRIC_NAME,
     PM2_5_CF_1_B_METRIC_DESCRIPTION,
+    PM2_5_EPA_CORRECTED_METRIC_NAME,
+    PM2_5_EPA_CORRECTED_METRIC_DESCRIPTION,
+    PM2_5_NOWCAST_METRIC_NAME,
+    PM2_5_NOWCAST_METRIC_DESCRIPTION,
+    AQI_METRIC_NAME,
+    AQI_METRIC_DESCRIPTION,
     PM2_5_10MINUTE_METRIC_NAME,
     PM2_5_10MINUTE_METRIC_DESCRIPTION,
     PM2_5_10MINUTE_A_METRIC_NAME,
@@ -237,6 +245,18 @@ from purpleair_data_logger.PurpleAirPrometheusDataLoggerConstants import (
     THINGSPEAK_PRIMARY_ID_B_METRIC_DESCRIPTION,
     THINGSPEAK_SECONDARY_ID_B_METRIC_NAME,
     THINGSPEAK_SECONDARY_ID_B_METRIC_DESCRIPTION,
+    ROLLING_MEAN_METRIC_NAME,
+    ROLLING_MEAN_METRIC_DESCRIPTION,
+    ROLLING_NOWCAST_METRIC_NAME,
+    ROLLING_NOWCAST_METRIC_DESCRIPTION,
+    WINDOW_SAMPLE_COUNT_METRIC_NAME,
+    WINDOW_SAMPLE_COUNT_METRIC_DESCRIPTION,
+    WINDOW_STATISTIC_METRIC_NAME,
+    WINDOW_STATISTIC_METRIC_DESCRIPTION,
+)
+from purpleair_data_logger.PurpleAirDataLoggerDownsampler import (
+    DOWNSAMPLED_FIELD_NAMES,
+    DOWNSAMPLED_STATISTIC_NAMES,
 )
 
 from prometheus_client import Gauge, start_http_server, CollectorRegistry, REGISTRY
@@ -414,6 +434,12 @@ class PurpleAirPrometheusDataLogger(PurpleAirDataLogger):
             ["sensor_index"],
             registry=self._registry,
         )
+        self._station_qc_flags = Gauge(
+            STATION_QC_FLAGS_METRIC_NAME,
+            STATION_QC_FLAGS_METRIC_DESCRIPTION,
+            ["sensor_index"],
+            registry=self._registry,
+        )
 
         # ---- Environmental fields ----
         self._environmental_humidity = Gauge(
@@ -632,6 +658,24 @@ class PurpleAirPrometheusDataLogger(PurpleAirDataLogger):
             ["sensor_index"],
             registry=self._registry,
         )
+        self._pm2_5_epa_corrected = Gauge(
+            PM2_5_EPA_CORRECTED_METRIC_NAME,
+            PM2_5_EPA_CORRECTED_METRIC_DESCRIPTION,
+            ["sensor_index"],
+            registry=self._registry,
+        )
+        self._pm2_5_nowcast = Gauge(
+            PM2_5_NOWCAST_METRIC_NAME,
+            PM2_5_NOWCAST_METRIC_DESCRIPTION,
+            ["sensor_index"],
+            registry=self._registry,
+        )
+        self._aqi = Gauge(
+            AQI_METRIC_NAME,
+            AQI_METRIC_DESCRIPTION,
+            ["sensor_index"],
+            registry=self._registry,
+        )
 
         # ---- PM2.5 pseudo average fields ----
         self._pm2_5_10minute = Gauge(
@@ -935,6 +979,38 @@ class PurpleAirPrometheusDataLogger(PurpleAirDataLogger):
             registry=self._registry,
         )
 
+        # ---- Rolling statistics ----
+        self._rolling_mean = Gauge(
+            ROLLING_MEAN_METRIC_NAME,
+            ROLLING_MEAN_METRIC_DESCRIPTION,
+            ["sensor_index", "field", "window"],
+            registry=self._registry,
+        )
+        self._rolling_nowcast = Gauge(
+            ROLLING_NOWCAST_METRIC_NAME,
+            ROLLING_NOWCAST_METRIC_DESCRIPTION,
+            ["sensor_index", "field"],
+            registry=self._registry,
+        )
+
+        # ---- Window statistics ----
+        self._window_sample_count = Gauge(
+            WINDOW_SAMPLE_COUNT_METRIC_NAME,
+            WINDOW_SAMPLE_COUNT_METRIC_DESCRIPTION,
+            ["sensor_index"],
+            registry=self._registry,
+        )
+        self._window_statistic = Gauge(
+            WINDOW_STATISTIC_METRIC_NAME,
+            WINDOW_STATISTIC_METRIC_DESCRIPTION,
+            ["sensor_index", "field", "statistic"],
+            registry=self._registry,
+        )
+
+        # The sensors stored since the last 'finish_storing_sensor_data'. Their rolling
+        # statistics are only complete once the batch is stored.
+        self._sensor_indexes_to_export = set()
+
         # Start the Prometheus HTTP server so metrics can be scraped
         start_http_server(self._prometheus_port, registry=self._registry)
 
@@ -969,6 +1045,7 @@ class PurpleAirPrometheusDataLogger(PurpleAirDataLogger):
         """
 
         sensor_index = str(single_sensor_data_dict["sensor_index"])
+        self._sensor_indexes_to_export.add(single_sensor_data_dict["sensor_index"])
 
         # ---- Station information and status fields ----
         self._station_data_time_stamp.labels(sensor_index=sensor_index).set(
@@ -1040,6 +1117,9 @@ class PurpleAirPrometheusDataLogger(PurpleAirDataLogger):
         self._station_confidence_auto.labels(sensor_index=sensor_index).set(
             self._safe_numeric(single_sensor_data_dict["confidence_auto"])
         )
+        self._station_qc_flags.labels(sensor_index=sensor_index).set(
+            self._safe_numeric(single_sensor_data_dict.get("qc_flags"))
+        )
 
         # ---- Environmental fields ----
         self._environmental_humidity.labels(sensor_index=sensor_index).set(
@@ -1153,6 +1233,15 @@ class PurpleAirPrometheusDataLogger(PurpleAirDataLogger):
         self._pm2_5_cf_1_b.labels(sensor_index=sensor_index).set(
             self._safe_numeric(single_sensor_data_dict["pm2.5_cf_1_b"])
         )
+        self._pm2_5_epa_corrected.labels(sensor_index=sensor_index).set(
+            self._safe_numeric(single_sensor_data_dict.get("pm2.5_epa_corrected"))
+        )
+        self._pm2_5_nowcast.labels(sensor_index=sensor_index).set(
+            self._safe_numeric(single_sensor_data_dict.get("pm2.5_nowcast"))
+        )
+        self._aqi.labels(sensor_index=sensor_index).set(
+            self._safe_numeric(single_sensor_data_dict.get("aqi"))
+        )
 
         # ---- PM2.5 pseudo average fields ----
         self._pm2_5_10minute.labels(sensor_index=sensor_index).set(
@@ -1309,6 +1398,50 @@ class PurpleAirPrometheusDataLogger(PurpleAirDataLogger):
             self._safe_numeric(single_sensor_data_dict["secondary_id_b"])
         )
 
+        # ---- Window statistics, only rows emitted by a downsampler carry them ----
+        if "sample_count" in single_sensor_data_dict:
+            self._window_sample_count.labels(sensor_index=sensor_index).set(
+                self._safe_numeric(single_sensor_data_dict["sample_count"])
+            )
+            for field_name in DOWNSAMPLED_FIELD_NAMES:
+                for statistic_name in DOWNSAMPLED_STATISTIC_NAMES:
+                    self._window_statistic.labels(
+                        sensor_index=sensor_index,
+                        field=field_name,
+                        statistic=statistic_name,
+                    ).set(
+                        self._safe_numeric(
+                            single_sensor_data_dict.get(
+                                f"{field_name}_{statistic_name}"
+                            )
+                        )
+                    )
+
+    def finish_storing_sensor_data(self):
+        """
+        Update the rolling statistics Gauges of the sensors stored in this batch.
+        """
+
+        rolling_statistics = self._rolling_statistics
+        for sensor_index in self._sensor_indexes_to_export:
+            statistics = rolling_statistics.get_statistics(sensor_index)
+            if statistics is None:
+                continue
+
+            for field_name, field_statistics in statistics["fields"].items():
+                for hours in rolling_statistics.window_hours:
+                    self._rolling_mean.labels(
+                        sensor_index=str(sensor_index),
+                        field=field_name,
+                        window=f"{hours}h",
+                    ).set(self._safe_numeric(field_statistics[f"mean_{hours}h"]))
+
+                self._rolling_nowcast.labels(
+                    sensor_index=str(sensor_index), field=field_name
+                ).set(self._safe_numeric(field_statistics["nowcast"]))
+
+        self._sensor_indexes_to_export.clear()
+
 
 if __name__ == "__main__":  # pragma: no cover
     parser = generate_common_arg_parser(
@@ -1334,6 +1467,19 @@ if __name__ == "__main__":  # pragma: no cover
         prometheus_port=args.prometheus_port,
     )
 
+    # Configure the deduplication cache that sits in front of store_sensor_data
+    the_paa_prometheus_data_logger.configure_deduplication_cache(
+        args.dedup_cache_size, args.dedup_cache_file
+    )
+
+    # Check the A and B channels of every row if asked to
+    if args.qc_ab_channels:
+        the_paa_prometheus_data_logger.configure_quality_control()
+
+    # Add the EPA corrected PM2.5, NowCast and AQI to every row if asked to
+    if args.enrich_epa_aqi:
+        the_paa_prometheus_data_logger.configure_enrichment()
+
     # Choose what run method to execute depending on
     # paa_multiple_sensor_request_json_file/paa_single_sensor_request_json_file/paa_group_sensor_request_json_file/paa_local_sensor_request_json_file
     the_paa_prometheus_data_logger.validate_parameters_and_run(
@@ -139,6 +139,13 @@ STATION_CONFIDENCE_AUTO_METRIC_NAME = "purpleair_station_confidence_auto"
 #: Metric description for confidence_auto
 STATION_CONFIDENCE_AUTO_METRIC_DESCRIPTION = "PurpleAir sensor confidence - auto (%)"
 
+#: Metric name for qc_flags
+STATION_QC_FLAGS_METRIC_NAME = "purpleair_station_qc_flags"
+#: Metric description for qc_flags
+STATION_QC_FLAGS_METRIC_DESCRIPTION = (
+    "PurpleAir sensor A/B channel quality control bitmask (QC_FLAG_*)"
+)
+
 # ---- Environmental fields ----
 
 #: Metric name for humidity
@@ -334,6 +341,25 @@ PM2_5_CF_1_B_METRIC_NAME = "purpleair_pm2_5_cf_1_b"
 #: Metric description for pm2.5_cf_1_b
 PM2_5_CF_1_B_METRIC_DESCRIPTION = "PurpleAir sensor PM2.5 CF=1 - channel B (μg/m³)"
 
+#: Metric name for pm2.5_epa_corrected
+PM2_5_EPA_CORRECTED_METRIC_NAME = "purpleair_pm2_5_epa_corrected"
+#: Metric description for pm2.5_epa_corrected
+PM2_5_EPA_CORRECTED_METRIC_DESCRIPTION = (
+    "PurpleAir sensor PM2.5 with the US EPA correction (μg/m³)"
+)
+
+#: Metric name for pm2.5_nowcast
+PM2_5_NOWCAST_METRIC_NAME = "purpleair_pm2_5_nowcast"
+#: Metric description for pm2.5_nowcast
+PM2_5_NOWCAST_METRIC_DESCRIPTION = (
+    "PurpleAir sensor NowCast of the US EPA corrected PM2.5 (μg/m³)"
+)
+
+#: Metric name for aqi
+AQI_METRIC_NAME = "purpleair_aqi"
+#: Metric description for aqi
+AQI_METRIC_DESCRIPTION = "PurpleAir sensor US EPA PM2.5 AQI of the NowCast"
+
 # ---- PM2.5 pseudo average fields ----
 
 #: Metric name for pm2.5_10minute
@@ -654,3 +680,33 @@ THINGSPEAK_SECONDARY_ID_B_METRIC_NAME = "purpleair_thingspeak_secondary_id_b"
 THINGSPEAK_SECONDARY_ID_B_METRIC_DESCRIPTION = (
     "PurpleAir sensor ThingSpeak secondary channel ID - channel B"
 )
+
+# ---- Rolling statistics ----
+
+#: Metric name for the rolling means of PurpleAirDataLoggerRollingStatistics
+ROLLING_MEAN_METRIC_NAME = "purpleair_rolling_mean"
+#: Metric description for the rolling means
+ROLLING_MEAN_METRIC_DESCRIPTION = (
+    "PurpleAir sensor mean of a field over the last hours, kept by the data logger"
+)
+
+#: Metric name for the NowCast of PurpleAirDataLoggerRollingStatistics
+ROLLING_NOWCAST_METRIC_NAME = "purpleair_rolling_nowcast"
+#: Metric description for the rolling NowCast
+ROLLING_NOWCAST_METRIC_DESCRIPTION = (
+    "PurpleAir sensor NowCast of a field from its hourly means, kept by the data logger"
+)
+
+# ---- Window statistics ----
+
+#: Metric name for the number of samples in the latest downsampled window
+WINDOW_SAMPLE_COUNT_METRIC_NAME = "purpleair_window_sample_count"
+#: Metric description for the window sample count
+WINDOW_SAMPLE_COUNT_METRIC_DESCRIPTION = (
+    "PurpleAir sensor number of samples in the latest window of the downsampler"
+)
+
+#: Metric name for the min, max and stddev of a field in the latest downsampled window
+WINDOW_STATISTIC_METRIC_NAME = "purpleair_window_statistic"
+#: Metric description for the window statistics
+WINDOW_STATISTIC_METRIC_DESCRIPTION = "PurpleAir sensor min, max or stddev of a field in the latest window of the downsampler"
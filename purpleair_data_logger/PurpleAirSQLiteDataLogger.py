@@ -15,10 +15,23 @@ single request rather than individual requests in succession."
 
 from purpleair_data_logger.PurpleAirDataLogger import (
     PurpleAirDataLogger,
+    PurpleAirDataLoggerError,
+)
+
+from purpleair_data_logger.PurpleAirDataLoggerDownsampler import (
+    WINDOW_STATISTICS_FIELD_NAMES,
+)
+
+from purpleair_data_logger.PurpleAirDataLoggerSupervisor import (
+    PurpleAirDataLoggerSupervisor,
+    add_shard_placeholder,
+    make_shard_data_logger,
 )
 
 from purpleair_data_logger.PurpleAirDataLoggerHelpers import (
     generate_common_arg_parser,
+    add_on_conflict_clause,
+    INSERT_CONFLICT_MODES,
 )
 
 from purpleair_data_logger.PurpleAirSQLiteQueryStatements import (
@@ -31,6 +44,7 @@ from purpleair_data_logger.PurpleAirSQLiteQueryStatements import (
     SQLITE_INSERT_STATEMENT_PM2_5_PSEUDO_AVERAGE_FIELDS,
     SQLITE_INSERT_STATEMENT_STATION_INFORMATION_AND_STATUS_FIELDS,
     SQLITE_INSERT_STATEMENT_THINGSPEAK_FIELDS,
+    SQLITE_INSERT_STATEMENT_WINDOW_STATISTICS_FIELDS,
     CREATE_PARTICLE_COUNT_FIELDS,
     CREATE_PM10_0_FIELDS,
     CREATE_PM1_0_FIELDS,
@@ -40,10 +54,230 @@ from purpleair_data_logger.PurpleAirSQLiteQueryStatements import (
     CREATE_MISCELLANEOUS_FIELDS,
     CREATE_STATION_INFORMATION_AND_STATUS_FIELDS_TABLE,
     CREATE_THINGSPEAK_FIELDS,
+    CREATE_WINDOW_STATISTICS_FIELDS,
     SQLITE_DROP_ALL_TABLES,
+    SQLITE_PERFORMANCE_PROFILES,
+    SQLITE_WAL_CHECKPOINT,
+    SQLITE_QUERY_ONLY,
+    SQLITE_CREATE_TABLE_STATEMENTS_V2,
+    SQLITE_ADDED_COLUMNS,
+    SQLITE_SCHEMA_VERSION_V2,
+    SQLITE_GET_SCHEMA_VERSION,
+    SQLITE_SET_SCHEMA_VERSION_V2,
+    SQLITE_GET_STATION_INFORMATION_AND_STATUS_FIELDS_TABLE_NAME,
+    SQLITE_TABLE_NAMES,
+    SQLITE_ROLLUP_RESOLUTIONS,
+    SQLITE_CREATE_ROLLUP_TABLE_STATEMENTS,
+    SQLITE_REFRESH_ROLLUP_STATEMENTS,
+    SQLITE_ENABLE_INCREMENTAL_AUTO_VACUUM,
+    SQLITE_INCREMENTAL_VACUUM,
+    SQLITE_GET_AUTO_VACUUM,
+    SQLITE_AUTO_VACUUM_INCREMENTAL,
+    SQLITE_VACUUM,
 )
 
+from datetime import datetime, timedelta, timezone
+from functools import partial
+import glob
+import os
+import pathlib
+import re
 import sqlite3
+import time
+
+#: The default number of commits between explicit WAL checkpoints
+SQLITE_DEFAULT_WAL_CHECKPOINT_INTERVAL = 100
+
+#: The periods a SQLite database can be partitioned into, one file per period
+SQLITE_PARTITION_PERIODS = ("month", "week")
+
+#: The number of partition files a data logger keeps open at once. Two lets rows that
+#: straddle a period boundary land in either file without reopening them.
+SQLITE_MAX_OPEN_PARTITIONS = 2
+
+#: The default number of expired rows deleted per table per batch. Small chunks keep
+#: each delete transaction, and so the time the writer holds the lock, short.
+SQLITE_DEFAULT_RETENTION_CHUNK_SIZE = 500
+
+
+def connect_sqlite_data_base(sqlite_data_base_name, performance_profile="default"):
+    """
+    Open a SQLite3 connection and apply a performance profile's pragmas to it.
+
+    :param str sqlite_data_base_name: The path and name for the SQLite3 database file (e.g. database_name.db)
+    :param str performance_profile: A key of ``SQLITE_PERFORMANCE_PROFILES``.
+
+    :return: A configured SQLite3 connection.
+    :rtype: sqlite3.Connection
+    """
+
+    db_conn = sqlite3.connect(sqlite_data_base_name)
+    for pragma in SQLITE_PERFORMANCE_PROFILES[performance_profile]:
+        db_conn.execute(pragma)
+
+    return db_conn
+
+
+def connect_sqlite_data_base_read_only(
+    sqlite_data_base_name, performance_profile="default"
+):
+    """
+    Open a read only SQLite3 connection for readers like Grafana. Paired with the
+    'wal' performance profile on the writer, readers never block the data logger.
+
+    :param str sqlite_data_base_name: The path and name for an existing SQLite3 database file
+    :param str performance_profile: A key of ``SQLITE_PERFORMANCE_PROFILES``. The
+                                    journal mode is a property of the file so only
+                                    the writer sets it.
+
+    :return: A read only SQLite3 connection.
+    :rtype: sqlite3.Connection
+    """
+
+    db_uri = pathlib.Path(sqlite_data_base_name).resolve().as_uri() + "?mode=ro"
+    db_conn = sqlite3.connect(db_uri, uri=True)
+    for pragma in SQLITE_PERFORMANCE_PROFILES[performance_profile]:
+        if not pragma.startswith("PRAGMA journal_mode"):
+            db_conn.execute(pragma)
+
+    db_conn.execute(SQLITE_QUERY_ONLY)
+    return db_conn
+
+
+def get_sqlite_partition_name(
+    sqlite_data_base_name, partition_period, unix_epoch_timestamp
+) -> str:
+    """
+    Build the partition file name that holds a timestamp. The period is appended to
+    the file name, e.g. database_name_2026_10.db for a month or
+    database_name_2026_W42.db for an ISO week.
+
+    :param str sqlite_data_base_name: The path and name for the SQLite3 database file (e.g. database_name.db)
+    :param str partition_period: One of ``SQLITE_PARTITION_PERIODS``.
+    :param int unix_epoch_timestamp: A valid unix epoch timestamp.
+
+    :return: The path and name of the partition file.
+    :rtype: str
+    """
+
+    root, extension = os.path.splitext(sqlite_data_base_name)
+    the_datetime = datetime.fromtimestamp(int(unix_epoch_timestamp), timezone.utc)
+    if partition_period == "month":
+        return f"{root}_{the_datetime.year:04d}_{the_datetime.month:02d}{extension}"
+
+    iso_year, iso_week, _ = the_datetime.isocalendar()
+    return f"{root}_{iso_year:04d}_W{iso_week:02d}{extension}"
+
+
+def get_sqlite_partition_end(partition_name, partition_period):
+    """
+    Find when the period of a partition file ends.
+
+    :param str partition_name: A partition file name built by ``get_sqlite_partition_name``.
+    :param str partition_period: One of ``SQLITE_PARTITION_PERIODS``.
+
+    :return: The unix epoch timestamp the period ends at, or None if the name isn't a
+             partition file name.
+    :rtype: int or None
+    """
+
+    root, _ = os.path.splitext(partition_name)
+    if partition_period == "month":
+        match = re.search(r"_(\d{4})_(\d{2})$", root)
+        if match is None:
+            return None
+
+        year, month = int(match.group(1)), int(match.group(2))
+        if month == 12:
+            period_end = datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+
+        else:
+            period_end = datetime(year, month + 1, 1, tzinfo=timezone.utc)
+
+    else:
+        match = re.search(r"_(\d{4})_W(\d{2})$", root)
+        if match is None:
+            return None
+
+        period_start = datetime.fromisocalendar(
+            int(match.group(1)), int(match.group(2)), 1
+        ).replace(tzinfo=timezone.utc)
+        period_end = period_start + timedelta(days=7)
+
+    return int(period_end.timestamp())
+
+
+def connect_sqlite_partitions_read_only(
+    sqlite_data_base_name,
+    partition_period,
+    start_unix_epoch_timestamp,
+    end_unix_epoch_timestamp,
+    performance_profile="default",
+):
+    """
+    Open a read only SQLite3 connection that ATTACHes every existing partition file
+    covering a time range. A temporary view per table unions the partitions, so
+    queries are written exactly as they are against a single database file.
+
+    :param str sqlite_data_base_name: The path and name given to the partitioned data logger
+    :param str partition_period: One of ``SQLITE_PARTITION_PERIODS``.
+    :param int start_unix_epoch_timestamp: The start of the time range.
+    :param int end_unix_epoch_timestamp: The end of the time range.
+    :param str performance_profile: A key of ``SQLITE_PERFORMANCE_PROFILES``.
+
+    :return: A read only SQLite3 connection.
+    :rtype: sqlite3.Connection
+
+    :raises PurpleAirDataLoggerError: If the range needs more partitions than SQLite
+                                      can attach to one connection.
+    """
+
+    # Walk the range a day at a time. Every month and ISO week starts on a day boundary.
+    partition_names = []
+    for unix_epoch_timestamp in range(
+        int(start_unix_epoch_timestamp), int(end_unix_epoch_timestamp) + 86400, 86400
+    ):
+        partition_name = get_sqlite_partition_name(
+            sqlite_data_base_name,
+            partition_period,
+            min(unix_epoch_timestamp, int(end_unix_epoch_timestamp)),
+        )
+        if partition_name not in partition_names and os.path.exists(partition_name):
+            partition_names.append(partition_name)
+
+    db_conn = sqlite3.connect(":memory:", uri=True)
+    max_attached_partitions = db_conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    if len(partition_names) > max_attached_partitions:
+        db_conn.close()
+        raise PurpleAirDataLoggerError(
+            f"The time range spans {len(partition_names)} partitions but only {max_attached_partitions} can be attached at once!"
+        )
+
+    for partition_number, partition_name in enumerate(partition_names):
+        partition_uri = pathlib.Path(partition_name).resolve().as_uri() + "?mode=ro"
+        db_conn.execute(
+            f"ATTACH DATABASE ? AS partition_{partition_number}", (partition_uri,)
+        )
+
+    for pragma in SQLITE_PERFORMANCE_PROFILES[performance_profile]:
+        if not pragma.startswith("PRAGMA journal_mode"):
+            db_conn.execute(pragma)
+
+    for table_name in SQLITE_TABLE_NAMES:
+        # Partitions written by older versions may not have every table
+        union_query = " UNION ALL ".join(
+            f"SELECT * FROM partition_{partition_number}.{table_name}"
+            for partition_number in range(len(partition_names))
+            if db_conn.execute(
+                f"SELECT 1 FROM partition_{partition_number}.sqlite_master WHERE type = 'table' AND name = ?",
+                (table_name,),
+            ).fetchone()
+        )
+        if union_query:
+            db_conn.execute(f"CREATE TEMP VIEW {table_name} AS {union_query}")
+
+    db_conn.execute(SQLITE_QUERY_ONLY)
+    return db_conn
 
 
 class PurpleAirSQLiteDataLogger(PurpleAirDataLogger):
@@ -52,21 +286,248 @@ class PurpleAirSQLiteDataLogger(PurpleAirDataLogger):
     """
 
     def __init__(
-        self, PurpleAirAPIReadKey, PurpleAirAPIWriteKey, sqlite_data_base_name
+        self,
+        PurpleAirAPIReadKey,
+        PurpleAirAPIWriteKey,
+        sqlite_data_base_name,
+        conflict_mode="insert",
+        performance_profile="default",
+        wal_checkpoint_interval=SQLITE_DEFAULT_WAL_CHECKPOINT_INTERVAL,
+        schema_version=1,
+        partition_period=None,
+        rollups=False,
+        retention_days=None,
+        rollup_retention_days=None,
+        retention_chunk_size=SQLITE_DEFAULT_RETENTION_CHUNK_SIZE,
     ):
         """
         :param str PurpleAirAPIReadKey: A valid PurpleAirAPI Read key
         :param str PurpleAirAPIWriteKey: A valid PurpleAirAPI Write key
         :param str sqlite_data_base_name: The path and name for the SQLite3 database file (e.g. database_name.db)
+        :param str conflict_mode: What to do when a (data_time_stamp, sensor_index) row
+                                  already exists. One of 'insert' (raise), 'ignore'
+                                  (keep the stored row) or 'update' (overwrite it).
+        :param str performance_profile: The pragmas to open the database with. One of
+                                        'default' (SQLite's defaults) or 'wal'.
+        :param int wal_checkpoint_interval: The number of commits between explicit WAL
+                                            checkpoints. Only used by the 'wal' profile.
+        :param int schema_version: The table layout to use. 1 stores timestamps as TEXT.
+                                   2 stores them as INTEGER epoch seconds in WITHOUT
+                                   ROWID tables clustered on (sensor_index, data_time_stamp).
+        :param str partition_period: If set to one of ``SQLITE_PARTITION_PERIODS``,
+                                     write one database file per period next to
+                                     ``sqlite_data_base_name`` instead of a single file.
+        :param bool rollups: If True, keep 5 minute, 1 hour and 1 day avg/min/max rollup
+                             tables up to date at the end of every batch.
+        :param int retention_days: If set, delete rows older than this many days from
+                                   the raw tables at the end of every batch. A dict of
+                                   {table name: days} sets a max age per table, rollup
+                                   tables included.
+        :param int rollup_retention_days: If set, delete rollup rows older than this many
+                                          days. Rollups are kept forever otherwise.
+        :param int retention_chunk_size: The max number of expired rows deleted per table
+                                         per batch.
+
+        :raises PurpleAirDataLoggerError: If ``conflict_mode`` or ``performance_profile``
+                                          is not known, ``wal_checkpoint_interval`` is
+                                          less than 1, ``partition_period`` is not known,
+                                          a retention setting is invalid, or
+                                          ``schema_version`` doesn't match the existing
+                                          database file.
         """
 
         # Inherit everything from the parent base class: PurpleAirDataLogger
         super().__init__(PurpleAirAPIReadKey, PurpleAirAPIWriteKey)
 
-        self._db_conn = sqlite3.connect(sqlite_data_base_name)
+        if conflict_mode not in INSERT_CONFLICT_MODES:
+            raise PurpleAirDataLoggerError(
+                f"conflict_mode must be one of {INSERT_CONFLICT_MODES}, not '{conflict_mode}'"
+            )
+
+        if performance_profile not in SQLITE_PERFORMANCE_PROFILES:
+            raise PurpleAirDataLoggerError(
+                f"performance_profile must be one of {tuple(SQLITE_PERFORMANCE_PROFILES)}, not '{performance_profile}'"
+            )
+
+        if wal_checkpoint_interval < 1:
+            raise PurpleAirDataLoggerError(
+                "wal_checkpoint_interval must be greater than or equal to 1!"
+            )
+
+        if schema_version not in (1, SQLITE_SCHEMA_VERSION_V2):
+            raise PurpleAirDataLoggerError(
+                f"schema_version must be 1 or {SQLITE_SCHEMA_VERSION_V2}, not '{schema_version}'"
+            )
+
+        if partition_period not in (None,) + SQLITE_PARTITION_PERIODS:
+            raise PurpleAirDataLoggerError(
+                f"partition_period must be one of {SQLITE_PARTITION_PERIODS}, not '{partition_period}'"
+            )
+
+        self._schema_version = schema_version
+        self._sqlite_data_base_name = sqlite_data_base_name
+        self._performance_profile = performance_profile
+        self._partition_period = partition_period
+        self._rollups = rollups
+
+        # The (sensor_index, data_time_stamp) of every row stored since the last
+        # rollup refresh
+        self._rollup_pending_keys = set()
+
+        # The max age in days of each table that has one
+        self._retention_days_by_table_name = self._make_retention_days_by_table_name(
+            retention_days, rollup_retention_days
+        )
+        if retention_chunk_size < 1:
+            raise PurpleAirDataLoggerError(
+                "retention_chunk_size must be greater than or equal to 1!"
+            )
+
+        self._retention_chunk_size = retention_chunk_size
+
+        # Open partition files keyed by name, least recently opened first
+        self._db_partition_conns = {}
+        self._db_partition_name = None
+
+        # Checkpoint the WAL ourselves every so often so it doesn't grow between
+        # SQLite's automatic checkpoints while readers hold it open
+        self._wal_checkpoint_interval = (
+            wal_checkpoint_interval if performance_profile == "wal" else None
+        )
+        self._commits_since_wal_checkpoint = 0
+
+        if self._partition_period is None:
+            self._db_conn = connect_sqlite_data_base(
+                sqlite_data_base_name, performance_profile
+            )
+
+            # Make our SQLite Tables
+            self._create_sqlite_db_tables()
+
+        else:
+            # Open the current partition now so problems with it surface right away
+            self._switch_sqlite_db_partition(time.time())
+
+        # Build the insert statements once for the chosen conflict mode
+        self._db_insert_statements = {}
+        for table_name, insert_statement in (
+            (
+                "station_information_and_status_fields",
+                SQLITE_INSERT_STATEMENT_STATION_INFORMATION_AND_STATUS_FIELDS,
+            ),
+            ("environmental_fields", SQLITE_INSERT_STATEMENT_ENVIRONMENTAL_FIELDS),
+            ("miscellaneous_fields", SQLITE_INSERT_STATEMENT_MISCELLANEOUS_FIELDS),
+            ("pm1_0_fields", SQLITE_INSERT_STATEMENT_PM1_0_FIELDS),
+            ("pm2_5_fields", SQLITE_INSERT_STATEMENT_PM2_5_FIELDS),
+            (
+                "pm2_5_pseudo_average_fields",
+                SQLITE_INSERT_STATEMENT_PM2_5_PSEUDO_AVERAGE_FIELDS,
+            ),
+            ("pm10_0_fields", SQLITE_INSERT_STATEMENT_PM10_0_FIELDS),
+            ("particle_count_fields", SQLITE_INSERT_STATEMENT_PARTICLE_COUNT_FIELDS),
+            ("thingspeak_fields", SQLITE_INSERT_STATEMENT_THINGSPEAK_FIELDS),
+            (
+                "window_statistics_fields",
+                SQLITE_INSERT_STATEMENT_WINDOW_STATISTICS_FIELDS,
+            ),
+        ):
+            self._db_insert_statements[table_name] = add_on_conflict_clause(
+                insert_statement, conflict_mode
+            )
+
+    def _make_retention_days_by_table_name(self, retention_days, rollup_retention_days):
+        """
+        A method to turn the retention settings into a max age in days per table name.
+
+        :return: A dict of {table name: days}.
+        :rtype: dict
+
+        :raises PurpleAirDataLoggerError: If a table name is unknown or days is less than 1.
+        """
+
+        rollup_table_names = [
+            f"{table_name}_rollup_{resolution}"
+            for table_name, resolution in SQLITE_CREATE_ROLLUP_TABLE_STATEMENTS
+        ]
+
+        retention_days_by_table_name = {}
+        if isinstance(retention_days, dict):
+            retention_days_by_table_name.update(retention_days)
+
+        elif retention_days is not None:
+            for table_name in SQLITE_TABLE_NAMES:
+                retention_days_by_table_name[table_name] = retention_days
+
+        if rollup_retention_days is not None:
+            for rollup_table_name in rollup_table_names:
+                retention_days_by_table_name[rollup_table_name] = rollup_retention_days
+
+        for table_name, days in retention_days_by_table_name.items():
+            if table_name not in SQLITE_TABLE_NAMES and (
+                not self._rollups or table_name not in rollup_table_names
+            ):
+                raise PurpleAirDataLoggerError(
+                    f"Can't set a retention policy on unknown table '{table_name}'!"
+                )
+
+            if days < 1:
+                raise PurpleAirDataLoggerError(
+                    f"The retention of '{table_name}' must be at least 1 day, not {days}!"
+                )
+
+        return retention_days_by_table_name
 
-        # Make our SQLite Tables
-        self._create_sqlite_db_tables()
+    def _switch_sqlite_db_partition(self, unix_epoch_timestamp):
+        """
+        A method to point ``_db_conn`` at the partition file holding a timestamp,
+        opening it and making our SQLite tables in it if needed.
+
+        :param int unix_epoch_timestamp: A valid unix epoch timestamp.
+        """
+
+        partition_name = get_sqlite_partition_name(
+            self._sqlite_data_base_name, self._partition_period, unix_epoch_timestamp
+        )
+        if partition_name == self._db_partition_name:
+            return
+
+        # Don't leave anything uncommitted behind in the partition we switch away from
+        if self._db_partition_name is not None:
+            self._db_conn.commit()
+
+        if partition_name not in self._db_partition_conns:
+            if len(self._db_partition_conns) >= SQLITE_MAX_OPEN_PARTITIONS:
+                oldest_partition_name = next(iter(self._db_partition_conns))
+                self._db_partition_conns.pop(oldest_partition_name).close()
+
+            self._db_conn = connect_sqlite_data_base(
+                partition_name, self._performance_profile
+            )
+            self._create_sqlite_db_tables()
+            self._db_partition_conns[partition_name] = self._db_conn
+
+        self._db_conn = self._db_partition_conns[partition_name]
+        self._db_partition_name = partition_name
+
+    def _get_sqlite_db_schema_version(self):
+        """
+        A method to find the schema version of the opened database file.
+
+        :return: The schema version, or None for a file without our tables.
+        :rtype: int or None
+        """
+
+        schema_version = self._db_conn.execute(SQLITE_GET_SCHEMA_VERSION).fetchone()[0]
+        if schema_version:
+            return schema_version
+
+        # v1 files were never stamped, so look for one of our tables
+        if self._db_conn.execute(
+            SQLITE_GET_STATION_INFORMATION_AND_STATUS_FIELDS_TABLE_NAME
+        ).fetchone():
+            return 1
+
+        return None
 
     def _create_sqlite_db_tables(self):
         """
@@ -76,17 +537,64 @@ class PurpleAirSQLiteDataLogger(PurpleAirDataLogger):
         official PurpleAir documentation. Think Station information and status fields,
         Environmental fields, etc. See website for more information.
         https://api.purpleair.com/#api-sensors-get-sensor-data
+
+        :raises PurpleAirDataLoggerError: If the file already uses another schema version.
         """
 
-        self._db_conn.execute(CREATE_STATION_INFORMATION_AND_STATUS_FIELDS_TABLE)
-        self._db_conn.execute(CREATE_ENVIRONMENTAL_FIELDS_TABLE)
-        self._db_conn.execute(CREATE_MISCELLANEOUS_FIELDS)
-        self._db_conn.execute(CREATE_PM1_0_FIELDS)
-        self._db_conn.execute(CREATE_PM2_5_FIELDS)
-        self._db_conn.execute(CREATE_PM2_5_PSEUDO_AVERAGE_FIELDS)
-        self._db_conn.execute(CREATE_PM10_0_FIELDS)
-        self._db_conn.execute(CREATE_PARTICLE_COUNT_FIELDS)
-        self._db_conn.execute(CREATE_THINGSPEAK_FIELDS)
+        existing_schema_version = self._get_sqlite_db_schema_version()
+        if existing_schema_version not in (None, self._schema_version):
+            raise PurpleAirDataLoggerError(
+                f"The database file uses schema version {existing_schema_version} but schema version {self._schema_version} was requested. "
+                "Use 'python3 -m purpleair_data_logger.PurpleAirSQLiteSchemaMigration' to migrate a v1 file to v2."
+            )
+
+        # auto_vacuum has to be set before the first table is made. A profile that
+        # switches the journal mode has written the file header already, so a new file
+        # is rebuilt, while it is still empty, for the setting to take effect.
+        if self._retention_days_by_table_name:
+            self._db_conn.execute(SQLITE_ENABLE_INCREMENTAL_AUTO_VACUUM)
+            if (
+                existing_schema_version is None
+                and self._db_conn.execute(SQLITE_GET_AUTO_VACUUM).fetchone()[0]
+                != SQLITE_AUTO_VACUUM_INCREMENTAL
+            ):
+                self._db_conn.execute(SQLITE_VACUUM)
+
+        if self._schema_version == SQLITE_SCHEMA_VERSION_V2:
+            for create_table_statement in SQLITE_CREATE_TABLE_STATEMENTS_V2.values():
+                self._db_conn.execute(create_table_statement)
+
+            self._db_conn.execute(SQLITE_SET_SCHEMA_VERSION_V2)
+
+        else:
+            self._db_conn.execute(CREATE_STATION_INFORMATION_AND_STATUS_FIELDS_TABLE)
+            self._db_conn.execute(CREATE_ENVIRONMENTAL_FIELDS_TABLE)
+            self._db_conn.execute(CREATE_MISCELLANEOUS_FIELDS)
+            self._db_conn.execute(CREATE_PM1_0_FIELDS)
+            self._db_conn.execute(CREATE_PM2_5_FIELDS)
+            self._db_conn.execute(CREATE_PM2_5_PSEUDO_AVERAGE_FIELDS)
+            self._db_conn.execute(CREATE_PM10_0_FIELDS)
+            self._db_conn.execute(CREATE_PARTICLE_COUNT_FIELDS)
+            self._db_conn.execute(CREATE_THINGSPEAK_FIELDS)
+            self._db_conn.execute(CREATE_WINDOW_STATISTICS_FIELDS)
+
+        # Files made by older versions don't have the columns added since
+        for table_name, added_columns in SQLITE_ADDED_COLUMNS.items():
+            existing_column_names = {
+                row[1]
+                for row in self._db_conn.execute(f"PRAGMA table_info({table_name})")
+            }
+            for column_name, column_type in added_columns:
+                if column_name not in existing_column_names:
+                    self._db_conn.execute(
+                        f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type} NULL"
+                    )
+
+        if self._rollups:
+            for create_statement in SQLITE_CREATE_ROLLUP_TABLE_STATEMENTS.values():
+                self._db_conn.execute(create_statement)
+
+        self._db_conn.commit()
 
     def store_sensor_data(self, single_sensor_data_dict):
         """
@@ -99,9 +607,12 @@ class PurpleAirSQLiteDataLogger(PurpleAirDataLogger):
                                              or error checking. That is up to the caller.
         """
 
+        if self._partition_period is not None:
+            self._switch_sqlite_db_partition(single_sensor_data_dict["data_time_stamp"])
+
         # Run the queries
         self._db_conn.execute(
-            SQLITE_INSERT_STATEMENT_STATION_INFORMATION_AND_STATUS_FIELDS,
+            self._db_insert_statements["station_information_and_status_fields"],
             (
                 single_sensor_data_dict["data_time_stamp"],
                 single_sensor_data_dict["sensor_index"],
@@ -132,11 +643,12 @@ class PurpleAirSQLiteDataLogger(PurpleAirDataLogger):
                 single_sensor_data_dict["confidence"],
                 single_sensor_data_dict["confidence_manual"],
                 single_sensor_data_dict["confidence_auto"],
+                single_sensor_data_dict.get("qc_flags"),
             ),
         )
 
         self._db_conn.execute(
-            SQLITE_INSERT_STATEMENT_ENVIRONMENTAL_FIELDS,
+            self._db_insert_statements["environmental_fields"],
             (
                 single_sensor_data_dict["data_time_stamp"],
                 single_sensor_data_dict["sensor_index"],
@@ -153,7 +665,7 @@ class PurpleAirSQLiteDataLogger(PurpleAirDataLogger):
         )
 
         self._db_conn.execute(
-            SQLITE_INSERT_STATEMENT_MISCELLANEOUS_FIELDS,
+            self._db_insert_statements["miscellaneous_fields"],
             (
                 single_sensor_data_dict["data_time_stamp"],
                 single_sensor_data_dict["sensor_index"],
@@ -166,7 +678,7 @@ class PurpleAirSQLiteDataLogger(PurpleAirDataLogger):
         )
 
         self._db_conn.execute(
-            SQLITE_INSERT_STATEMENT_PM1_0_FIELDS,
+            self._db_insert_statements["pm1_0_fields"],
             (
                 single_sensor_data_dict["data_time_stamp"],
                 single_sensor_data_dict["sensor_index"],
@@ -183,7 +695,7 @@ class PurpleAirSQLiteDataLogger(PurpleAirDataLogger):
         )
 
         self._db_conn.execute(
-            SQLITE_INSERT_STATEMENT_PM2_5_FIELDS,
+            self._db_insert_statements["pm2_5_fields"],
             (
                 single_sensor_data_dict["data_time_stamp"],
                 single_sensor_data_dict["sensor_index"],
@@ -199,11 +711,14 @@ class PurpleAirSQLiteDataLogger(PurpleAirDataLogger):
                 single_sensor_data_dict["pm2.5_cf_1"],
                 single_sensor_data_dict["pm2.5_cf_1_a"],
                 single_sensor_data_dict["pm2.5_cf_1_b"],
+                single_sensor_data_dict.get("pm2.5_epa_corrected"),
+                single_sensor_data_dict.get("pm2.5_nowcast"),
+                single_sensor_data_dict.get("aqi"),
             ),
         )
 
         self._db_conn.execute(
-            SQLITE_INSERT_STATEMENT_PM2_5_PSEUDO_AVERAGE_FIELDS,
+            self._db_insert_statements["pm2_5_pseudo_average_fields"],
             (
                 single_sensor_data_dict["data_time_stamp"],
                 single_sensor_data_dict["sensor_index"],
@@ -229,7 +744,7 @@ class PurpleAirSQLiteDataLogger(PurpleAirDataLogger):
         )
 
         self._db_conn.execute(
-            SQLITE_INSERT_STATEMENT_PM10_0_FIELDS,
+            self._db_insert_statements["pm10_0_fields"],
             (
                 single_sensor_data_dict["data_time_stamp"],
                 single_sensor_data_dict["sensor_index"],
@@ -246,7 +761,7 @@ class PurpleAirSQLiteDataLogger(PurpleAirDataLogger):
         )
 
         self._db_conn.execute(
-            SQLITE_INSERT_STATEMENT_PARTICLE_COUNT_FIELDS,
+            self._db_insert_statements["particle_count_fields"],
             (
                 single_sensor_data_dict["data_time_stamp"],
                 single_sensor_data_dict["sensor_index"],
@@ -272,7 +787,7 @@ class PurpleAirSQLiteDataLogger(PurpleAirDataLogger):
         )
 
         self._db_conn.execute(
-            SQLITE_INSERT_STATEMENT_THINGSPEAK_FIELDS,
+            self._db_insert_statements["thingspeak_fields"],
             (
                 single_sensor_data_dict["data_time_stamp"],
                 single_sensor_data_dict["sensor_index"],
@@ -287,9 +802,164 @@ class PurpleAirSQLiteDataLogger(PurpleAirDataLogger):
             ),
         )
 
+        # Only rows of the local sensor downsampler have window statistics
+        if "sample_count" in single_sensor_data_dict:
+            self._db_conn.execute(
+                self._db_insert_statements["window_statistics_fields"],
+                (
+                    single_sensor_data_dict["data_time_stamp"],
+                    single_sensor_data_dict["sensor_index"],
+                    *(
+                        single_sensor_data_dict.get(field_name)
+                        for field_name in WINDOW_STATISTICS_FIELD_NAMES
+                    ),
+                ),
+            )
+
         # Commit to the db
         self._db_conn.commit()
 
+        if self._rollups:
+            self._rollup_pending_keys.add(
+                (
+                    single_sensor_data_dict["sensor_index"],
+                    int(single_sensor_data_dict["data_time_stamp"]),
+                )
+            )
+
+        if self._wal_checkpoint_interval is not None:
+            self._commits_since_wal_checkpoint += 1
+            if self._commits_since_wal_checkpoint >= self._wal_checkpoint_interval:
+                self._db_conn.execute(SQLITE_WAL_CHECKPOINT)
+                self._commits_since_wal_checkpoint = 0
+
+    def finish_storing_sensor_data(self):
+        """
+        Refresh the rollups and enforce the retention policy once per batch, so neither
+        slows down the insert path.
+        """
+
+        if self._rollup_pending_keys:
+            self._refresh_sqlite_db_rollups()
+
+        if self._retention_days_by_table_name:
+            self._enforce_sqlite_db_retention()
+
+    def _refresh_sqlite_db_rollups(self):
+        """
+        Refresh the rollup buckets touched by the rows stored since the last refresh.
+        Each touched (sensor_index, bucket) is recomputed from the raw rows once,
+        no matter how many of its rows were stored.
+        """
+
+        touched_buckets = set()
+        for sensor_index, data_time_stamp in self._rollup_pending_keys:
+            for resolution, bucket_size in SQLITE_ROLLUP_RESOLUTIONS.items():
+                bucket_time_stamp = (data_time_stamp // bucket_size) * bucket_size
+                touched_buckets.add(
+                    (resolution, sensor_index, bucket_time_stamp, bucket_size)
+                )
+
+        for resolution, sensor_index, bucket_time_stamp, bucket_size in sorted(
+            touched_buckets, key=lambda touched_bucket: touched_bucket[2]
+        ):
+            if self._partition_period is not None:
+                self._switch_sqlite_db_partition(bucket_time_stamp)
+
+            for (
+                table_name,
+                rollup_resolution,
+            ), refresh_statement in SQLITE_REFRESH_ROLLUP_STATEMENTS.items():
+                if rollup_resolution == resolution:
+                    self._db_conn.execute(
+                        refresh_statement,
+                        (
+                            sensor_index,
+                            bucket_time_stamp,
+                            bucket_time_stamp + bucket_size,
+                        ),
+                    )
+
+        self._db_conn.commit()
+        self._rollup_pending_keys.clear()
+
+    def _enforce_sqlite_db_retention(self):
+        """
+        Delete up to ``retention_chunk_size`` expired rows per table, one short
+        transaction per table, then hand a few free pages back to the file system.
+        Anything left over is deleted after the following batches. When partitioned,
+        partition files that only hold expired rows are deleted as a whole.
+        """
+
+        now = int(time.time())
+
+        if self._partition_period is not None:
+            self._remove_expired_sqlite_db_partitions(now)
+            db_conns = list(self._db_partition_conns.values())
+
+        else:
+            db_conns = [self._db_conn]
+
+        for db_conn in db_conns:
+            for table_name, days in self._retention_days_by_table_name.items():
+                time_column_name = (
+                    "data_time_stamp"
+                    if table_name in SQLITE_TABLE_NAMES
+                    else "bucket_time_stamp"
+                )
+                db_conn.execute(
+                    f"""DELETE FROM {table_name} WHERE ({time_column_name}, sensor_index) IN (
+                        SELECT {time_column_name}, sensor_index FROM {table_name}
+                        WHERE {time_column_name} < ? LIMIT ?)""",
+                    (now - days * 86400, self._retention_chunk_size),
+                )
+                db_conn.commit()
+
+            db_conn.execute(SQLITE_INCREMENTAL_VACUUM).fetchall()
+
+    def _remove_expired_sqlite_db_partitions(self, now):
+        """
+        A method to delete the partition files whose every table is past its retention.
+
+        :param int now: The current unix epoch timestamp.
+        """
+
+        # A file can only go once every table in it has a retention policy
+        table_names = list(SQLITE_TABLE_NAMES)
+        if self._rollups:
+            table_names += [
+                f"{table_name}_rollup_{resolution}"
+                for table_name, resolution in SQLITE_CREATE_ROLLUP_TABLE_STATEMENTS
+            ]
+
+        if any(
+            table_name not in self._retention_days_by_table_name
+            for table_name in table_names
+        ):
+            return
+
+        cutoff = now - max(self._retention_days_by_table_name.values()) * 86400
+        root, extension = os.path.splitext(self._sqlite_data_base_name)
+        for partition_name in glob.glob(f"{glob.escape(root)}_*{extension}"):
+            partition_end = get_sqlite_partition_end(
+                partition_name, self._partition_period
+            )
+            if partition_end is None or partition_end > cutoff:
+                continue
+
+            if partition_name in self._db_partition_conns:
+                self._db_partition_conns.pop(partition_name).close()
+                if partition_name == self._db_partition_name:
+                    self._db_partition_name = None
+
+            for file_name in (
+                partition_name,
+                partition_name + "-wal",
+                partition_name + "-shm",
+            ):
+                if os.path.exists(file_name):
+                    os.remove(file_name)
+
 
 if __name__ == "__main__":
     parser = generate_common_arg_parser(
@@ -305,22 +975,167 @@ if __name__ == "__main__":
                         file! i.e database_name.db""",
     )
 
+    parser.add_argument(
+        "-db_conflict_mode",
+        required=False,
+        default="insert",
+        dest="db_conflict_mode",
+        choices=INSERT_CONFLICT_MODES,
+        help="""What to do when a row for the same data_time_stamp and sensor_index
+                        already exists. 'insert' raises an error, 'ignore' keeps the stored
+                        row and 'update' overwrites it. Default is 'insert'.""",
+    )
+
+    parser.add_argument(
+        "-db_performance_profile",
+        required=False,
+        default="default",
+        dest="db_performance_profile",
+        choices=tuple(SQLITE_PERFORMANCE_PROFILES),
+        help="""The pragmas to open the SQLite3 database file with. 'default' keeps
+                        SQLite's defaults. 'wal' uses a write ahead log, synchronous=NORMAL,
+                        a larger page cache and mmap so readers don't block the logger.""",
+    )
+
+    parser.add_argument(
+        "-db_wal_checkpoint_interval",
+        required=False,
+        default=SQLITE_DEFAULT_WAL_CHECKPOINT_INTERVAL,
+        dest="db_wal_checkpoint_interval",
+        type=int,
+        help="""The number of commits between explicit WAL checkpoints. Only
+                        used with '-db_performance_profile wal'.""",
+    )
+
+    parser.add_argument(
+        "-db_schema_version",
+        required=False,
+        default=1,
+        dest="db_schema_version",
+        type=int,
+        choices=(1, SQLITE_SCHEMA_VERSION_V2),
+        help="""The table layout to use. 1 stores timestamps as TEXT. 2 stores
+                        them as INTEGER epoch seconds in WITHOUT ROWID tables clustered on
+                        (sensor_index, data_time_stamp). Default is 1.""",
+    )
+
+    parser.add_argument(
+        "-db_partition_period",
+        required=False,
+        default=None,
+        dest="db_partition_period",
+        choices=SQLITE_PARTITION_PERIODS,
+        help="""Write one SQLite3 database file per month or ISO week next to
+                        db_name (e.g. database_name_2026_10.db) instead of a single file.""",
+    )
+
+    parser.add_argument(
+        "-db_rollups",
+        action="store_true",
+        required=False,
+        dest="db_rollups",
+        help="""Set this flag to keep 5 minute, 1 hour and 1 day avg/min/max rollup
+                        tables (e.g. pm2_5_fields_rollup_1h) up to date after every batch.""",
+    )
+
+    parser.add_argument(
+        "-db_retention_days",
+        required=False,
+        default=None,
+        dest="db_retention_days",
+        type=int,
+        help="""Delete raw rows older than this many days. Expired rows are deleted
+                        in small chunks after every batch.""",
+    )
+
+    parser.add_argument(
+        "-db_rollup_retention_days",
+        required=False,
+        default=None,
+        dest="db_rollup_retention_days",
+        type=int,
+        help="""Delete rollup rows older than this many days. Rollups are kept
+                        forever otherwise.""",
+    )
+
+    parser.add_argument(
+        "-shards",
+        required=False,
+        default=1,
+        dest="shards",
+        type=int,
+        help="""The number of worker processes to split the sensors of the json
+                        config file across. Every worker makes its own data logger. '{shard}'
+                        in db_name and dedup_cache_file is replaced by the worker's shard
+                        number, so every worker writes its own database file. It's added
+                        before the file extension if they don't have it. Default is 1,
+                        i.e. no worker processes.""",
+    )
+
     args = parser.parse_args()
 
+    # Workers mustn't share a database file
+    if args.shards > 1 and add_shard_placeholder(args.db_name) != args.db_name:
+        args.db_name = add_shard_placeholder(args.db_name)
+        print(f"db_name has no '{{shard}}', using {args.db_name} instead...")
+
     # Place holders that are used later down
     the_json_file = None
     file_obj = None
 
     # Second make an instance of our data logger
-    the_paa_sqlite_data_logger = PurpleAirSQLiteDataLogger(
-        args.paa_read_key, args.paa_write_key, args.db_name
+    data_logger_args = (
+        args.paa_read_key,
+        args.paa_write_key,
+        args.db_name,
+        args.db_conflict_mode,
+        args.db_performance_profile,
+        args.db_wal_checkpoint_interval,
+        args.db_schema_version,
+        args.db_partition_period,
+        args.db_rollups,
+        args.db_retention_days,
+        args.db_rollup_retention_days,
     )
+    if args.shards > 1:
+        # Every worker process makes its own data logger, see make_shard_data_logger
+        the_paa_data_logger_supervisor = PurpleAirDataLoggerSupervisor(
+            partial(
+                make_shard_data_logger,
+                PurpleAirSQLiteDataLogger,
+                data_logger_args,
+                args,
+            ),
+            args.shards,
+        )
+        the_paa_data_logger_supervisor.validate_parameters_and_run(
+            args.paa_multiple_sensor_request_json_file,
+            args.paa_single_sensor_request_json_file,
+            args.paa_group_sensor_request_json_file,
+            args.paa_local_sensor_request_json_file,
+        )
 
-    # Third choose what run method to execute depending on
-    # paa_multiple_sensor_request_json_file/paa_single_sensor_request_json_file/paa_group_sensor_request_json_file/paa_local_sensor_request_json_file
-    the_paa_sqlite_data_logger.validate_parameters_and_run(
-        args.paa_multiple_sensor_request_json_file,
-        args.paa_single_sensor_request_json_file,
-        args.paa_group_sensor_request_json_file,
-        args.paa_local_sensor_request_json_file,
-    )
+    else:
+        the_paa_sqlite_data_logger = PurpleAirSQLiteDataLogger(*data_logger_args)
+
+        # Configure the deduplication cache that sits in front of store_sensor_data
+        the_paa_sqlite_data_logger.configure_deduplication_cache(
+            args.dedup_cache_size, args.dedup_cache_file
+        )
+
+        # Check the A and B channels of every row if asked to
+        if args.qc_ab_channels:
+            the_paa_sqlite_data_logger.configure_quality_control()
+
+        # Add the EPA corrected PM2.5, NowCast and AQI to every row if asked to
+        if args.enrich_epa_aqi:
+            the_paa_sqlite_data_logger.configure_enrichment()
+
+        # Third choose what run method to execute depending on
+        # paa_multiple_sensor_request_json_file/paa_single_sensor_request_json_file/paa_group_sensor_request_json_file/paa_local_sensor_request_json_file
+        the_paa_sqlite_data_logger.validate_parameters_and_run(
+            args.paa_multiple_sensor_request_json_file,
+            args.paa_single_sensor_request_json_file,
+            args.paa_group_sensor_request_json_file,
+            args.paa_local_sensor_request_json_file,
+        )
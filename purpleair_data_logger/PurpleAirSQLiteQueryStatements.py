@@ -7,6 +7,10 @@ Generate the SQLITE query strings. For simplicity our table names will match
 what the PurpleAir documentation says. We will do the same for table column names.
 """
 
+from purpleair_data_logger.PurpleAirDataLoggerDownsampler import (
+    WINDOW_STATISTICS_FIELD_NAMES,
+)
+
 #: SQLITE statement for station_information_and_status_fields table
 CREATE_STATION_INFORMATION_AND_STATUS_FIELDS_TABLE = """
     CREATE TABLE IF NOT EXISTS station_information_and_status_fields (
@@ -39,6 +43,7 @@ CREATE_STATION_INFORMATION_AND_STATUS_FIELDS_TABLE = """
         confidence INTEGER NULL,
         confidence_manual INTEGER NULL,
         confidence_auto INTEGER NULL,
+        qc_flags INTEGER NULL,
         PRIMARY KEY(data_time_stamp, sensor_index))"""
 
 #: SQLITE statement for environmental_fields table
@@ -104,6 +109,9 @@ CREATE_PM2_5_FIELDS = """
         pm2_5_cf_1 REAL NULL,
         pm2_5_cf_1_a REAL NULL,
         pm2_5_cf_1_b REAL NULL,
+        pm2_5_epa_corrected REAL NULL,
+        pm2_5_nowcast REAL NULL,
+        aqi INTEGER NULL,
         PRIMARY KEY(data_time_stamp, sensor_index))"""
 
 #: Note: Since we can't have decimals in variable names, we do pm2_5 instead of pm2.5
@@ -224,7 +232,8 @@ SQLITE_INSERT_STATEMENT_STATION_INFORMATION_AND_STATUS_FIELDS = """
             channel_flags_auto,
             confidence,
             confidence_manual,
-            confidence_auto
+            confidence_auto,
+            qc_flags
         )
         VALUES 
         (
@@ -256,6 +265,7 @@ SQLITE_INSERT_STATEMENT_STATION_INFORMATION_AND_STATUS_FIELDS = """
             ?,
             ?,
             ?,
+            ?,
             ?
         )"""
 
@@ -361,7 +371,10 @@ SQLITE_INSERT_STATEMENT_PM2_5_FIELDS = """
             pm2_5_atm_b,
             pm2_5_cf_1,
             pm2_5_cf_1_a,
-            pm2_5_cf_1_b
+            pm2_5_cf_1_b,
+            pm2_5_epa_corrected,
+            pm2_5_nowcast,
+            aqi
         ) 
         VALUES
         (
@@ -378,6 +391,9 @@ SQLITE_INSERT_STATEMENT_PM2_5_FIELDS = """
             ?,
             ?,
             ?,
+            ?,
+            ?,
+            ?,
             ?
         )"""
 
@@ -539,6 +555,56 @@ SQLITE_INSERT_STATEMENT_THINGSPEAK_FIELDS = """
         ?
     )"""
 
+#: The SQLITE columns of the window_statistics_fields table, named like the keys of a
+#: downsampled window row with '.' replaced by '_', e.g. pm2_5_atm_min
+SQLITE_WINDOW_STATISTICS_COLUMN_NAMES = tuple(
+    field_name.replace(".", "_") for field_name in WINDOW_STATISTICS_FIELD_NAMES
+)
+
+_WINDOW_STATISTICS_COLUMN_DEFINITIONS = "".join(
+    f"""
+        {column_name} {"INTEGER NOT NULL" if column_name == "sample_count" else "REAL NULL"},"""
+    for column_name in SQLITE_WINDOW_STATISTICS_COLUMN_NAMES
+)
+
+#: SQLITE statement for window_statistics_fields table. It holds the sample count, min,
+#: max and standard deviation of each downsampled window. The means are stored in the
+#: other tables like any other reading.
+CREATE_WINDOW_STATISTICS_FIELDS = f"""
+    CREATE TABLE IF NOT EXISTS window_statistics_fields (
+        data_time_stamp TEXT NOT NULL,
+        sensor_index INTEGER NOT NULL,{_WINDOW_STATISTICS_COLUMN_DEFINITIONS}
+        PRIMARY KEY(data_time_stamp, sensor_index))"""
+
+#: SQLITE insert statement for window_statistics_fields
+SQLITE_INSERT_STATEMENT_WINDOW_STATISTICS_FIELDS = f"""
+    INSERT INTO window_statistics_fields
+    (
+        data_time_stamp,
+        sensor_index,
+        {", ".join(SQLITE_WINDOW_STATISTICS_COLUMN_NAMES)}
+    )
+    VALUES
+    (
+        ?,
+        ?,
+        {", ".join("?" for _ in SQLITE_WINDOW_STATISTICS_COLUMN_NAMES)}
+    )"""
+
+#: All SQLITE table names
+SQLITE_TABLE_NAMES = (
+    "station_information_and_status_fields",
+    "environmental_fields",
+    "miscellaneous_fields",
+    "pm1_0_fields",
+    "pm2_5_fields",
+    "pm2_5_pseudo_average_fields",
+    "pm10_0_fields",
+    "particle_count_fields",
+    "thingspeak_fields",
+    "window_statistics_fields",
+)
+
 #: SQLITE statement to drop all tables in the database
 SQLITE_DROP_ALL_TABLES = """
     DROP TABLE station_information_and_status_fields;
@@ -550,4 +616,363 @@ SQLITE_DROP_ALL_TABLES = """
     DROP TABLE pm10_0_fields;
     DROP TABLE particle_count_fields;
     DROP TABLE thingspeak_fields;
+    DROP TABLE IF EXISTS window_statistics_fields;
     """
+
+#: SQLITE pragmas for the 'default' performance profile. SQLite's own defaults: a
+#: rollback journal with synchronous=FULL.
+SQLITE_PRAGMAS_DEFAULT_PERFORMANCE_PROFILE = ()
+
+#: SQLITE pragmas for the 'wal' performance profile. A write ahead log lets readers
+#: (e.g. Grafana) run while the logger writes, synchronous=NORMAL only syncs at
+#: checkpoints, and a 64 MiB page cache plus 256 MiB of mmap keep hot pages in memory.
+SQLITE_PRAGMAS_WAL_PERFORMANCE_PROFILE = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+)
+
+#: All SQLITE performance profiles keyed by name
+SQLITE_PERFORMANCE_PROFILES = {
+    "default": SQLITE_PRAGMAS_DEFAULT_PERFORMANCE_PROFILE,
+    "wal": SQLITE_PRAGMAS_WAL_PERFORMANCE_PROFILE,
+}
+
+#: SQLITE statement to copy the write ahead log back into the database file without
+#: waiting on readers
+SQLITE_WAL_CHECKPOINT = "PRAGMA wal_checkpoint(PASSIVE)"
+
+#: SQLITE pragma that stops a connection from writing to the database
+SQLITE_QUERY_ONLY = "PRAGMA query_only=ON"
+
+#: The SQLITE schema version stored in ``PRAGMA user_version`` by the v2 schema. v1
+#: files were never stamped so they report 0.
+SQLITE_SCHEMA_VERSION_V2 = 2
+
+#: SQLITE statement to read the schema version of a database file
+SQLITE_GET_SCHEMA_VERSION = "PRAGMA user_version"
+
+#: SQLITE statement to stamp a database file with the v2 schema version
+SQLITE_SET_SCHEMA_VERSION_V2 = f"PRAGMA user_version = {SQLITE_SCHEMA_VERSION_V2}"
+
+# The v2 schema stores every timestamp as INTEGER unix epoch seconds and clusters each
+# WITHOUT ROWID table on (sensor_index, data_time_stamp). Rows for one sensor are
+# stored next to each other so per sensor time range queries are index seeks.
+
+#: SQLITE v2 statement for station_information_and_status_fields table
+CREATE_STATION_INFORMATION_AND_STATUS_FIELDS_TABLE_V2 = """
+    CREATE TABLE IF NOT EXISTS station_information_and_status_fields (
+        data_time_stamp INTEGER NOT NULL,
+        sensor_index INTEGER NOT NULL,
+        name TEXT NULL,
+        icon INTEGER NULL,
+        model TEXT NULL,
+        hardware TEXT NULL,
+        location_type INTEGER NULL,
+        private INTEGER NULL,
+        latitude REAL NULL,
+        longitude REAL NULL,
+        altitude REAL NULL,
+        position_rating INTEGER NULL,
+        led_brightness INTEGER NULL,
+        firmware_version TEXT NULL,
+        firmware_upgrade TEXT NULL,
+        rssi INTEGER NULL,
+        uptime INTEGER NULL,
+        pa_latency INTEGER NULL,
+        memory INTEGER NULL,
+        last_seen INTEGER NULL,
+        last_modified INTEGER NULL,
+        date_created INTEGER NULL,
+        channel_state INTEGER NULL,
+        channel_flags INTEGER NULL,
+        channel_flags_manual INTEGER NULL,
+        channel_flags_auto INTEGER NULL,
+        confidence INTEGER NULL,
+        confidence_manual INTEGER NULL,
+        confidence_auto INTEGER NULL,
+        qc_flags INTEGER NULL,
+        PRIMARY KEY(sensor_index, data_time_stamp)) WITHOUT ROWID"""
+
+#: SQLITE v2 statement for environmental_fields table
+CREATE_ENVIRONMENTAL_FIELDS_TABLE_V2 = """
+    CREATE TABLE IF NOT EXISTS environmental_fields (
+        data_time_stamp INTEGER NOT NULL,
+        sensor_index INTEGER NOT NULL,
+        humidity INTEGER NULL,
+        humidity_a INTEGER NULL,
+        humidity_b INTEGER NULL,
+        temperature INTEGER NULL,
+        temperature_a INTEGER NULL,
+        temperature_b INTEGER NULL,
+        pressure REAL NULL,
+        pressure_a REAL NULL,
+        pressure_b REAL NULL,
+        PRIMARY KEY(sensor_index, data_time_stamp)) WITHOUT ROWID"""
+
+#: SQLITE v2 statement for miscellaneous_fields table
+CREATE_MISCELLANEOUS_FIELDS_V2 = """
+    CREATE TABLE IF NOT EXISTS miscellaneous_fields (
+        data_time_stamp INTEGER NOT NULL,
+        sensor_index INTEGER NOT NULL,
+        voc REAL NULL,
+        voc_a REAL NULL,
+        voc_b REAL NULL,
+        ozone1 REAL NULL,
+        analog_input REAL NULL,
+        PRIMARY KEY(sensor_index, data_time_stamp)) WITHOUT ROWID"""
+
+#: SQLITE v2 statement for pm1_0_fields table
+CREATE_PM1_0_FIELDS_V2 = """
+    CREATE TABLE IF NOT EXISTS pm1_0_fields(
+        data_time_stamp INTEGER NOT NULL,
+        sensor_index INTEGER NOT NULL,
+        pm1_0 REAL NULL,
+        pm1_0_a REAL NULL,
+        pm1_0_b REAL NULL,
+        pm1_0_atm REAL NULL,
+        pm1_0_atm_a REAL NULL,
+        pm1_0_atm_b REAL NULL,
+        pm1_0_cf_1 REAL NULL,
+        pm1_0_cf_1_a REAL NULL,
+        pm1_0_cf_1_b REAL NULL,
+        PRIMARY KEY(sensor_index, data_time_stamp)) WITHOUT ROWID"""
+
+#: SQLITE v2 statement for pm2_5_fields table
+CREATE_PM2_5_FIELDS_V2 = """
+    CREATE TABLE IF NOT EXISTS pm2_5_fields (
+        data_time_stamp INTEGER NOT NULL,
+        sensor_index INTEGER NOT NULL,
+        pm2_5_alt REAL NULL,
+        pm2_5_alt_a REAL NULL,
+        pm2_5_alt_b REAL NULL,
+        pm2_5 REAL NULL,
+        pm2_5_a REAL NULL,
+        pm2_5_b REAL NULL,
+        pm2_5_atm REAL NULL,
+        pm2_5_atm_a REAL NULL,
+        pm2_5_atm_b REAL NULL,
+        pm2_5_cf_1 REAL NULL,
+        pm2_5_cf_1_a REAL NULL,
+        pm2_5_cf_1_b REAL NULL,
+        pm2_5_epa_corrected REAL NULL,
+        pm2_5_nowcast REAL NULL,
+        aqi INTEGER NULL,
+        PRIMARY KEY(sensor_index, data_time_stamp)) WITHOUT ROWID"""
+
+#: SQLITE v2 statement for pm2_5_pseudo_average_fields table
+CREATE_PM2_5_PSEUDO_AVERAGE_FIELDS_V2 = """
+    CREATE TABLE IF NOT EXISTS pm2_5_pseudo_average_fields (
+        data_time_stamp INTEGER NOT NULL,
+        sensor_index INTEGER NOT NULL,
+        pm2_5_10minute REAL NULL,
+        pm2_5_10minute_a REAL NULL,
+        pm2_5_10minute_b REAL NULL,
+        pm2_5_30minute REAL NULL,
+        pm2_5_30minute_a REAL NULL,
+        pm2_5_30minute_b REAL NULL,
+        pm2_5_60minute REAL NULL,
+        pm2_5_60minute_a REAL NULL,
+        pm2_5_60minute_b REAL NULL,
+        pm2_5_6hour REAL NULL,
+        pm2_5_6hour_a REAL NULL,
+        pm2_5_6hour_b REAL NULL,
+        pm2_5_24hour REAL NULL,
+        pm2_5_24hour_a REAL NULL,
+        pm2_5_24hour_b REAL NULL,
+        pm2_5_1week REAL NULL,
+        pm2_5_1week_a REAL NULL,
+        pm2_5_1week_b REAL NULL,
+        PRIMARY KEY(sensor_index, data_time_stamp)) WITHOUT ROWID"""
+
+#: SQLITE v2 statement for pm10_0_fields table
+CREATE_PM10_0_FIELDS_V2 = """
+    CREATE TABLE IF NOT EXISTS pm10_0_fields (
+        data_time_stamp INTEGER NOT NULL,
+        sensor_index INTEGER NOT NULL,
+        pm10_0 REAL NULL,
+        pm10_0_a REAL NULL,
+        pm10_0_b REAL NULL,
+        pm10_0_atm REAL NULL,
+        pm10_0_atm_a REAL NULL,
+        pm10_0_atm_b REAL NULL,
+        pm10_0_cf_1 REAL NULL,
+        pm10_0_cf_1_a REAL NULL,
+        pm10_0_cf_1_b REAL NULL,
+        PRIMARY KEY(sensor_index, data_time_stamp)) WITHOUT ROWID"""
+
+#: SQLITE v2 statement for particle_count_fields table
+CREATE_PARTICLE_COUNT_FIELDS_V2 = """
+    CREATE TABLE IF NOT EXISTS particle_count_fields (
+        data_time_stamp INTEGER NOT NULL,
+        sensor_index INTEGER NOT NULL,
+        um_count_0_3 REAL NULL,
+        um_count_a_0_3 REAL NULL,
+        um_count_b_0_3 REAL NULL,
+        um_count_0_5 REAL NULL,
+        um_count_a_0_5 REAL NULL,
+        um_count_b_0_5 REAL NULL,
+        um_count_1_0 REAL NULL,
+        um_count_a_1_0 REAL NULL,
+        um_count_b_1_0 REAL NULL,
+        um_count_2_5 REAL NULL,
+        um_count_a_2_5 REAL NULL,
+        um_count_b_2_5 REAL NULL,
+        um_count_5_0 REAL NULL,
+        um_count_a_5_0 REAL NULL,
+        um_count_b_5_0 REAL NULL,
+        um_count_10_0 REAL NULL,
+        um_count_a_10_0 REAL NULL,
+        um_count_b_10_0 REAL NULL,
+        PRIMARY KEY(sensor_index, data_time_stamp)) WITHOUT ROWID"""
+
+#: SQLITE v2 statement for thingspeak_fields table
+CREATE_THINGSPEAK_FIELDS_V2 = """
+    CREATE TABLE IF NOT EXISTS thingspeak_fields (
+        data_time_stamp INTEGER NOT NULL,
+        sensor_index INTEGER NOT NULL,
+        primary_id_a INTEGER NULL,
+        primary_key_a TEXT NULL,
+        secondary_id_a INTEGER NULL,
+        secondary_key_a TEXT NULL,
+        primary_id_b INTEGER NULL,
+        primary_key_b TEXT NULL,
+        secondary_id_b INTEGER NULL,
+        secondary_key_b TEXT NULL,
+        PRIMARY KEY(sensor_index, data_time_stamp)) WITHOUT ROWID"""
+
+#: SQLITE v2 statement for window_statistics_fields table
+CREATE_WINDOW_STATISTICS_FIELDS_V2 = f"""
+    CREATE TABLE IF NOT EXISTS window_statistics_fields (
+        data_time_stamp INTEGER NOT NULL,
+        sensor_index INTEGER NOT NULL,{_WINDOW_STATISTICS_COLUMN_DEFINITIONS}
+        PRIMARY KEY(sensor_index, data_time_stamp)) WITHOUT ROWID"""
+
+#: The (column name, type) pairs of the columns later versions added, keyed by table
+#: name. They are added to files made before they existed.
+SQLITE_ADDED_COLUMNS = {
+    "station_information_and_status_fields": (("qc_flags", "INTEGER"),),
+    "pm2_5_fields": (
+        ("pm2_5_epa_corrected", "REAL"),
+        ("pm2_5_nowcast", "REAL"),
+        ("aqi", "INTEGER"),
+    ),
+}
+
+#: SQLITE statement to check if a database file already has our tables
+SQLITE_GET_STATION_INFORMATION_AND_STATUS_FIELDS_TABLE_NAME = """
+    SELECT name FROM sqlite_master
+    WHERE type = 'table' AND name = 'station_information_and_status_fields'"""
+
+#: SQLITE v2 create statements keyed by table name
+SQLITE_CREATE_TABLE_STATEMENTS_V2 = {
+    "station_information_and_status_fields": CREATE_STATION_INFORMATION_AND_STATUS_FIELDS_TABLE_V2,
+    "environmental_fields": CREATE_ENVIRONMENTAL_FIELDS_TABLE_V2,
+    "miscellaneous_fields": CREATE_MISCELLANEOUS_FIELDS_V2,
+    "pm1_0_fields": CREATE_PM1_0_FIELDS_V2,
+    "pm2_5_fields": CREATE_PM2_5_FIELDS_V2,
+    "pm2_5_pseudo_average_fields": CREATE_PM2_5_PSEUDO_AVERAGE_FIELDS_V2,
+    "pm10_0_fields": CREATE_PM10_0_FIELDS_V2,
+    "particle_count_fields": CREATE_PARTICLE_COUNT_FIELDS_V2,
+    "thingspeak_fields": CREATE_THINGSPEAK_FIELDS_V2,
+    "window_statistics_fields": CREATE_WINDOW_STATISTICS_FIELDS_V2,
+}
+
+#: The SQLITE columns that hold unix epoch timestamps
+SQLITE_TIMESTAMP_COLUMN_NAMES = (
+    "data_time_stamp",
+    "last_seen",
+    "last_modified",
+    "date_created",
+)
+
+#: The SQLITE rollup resolutions and their bucket size in seconds
+SQLITE_ROLLUP_RESOLUTIONS = {"5m": 300, "1h": 3600, "1d": 86400}
+
+#: The SQLITE columns that get avg/min/max rollups, keyed by the table they come from.
+#: Rollup tables are named <table name>_rollup_<resolution>, e.g. pm2_5_fields_rollup_1h.
+SQLITE_ROLLUP_COLUMN_NAMES = {
+    "environmental_fields": ("humidity", "temperature", "pressure"),
+    "miscellaneous_fields": ("voc",),
+    "pm1_0_fields": ("pm1_0", "pm1_0_atm", "pm1_0_cf_1"),
+    "pm2_5_fields": ("pm2_5", "pm2_5_alt", "pm2_5_atm", "pm2_5_cf_1"),
+    "pm10_0_fields": ("pm10_0", "pm10_0_atm", "pm10_0_cf_1"),
+}
+
+
+def _make_create_rollup_table_statement(table_name, resolution):
+    column_definitions = "".join(
+        f"""
+        {column_name}_avg REAL NULL,
+        {column_name}_min REAL NULL,
+        {column_name}_max REAL NULL,"""
+        for column_name in SQLITE_ROLLUP_COLUMN_NAMES[table_name]
+    )
+    return f"""
+    CREATE TABLE IF NOT EXISTS {table_name}_rollup_{resolution} (
+        bucket_time_stamp INTEGER NOT NULL,
+        sensor_index INTEGER NOT NULL,
+        sample_count INTEGER NOT NULL,{column_definitions}
+        PRIMARY KEY(sensor_index, bucket_time_stamp)) WITHOUT ROWID"""
+
+
+def _make_refresh_rollup_statement(table_name, resolution):
+    bucket_size = SQLITE_ROLLUP_RESOLUTIONS[resolution]
+    column_names = SQLITE_ROLLUP_COLUMN_NAMES[table_name]
+    rollup_column_names = "".join(
+        f", {column_name}_avg, {column_name}_min, {column_name}_max"
+        for column_name in column_names
+    )
+    aggregates = "".join(
+        f", AVG({column_name}), MIN({column_name}), MAX({column_name})"
+        for column_name in column_names
+    )
+
+    # Timestamps are compared with bound integers. v1 TEXT timestamps then compare as
+    # equal length digit strings, so both schema versions can use their primary key.
+    return f"""
+    INSERT OR REPLACE INTO {table_name}_rollup_{resolution}
+        (bucket_time_stamp, sensor_index, sample_count{rollup_column_names})
+    SELECT
+        (CAST(data_time_stamp AS INTEGER) / {bucket_size}) * {bucket_size},
+        sensor_index,
+        COUNT(*){aggregates}
+    FROM {table_name}
+    WHERE sensor_index = ? AND data_time_stamp >= ? AND data_time_stamp < ?
+    GROUP BY 1, 2"""
+
+
+#: SQLITE statements to create the rollup tables, keyed by (table name, resolution)
+SQLITE_CREATE_ROLLUP_TABLE_STATEMENTS = {
+    (table_name, resolution): _make_create_rollup_table_statement(
+        table_name, resolution
+    )
+    for table_name in SQLITE_ROLLUP_COLUMN_NAMES
+    for resolution in SQLITE_ROLLUP_RESOLUTIONS
+}
+
+#: SQLITE statements to recompute one sensor's rollup bucket from the raw rows, keyed
+#: by (table name, resolution). Bind sensor_index, the bucket start and the bucket end.
+SQLITE_REFRESH_ROLLUP_STATEMENTS = {
+    (table_name, resolution): _make_refresh_rollup_statement(table_name, resolution)
+    for table_name in SQLITE_ROLLUP_COLUMN_NAMES
+    for resolution in SQLITE_ROLLUP_RESOLUTIONS
+}
+
+#: SQLITE pragma to let deleted pages be handed back to the file system a few at a
+#: time. It only takes effect on a database file that doesn't have any tables yet.
+SQLITE_ENABLE_INCREMENTAL_AUTO_VACUUM = "PRAGMA auto_vacuum=INCREMENTAL"
+
+#: SQLITE statement to hand up to 256 free pages back to the file system
+SQLITE_INCREMENTAL_VACUUM = "PRAGMA incremental_vacuum(256)"
+
+#: SQLITE statement to read the auto_vacuum mode of a database file
+SQLITE_GET_AUTO_VACUUM = "PRAGMA auto_vacuum"
+
+#: The ``PRAGMA auto_vacuum`` value of a file with incremental auto vacuum
+SQLITE_AUTO_VACUUM_INCREMENTAL = 2
+
+#: SQLITE statement to rebuild the database file, which applies a new auto_vacuum mode
+SQLITE_VACUUM = "VACUUM"
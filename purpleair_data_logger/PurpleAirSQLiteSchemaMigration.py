@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+A one shot tool to migrate a SQLite3 database file written by PurpleAirSQLiteDataLogger
+from the v1 schema (TEXT timestamps) to the v2 schema (INTEGER epoch timestamps in
+WITHOUT ROWID tables clustered on (sensor_index, data_time_stamp)).
+"""
+
+from purpleair_data_logger.PurpleAirDataLogger import PurpleAirDataLoggerError
+
+from purpleair_data_logger.PurpleAirSQLiteQueryStatements import (
+    SQLITE_CREATE_TABLE_STATEMENTS_V2,
+    SQLITE_GET_SCHEMA_VERSION,
+    SQLITE_SCHEMA_VERSION_V2,
+    SQLITE_SET_SCHEMA_VERSION_V2,
+    SQLITE_TIMESTAMP_COLUMN_NAMES,
+)
+
+import argparse
+import sqlite3
+
+
+def migrate_sqlite_data_base_to_v2(sqlite_data_base_name, vacuum=True) -> int:
+    """
+    Migrate a v1 SQLite3 database file to the v2 schema in place. Every table is
+    copied into its v2 layout in a single transaction, so a failed migration leaves
+    the file untouched.
+
+    :param str sqlite_data_base_name: The path and name for the SQLite3 database file (e.g. database_name.db)
+    :param bool vacuum: If True, VACUUM the file afterwards to give the freed pages
+                        back to the file system.
+
+    :return: The number of rows migrated.
+    :rtype: int
+
+    :raises PurpleAirDataLoggerError: If the file is already using the v2 schema.
+    """
+
+    # Manage the transaction ourselves so the DDL is part of it too
+    db_conn = sqlite3.connect(sqlite_data_base_name, isolation_level=None)
+
+    try:
+        if db_conn.execute(SQLITE_GET_SCHEMA_VERSION).fetchone()[0] != 0:
+            raise PurpleAirDataLoggerError(
+                f"{sqlite_data_base_name} is already using schema version {SQLITE_SCHEMA_VERSION_V2}!"
+            )
+
+        migrated_row_count = 0
+        db_conn.execute("BEGIN")
+        try:
+            for (
+                table_name,
+                create_table_statement,
+            ) in SQLITE_CREATE_TABLE_STATEMENTS_V2.items():
+                column_names = [
+                    row[1]
+                    for row in db_conn.execute(f"PRAGMA table_info({table_name})")
+                ]
+
+                # Tables that were never created don't need to be copied
+                if not column_names:
+                    db_conn.execute(create_table_statement)
+                    continue
+
+                select_list = ", ".join(
+                    (
+                        f"CAST({column_name} AS INTEGER)"
+                        if column_name in SQLITE_TIMESTAMP_COLUMN_NAMES
+                        else column_name
+                    )
+                    for column_name in column_names
+                )
+
+                db_conn.execute(f"ALTER TABLE {table_name} RENAME TO {table_name}_v1")
+                db_conn.execute(create_table_statement)
+                migrated_row_count += db_conn.execute(
+                    f"INSERT INTO {table_name} ({', '.join(column_names)}) SELECT {select_list} FROM {table_name}_v1"
+                ).rowcount
+                db_conn.execute(f"DROP TABLE {table_name}_v1")
+
+            db_conn.execute(SQLITE_SET_SCHEMA_VERSION_V2)
+            db_conn.execute("COMMIT")
+
+        except BaseException:
+            db_conn.execute("ROLLBACK")
+            raise
+
+        if vacuum:
+            db_conn.execute("VACUUM")
+
+    finally:
+        db_conn.close()
+
+    return migrated_row_count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Migrate a PurpleAirSQLiteDataLogger database file to the v2 schema!"
+    )
+
+    parser.add_argument(
+        "-db_name",
+        required=True,
+        dest="db_name",
+        type=str,
+        help="""The path and name for the SQLite3 database
+                        file! i.e database_name.db""",
+    )
+
+    parser.add_argument(
+        "-no_vacuum",
+        action="store_true",
+        required=False,
+        dest="no_vacuum",
+        help="""Set this flag to skip the VACUUM after migrating. The file will not
+                        shrink until it is vacuumed.""",
+    )
+
+    args = parser.parse_args()
+
+    migrated_row_count = migrate_sqlite_data_base_to_v2(
+        args.db_name, vacuum=not args.no_vacuum
+    )
+    print(f"Migrated {migrated_row_count} rows in {args.db_name} to the v2 schema.")
@@ -94,6 +94,88 @@ class PurpleAirDataLoggerTest(unittest.TestCase):
         with self.assertRaises(PurpleAirDataLoggerError):
             padl.send_request_every_x_seconds = 59
 
+    def test_configure_deduplication_cache(self):
+        """
+        Test that the deduplication cache can be resized and that invalid sizes raise.
+        """
+
+        padl = self._make_padl_with_mock()
+        padl.configure_deduplication_cache(10)
+        self.assertEqual(padl._deduplication_cache._max_size, 10)
+
+        with self.assertRaises(PurpleAirDataLoggerError):
+            padl.configure_deduplication_cache(0)
+
+    def test_configure_ring_buffer(self):
+        """
+        Test that the ring buffer is only created once configured and that invalid
+        capacities raise.
+        """
+
+        padl = self._make_padl_with_mock()
+        self.assertIsNone(padl.ring_buffer)
+        padl.configure_ring_buffer(10)
+        self.assertEqual(padl.ring_buffer.capacity, 10)
+
+        with self.assertRaises(PurpleAirDataLoggerError):
+            padl.configure_ring_buffer(0)
+
+    def test_configure_rolling_statistics(self):
+        """
+        Test that the rolling statistics can be reconfigured and that invalid windows
+        raise.
+        """
+
+        padl = self._make_padl_with_mock()
+        padl.configure_rolling_statistics((2, 4), ("pm2.5_atm",))
+        self.assertEqual(padl.rolling_statistics.window_hours, (2, 4))
+        self.assertEqual(padl.rolling_statistics.field_names, ("pm2.5_atm",))
+
+        with self.assertRaises(PurpleAirDataLoggerError):
+            padl.configure_rolling_statistics((0,))
+
+    def test_configure_spatial_index(self):
+        """
+        Test that the spatial index can be reconfigured and that invalid cell sizes
+        raise.
+        """
+
+        padl = self._make_padl_with_mock()
+        padl.configure_spatial_index(0.5)
+        self.assertEqual(padl.spatial_index.cell_size_degrees, 0.5)
+
+        with self.assertRaises(PurpleAirDataLoggerError):
+            padl.configure_spatial_index(0)
+
+    def test_run_loop_for_storing_multiple_sensors_data_checks_tiles(self):
+        """
+        Test that tiling needs a bounding box, whether its keys are null or left out,
+        and at least one tile per direction.
+        """
+
+        padl = self._make_padl_with_mock()
+        json_config_file = {
+            "poll_interval_seconds": 60,
+            "nwlng": None,
+            "nwlat": None,
+            "selng": None,
+            "selat": None,
+            "tile_rows": 2,
+        }
+
+        with self.assertRaises(PurpleAirDataLoggerError):
+            padl._run_loop_for_storing_multiple_sensors_data(json_config_file)
+
+        with self.assertRaises(PurpleAirDataLoggerError):
+            padl._run_loop_for_storing_multiple_sensors_data(
+                {"poll_interval_seconds": 60, "show_only": "1,2", "tile_columns": 2}
+            )
+
+        with self.assertRaises(PurpleAirDataLoggerError):
+            padl._run_loop_for_storing_multiple_sensors_data(
+                dict(json_config_file, tile_rows=0)
+            )
+
     def _make_padl_with_mock(self):
         """Helper to create a PurpleAirDataLogger with a mocked read key."""
         expected_url_request = "https://api.purpleair.com/v1/keys"
@@ -259,6 +341,24 @@ class PurpleAirDataLoggerTest(unittest.TestCase):
         mock_logic.assert_called_once_with(padl, config)
         self.assertEqual(padl.send_request_every_x_seconds, 65)
 
+    def test_run_loop_calls_the_polling_cycle_callback(self):
+        """
+        Test that the run loops call the polling cycle callback after every cycle.
+        """
+        padl = self._make_padl_with_mock()
+        padl._polling_cycle_callback = MagicMock()
+        config = {"poll_interval_seconds": 65, "sensor_ip_list": []}
+
+        with patch(
+            "purpleair_data_logger.PurpleAirDataLogger.logic_for_storing_local_sensors_data"
+        ), patch(
+            "purpleair_data_logger.PurpleAirDataLogger.sleep",
+            side_effect=[None, StopIteration],
+        ):
+            with self.assertRaises(StopIteration):
+                padl._run_loop_for_storing_local_sensors_data(config)
+        self.assertEqual(padl._polling_cycle_callback.call_count, 2)
+
     def test_run_loop_for_storing_group_sensors_data(self):
         """
         Test that _run_loop_for_storing_group_sensors_data sets the poll interval
@@ -300,3 +400,53 @@ class PurpleAirDataLoggerTest(unittest.TestCase):
             with self.assertRaises(StopIteration):
                 padl._run_loop_for_storing_local_sensors_data(config)
         mock_logic.assert_called_once_with(padl, config)
+
+    def test_run_loop_for_storing_local_sensors_data_stops_when_it_ends(self):
+        """
+        Test that the local sensors run loop shuts down its request pool when it ends.
+        """
+        # Setup
+        padl = self._make_padl_with_mock()
+        executor = MagicMock()
+        padl._local_sensor_executor = executor
+        padl._running_local_sensor_requests = {"192.168.1.1": MagicMock()}
+        config = {"sensor_ip_list": ["192.168.1.1"], "poll_interval_seconds": 65}
+
+        # Action
+        with patch(
+            "purpleair_data_logger.PurpleAirDataLogger.logic_for_storing_local_sensors_data"
+        ), patch(
+            "purpleair_data_logger.PurpleAirDataLogger.sleep",
+            side_effect=KeyboardInterrupt,
+        ):
+            with self.assertRaises(KeyboardInterrupt):
+                padl._run_loop_for_storing_local_sensors_data(config)
+
+        # Expected Result
+        executor.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+        self.assertIsNone(padl._local_sensor_executor)
+        self.assertEqual(padl._running_local_sensor_requests, {})
+
+    def test_stop_stores_the_open_downsampler_windows(self):
+        """
+        Test that stop stores the windows the local sensor downsampler still has open.
+        """
+        # Setup
+        padl = self._make_padl_with_mock()
+        padl.configure_local_sensor_downsampler(60)
+        padl._local_sensor_downsampler.add_sample(
+            {"sensor_index": 1, "data_time_stamp": 1200, "humidity": 40}
+        )
+
+        # Action
+        with patch(
+            "purpleair_data_logger.PurpleAirDataLogger.store_new_sensor_data"
+        ) as mock_store:
+            padl.stop()
+
+        # Expected Result
+        mock_store.assert_called_once()
+        stored_rows = mock_store.call_args.args[1]
+        self.assertEqual(len(stored_rows), 1)
+        self.assertEqual(stored_rows[0]["sample_count"], 1)
+        self.assertEqual(padl._local_sensor_downsampler.flush(), [])
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+
+sys.path.append("../")
+
+from purpleair_data_logger.PurpleAirDataLoggerDeduplicationCache import (
+    PurpleAirDataLoggerDeduplicationCache,
+)
+
+
+class PurpleAirDataLoggerDeduplicationCacheTest(unittest.TestCase):
+    def test_make_key(self):
+        """
+        Test that the key is built from the sensor_index and data_time_stamp.
+        """
+
+        key = PurpleAirDataLoggerDeduplicationCache.make_key(
+            {"sensor_index": 77, "data_time_stamp": 1659710232, "name": "TEST"}
+        )
+        self.assertEqual(key, (77, 1659710232))
+
+    def test_least_recently_used_key_is_evicted(self):
+        """
+        Test that the cache is bounded and evicts the least recently used key.
+        """
+
+        cache = PurpleAirDataLoggerDeduplicationCache(max_size=2)
+        cache.add((1, 100))
+        cache.add((2, 100))
+
+        # Touch (1, 100) so (2, 100) becomes the least recently used key
+        self.assertTrue(cache.contains((1, 100)))
+        cache.add((3, 100))
+
+        self.assertEqual(len(cache), 2)
+        self.assertTrue(cache.contains((1, 100)))
+        self.assertFalse(cache.contains((2, 100)))
+        self.assertTrue(cache.contains((3, 100)))
+
+    def test_keys_persist_across_restarts(self):
+        """
+        Test that saved keys are loaded by a new cache using the same file.
+        """
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "dedup_cache.json")
+            cache = PurpleAirDataLoggerDeduplicationCache(file_path=file_path)
+            cache.add((1, 100))
+            cache.add((2, 100))
+            cache.save()
+
+            restarted_cache = PurpleAirDataLoggerDeduplicationCache(
+                max_size=1, file_path=file_path
+            )
+            self.assertEqual(len(restarted_cache), 1)
+            self.assertTrue(restarted_cache.contains((2, 100)))
+
+    def test_save_appends_new_keys_and_compacts_the_file(self):
+        """
+        Test that a save only appends the keys added since the last save and that the
+        file is rewritten with the cached keys once it grows too long.
+        """
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Setup
+            file_path = os.path.join(temp_dir, "dedup_cache.json")
+            cache = PurpleAirDataLoggerDeduplicationCache(
+                max_size=2, file_path=file_path
+            )
+
+            # Action
+            cache.add((1, 100))
+            cache.add((2, 100))
+            cache.save()
+            cache.save()
+            with open(file_path, "r") as file_obj:
+                lines_after_first_saves = file_obj.read().splitlines()
+
+            cache.add((3, 100))
+            cache.save()
+            cache.add((4, 100))
+            cache.add((5, 100))
+            cache.save()
+            with open(file_path, "r") as file_obj:
+                lines_after_compaction = file_obj.read().splitlines()
+
+            # Expected Result
+            self.assertEqual(lines_after_first_saves, ["[1, 100]", "[2, 100]"])
+            self.assertEqual(lines_after_compaction, ["[4, 100]", "[5, 100]"])
+
+    def test_load_skips_broken_lines(self):
+        """
+        Test that lines that aren't a (sensor_index, data_time_stamp) pair, like one cut
+        short by a crash, are skipped and compacted away.
+        """
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Setup
+            file_path = os.path.join(temp_dir, "dedup_cache.json")
+            with open(file_path, "w") as file_obj:
+                file_obj.write(
+                    '[1, 100]\n[]\n[[1, 100], [2, 100]]\n{"a": 1}\n[2, 100]\n[3, [1]]\n[4, 1'
+                )
+
+            # Action
+            cache = PurpleAirDataLoggerDeduplicationCache(file_path=file_path)
+
+            # Expected Result
+            self.assertEqual(len(cache), 2)
+            self.assertTrue(cache.contains((1, 100)))
+            self.assertTrue(cache.contains((2, 100)))
+            with open(file_path, "r") as file_obj:
+                self.assertEqual(file_obj.read().splitlines(), ["[1, 100]", "[2, 100]"])
+
+    def test_save_without_file_path_is_a_no_op(self):
+        """
+        Test that an in memory cache doesn't write anything when saved.
+        """
+
+        cache = PurpleAirDataLoggerDeduplicationCache()
+        cache.add((1, 100))
+        cache.save()
+        self.assertEqual(len(cache), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
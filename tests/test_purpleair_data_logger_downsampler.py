@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+"""
+
+import unittest
+import sys
+
+sys.path.append("../")
+
+from purpleair_data_logger.PurpleAirDataLoggerDownsampler import (
+    PurpleAirDataLoggerDownsampler,
+)
+
+
+def make_sample(data_time_stamp, pm2_5_atm, sensor_index=1):
+    """Helper to create a local sensor sample."""
+
+    return {
+        "sensor_index": sensor_index,
+        "data_time_stamp": data_time_stamp,
+        "name": "de:ad:be:ef:12:34",
+        "pm2.5_atm": pm2_5_atm,
+        "pm2.5_atm_b": None,
+    }
+
+
+class PurpleAirDataLoggerDownsamplerTest(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_window_row_is_emitted_when_the_window_closes(self):
+        """
+        Test that a sample from the next window emits the previous window's statistics.
+        """
+
+        # Setup
+        downsampler = PurpleAirDataLoggerDownsampler(60)
+
+        # Action
+        self.assertEqual(downsampler.add_sample(make_sample(1200, 2.0)), [])
+        self.assertEqual(downsampler.add_sample(make_sample(1230, 4.0)), [])
+        self.assertEqual(downsampler.add_sample(make_sample(1259, 9.0)), [])
+        window_rows = downsampler.add_sample(make_sample(1260, 1.0))
+
+        # Expected Result
+        self.assertEqual(len(window_rows), 1)
+        window_row = window_rows[0]
+        self.assertEqual(window_row["data_time_stamp"], 1200)
+        self.assertEqual(window_row["sample_count"], 3)
+        self.assertEqual(window_row["name"], "de:ad:be:ef:12:34")
+        self.assertAlmostEqual(window_row["pm2.5_atm"], 5.0)
+        self.assertEqual(window_row["pm2.5_atm_min"], 2.0)
+        self.assertEqual(window_row["pm2.5_atm_max"], 9.0)
+        self.assertAlmostEqual(window_row["pm2.5_atm_stddev"], (26 / 3) ** 0.5)
+        self.assertIsNone(window_row["pm2.5_atm_b"])
+        self.assertNotIn("pm2.5_atm_b_min", window_row)
+
+    def test_sensors_have_their_own_windows(self):
+        """
+        Test that each sensor is aggregated on its own and flush closes every window.
+        """
+
+        # Setup
+        downsampler = PurpleAirDataLoggerDownsampler(60)
+        downsampler.add_sample(make_sample(1200, 2.0, sensor_index=1))
+        downsampler.add_sample(make_sample(1200, 8.0, sensor_index=2))
+
+        # Action
+        window_rows = downsampler.flush()
+
+        # Expected Result
+        self.assertEqual(
+            {
+                window_row["sensor_index"]: window_row["pm2.5_atm"]
+                for window_row in window_rows
+            },
+            {1: 2.0, 2: 8.0},
+        )
+        self.assertEqual(downsampler.flush(), [])
+
+    def test_idle_windows_are_closed(self):
+        """
+        Test that only the windows of sensors quiet for longer than one window are
+        closed, going by when their samples were received.
+        """
+
+        # Setup
+        downsampler = PurpleAirDataLoggerDownsampler(60)
+        downsampler.add_sample(make_sample(1200, 2.0, sensor_index=1), received_at=100)
+        downsampler.add_sample(make_sample(1250, 8.0, sensor_index=2), received_at=150)
+
+        # Action
+        window_rows = downsampler.close_idle_windows(180)
+
+        # Expected Result
+        self.assertEqual(
+            [
+                (window_row["sensor_index"], window_row["data_time_stamp"])
+                for window_row in window_rows
+            ],
+            [(1, 1200)],
+        )
+        self.assertEqual(downsampler.close_idle_windows(180), [])
+        self.assertEqual(len(downsampler.flush()), 1)
+
+    def test_raw_samples_are_kept_in_a_bounded_ring_buffer(self):
+        """
+        Test that only the latest raw samples are kept.
+        """
+
+        # Setup
+        downsampler = PurpleAirDataLoggerDownsampler(60, raw_sample_buffer_size=2)
+
+        # Action
+        for data_time_stamp in (1200, 1202, 1204):
+            downsampler.add_sample(make_sample(data_time_stamp, 1.0))
+
+        # Expected Result
+        self.assertEqual(
+            [
+                raw_sample["data_time_stamp"]
+                for raw_sample in downsampler.get_raw_samples(1)
+            ],
+            [1202, 1204],
+        )
+        self.assertEqual(downsampler.get_raw_samples(2), [])
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+"""
+
+import random
+import unittest
+import sys
+
+sys.path.append("../")
+
+from purpleair_data_logger.PurpleAirDataLoggerEnrichment import (
+    PurpleAirDataLoggerEnrichment,
+    ENRICHMENT_FIELD_NAMES,
+    correct_pm2_5_epa,
+    compute_nowcast,
+    compute_aqi_pm2_5,
+    numpy,
+)
+
+
+def make_reading(data_time_stamp, pm2_5_cf_1, humidity=50, sensor_index=1):
+    """Helper to create a reading."""
+
+    return {
+        "sensor_index": sensor_index,
+        "data_time_stamp": data_time_stamp,
+        "pm2.5_cf_1": pm2_5_cf_1,
+        "humidity": humidity,
+    }
+
+
+class PurpleAirDataLoggerEnrichmentTest(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_correct_pm2_5_epa(self):
+        """
+        Test the EPA correction in each of its ranges and with missing inputs.
+        """
+
+        self.assertAlmostEqual(correct_pm2_5_epa(10, 50), 0.524 * 10 - 4.31 + 5.75)
+        self.assertAlmostEqual(correct_pm2_5_epa(100, 50), 0.786 * 100 - 4.31 + 5.75)
+        self.assertAlmostEqual(
+            correct_pm2_5_epa(300, 50), 2.966 + 0.69 * 300 + 8.84e-4 * 300**2
+        )
+
+        # The blended ranges meet the ranges next to them
+        self.assertAlmostEqual(
+            correct_pm2_5_epa(30, 50), correct_pm2_5_epa(29.999, 50), 2
+        )
+        self.assertAlmostEqual(
+            correct_pm2_5_epa(50, 50), correct_pm2_5_epa(49.999, 50), 2
+        )
+        self.assertEqual(correct_pm2_5_epa(0, 100), 0.0)
+        self.assertIsNone(correct_pm2_5_epa(None, 50))
+        self.assertIsNone(correct_pm2_5_epa(10, None))
+
+    def test_compute_aqi_pm2_5(self):
+        """
+        Test the AQI breakpoints, the truncation to one decimal and the cap at 500.
+        """
+
+        self.assertEqual(compute_aqi_pm2_5(0), 0)
+        self.assertEqual(compute_aqi_pm2_5(9.0), 50)
+        self.assertEqual(compute_aqi_pm2_5(9.09), 50)
+        self.assertEqual(compute_aqi_pm2_5(9.1), 51)
+        self.assertEqual(compute_aqi_pm2_5(35.4), 100)
+        self.assertEqual(compute_aqi_pm2_5(55.5), 151)
+        self.assertEqual(compute_aqi_pm2_5(1000), 500)
+        self.assertIsNone(compute_aqi_pm2_5(None))
+
+    def test_compute_nowcast(self):
+        """
+        Test the NowCast weighting and that it needs two of the last three hours.
+        """
+
+        self.assertEqual(compute_nowcast([10.0] * 12), 10.0)
+
+        # A weight of 0.5: (20 + 0.5 * 10) / 1.5
+        self.assertAlmostEqual(compute_nowcast([20.0, 10.0]), 25 / 1.5)
+        self.assertAlmostEqual(compute_nowcast([20.0, None, 10.0]), 22.5 / 1.25)
+        self.assertIsNone(compute_nowcast([20.0, None, None, 10.0]))
+
+    def test_enrich_fills_out_the_fields(self):
+        """
+        Test that the NowCast and AQI show up once a sensor has two hours of data.
+        """
+
+        # Setup
+        enrichment = PurpleAirDataLoggerEnrichment(use_numpy=False)
+
+        # Action
+        first_hour = enrichment.enrich([make_reading(0, 10)])[0]
+        second_hour = enrichment.enrich([make_reading(3600, 10)])[0]
+
+        # Expected Result
+        self.assertAlmostEqual(
+            first_hour["pm2.5_epa_corrected"], correct_pm2_5_epa(10, 50)
+        )
+        self.assertIsNone(first_hour["pm2.5_nowcast"])
+        self.assertIsNone(first_hour["aqi"])
+        self.assertAlmostEqual(second_hour["pm2.5_nowcast"], correct_pm2_5_epa(10, 50))
+        self.assertEqual(
+            second_hour["aqi"], compute_aqi_pm2_5(correct_pm2_5_epa(10, 50))
+        )
+
+    def test_enrich_drops_hours_older_than_the_nowcast(self):
+        """
+        Test that a sensor that went quiet for more than the NowCast hours starts over.
+        """
+
+        # Setup
+        enrichment = PurpleAirDataLoggerEnrichment(use_numpy=False)
+        enrichment.enrich([make_reading(0, 10), make_reading(3600, 10)])
+
+        # Action
+        row = enrichment.enrich([make_reading(13 * 3600, 10)])[0]
+
+        # Expected Result
+        self.assertIsNone(row["pm2.5_nowcast"])
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_numpy_matches_scalar(self):
+        """
+        Test that the vectorized and the scalar implementations agree, including
+        missing values, late samples and repeated sensors in a batch.
+        """
+
+        # Setup
+        random_generator = random.Random(1)
+        scalar_enrichment = PurpleAirDataLoggerEnrichment(use_numpy=False)
+        numpy_enrichment = PurpleAirDataLoggerEnrichment(use_numpy=True)
+
+        for hour in range(16):
+            for minute in (0, 20, 40):
+                batch = [
+                    make_reading(
+                        hour * 3600 + minute * 60 - random_generator.choice((0, 3600)),
+                        random_generator.choice(
+                            (None, random_generator.uniform(0, 400))
+                        ),
+                        random_generator.uniform(0, 100),
+                        random_generator.randrange(50),
+                    )
+                    for _ in range(60)
+                ]
+
+                # Action
+                scalar_rows = scalar_enrichment.enrich([dict(row) for row in batch])
+                numpy_rows = numpy_enrichment.enrich([dict(row) for row in batch])
+
+                # Expected Result
+                for scalar_row, numpy_row in zip(scalar_rows, numpy_rows):
+                    for field_name in ENRICHMENT_FIELD_NAMES:
+                        if scalar_row[field_name] is None:
+                            self.assertIsNone(numpy_row[field_name])
+
+                        else:
+                            self.assertAlmostEqual(
+                                scalar_row[field_name], numpy_row[field_name]
+                            )
+
+    def test_use_numpy_without_numpy_raises(self):
+        """
+        Test that asking for NumPy without it installed raises.
+        """
+
+        if numpy is not None:
+            self.assertTrue(PurpleAirDataLoggerEnrichment(use_numpy=True).uses_numpy)
+
+        else:
+            with self.assertRaises(ImportError):
+                PurpleAirDataLoggerEnrichment(use_numpy=True)
@@ -6,8 +6,11 @@ Copyright 2023 carlkidcrypto, All rights reserved.
 
 import unittest
 from unittest.mock import MagicMock, patch
+from concurrent.futures import ThreadPoolExecutor
+import requests
 import requests_mock
 import sys
+import time
 from json import load, dumps
 
 sys.path.append("../")
@@ -16,14 +19,39 @@ from purpleair_data_logger.PurpleAirDataLoggerHelpers import (
     generate_common_arg_parser,
     validate_sensor_data_before_insert,
     construct_store_sensor_data_type,
+    determine_modified_since,
+    remove_sensor_data_without_new_last_seen,
+    store_new_sensor_data,
     flatten_single_sensor_data,
     logic_for_storing_single_sensor_data,
     logic_for_storing_multiple_sensors_data,
     logic_for_storing_group_sensors_data,
     logic_for_storing_local_sensors_data,
+    request_local_sensors_data_concurrently,
+    split_bounding_box_into_tiles,
+    request_bounding_box_tiles_concurrently,
 )
 
 from purpleair_data_logger.PurpleAirDataLogger import PurpleAirDataLogger
+from purpleair_api.PurpleAirAPI import PurpleAirAPIError
+import threading
+from purpleair_data_logger.PurpleAirDataLoggerDeduplicationCache import (
+    PurpleAirDataLoggerDeduplicationCache,
+)
+from purpleair_data_logger.PurpleAirDataLoggerSpatialIndex import (
+    PurpleAirDataLoggerSpatialIndex,
+)
+from purpleair_data_logger.PurpleAirDataLoggerRingBuffer import (
+    PurpleAirDataLoggerRingBuffer,
+)
+from purpleair_data_logger.PurpleAirDataLoggerEnrichment import (
+    PurpleAirDataLoggerEnrichment,
+)
+from purpleair_data_logger.PurpleAirDataLoggerQualityControl import (
+    PurpleAirDataLoggerQualityControl,
+    QC_FLAG_B_CHANNEL_DOWNGRADED,
+    QC_FLAG_CHANNELS_DISAGREE_BY_FIELD_NAME,
+)
 
 from helpers import (
     DATA_IN_1,
@@ -98,6 +126,239 @@ class PurpleAirDataLoggerHelpersTest(unittest.TestCase):
         retval = construct_store_sensor_data_type(data_in)
         self.assertEqual(retval, data_out)
 
+    def test_determine_modified_since(self):
+        """
+        Test that the previous data time stamp is used as 'modified_since' with the
+        configured value acting as a floor.
+        """
+
+        padl = MagicMock()
+        padl._last_data_time_stamp = None
+        self.assertIsNone(determine_modified_since(padl, {"modified_since": None}))
+        self.assertEqual(determine_modified_since(padl, {"modified_since": 10}), 10)
+
+        padl._last_data_time_stamp = 1659710232
+        self.assertEqual(
+            determine_modified_since(padl, {"modified_since": None}), 1659710232
+        )
+        self.assertEqual(
+            determine_modified_since(padl, {"modified_since": 1759710232}), 1759710232
+        )
+
+    def test_remove_sensor_data_without_new_last_seen(self):
+        """
+        Test that sensor data is only kept when its 'last_seen' advanced since it was
+        stored.
+        """
+
+        padl = MagicMock()
+        padl._stores_sensor_data_in_background = False
+        padl._last_seen_by_sensor_index = {}
+        padl._deduplication_cache = PurpleAirDataLoggerDeduplicationCache()
+        first_cycle = [
+            {"sensor_index": 1, "data_time_stamp": 1, "last_seen": 100},
+            {"sensor_index": 2, "data_time_stamp": 1, "last_seen": 0},
+        ]
+        second_cycle = [
+            {"sensor_index": 1, "data_time_stamp": 2, "last_seen": 100},
+            {"sensor_index": 2, "data_time_stamp": 2, "last_seen": 0},
+            {"sensor_index": 3, "data_time_stamp": 2, "last_seen": 50},
+        ]
+
+        self.assertEqual(
+            remove_sensor_data_without_new_last_seen(padl, first_cycle), first_cycle
+        )
+
+        # Nothing is recorded until the sensor data is stored
+        self.assertEqual(padl._last_seen_by_sensor_index, {})
+        store_new_sensor_data(padl, first_cycle)
+        self.assertEqual(
+            remove_sensor_data_without_new_last_seen(padl, second_cycle),
+            second_cycle[1:],
+        )
+        store_new_sensor_data(padl, second_cycle[1:])
+        self.assertEqual(padl._last_seen_by_sensor_index, {1: 100, 3: 50})
+
+    def test_store_new_sensor_data(self):
+        """
+        Test that duplicate (sensor_index, data_time_stamp) rows are not stored twice and
+        that a failed store can be retried.
+        """
+
+        padl = MagicMock()
+        padl._stores_sensor_data_in_background = False
+        padl._deduplication_cache = PurpleAirDataLoggerDeduplicationCache()
+        padl.store_sensor_data.side_effect = [None, RuntimeError("boom"), None, None]
+        sensor_data_list = [
+            {"sensor_index": 1, "data_time_stamp": 100},
+            {"sensor_index": 1, "data_time_stamp": 100},
+            {"sensor_index": 2, "data_time_stamp": 100},
+        ]
+
+        with self.assertRaises(RuntimeError):
+            store_new_sensor_data(padl, sensor_data_list)
+
+        self.assertEqual(store_new_sensor_data(padl, sensor_data_list), 1)
+        self.assertEqual(padl.store_sensor_data.call_count, 3)
+
+        # Both batches stored something so both were finished
+        self.assertEqual(padl.finish_storing_sensor_data.call_count, 2)
+        self.assertEqual(store_new_sensor_data(padl, sensor_data_list), 0)
+        self.assertEqual(padl.finish_storing_sensor_data.call_count, 2)
+
+    def test_store_new_sensor_data_fills_the_ring_buffer(self):
+        """
+        Test that every stored row lands in the data logger's ring buffer.
+        """
+
+        # Setup
+        padl = MagicMock()
+        padl._stores_sensor_data_in_background = False
+        padl._deduplication_cache = PurpleAirDataLoggerDeduplicationCache()
+        padl._ring_buffer = PurpleAirDataLoggerRingBuffer()
+
+        # Action
+        store_new_sensor_data(
+            padl,
+            [
+                {"sensor_index": 1, "data_time_stamp": 100, "pm2.5": 1.0},
+                {"sensor_index": 1, "data_time_stamp": 200, "pm2.5": 2.0},
+            ],
+        )
+
+        # Expected Result
+        self.assertEqual(padl._ring_buffer.get_latest(1, "pm2.5"), 2.0)
+        self.assertEqual(len(padl._ring_buffer.get_last(1, 10)), 2)
+
+    def test_store_new_sensor_data_without_a_ring_buffer(self):
+        """
+        Test that rows are stored when no ring buffer is configured.
+        """
+
+        # Setup
+        padl = MagicMock()
+        padl._stores_sensor_data_in_background = False
+        padl._deduplication_cache = PurpleAirDataLoggerDeduplicationCache()
+        padl._ring_buffer = None
+
+        # Action
+        stored_count = store_new_sensor_data(
+            padl, [{"sensor_index": 1, "data_time_stamp": 100, "pm2.5": 1.0}]
+        )
+
+        # Expected Result
+        self.assertEqual(stored_count, 1)
+        padl.store_sensor_data.assert_called_once()
+
+    def test_store_new_sensor_data_fills_the_spatial_index(self):
+        """
+        Test that every stored row moves its sensor in the data logger's spatial index.
+        """
+
+        # Setup
+        padl = MagicMock()
+        padl._stores_sensor_data_in_background = False
+        padl._deduplication_cache = PurpleAirDataLoggerDeduplicationCache()
+        padl._spatial_index = PurpleAirDataLoggerSpatialIndex()
+
+        # Action
+        store_new_sensor_data(
+            padl,
+            [
+                {
+                    "sensor_index": 1,
+                    "data_time_stamp": 100,
+                    "latitude": 1.0,
+                    "longitude": 2.0,
+                },
+                {
+                    "sensor_index": 2,
+                    "data_time_stamp": 100,
+                    "latitude": None,
+                    "longitude": None,
+                },
+            ],
+        )
+
+        # Expected Result
+        self.assertEqual(padl._spatial_index.get_position(1), (1.0, 2.0))
+        self.assertNotIn(2, padl._spatial_index)
+
+    def test_store_new_sensor_data_enriches_the_new_rows(self):
+        """
+        Test that only the rows that will be stored are passed to the enrichment stage,
+        as one batch.
+        """
+
+        # Setup
+        padl = MagicMock()
+        padl._stores_sensor_data_in_background = False
+        padl._deduplication_cache = PurpleAirDataLoggerDeduplicationCache()
+        padl._quality_control = None
+        padl._enrichment = PurpleAirDataLoggerEnrichment(use_numpy=False)
+        padl._deduplication_cache.add(
+            padl._deduplication_cache.make_key(
+                {"sensor_index": 1, "data_time_stamp": 100}
+            )
+        )
+
+        # Action
+        stored_count = store_new_sensor_data(
+            padl,
+            [
+                {"sensor_index": 1, "data_time_stamp": 100, "pm2.5_cf_1": 1.0},
+                {"sensor_index": 2, "data_time_stamp": 100, "pm2.5_cf_1": 1.0},
+            ],
+        )
+
+        # Expected Result
+        self.assertEqual(stored_count, 1)
+        stored_row = padl.store_sensor_data.call_args.args[0]
+        self.assertEqual(stored_row["sensor_index"], 2)
+
+        # No humidity, so nothing can be corrected
+        self.assertIn("pm2.5_epa_corrected", stored_row)
+        self.assertIsNone(stored_row["pm2.5_epa_corrected"])
+
+    def test_store_new_sensor_data_checks_channels_before_enriching(self):
+        """
+        Test that a downgraded channel is what the enrichment stage sees.
+        """
+
+        # Setup
+        padl = MagicMock()
+        padl._stores_sensor_data_in_background = False
+        padl._deduplication_cache = PurpleAirDataLoggerDeduplicationCache()
+        padl._quality_control = PurpleAirDataLoggerQualityControl(use_numpy=False)
+        padl._enrichment = PurpleAirDataLoggerEnrichment(use_numpy=False)
+
+        # Action
+        store_new_sensor_data(
+            padl,
+            [
+                {
+                    "sensor_index": 1,
+                    "data_time_stamp": 100,
+                    "humidity": 50,
+                    "pm2.5_cf_1": 1005.0,
+                    "pm2.5_cf_1_a": 10.0,
+                    "pm2.5_cf_1_b": 2000.0,
+                }
+            ],
+        )
+
+        # Expected Result
+        stored_row = padl.store_sensor_data.call_args.args[0]
+        self.assertEqual(
+            stored_row["qc_flags"],
+            QC_FLAG_B_CHANNEL_DOWNGRADED
+            | QC_FLAG_CHANNELS_DISAGREE_BY_FIELD_NAME["pm2.5_cf_1"],
+        )
+        self.assertEqual(stored_row["pm2.5_cf_1"], 10.0)
+        self.assertAlmostEqual(
+            stored_row["pm2.5_epa_corrected"], 0.524 * 10 - 0.0862 * 50 + 5.75
+        )
+
     def test_flatten_single_sensor_data(self):
         """
         Test that the flatten_single_sensor_data can handle all the sample responses under ../external_network_hardware_variant_json_samples/*.json
@@ -280,6 +541,76 @@ class PurpleAirDataLoggerHelpersTest(unittest.TestCase):
             padl.store_sensor_data.side_effect = [DATA_OUT_3, DATA_OUT_4, DATA_OUT_5]
             self.assertEqual(padl.store_sensor_data.call_count, 3)
 
+        # The next cycle asks only for sensors modified since the previous data time stamp
+        with requests_mock.Mocker() as m:
+            m.get(
+                requests_mock.ANY,
+                text=f"{dumps(DATA_IN_1)}",
+                status_code=200,
+            )
+            logic_for_storing_multiple_sensors_data(padl, json_config_file)
+            self.assertIn(
+                f"modified_since={DATA_IN_1['data_time_stamp']}",
+                m.last_request.url,
+            )
+
+    def test_logic_for_storing_multiple_sensors_data_retries_a_failed_store(self):
+        """
+        Test that a failed store neither moves 'modified_since' forward nor records the
+        'last_seen' values, so the next cycle asks for the sensors again and stores them.
+        """
+
+        # Setup
+        with requests_mock.Mocker() as m:
+            m.get(
+                "https://api.purpleair.com/v1/keys",
+                text='{"api_version" : "1.1.1", "time_stamp": 123456789, "api_key_type": "READ"}',
+                status_code=200,
+            )
+            padl = PurpleAirDataLogger(PurpleAirApiReadKey="123456789")
+            padl.store_sensor_data = MagicMock(name="store_sensor_data")
+
+        padl.store_sensor_data.side_effect = [None, RuntimeError("boom"), None, None]
+        json_config_file = {
+            "poll_interval_seconds": 60,
+            "fields": "name, last_seen",
+            "location_type": None,
+            "read_keys": None,
+            "show_only": None,
+            "modified_since": None,
+            "max_age": None,
+            "nwlng": None,
+            "nwlat": None,
+            "selng": None,
+            "selat": None,
+        }
+        sensors_data = {
+            "data_time_stamp": 1659710232,
+            "fields": ["sensor_index", "name", "last_seen"],
+            "data": [[1, "TEST1", 1659710200], [2, "TEST2", 1659710210]],
+        }
+
+        # Action
+        with requests_mock.Mocker() as m:
+            m.get(requests_mock.ANY, text=dumps(sensors_data), status_code=200)
+            with self.assertRaises(RuntimeError):
+                logic_for_storing_multiple_sensors_data(padl, json_config_file)
+
+            logic_for_storing_multiple_sensors_data(padl, json_config_file)
+
+            # Expected Result
+            self.assertNotIn("modified_since", m.last_request.url)
+
+        stored_sensor_indexes = [
+            call.args[0]["sensor_index"]
+            for call in padl.store_sensor_data.call_args_list
+        ]
+        self.assertEqual(stored_sensor_indexes, [1, 2, 2])
+        self.assertEqual(padl._last_data_time_stamp, 1659710232)
+        self.assertEqual(
+            padl._last_seen_by_sensor_index, {1: 1659710200, 2: 1659710210}
+        )
+
     @patch("time.sleep", return_value=None)
     def test_logic_for_storing_group_sensors_data_with_group_id_none(
         self, patched_time_sleep
@@ -795,3 +1126,254 @@ class PurpleAirDataLoggerHelpersTest(unittest.TestCase):
             )
             with self.assertRaises(PurpleAirAPIError):
                 logic_for_storing_group_sensors_data(padl, None, json_config_file)
+
+    def test_request_local_sensors_data_concurrently_skips_laggards(self):
+        """
+        Test that sensors that answered are returned and sensors that failed or were too
+        slow are reported, without the slow sensor holding up the others.
+        """
+
+        # Setup
+        def slow_sensor_response(request, context):
+            time.sleep(0.5)
+            return dumps(LOCAL_API_DATA_IN_2)
+
+        executor = ThreadPoolExecutor(max_workers=3)
+        running_future_dict = {}
+        with requests_mock.Mocker() as m:
+            m.get("http://192.168.1.2/json", text=dumps(LOCAL_API_DATA_IN_1))
+            m.get("http://192.168.1.3/json", exc=requests.exceptions.ConnectTimeout)
+            m.get("http://192.168.1.4/json", text=slow_sensor_response)
+
+            # Action
+            start_time = time.perf_counter()
+            local_sensor_dict, laggard_dict = request_local_sensors_data_concurrently(
+                executor,
+                ["192.168.1.2", "192.168.1.3", "192.168.1.4"],
+                request_timeout_seconds=0.1,
+                running_future_dict=running_future_dict,
+            )
+            elapsed_time = time.perf_counter() - start_time
+
+            # The slow sensor isn't requested again while its request is running
+            _, next_laggard_dict = request_local_sensors_data_concurrently(
+                executor,
+                ["192.168.1.4"],
+                request_timeout_seconds=0.1,
+                running_future_dict=running_future_dict,
+            )
+            executor.shutdown(wait=True)
+
+        # Expected Result
+        self.assertEqual(local_sensor_dict, {"192.168.1.2": LOCAL_API_DATA_IN_1})
+        self.assertEqual(list(laggard_dict), ["192.168.1.3", "192.168.1.4"])
+        self.assertLess(elapsed_time, 0.5)
+        self.assertEqual(
+            next_laggard_dict,
+            {"192.168.1.4": "its previous request is still running"},
+        )
+        self.assertEqual(list(running_future_dict), ["192.168.1.4"])
+
+    def test_split_bounding_box_into_tiles(self):
+        """
+        Test that the tiles cover the bounding box row by row from the north west.
+        """
+
+        self.assertEqual(
+            split_bounding_box_into_tiles(-120, 40, -100, 30, 2, 2),
+            [
+                (-120, 40, -110, 35),
+                (-110, 40, -100, 35),
+                (-120, 35, -110, 30),
+                (-110, 35, -100, 30),
+            ],
+        )
+        self.assertEqual(
+            split_bounding_box_into_tiles(-120, 40, -100, 30, 1, 1),
+            [(-120, 40, -100, 30)],
+        )
+
+    def test_request_bounding_box_tiles_concurrently_bounds_the_requests(self):
+        """
+        Test that no more than the maximum number of tiles are requested at the same time
+        and that every tile is yielded once.
+        """
+
+        # Setup
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        def request_multiple_sensors_data(**kwargs):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+
+            return {"nwlng": kwargs["nwlng"], "nwlat": kwargs["nwlat"]}
+
+        padl = MagicMock()
+        padl._purpleair_api_obj.request_multiple_sensors_data.side_effect = (
+            request_multiple_sensors_data
+        )
+        tile_list = split_bounding_box_into_tiles(0, 3, 3, 0, 3, 3)
+
+        # Action
+        result_list = list(
+            request_bounding_box_tiles_concurrently(
+                padl, self._make_bounding_box_json_config_file(), None, tile_list, 2
+            )
+        )
+
+        # Expected Result
+        self.assertEqual(sorted(tile for tile, _, _ in result_list), sorted(tile_list))
+        for tile, sensors_data, error in result_list:
+            self.assertIsNone(error)
+            self.assertEqual((sensors_data["nwlng"], sensors_data["nwlat"]), tile[:2])
+
+        self.assertLessEqual(in_flight[1], 2)
+
+    def test_logic_for_storing_multiple_sensors_data_in_tiles(self):
+        """
+        Test that every tile that arrived is stored, that a failing tile is skipped and
+        that 'modified_since' only moves forward once every tile arrived.
+        """
+
+        # Setup
+        failing_nwlngs = {10}
+
+        def request_multiple_sensors_data(**kwargs):
+            if kwargs["nwlng"] in failing_nwlngs:
+                raise PurpleAirAPIError("500: tile failed")
+
+            # The sensor at 5 sits on the edge the two tiles share
+            return {
+                "data_time_stamp": 1000 + kwargs["nwlng"],
+                "fields": ["sensor_index", "last_seen", "name"],
+                "data": [[kwargs["nwlng"], 900, "in a tile"], [5, 900, "on the edge"]],
+            }
+
+        padl = MagicMock()
+        padl._stores_sensor_data_in_background = False
+        padl._last_data_time_stamp = None
+        padl._last_seen_by_sensor_index = {}
+        padl._deduplication_cache = PurpleAirDataLoggerDeduplicationCache()
+        padl._quality_control = None
+        padl._enrichment = None
+        padl._purpleair_api_obj.request_multiple_sensors_data.side_effect = (
+            request_multiple_sensors_data
+        )
+        json_config_file = self._make_bounding_box_json_config_file()
+
+        # Action
+        logic_for_storing_multiple_sensors_data(padl, json_config_file)
+        stored_after_failure = sorted(
+            call.args[0]["sensor_index"]
+            for call in padl.store_sensor_data.call_args_list
+        )
+        last_data_time_stamp_after_failure = padl._last_data_time_stamp
+        failing_nwlngs.clear()
+        logic_for_storing_multiple_sensors_data(padl, json_config_file)
+
+        # Expected Result
+        self.assertEqual(stored_after_failure, [0, 5])
+        self.assertIsNone(last_data_time_stamp_after_failure)
+        self.assertEqual(padl._last_data_time_stamp, 1000)
+        self.assertEqual(
+            sorted(
+                call.args[0]["sensor_index"]
+                for call in padl.store_sensor_data.call_args_list
+            ),
+            [0, 5, 10],
+        )
+
+    def _make_bounding_box_json_config_file(self):
+        """Helper to create a multiple sensors json config file with two tiles."""
+
+        return {
+            "poll_interval_seconds": 60,
+            "fields": "name, last_seen",
+            "location_type": None,
+            "read_keys": None,
+            "show_only": None,
+            "modified_since": None,
+            "max_age": None,
+            "nwlng": 0,
+            "nwlat": 10,
+            "selng": 20,
+            "selat": 0,
+            "tile_rows": 1,
+            "tile_columns": 2,
+        }
+
+    def test_logic_for_storing_local_sensors_data_with_downsampling(self):
+        """
+        Test that only the rows of closed windows are stored when downsampling.
+        """
+
+        # Setup
+        with requests_mock.Mocker() as m:
+            m.get("http://192.168.1.2/json", text="{}", status_code=200)
+            padl = PurpleAirDataLogger(PurpleAirApiIpv4Address=["192.168.1.2"])
+            padl.store_sensor_data = MagicMock(name="store_sensor_data")
+        padl.configure_local_sensor_downsampler(60)
+        json_config_file = {
+            "sensor_ip_list": ["192.168.1.2"],
+            "poll_interval_seconds": 1,
+        }
+
+        # Action & Expected Result
+        for response_date in (1695398520, 1695398550, 1695398580):
+            with requests_mock.Mocker() as m:
+                m.get(
+                    "http://192.168.1.2/json",
+                    text=dumps(dict(LOCAL_API_DATA_IN_1, response_date=response_date)),
+                    status_code=200,
+                )
+                logic_for_storing_local_sensors_data(padl, json_config_file)
+
+        padl.store_sensor_data.assert_called_once()
+        window_row = padl.store_sensor_data.call_args.args[0]
+        self.assertEqual(window_row["data_time_stamp"], 1695398520)
+        self.assertEqual(window_row["sample_count"], 2)
+
+    def test_logic_for_storing_local_sensors_data_closes_idle_windows(self):
+        """
+        Test that the window of a sensor that stopped answering is stored once it has
+        been idle for longer than one window.
+        """
+
+        # Setup
+        with requests_mock.Mocker() as m:
+            m.get("http://192.168.1.2/json", text="{}", status_code=200)
+            padl = PurpleAirDataLogger(PurpleAirApiIpv4Address=["192.168.1.2"])
+            padl.store_sensor_data = MagicMock(name="store_sensor_data")
+        padl.configure_local_sensor_downsampler(60)
+        json_config_file = {
+            "sensor_ip_list": ["192.168.1.2"],
+            "poll_interval_seconds": 1,
+        }
+
+        # Action
+        with patch(
+            "purpleair_data_logger.PurpleAirDataLoggerDownsampler.monotonic",
+            side_effect=(100, 100, 161),
+        ):
+            with requests_mock.Mocker() as m:
+                m.get(
+                    "http://192.168.1.2/json",
+                    text=dumps(LOCAL_API_DATA_IN_1),
+                    status_code=200,
+                )
+                logic_for_storing_local_sensors_data(padl, json_config_file)
+            padl.store_sensor_data.assert_not_called()
+
+            with requests_mock.Mocker() as m:
+                m.get("http://192.168.1.2/json", status_code=500)
+                logic_for_storing_local_sensors_data(padl, json_config_file)
+
+        # Expected Result
+        padl.store_sensor_data.assert_called_once()
+        self.assertEqual(padl.store_sensor_data.call_args.args[0]["sample_count"], 1)
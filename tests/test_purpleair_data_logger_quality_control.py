@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+"""
+
+import random
+import unittest
+import sys
+
+sys.path.append("../")
+
+from purpleair_data_logger.PurpleAirDataLoggerQualityControl import (
+    PurpleAirDataLoggerQualityControl,
+    QUALITY_CONTROL_CHANNEL_FIELD_NAMES,
+    QC_FLAG_SINGLE_CHANNEL,
+    QC_FLAG_A_CHANNEL_DOWNGRADED,
+    QC_FLAG_B_CHANNEL_DOWNGRADED,
+    QC_FLAG_CHANNELS_DISAGREE_BY_FIELD_NAME,
+    check_sensor_channels,
+    numpy,
+)
+
+
+def make_reading(value_a, value_b, hardware="2.0+BME280+PMSX003-B+PMSX003-A"):
+    """Helper to create a reading with the same channels for every PM field."""
+
+    reading = {"sensor_index": 1, "data_time_stamp": 100, "hardware": hardware}
+    for field_name in QUALITY_CONTROL_CHANNEL_FIELD_NAMES:
+        reading[f"{field_name}_a"] = value_a
+        reading[f"{field_name}_b"] = value_b
+        reading[field_name] = (value_a + value_b) / 2
+
+    return reading
+
+
+class PurpleAirDataLoggerQualityControlTest(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_agreeing_channels_have_no_flags(self):
+        """
+        Test that channels within the absolute or the relative limit agree.
+        """
+
+        self.assertEqual(check_sensor_channels(make_reading(10, 14)), 0)
+
+        # 40 and 60 are 20 apart but that is only 40% of their average
+        self.assertEqual(check_sensor_channels(make_reading(40, 60)), 0)
+
+    def test_disagreeing_channels_are_flagged_per_field(self):
+        """
+        Test that each disagreeing field gets its own bit.
+        """
+
+        # Setup
+        reading = make_reading(10, 10)
+        reading["pm2.5_cf_1_b"] = 30
+
+        # Action
+        qc_flags = check_sensor_channels(reading)
+
+        # Expected Result
+        self.assertEqual(
+            qc_flags, QC_FLAG_CHANNELS_DISAGREE_BY_FIELD_NAME["pm2.5_cf_1"]
+        )
+
+    def test_out_of_range_channel_is_downgraded(self):
+        """
+        Test that the averaged fields hold the other channel when one channel is out of
+        range.
+        """
+
+        # Setup
+        reading = make_reading(5, 2000)
+
+        # Action
+        qc_flags = check_sensor_channels(reading)
+
+        # Expected Result
+        self.assertTrue(qc_flags & QC_FLAG_B_CHANNEL_DOWNGRADED)
+        self.assertFalse(qc_flags & QC_FLAG_A_CHANNEL_DOWNGRADED)
+        self.assertEqual(reading["pm2.5"], 5)
+        self.assertEqual(reading["pm10.0_cf_1"], 5)
+
+    def test_both_channels_out_of_range_keep_the_average(self):
+        """
+        Test that nothing is replaced when both channels are out of range.
+        """
+
+        # Setup
+        reading = make_reading(-1, 2000)
+
+        # Action
+        qc_flags = check_sensor_channels(reading)
+
+        # Expected Result
+        self.assertTrue(qc_flags & QC_FLAG_A_CHANNEL_DOWNGRADED)
+        self.assertTrue(qc_flags & QC_FLAG_B_CHANNEL_DOWNGRADED)
+        self.assertEqual(reading["pm2.5"], 999.5)
+
+    def test_single_channel_sensors_are_not_compared(self):
+        """
+        Test that the B channel of a sensor without one is ignored.
+        """
+
+        self.assertEqual(
+            check_sensor_channels(make_reading(50, 0, hardware="2.0+BME280+PMSX003-A")),
+            QC_FLAG_SINGLE_CHANNEL,
+        )
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_numpy_matches_scalar(self):
+        """
+        Test that the vectorized and the scalar implementations agree, including
+        missing values, single channel sensors and downgrades.
+        """
+
+        # Setup
+        random_generator = random.Random(1)
+        batch = []
+        for _ in range(500):
+            reading = make_reading(
+                random_generator.uniform(-10, 60),
+                random_generator.choice((random_generator.uniform(0, 60), 1500)),
+                random_generator.choice(
+                    ("", "2.0+BME280+PMSX003-A", "2.0+BME280+PMSX003-B+PMSX003-A")
+                ),
+            )
+            reading["pm1.0_b"] = random_generator.choice((None, reading["pm1.0_b"]))
+            batch.append(reading)
+
+        # Action
+        scalar_rows = PurpleAirDataLoggerQualityControl(use_numpy=False).check(
+            [dict(row) for row in batch]
+        )
+        numpy_rows = PurpleAirDataLoggerQualityControl(use_numpy=True).check(
+            [dict(row) for row in batch]
+        )
+
+        # Expected Result
+        self.assertEqual(scalar_rows, numpy_rows)
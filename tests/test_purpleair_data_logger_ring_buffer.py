@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+"""
+
+import math
+import unittest
+import sys
+from array import array
+
+sys.path.append("../")
+
+from purpleair_data_logger.PurpleAirDataLoggerRingBuffer import (
+    PurpleAirDataLoggerRingBuffer,
+)
+
+
+def make_reading(data_time_stamp, pm2_5, sensor_index=1):
+    """Helper to create a reading."""
+
+    return {
+        "sensor_index": sensor_index,
+        "data_time_stamp": data_time_stamp,
+        "name": "a name",
+        "pm2.5": pm2_5,
+    }
+
+
+class PurpleAirDataLoggerRingBufferTest(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_get_latest(self):
+        """
+        Test that the latest value of a field is returned and missing values are None.
+        """
+
+        # Setup
+        ring_buffer = PurpleAirDataLoggerRingBuffer(capacity=3)
+
+        # Action
+        ring_buffer.append(make_reading(100, 1.5))
+        ring_buffer.append(make_reading(200, None))
+
+        # Expected Result
+        self.assertEqual(ring_buffer.get_latest(1, "data_time_stamp"), 200)
+        self.assertIsNone(ring_buffer.get_latest(1, "pm2.5"))
+        self.assertIsNone(ring_buffer.get_latest(2, "pm2.5"))
+        self.assertIn(1, ring_buffer)
+        self.assertEqual(len(ring_buffer), 1)
+
+    def test_oldest_readings_are_overwritten(self):
+        """
+        Test that a full ring overwrites its oldest readings.
+        """
+
+        # Setup
+        ring_buffer = PurpleAirDataLoggerRingBuffer(capacity=3)
+
+        # Action
+        for data_time_stamp in range(1, 6):
+            ring_buffer.append(make_reading(data_time_stamp, data_time_stamp * 10.0))
+
+        # Expected Result
+        readings = ring_buffer.get_last(1, 10)
+        self.assertEqual(
+            [reading["data_time_stamp"] for reading in readings], [3.0, 4.0, 5.0]
+        )
+        self.assertEqual(readings[-1]["pm2.5"], 50.0)
+        self.assertEqual(readings[-1]["sensor_index"], 1)
+        self.assertNotIn("name", readings[-1])
+
+    def test_copy_last_into_a_reused_array(self):
+        """
+        Test that the last values of a field are copied into a caller owned array.
+        """
+
+        # Setup
+        ring_buffer = PurpleAirDataLoggerRingBuffer(capacity=4)
+        out = array("d", [0.0] * 3)
+        ring_buffer.append(make_reading(1, 1.0))
+        ring_buffer.append(make_reading(2, None))
+
+        # Action
+        copy_count = ring_buffer.copy_last(1, "pm2.5", out)
+
+        # Expected Result
+        self.assertEqual(copy_count, 2)
+        self.assertEqual(out[0], 1.0)
+        self.assertTrue(math.isnan(out[1]))
+        self.assertEqual(ring_buffer.copy_last(2, "pm2.5", out), 0)
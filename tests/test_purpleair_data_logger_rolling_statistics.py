@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+"""
+
+import random
+import unittest
+import sys
+
+sys.path.append("../")
+
+from purpleair_data_logger.PurpleAirDataLoggerRollingStatistics import (
+    PurpleAirDataLoggerRollingStatistics,
+)
+from purpleair_data_logger.PurpleAirDataLoggerEnrichment import compute_nowcast
+
+
+def make_reading(data_time_stamp, pm2_5, sensor_index=1):
+    """Helper to create a reading."""
+
+    return {
+        "sensor_index": sensor_index,
+        "data_time_stamp": data_time_stamp,
+        "pm2.5": pm2_5,
+    }
+
+
+class PurpleAirDataLoggerRollingStatisticsTest(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_means_over_each_window(self):
+        """
+        Test that each window only averages the hours it covers.
+        """
+
+        # Setup
+        rolling_statistics = PurpleAirDataLoggerRollingStatistics(
+            window_hours=(1, 3), field_names=("pm2.5",)
+        )
+
+        # Action
+        rolling_statistics.update(make_reading(0, 10))
+        rolling_statistics.update(make_reading(1800, 20))
+        rolling_statistics.update(make_reading(2 * 3600, 40))
+
+        # Expected Result
+        self.assertEqual(rolling_statistics.get_mean(1, "pm2.5", 1), 40)
+        self.assertAlmostEqual(rolling_statistics.get_mean(1, "pm2.5", 3), 70 / 3)
+        self.assertIsNone(rolling_statistics.get_mean(2, "pm2.5", 1))
+
+    def test_hours_leave_the_windows(self):
+        """
+        Test that hours that fall out of a window are taken off its running sum, and that
+        a long gap empties every window.
+        """
+
+        # Setup
+        rolling_statistics = PurpleAirDataLoggerRollingStatistics(
+            window_hours=(2,), field_names=("pm2.5",)
+        )
+        rolling_statistics.update(make_reading(0, 10))
+
+        # Action
+        rolling_statistics.update(make_reading(2 * 3600, 30))
+        mean_after_two_hours = rolling_statistics.get_mean(1, "pm2.5", 2)
+        rolling_statistics.update(make_reading(100 * 3600, None))
+
+        # Expected Result
+        self.assertEqual(mean_after_two_hours, 30)
+        self.assertIsNone(rolling_statistics.get_mean(1, "pm2.5", 2))
+        self.assertIsNone(rolling_statistics.get_nowcast(1, "pm2.5"))
+
+    def test_late_readings(self):
+        """
+        Test that a late reading counts for the windows that cover its hour and that too
+        old readings are ignored.
+        """
+
+        # Setup
+        rolling_statistics = PurpleAirDataLoggerRollingStatistics(
+            window_hours=(1, 3), field_names=("pm2.5",)
+        )
+        rolling_statistics.update(make_reading(20 * 3600, 10))
+
+        # Action
+        rolling_statistics.update(make_reading(19 * 3600, 40))
+        rolling_statistics.update(make_reading(3600, 1000))
+
+        # Expected Result
+        self.assertEqual(rolling_statistics.get_mean(1, "pm2.5", 1), 10)
+        self.assertEqual(rolling_statistics.get_mean(1, "pm2.5", 3), 25)
+
+    def test_nowcast_and_get_statistics(self):
+        """
+        Test that the NowCast is computed from the hourly means.
+        """
+
+        # Setup
+        rolling_statistics = PurpleAirDataLoggerRollingStatistics(
+            window_hours=(1,), field_names=("pm2.5",)
+        )
+
+        # Action
+        for hour, pm2_5 in enumerate((10, 30, 20, 20)):
+            rolling_statistics.update(make_reading(hour * 3600, pm2_5))
+            rolling_statistics.update(make_reading(hour * 3600 + 60, pm2_5 + 2))
+
+        # Expected Result
+        self.assertAlmostEqual(
+            rolling_statistics.get_nowcast(1, "pm2.5"),
+            compute_nowcast([21, 21, 31, 11]),
+        )
+        self.assertEqual(
+            rolling_statistics.get_statistics(1),
+            {
+                "data_hour_time_stamp": 3 * 3600,
+                "fields": {
+                    "pm2.5": {
+                        "mean_1h": 21,
+                        "nowcast": rolling_statistics.get_nowcast(1, "pm2.5"),
+                    }
+                },
+            },
+        )
+        self.assertIsNone(rolling_statistics.get_statistics(2))
+
+    def test_matches_scanning_the_readings(self):
+        """
+        Test that the running sums agree with averaging the readings in each window.
+        """
+
+        # Setup
+        random_generator = random.Random(1)
+        window_hours = (1, 6, 24)
+        rolling_statistics = PurpleAirDataLoggerRollingStatistics(
+            window_hours=window_hours, field_names=("pm2.5",)
+        )
+        readings = []
+        data_time_stamp = 0
+
+        for _ in range(1000):
+            data_time_stamp += random_generator.choice((60, 600, 3600, 30 * 3600))
+            reading = make_reading(
+                data_time_stamp - random_generator.choice((0, 0, 0, 5 * 3600)),
+                random_generator.choice((None, random_generator.uniform(0, 200))),
+            )
+
+            # Action
+            rolling_statistics.update(reading)
+            readings.append(reading)
+
+            # Expected Result
+            latest_hour = (
+                max(reading["data_time_stamp"] for reading in readings) // 3600
+            )
+            for hours in window_hours:
+                values = [
+                    reading["pm2.5"]
+                    for reading in readings
+                    if reading["pm2.5"] is not None
+                    and latest_hour - hours
+                    < reading["data_time_stamp"] // 3600
+                    <= latest_hour
+                ]
+                mean = rolling_statistics.get_mean(1, "pm2.5", hours)
+                if values:
+                    self.assertAlmostEqual(mean, sum(values) / len(values))
+
+                else:
+                    self.assertIsNone(mean)
+
+    def test_invalid_window_raises(self):
+        """
+        Test that windows shorter than an hour raise.
+        """
+
+        with self.assertRaises(ValueError):
+            PurpleAirDataLoggerRollingStatistics(window_hours=(0, 1))
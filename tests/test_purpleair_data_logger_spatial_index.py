@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+"""
+
+import random
+import unittest
+import sys
+
+sys.path.append("../")
+
+from purpleair_data_logger.PurpleAirDataLoggerSpatialIndex import (
+    PurpleAirDataLoggerSpatialIndex,
+    compute_distance_km,
+)
+
+
+def make_position(sensor_index, latitude, longitude):
+    """Helper to create a reading with a position."""
+
+    return {"sensor_index": sensor_index, "latitude": latitude, "longitude": longitude}
+
+
+class PurpleAirDataLoggerSpatialIndexTest(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_compute_distance_km(self):
+        """
+        Test the haversine distance against known distances.
+        """
+
+        self.assertEqual(compute_distance_km(10, 20, 10, 20), 0)
+        self.assertAlmostEqual(compute_distance_km(0, 0, 1, 0), 111.195, places=2)
+
+        # San Francisco to Los Angeles is about 559 km
+        self.assertAlmostEqual(
+            compute_distance_km(37.7749, -122.4194, 34.0522, -118.2437), 559, delta=1
+        )
+
+    def test_update_moves_and_remove_drops_sensors(self):
+        """
+        Test that a sensor is found at its latest position only, that readings without
+        a position keep it where it was and that removed sensors are gone.
+        """
+
+        # Setup
+        spatial_index = PurpleAirDataLoggerSpatialIndex()
+        spatial_index.update(make_position(1, 10, 10))
+
+        # Action
+        spatial_index.update(make_position(1, 20, 20))
+        spatial_index.update(make_position(1, None, None))
+        spatial_index.update(make_position(2, 20.01, 20.01))
+        spatial_index.remove(2)
+        spatial_index.remove(3)
+
+        # Expected Result
+        self.assertEqual(spatial_index.get_position(1), (20, 20))
+        self.assertEqual(spatial_index.query_bounding_box(9, 11, 11, 9), [])
+        self.assertEqual(spatial_index.query_bounding_box(19, 21, 21, 19), [1])
+        self.assertNotIn(2, spatial_index)
+        self.assertEqual(len(spatial_index), 1)
+
+    def test_queries_across_the_antimeridian(self):
+        """
+        Test that radius, bounding box and nearest queries wrap around 180° longitude.
+        """
+
+        # Setup
+        spatial_index = PurpleAirDataLoggerSpatialIndex()
+        spatial_index.update(make_position(1, 0, 179.95))
+        spatial_index.update(make_position(2, 0, -179.95))
+        spatial_index.update(make_position(3, 0, 0))
+
+        # Action
+        radius_results = spatial_index.query_radius(0, 180, 10)
+        bounding_box_results = spatial_index.query_bounding_box(179, 1, -179, -1)
+        nearest_results = spatial_index.query_nearest(0, -179.9, 2)
+
+        # Expected Result
+        self.assertEqual(sorted(result[0] for result in radius_results), [1, 2])
+        self.assertEqual(bounding_box_results, [1, 2])
+        self.assertEqual([result[0] for result in nearest_results], [2, 1])
+
+    def test_matches_scanning_the_sensors(self):
+        """
+        Test that the grid queries agree with checking every sensor.
+        """
+
+        # Setup
+        random_generator = random.Random(1)
+        spatial_index = PurpleAirDataLoggerSpatialIndex(cell_size_degrees=0.7)
+        positions = {}
+        for sensor_index in range(2000):
+            latitude = random_generator.uniform(-90, 90)
+            longitude = random_generator.uniform(-180, 180)
+            positions[sensor_index] = (latitude, longitude)
+            spatial_index.update(make_position(sensor_index, latitude, longitude))
+
+        for _ in range(100):
+            latitude = random_generator.uniform(-90, 90)
+            longitude = random_generator.uniform(-180, 180)
+            radius_km = random_generator.choice((10, 200, 1000, 8000))
+            nwlng = random_generator.uniform(-180, 180)
+            selng = random_generator.uniform(-180, 180)
+            nwlat = random_generator.uniform(-90, 90)
+            selat = random_generator.uniform(-90, nwlat)
+
+            # Action
+            radius_results = spatial_index.query_radius(latitude, longitude, radius_km)
+            bounding_box_results = spatial_index.query_bounding_box(
+                nwlng, nwlat, selng, selat
+            )
+            nearest_results = spatial_index.query_nearest(latitude, longitude, 5)
+
+            # Expected Result
+            distances = sorted(
+                (compute_distance_km(latitude, longitude, *position), sensor_index)
+                for sensor_index, position in positions.items()
+            )
+            self.assertEqual(
+                [result[0] for result in radius_results],
+                [
+                    sensor_index
+                    for distance_km, sensor_index in distances
+                    if distance_km <= radius_km
+                ],
+            )
+            self.assertEqual(
+                [result[0] for result in nearest_results],
+                [sensor_index for _, sensor_index in distances[:5]],
+            )
+            self.assertEqual(
+                bounding_box_results,
+                sorted(
+                    sensor_index
+                    for sensor_index, (sensor_latitude, sensor_longitude) in (
+                        positions.items()
+                    )
+                    if selat <= sensor_latitude <= nwlat
+                    and (
+                        nwlng <= sensor_longitude <= selng
+                        if nwlng <= selng
+                        else nwlng <= sensor_longitude or sensor_longitude <= selng
+                    )
+                ),
+            )
+
+    def test_invalid_cell_size_raises(self):
+        """
+        Test that cells must be larger than 0 and not larger than 90 degrees.
+        """
+
+        with self.assertRaises(ValueError):
+            PurpleAirDataLoggerSpatialIndex(cell_size_degrees=0)
+
+        with self.assertRaises(ValueError):
+            PurpleAirDataLoggerSpatialIndex(cell_size_degrees=91)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+"""
+
+import argparse
+import os
+import unittest
+import sys
+from functools import partial
+from unittest.mock import MagicMock
+
+sys.path.append("../")
+
+from purpleair_data_logger.PurpleAirDataLogger import PurpleAirDataLoggerError
+from purpleair_data_logger.PurpleAirDataLoggerSupervisor import (
+    PurpleAirDataLoggerSupervisor,
+    add_shard_placeholder,
+    make_shard_data_logger,
+    split_json_config_file,
+)
+
+
+class FakeDataLogger:
+    """
+    A data logger whose multiple sensors run loop finishes a few cycles and exits.
+    Workers are spawned, so it lives at module level to be picklable.
+    """
+
+    def __init__(self, cycle_count):
+        self._cycle_count = cycle_count
+        self._polling_cycle_callback = None
+
+    def _run_loop_for_storing_multiple_sensors_data(self, json_config_file):
+        for _ in range(self._cycle_count):
+            self._polling_cycle_callback()
+
+        sys.exit(3)
+
+
+def make_fake_data_logger(cycle_count, shard_number):
+    """Helper to make the data logger of a shard."""
+
+    return FakeDataLogger(cycle_count)
+
+
+class PurpleAirDataLoggerSupervisorTest(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_split_multiple_sensors_request(self):
+        """
+        Test that 'show_only' is split when it is set and the bounding box otherwise.
+        """
+
+        # Setup
+        json_config_file = {
+            "poll_interval_seconds": 60,
+            "show_only": "1, 2,3,4,5",
+            "nwlng": -120,
+            "nwlat": 40,
+            "selng": -100,
+            "selat": 30,
+        }
+
+        # Action
+        show_only_shards = split_json_config_file(json_config_file, "multiple", 2)
+        bounding_box_shards = split_json_config_file(
+            dict(json_config_file, show_only=None), "multiple", 2
+        )
+
+        # Expected Result
+        self.assertEqual(
+            [shard["show_only"] for shard in show_only_shards], ["1,2", "3,4,5"]
+        )
+        self.assertEqual(
+            [
+                (shard["nwlng"], shard["nwlat"], shard["selng"], shard["selat"])
+                for shard in bounding_box_shards
+            ],
+            [(-120, 40, -110, 30), (-110, 40, -100, 30)],
+        )
+        self.assertEqual(json_config_file["show_only"], "1, 2,3,4,5")
+
+    def test_split_group_and_local_sensors_requests(self):
+        """
+        Test that group members and local sensors are split, that only the first group
+        shard adds sensors and that there are no empty shards.
+        """
+
+        # Setup
+        group_json_config_file = {
+            "poll_interval_seconds": 60,
+            "sensor_group_name": "A Name Goes Here",
+            "add_sensors_to_group": True,
+            "sensor_index_list": [77, 81, 95079],
+            "show_only": None,
+        }
+        local_json_config_file = {
+            "poll_interval_seconds": 1,
+            "sensor_ip_list": ["192.168.86.24", "192.168.86.25"],
+        }
+
+        # Action
+        group_shards = split_json_config_file(group_json_config_file, "group", 3)
+        local_shards = split_json_config_file(local_json_config_file, "local", 4)
+
+        # Expected Result
+        self.assertEqual(
+            [shard["show_only"] for shard in group_shards], ["77", "81", "95079"]
+        )
+        self.assertEqual(
+            [shard["add_sensors_to_group"] for shard in group_shards],
+            [True, False, False],
+        )
+        self.assertEqual(group_shards[1]["sensor_index_list"], [77, 81, 95079])
+        self.assertEqual(
+            [shard["sensor_ip_list"] for shard in local_shards],
+            [["192.168.86.24"], ["192.168.86.25"]],
+        )
+
+    def test_split_raises_when_there_is_nothing_to_split(self):
+        """
+        Test that single sensor requests and multiple sensors requests without
+        'show_only' or a bounding box can't be split.
+        """
+
+        with self.assertRaises(PurpleAirDataLoggerError):
+            split_json_config_file({"sensor_index": 53}, "single", 2)
+
+        with self.assertRaises(PurpleAirDataLoggerError):
+            split_json_config_file(
+                {"show_only": None, "nwlng": None, "nwlat": None}, "multiple", 2
+            )
+
+        self.assertEqual(
+            split_json_config_file({"sensor_index": 53}, "single", 1),
+            [{"sensor_index": 53}],
+        )
+
+    def test_make_shard_data_logger(self):
+        """
+        Test that '{shard}' is replaced and the common arguments are applied.
+        """
+
+        # Setup
+        data_logger_class = MagicMock()
+        common_args = argparse.Namespace(
+            dedup_cache_size=10,
+            dedup_cache_file="dedup_{shard}.json",
+            qc_ab_channels=True,
+            enrich_epa_aqi=False,
+            shards=3,
+            paa_local_sensor_request_json_file=None,
+        )
+
+        # Action
+        data_logger = make_shard_data_logger(
+            data_logger_class, ("key", "db_{shard}.db", 5), common_args, 2
+        )
+
+        # Expected Result
+        data_logger_class.assert_called_once_with("key", "db_2.db", 5)
+        data_logger.configure_deduplication_cache.assert_called_once_with(
+            10, "dedup_2.json"
+        )
+        data_logger.configure_quality_control.assert_called_once_with()
+        data_logger.configure_enrichment.assert_not_called()
+
+    def test_make_shard_data_logger_for_local_sensors(self):
+        """
+        Test that a local sensors shard only gets its own IPv4 addresses and that
+        '{shard}' is added to a deduplication cache file that lacks it.
+        """
+
+        # Setup
+        data_logger_class = MagicMock()
+        ipv4_address_list = ["10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.4"]
+        common_args = argparse.Namespace(
+            dedup_cache_size=10,
+            dedup_cache_file="dedup.json",
+            qc_ab_channels=False,
+            enrich_epa_aqi=False,
+            shards=2,
+            paa_local_sensor_request_json_file="local.json",
+        )
+        shard_json_config_files = split_json_config_file(
+            {"sensor_ip_list": ipv4_address_list}, "local", 2
+        )
+
+        # Action
+        data_logger = make_shard_data_logger(
+            data_logger_class, ("key", None, ipv4_address_list), common_args, 1
+        )
+
+        # Expected Result
+        data_logger_class.assert_called_once_with(
+            "key", None, shard_json_config_files[1]["sensor_ip_list"]
+        )
+        self.assertEqual(data_logger_class.call_args.args[2], ["10.0.0.3", "10.0.0.4"])
+        data_logger.configure_deduplication_cache.assert_called_once_with(
+            10, "dedup_1.json"
+        )
+
+    def test_add_shard_placeholder(self):
+        """
+        Test that '{shard}' is added to file and directory paths that lack it.
+        """
+
+        self.assertEqual(
+            add_shard_placeholder("data/sensors.db"), "data/sensors_{shard}.db"
+        )
+        self.assertEqual(add_shard_placeholder("db_{shard}.db"), "db_{shard}.db")
+        self.assertEqual(
+            add_shard_placeholder("csv_files", is_directory=True),
+            os.path.join("csv_files", "shard_{shard}"),
+        )
+        self.assertIsNone(add_shard_placeholder(None))
+
+    def test_supervisor_restarts_workers_and_aggregates_their_health(self):
+        """
+        Test that every shard runs in its own process, that workers that exit are
+        restarted and that the supervisor gives up once every shard exited too often.
+        """
+
+        # Setup
+        supervisor = PurpleAirDataLoggerSupervisor(
+            partial(make_fake_data_logger, 2),
+            shard_count=2,
+            restart_delay_seconds=0,
+            max_restarts=1,
+        )
+        json_config_file = {"poll_interval_seconds": 60, "show_only": "1,2,3"}
+
+        # Action
+        with self.assertRaises(PurpleAirDataLoggerError):
+            supervisor.run("multiple", json_config_file)
+
+        # Expected Result
+        health = supervisor.get_health()
+        self.assertEqual(health["status"], "failed")
+        self.assertEqual(len(health["shards"]), 2)
+        for shard in health["shards"]:
+            self.assertEqual(shard["cycle_count"], 4)
+            self.assertEqual(shard["restart_count"], 1)
+            self.assertEqual(shard["exit_code"], 3)
+            self.assertTrue(shard["given_up"])
+            self.assertFalse(shard["alive"])
+
+    def test_invalid_shard_count_raises(self):
+        """
+        Test that there must be at least one shard.
+        """
+
+        with self.assertRaises(PurpleAirDataLoggerError):
+            PurpleAirDataLoggerSupervisor(make_fake_data_logger, 0)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+"""
+
+import glob
+import json
+import os
+import unittest
+import sys
+
+sys.path.append("../")
+
+from purpleair_data_logger.PurpleAirLocalSensorMapping import (
+    compile_local_sensor_converter,
+    convert_local_sensor_data,
+)
+
+INTERNAL_NETWORK_HARDWARE_VARIANT_JSON_SAMPLES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "internal_network_hardware_variant_json_samples",
+)
+
+
+class PurpleAirLocalSensorMappingTest(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_averages_both_channels(self):
+        """
+        Test that a field with a B channel gets the mean of both channels.
+        """
+
+        # Setup
+        sensor_dict = {"SensorId": "aa:bb", "pm2_5_atm": 10.0, "pm2_5_atm_b": 20.0}
+
+        # Action
+        converted = convert_local_sensor_data(sensor_dict)
+
+        # Expected Result
+        self.assertEqual(converted["pm2.5_atm"], 15.0)
+        self.assertEqual(converted["pm2.5_atm_a"], 10.0)
+        self.assertEqual(converted["pm2.5_atm_b"], 20.0)
+
+    def test_returns_a_channel_when_b_channel_missing(self):
+        """
+        Test that a field without a B channel is the A channel and has no _b field.
+        """
+
+        # Setup
+        sensor_dict = {"SensorId": "aa:bb", "pm2_5_atm": 10.0}
+
+        # Action
+        converted = convert_local_sensor_data(sensor_dict)
+
+        # Expected Result
+        self.assertEqual(converted["pm2.5_atm"], 10.0)
+        self.assertEqual(converted["pm2.5_atm_a"], 10.0)
+        self.assertNotIn("pm2.5_atm_b", converted)
+
+    def test_returns_none_when_a_channel_missing(self):
+        """
+        Test that a field is None when the A channel itself is missing.
+        """
+
+        # Setup
+        sensor_dict = {"SensorId": "aa:bb", "pm2_5_atm_b": 20.0}
+
+        # Action
+        converted = convert_local_sensor_data(sensor_dict)
+
+        # Expected Result
+        self.assertIsNone(converted["pm2.5_atm"])
+
+    def test_sensor_id_is_required(self):
+        """
+        Test that a payload without a SensorId raises KeyError.
+        """
+
+        with self.assertRaises(KeyError):
+            convert_local_sensor_data({"unexpected": "payload"})
+
+    def test_custom_mapping(self):
+        """
+        Test that a custom mapping is compiled into its own converter.
+        """
+
+        # Setup
+        converter = compile_local_sensor_converter(
+            field_mapping=(("name", "Geo"),),
+            ab_field_mapping=(("voc", "gas_680", "gas_680_b"),),
+        )
+
+        # Action
+        converted = converter(
+            {"SensorId": "00:10", "Geo": "PurpleAir-1234", "gas_680": 1.0, "place": "x"}
+        )
+
+        # Expected Result
+        self.assertEqual(
+            converted,
+            {"sensor_index": 16, "name": "PurpleAir-1234", "voc": 1.0, "voc_a": 1.0},
+        )
+
+    def test_hardware_variant_json_samples(self):
+        """
+        Test the converter against every internal network hardware variant sample.
+        """
+
+        for json_sample_file_path in glob.glob(
+            os.path.join(INTERNAL_NETWORK_HARDWARE_VARIANT_JSON_SAMPLES, "*.json")
+        ):
+            with open(json_sample_file_path, "r") as json_sample_file:
+                sensor_dict = json.load(json_sample_file)
+
+            # Action
+            converted = convert_local_sensor_data(sensor_dict)
+
+            # Expected Result
+            self.assertEqual(
+                converted["sensor_index"],
+                int(sensor_dict["SensorId"].replace(":", ""), 16),
+            )
+            self.assertEqual(converted["data_time_stamp"], sensor_dict["response_date"])
+            self.assertEqual(converted["temperature_a"], sensor_dict["current_temp_f"])
+            self.assertEqual(converted["pm2.5_atm_a"], sensor_dict["pm2_5_atm"])
+            if "pm2_5_atm_b" in sensor_dict:
+                self.assertEqual(
+                    converted["pm2.5_atm"],
+                    (sensor_dict["pm2_5_atm"] + sensor_dict["pm2_5_atm_b"]) / 2,
+                )
@@ -13,6 +13,9 @@ from unittest.mock import MagicMock, patch
 sys.path.append("../")
 
 from purpleair_data_logger.PurpleAirLokiDataLogger import PurpleAirLokiDataLogger
+from purpleair_data_logger.PurpleAirDataLoggerDownsampler import (
+    PurpleAirDataLoggerDownsampler,
+)
 
 from helpers import DATA_OUT_1
 
@@ -308,6 +311,35 @@ class PurpleAirLokiDataLoggerTest(unittest.TestCase):
             log_line = json.loads(station_stream["values"][0][1])
             self.assertEqual(set(log_line.keys()), expected_keys)
 
+    def test_store_sensor_data_pushes_the_window_statistics(self):
+        """
+        Test that a downsampled row gets a tenth stream with its window statistics.
+        """
+
+        # Setup
+        logger = self._make_loki_logger()
+        downsampler = PurpleAirDataLoggerDownsampler(60)
+        downsampler.add_sample(dict(SAMPLE_SENSOR_DATA, data_time_stamp=1200))
+        downsampler.add_sample(
+            dict(SAMPLE_SENSOR_DATA, data_time_stamp=1230, humidity=50)
+        )
+
+        # Action
+        with requests_mock_module.Mocker() as m:
+            m.post(LOKI_PUSH_URL, status_code=204)
+            logger.store_sensor_data(downsampler.flush()[0])
+            payload = json.loads(m.last_request.body)
+
+        # Expected Result
+        self.assertEqual(len(payload["streams"]), 10)
+        window_stream = payload["streams"][-1]
+        self.assertEqual(
+            window_stream["stream"]["data_group"], "window_statistics_fields"
+        )
+        log_line = json.loads(window_stream["values"][0][1])
+        self.assertEqual(log_line["sample_count"], 2)
+        self.assertEqual(log_line["humidity_max"], 50)
+
 
 if __name__ == "__main__":
     unittest.main()
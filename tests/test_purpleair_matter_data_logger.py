@@ -28,11 +28,20 @@ from purpleair_data_logger.PurpleAirMatterDataLogger import (
     _MatterDataLoggerHandler,
     main,
 )
+from purpleair_data_logger.PurpleAirDataLoggerRollingStatistics import (
+    PurpleAirDataLoggerRollingStatistics,
+)
+from purpleair_data_logger.PurpleAirDataLoggerSpatialIndex import (
+    PurpleAirDataLoggerSpatialIndex,
+)
 from purpleair_data_logger.PurpleAirMatterDataLoggerConstants import (
     MATTER_DATA_LOGGER_DEFAULT_PORT,
     MATTER_DATA_LOGGER_DEFAULT_HOST,
     MATTER_ALL_SENSORS_PATH,
     MATTER_SENSOR_PATH_PREFIX,
+    MATTER_SENSOR_STATISTICS_PATH_SUFFIX,
+    MATTER_SENSORS_NEARBY_PATH,
+    MATTER_SENSORS_WITHIN_PATH,
     HEALTH_PATH,
 )
 
@@ -321,6 +330,145 @@ class MatterHTTPServerEndpointsTest(unittest.TestCase):
 # =============================================================================
 
 
+class MatterHTTPServerStatisticsTest(unittest.TestCase):
+    """Tests for the rolling statistics endpoint."""
+
+    def setUp(self):
+        rolling_statistics = PurpleAirDataLoggerRollingStatistics()
+        rolling_statistics.update(
+            {"sensor_index": 282168, "data_time_stamp": 3600, "pm2.5": 12.3}
+        )
+        self.httpd = _MatterHTTPServer(
+            server_address=("127.0.0.1", 0),
+            RequestHandlerClass=_MatterDataLoggerHandler,
+            matter_devices={},
+            lock=threading.Lock(),
+            rolling_statistics=rolling_statistics,
+        )
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join(timeout=2)
+
+    def _get(self, path: str) -> tuple[int, dict]:
+        """Make a GET request and return (status_code, json_body)."""
+        try:
+            with urllib.request.urlopen(
+                f"http://127.0.0.1:{self.port}{path}", timeout=2
+            ) as resp:
+                return resp.status, json.loads(resp.read())
+        except urllib.error.HTTPError as exc:
+            return exc.code, json.loads(exc.read())
+
+    def test_statistics_endpoint(self):
+        """GET /matter/sensor/<id>/statistics returns the rolling statistics."""
+        status, body = self._get(
+            f"{MATTER_SENSOR_PATH_PREFIX}/282168{MATTER_SENSOR_STATISTICS_PATH_SUFFIX}"
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(body["sensor_index"], 282168)
+        self.assertEqual(body["statistics"]["fields"]["pm2.5"]["mean_1h"], 12.3)
+        self.assertIsNone(body["statistics"]["fields"]["pm2.5"]["nowcast"])
+
+    def test_statistics_endpoint_unknown_sensor(self):
+        """Sensors without statistics return 404 and invalid ids 400."""
+        not_found_status, _ = self._get(
+            f"{MATTER_SENSOR_PATH_PREFIX}/1{MATTER_SENSOR_STATISTICS_PATH_SUFFIX}"
+        )
+        invalid_status, _ = self._get(
+            f"{MATTER_SENSOR_PATH_PREFIX}/abc{MATTER_SENSOR_STATISTICS_PATH_SUFFIX}"
+        )
+        self.assertEqual(not_found_status, 404)
+        self.assertEqual(invalid_status, 400)
+
+
+class MatterHTTPServerSpatialTest(unittest.TestCase):
+    """Tests for the nearby and within endpoints."""
+
+    def setUp(self):
+        spatial_index = PurpleAirDataLoggerSpatialIndex()
+        for sensor_index, latitude, longitude in (
+            (1, 37.7749, -122.4194),
+            (2, 37.8044, -122.2712),
+            (3, 34.0522, -118.2437),
+        ):
+            spatial_index.update(
+                {
+                    "sensor_index": sensor_index,
+                    "latitude": latitude,
+                    "longitude": longitude,
+                }
+            )
+        self.httpd = _MatterHTTPServer(
+            server_address=("127.0.0.1", 0),
+            RequestHandlerClass=_MatterDataLoggerHandler,
+            matter_devices={},
+            lock=threading.Lock(),
+            spatial_index=spatial_index,
+        )
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join(timeout=2)
+
+    def _get(self, path: str) -> tuple[int, dict]:
+        """Make a GET request and return (status_code, json_body)."""
+        try:
+            with urllib.request.urlopen(
+                f"http://127.0.0.1:{self.port}{path}", timeout=2
+            ) as resp:
+                return resp.status, json.loads(resp.read())
+        except urllib.error.HTTPError as exc:
+            return exc.code, json.loads(exc.read())
+
+    def test_nearby_endpoint_by_radius(self):
+        """GET /matter/sensors/nearby with radius_km returns the sensors in range."""
+        status, body = self._get(
+            f"{MATTER_SENSORS_NEARBY_PATH}?latitude=37.78&longitude=-122.41&radius_km=25"
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual([sensor["sensor_index"] for sensor in body["sensors"]], [1, 2])
+        self.assertLess(body["sensors"][0]["distance_km"], 2)
+        self.assertEqual(body["sensors"][0]["latitude"], 37.7749)
+
+    def test_nearby_endpoint_by_count(self):
+        """GET /matter/sensors/nearby with count returns the nearest sensors."""
+        status, body = self._get(
+            f"{MATTER_SENSORS_NEARBY_PATH}?latitude=34&longitude=-118&count=2"
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual([sensor["sensor_index"] for sensor in body["sensors"]], [3, 2])
+
+    def test_within_endpoint(self):
+        """GET /matter/sensors/within returns the sensors in the bounding box."""
+        status, body = self._get(
+            f"{MATTER_SENSORS_WITHIN_PATH}?nwlng=-123&nwlat=38&selng=-122.3&selat=37"
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(body["count"], 1)
+        self.assertEqual(body["sensors"][0]["sensor_index"], 1)
+
+    def test_spatial_endpoints_reject_bad_parameters(self):
+        """Missing or invalid parameters return 400."""
+        for path in (
+            f"{MATTER_SENSORS_NEARBY_PATH}?latitude=37&longitude=-122",
+            f"{MATTER_SENSORS_NEARBY_PATH}?latitude=abc&longitude=-122&count=1",
+            f"{MATTER_SENSORS_NEARBY_PATH}?latitude=nan&longitude=-122&count=1",
+            f"{MATTER_SENSORS_WITHIN_PATH}?nwlng=-123&nwlat=38&selng=-122",
+        ):
+            status, body = self._get(path)
+            self.assertEqual(status, 400, path)
+            self.assertIn("error", body)
+
+
 class PurpleAirMatterDataLoggerConfigTest(unittest.TestCase):
     """Tests for config file loading in validate_parameters_and_run."""
 
@@ -473,34 +621,6 @@ class PurpleAirMatterDataLoggerResilienceTest(unittest.TestCase):
         self.assertIsNone(logger._poll_and_convert_sensor(282168))
 
 
-class LocalAverageTest(unittest.TestCase):
-    """Tests for PurpleAirMatterDataLogger._local_average."""
-
-    def test_averages_both_channels(self):
-        """Returns the mean of primary and secondary when both are present."""
-        raw = {"pm2_5_atm": 10.0, "pm2_5_atm_b": 20.0}
-        result = PurpleAirMatterDataLogger._local_average(
-            raw, "pm2_5_atm", "pm2_5_atm_b"
-        )
-        self.assertEqual(result, 15.0)
-
-    def test_returns_primary_when_secondary_missing(self):
-        """Returns the primary value unmodified when secondary is absent."""
-        raw = {"pm2_5_atm": 10.0}
-        result = PurpleAirMatterDataLogger._local_average(
-            raw, "pm2_5_atm", "pm2_5_atm_b"
-        )
-        self.assertEqual(result, 10.0)
-
-    def test_returns_none_when_primary_missing(self):
-        """Returns None when the primary reading itself is absent."""
-        raw = {"pm2_5_atm_b": 20.0}
-        result = PurpleAirMatterDataLogger._local_average(
-            raw, "pm2_5_atm", "pm2_5_atm_b"
-        )
-        self.assertIsNone(result)
-
-
 class PollAndConvertLocalTest(unittest.TestCase):
     """Tests for PurpleAirMatterDataLogger._poll_and_convert_local."""
 
@@ -517,6 +637,9 @@ class PollAndConvertLocalTest(unittest.TestCase):
     def test_converts_local_sensor_payload(self):
         """A valid local sensor payload is converted to a Matter device dict."""
         logger = PurpleAirMatterDataLogger.__new__(PurpleAirMatterDataLogger)
+        logger._matter_fingerprints = {}
+        logger._spatial_index = PurpleAirDataLoggerSpatialIndex()
+        logger._lock = threading.Lock()
         logger._purpleair_api_obj = Mock()
         logger._purpleair_api_obj.request_local_sensor_data.return_value = {
             "192.168.1.50": {
@@ -538,6 +661,7 @@ class PollAndConvertLocalTest(unittest.TestCase):
         expected_index = int("aabbccddeeff", 16)
         self.assertIn(expected_index, result)
         self.assertEqual(result[expected_index]["device_type"]["id"], 0x002D)
+        self.assertEqual(logger._spatial_index.get_position(expected_index), (1.0, 2.0))
 
     def test_invalid_payload_is_skipped(self):
         """A local sensor payload missing required keys is skipped, not raised."""
@@ -571,6 +695,165 @@ class PollAndConvertLocalTest(unittest.TestCase):
         self.assertEqual(logger._matter_devices[1]["reading"], "last-known-good")
 
 
+class MatterDeltaDetectionTest(unittest.TestCase):
+    """Tests for skipping Matter conversion of unchanged sensors."""
+
+    def _make_logger(self):
+        logger = PurpleAirMatterDataLogger.__new__(PurpleAirMatterDataLogger)
+        logger._matter_fingerprints = {}
+        logger._rolling_statistics = PurpleAirDataLoggerRollingStatistics()
+        logger._spatial_index = PurpleAirDataLoggerSpatialIndex()
+        logger._lock = threading.Lock()
+        logger._purpleair_api_obj = Mock()
+        return logger
+
+    def test_unchanged_reading_is_not_reconverted(self):
+        """A second poll with the same last_seen and values reuses the device."""
+        logger = self._make_logger()
+        logger._purpleair_api_obj.request_sensor_data.return_value = {
+            "sensor": dict(PA_SENSOR_PAYLOAD["sensor"], last_seen=100)
+        }
+
+        first = logger._poll_and_convert_sensor(282168)
+        with patch(
+            "purpleair_data_logger.PurpleAirMatterDataLogger.PurpleAirMatterConverter"
+        ) as converter:
+            second = logger._poll_and_convert_sensor(282168)
+
+        converter.to_air_quality_sensor.assert_not_called()
+        self.assertIs(first, second)
+
+    def test_only_changed_readings_feed_the_rolling_statistics(self):
+        """A reading polled twice is only counted once by the rolling statistics."""
+        logger = self._make_logger()
+        logger._purpleair_api_obj.request_sensor_data.side_effect = [
+            {"sensor": dict(PA_SENSOR_PAYLOAD["sensor"], last_seen=100)},
+            {"sensor": dict(PA_SENSOR_PAYLOAD["sensor"], last_seen=100)},
+            {
+                "sensor": dict(
+                    PA_SENSOR_PAYLOAD["sensor"], last_seen=160, **{"pm2.5": 20.3}
+                )
+            },
+        ]
+
+        for _ in range(3):
+            logger._poll_and_convert_sensor(282168)
+
+        self.assertAlmostEqual(
+            logger._rolling_statistics.get_mean(282168, "pm2.5", 1), 16.3
+        )
+
+    def test_changed_readings_move_the_sensor_in_the_spatial_index(self):
+        """The spatial index follows the position of the latest reading."""
+        logger = self._make_logger()
+        logger._purpleair_api_obj.request_sensor_data.side_effect = [
+            {"sensor": dict(PA_SENSOR_PAYLOAD["sensor"], last_seen=100)},
+            {
+                "sensor": dict(
+                    PA_SENSOR_PAYLOAD["sensor"],
+                    last_seen=160,
+                    latitude=34.0522,
+                    longitude=-118.2437,
+                )
+            },
+        ]
+
+        logger._poll_and_convert_sensor(282168)
+        first_position = logger._spatial_index.get_position(282168)
+        logger._poll_and_convert_sensor(282168)
+
+        self.assertEqual(first_position, (37.7749, -122.4194))
+        self.assertEqual(
+            logger._spatial_index.get_position(282168), (34.0522, -118.2437)
+        )
+
+    def test_changed_reading_is_reconverted(self):
+        """A poll with a new last_seen produces a fresh device dict."""
+        logger = self._make_logger()
+        logger._purpleair_api_obj.request_sensor_data.side_effect = [
+            {"sensor": dict(PA_SENSOR_PAYLOAD["sensor"], last_seen=100)},
+            {"sensor": dict(PA_SENSOR_PAYLOAD["sensor"], last_seen=160)},
+        ]
+
+        first = logger._poll_and_convert_sensor(282168)
+        second = logger._poll_and_convert_sensor(282168)
+
+        self.assertIsNot(first, second)
+
+    def test_loop_only_publishes_changed_devices(self):
+        """The loop keeps the ETag of sensors whose fingerprint did not move."""
+        logger = self._make_logger()
+        logger._poll_interval = 60
+        logger._sensor_indexes = []
+        logger._sensor_names = {}
+        logger._read_keys = {}
+        logger._matter_devices = {}
+        logger._matter_etags = {}
+        logger._lock = threading.Lock()
+        logger._purpleair_api_obj.request_sensor_data.return_value = {
+            "sensor": dict(PA_SENSOR_PAYLOAD["sensor"], last_seen=100)
+        }
+        etags = []
+
+        def record_etag(_):
+            etags.append(logger._matter_etags[282168])
+            if len(etags) == 2:
+                raise StopIteration
+
+        with patch(
+            "purpleair_data_logger.PurpleAirMatterDataLogger.sleep",
+            side_effect=record_etag,
+        ):
+            with self.assertRaises(StopIteration):
+                logger._run_loop_matter({"sensor_indexes": [282168]})
+
+        self.assertEqual(etags[0], etags[1])
+        self.assertIn(282168, logger._matter_devices)
+
+
+class MatterHTTPServerETagTest(unittest.TestCase):
+    """Tests for ETag revalidation on the single-sensor endpoint."""
+
+    def setUp(self):
+        self.httpd = _MatterHTTPServer(
+            server_address=("127.0.0.1", 0),
+            RequestHandlerClass=_MatterDataLoggerHandler,
+            matter_devices={282168: {"device_type": {"id": 0x002D}}},
+            lock=threading.Lock(),
+            matter_etags={282168: '"00000000000000ab"'},
+        )
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join(timeout=2)
+
+    def _get(self, headers):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=2)
+        try:
+            conn.request("GET", f"{MATTER_SENSOR_PATH_PREFIX}/282168", headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            return resp.status, resp.getheader("ETag")
+        finally:
+            conn.close()
+
+    def test_single_sensor_sends_etag(self):
+        """The single-sensor endpoint exposes the current ETag."""
+        status, etag = self._get({})
+        self.assertEqual(status, 200)
+        self.assertEqual(etag, '"00000000000000ab"')
+
+    def test_matching_if_none_match_returns_304(self):
+        """A matching If-None-Match header short-circuits with 304."""
+        status, etag = self._get({"If-None-Match": '"00000000000000ab"'})
+        self.assertEqual(status, 304)
+        self.assertEqual(etag, '"00000000000000ab"')
+
+
 # =============================================================================
 # Tests — Matter device type correctness
 # =============================================================================
@@ -123,6 +123,74 @@ class PurpleAirPrometheusDataLoggerTest(unittest.TestCase):
             float(sensor_data["pm10.0"]),
         )
 
+    def test_finish_storing_sensor_data_updates_rolling_statistics(self):
+        """
+        Test that the rolling statistics of a stored batch are exported once the batch
+        is stored.
+        """
+
+        # Setup
+        from purpleair_data_logger.PurpleAirDataLoggerHelpers import (
+            store_new_sensor_data,
+        )
+
+        logger = self._make_prometheus_logger()
+        first_reading = dict(DATA_OUT_1[0], data_time_stamp=7200)
+        second_reading = dict(
+            first_reading, data_time_stamp=7260, **{"pm2.5": first_reading["pm2.5"] + 2}
+        )
+
+        # Action
+        store_new_sensor_data(logger, [first_reading, second_reading])
+
+        # Expected Result
+        sensor_index = str(first_reading["sensor_index"])
+        self.assertAlmostEqual(
+            logger._rolling_mean.labels(
+                sensor_index=sensor_index, field="pm2.5", window="1h"
+            )._value.get(),
+            first_reading["pm2.5"] + 1,
+        )
+        self.assertTrue(
+            math.isnan(
+                logger._rolling_nowcast.labels(
+                    sensor_index=sensor_index, field="pm2.5"
+                )._value.get()
+            )
+        )
+        self.assertEqual(logger._sensor_indexes_to_export, set())
+
+    def test_store_sensor_data_updates_window_statistics(self):
+        """
+        Test that a downsampled row exports its sample count and window statistics.
+        """
+
+        # Setup
+        from purpleair_data_logger.PurpleAirDataLoggerDownsampler import (
+            PurpleAirDataLoggerDownsampler,
+        )
+
+        logger = self._make_prometheus_logger()
+        downsampler = PurpleAirDataLoggerDownsampler(60)
+        downsampler.add_sample(dict(DATA_OUT_1[0], data_time_stamp=1200))
+        downsampler.add_sample(dict(DATA_OUT_1[0], data_time_stamp=1230, humidity=50))
+
+        # Action
+        logger.store_sensor_data(downsampler.flush()[0])
+
+        # Expected Result
+        sensor_index = str(DATA_OUT_1[0]["sensor_index"])
+        self.assertEqual(
+            logger._window_sample_count.labels(sensor_index=sensor_index)._value.get(),
+            2,
+        )
+        self.assertEqual(
+            logger._window_statistic.labels(
+                sensor_index=sensor_index, field="humidity", statistic="max"
+            )._value.get(),
+            50,
+        )
+
     def test_store_sensor_data_multiple_sensors(self):
         """
         Test that store_sensor_data correctly handles data from multiple sensors,
@@ -0,0 +1,642 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+"""
+
+import unittest
+import requests_mock as requests_mock_module
+import sys
+import pg8000
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+sys.path.append("../")
+
+from purpleair_data_logger.PurpleAirDataLogger import PurpleAirDataLoggerError
+from purpleair_data_logger.PurpleAirPSQLDataLogger import PurpleAirPSQLDataLogger
+from purpleair_data_logger.PurpleAirDataLoggerHelpers import store_new_sensor_data
+from purpleair_data_logger.PurpleAirPSQLQueryStatements import (
+    PSQL_SCHEMA_VERSION,
+    PSQL_GET_SCHEMA_VERSION,
+    PSQL_INSERT_SCHEMA_VERSION,
+    CREATE_PURPLEAIR_SENSOR_DATA_TABLE,
+    PSQL_CREATE_COMPATIBILITY_VIEWS,
+    PSQL_CREATE_CONTINUOUS_AGGREGATE_STATEMENTS,
+    PSQL_CREATE_CONTINUOUS_AGGREGATE_REFRESH_POLICY_STATEMENTS,
+    PSQL_CREATE_CONTINUOUS_AGGREGATE_RETENTION_POLICY_STATEMENTS,
+    PSQL_ADD_ENRICHMENT_COLUMNS,
+    PSQL_ADD_ENRICHMENT_COLUMNS_WIDE,
+    PSQL_ADD_QUALITY_CONTROL_COLUMNS,
+    PSQL_ADD_QUALITY_CONTROL_COLUMNS_WIDE,
+    CREATE_WINDOW_STATISTICS_FIELDS,
+)
+from purpleair_data_logger.PurpleAirDataLoggerDownsampler import (
+    PurpleAirDataLoggerDownsampler,
+)
+
+from helpers import DATA_OUT_1
+
+PURPLEAIR_KEYS_URL = "https://api.purpleair.com/v1/keys"
+
+# A full sensor data dict (borrowed from helpers.DATA_OUT_1[0])
+SAMPLE_SENSOR_DATA = DATA_OUT_1[0]
+
+
+def make_psql_db_conn(schema_version=PSQL_SCHEMA_VERSION, table_layout="split"):
+    """Helper to create a mock PG8000 connection whose database is at ``schema_version``
+    and uses ``table_layout``."""
+
+    psql_db_conn = MagicMock()
+
+    def run(sql, **params):
+        if sql == PSQL_GET_SCHEMA_VERSION:
+            if schema_version is None:
+                raise pg8000.DatabaseError(
+                    {"S": "ERROR", "C": "42P01", "M": "relation does not exist"}
+                )
+
+            return [[schema_version, table_layout == "wide"]]
+
+        return []
+
+    psql_db_conn.run.side_effect = run
+    return psql_db_conn
+
+
+class PurpleAirPSQLDataLoggerTest(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def _make_psql_logger(self, psql_db_conn, **kwargs):
+        """Helper to create a PurpleAirPSQLDataLogger with mocked PurpleAir API key validation."""
+        with requests_mock_module.Mocker() as m:
+            m.get(
+                PURPLEAIR_KEYS_URL,
+                text='{"api_version": "1.1.1", "time_stamp": 123456789, "api_key_type": "READ"}',
+                status_code=200,
+            )
+            logger = PurpleAirPSQLDataLogger(
+                "test-read-key", None, psql_db_conn, **kwargs
+            )
+        return logger
+
+    def test_up_to_date_database_boots_in_one_query(self):
+        """
+        Test that an up to date database only runs the schema version query.
+        """
+
+        # Setup
+        psql_db_conn = make_psql_db_conn()
+
+        # Action
+        self._make_psql_logger(psql_db_conn)
+
+        # Expected Result
+        psql_db_conn.run.assert_called_once_with(PSQL_GET_SCHEMA_VERSION)
+        self.assertEqual(psql_db_conn.prepare.call_count, 10)
+
+    def test_new_database_is_bootstrapped_and_versioned(self):
+        """
+        Test that a database without the version table is bootstrapped and stamped.
+        """
+
+        # Setup
+        psql_db_conn = make_psql_db_conn(schema_version=None)
+
+        # Action
+        self._make_psql_logger(psql_db_conn)
+
+        # Expected Result
+        psql_db_conn.rollback.assert_called_once()
+        run_sql_list = [call.args[0] for call in psql_db_conn.run.call_args_list]
+        self.assertTrue(any("create_hypertable" in run_sql for run_sql in run_sql_list))
+        psql_db_conn.run.assert_any_call(
+            PSQL_INSERT_SCHEMA_VERSION, version=PSQL_SCHEMA_VERSION
+        )
+
+    def test_newer_database_raises(self):
+        """
+        Test that a database from a newer data logger is rejected.
+        """
+
+        with self.assertRaises(PurpleAirDataLoggerError):
+            self._make_psql_logger(make_psql_db_conn(PSQL_SCHEMA_VERSION + 1))
+
+    @patch("purpleair_data_logger.PurpleAirPSQLDataLogger.sleep")
+    def test_store_sensor_data_reconnects_and_replays(self, mock_sleep):
+        """
+        Test that a broken connection is replaced, the statements are prepared again
+        and the sensor data is stored on the new connection.
+        """
+
+        # Setup
+        broken_psql_db_conn = make_psql_db_conn()
+        new_psql_db_conn = make_psql_db_conn()
+        logger = self._make_psql_logger(
+            broken_psql_db_conn,
+            psql_db_conn_factory=MagicMock(
+                side_effect=[pg8000.InterfaceError("network error"), new_psql_db_conn]
+            ),
+        )
+        broken_psql_db_conn.prepare.return_value.run.side_effect = (
+            pg8000.InterfaceError("network error")
+        )
+
+        # Action
+        logger.store_sensor_data(SAMPLE_SENSOR_DATA)
+
+        # Expected Result
+        self.assertIs(logger._db_conn, new_psql_db_conn)
+        self.assertEqual(new_psql_db_conn.prepare.call_count, 10)
+        self.assertEqual(new_psql_db_conn.prepare.return_value.run.call_count, 9)
+        new_psql_db_conn.commit.assert_called_once()
+        self.assertEqual([call.args[0] for call in mock_sleep.call_args_list], [1, 2])
+
+    @patch("purpleair_data_logger.PurpleAirPSQLDataLogger.sleep")
+    def test_store_sensor_data_gives_up_after_reconnect_attempts(self, mock_sleep):
+        """
+        Test that the data logger gives up once every reconnect attempt failed.
+        """
+
+        # Setup
+        psql_db_conn = make_psql_db_conn()
+        logger = self._make_psql_logger(
+            psql_db_conn,
+            psql_db_conn_factory=MagicMock(side_effect=OSError("refused")),
+            reconnect_attempts=3,
+        )
+        psql_db_conn.prepare.return_value.run.side_effect = pg8000.DatabaseError(
+            {"S": "FATAL", "C": "57P01", "M": "terminating connection"}
+        )
+
+        # Action and Expected Result
+        with self.assertRaises(PurpleAirDataLoggerError):
+            logger.store_sensor_data(SAMPLE_SENSOR_DATA)
+        self.assertEqual(mock_sleep.call_count, 3)
+
+    def test_store_sensor_data_raises_statement_errors(self):
+        """
+        Test that errors which aren't about the connection are raised as is.
+        """
+
+        # Setup
+        psql_db_conn = make_psql_db_conn()
+        psql_db_conn_factory = MagicMock()
+        logger = self._make_psql_logger(
+            psql_db_conn, psql_db_conn_factory=psql_db_conn_factory
+        )
+        psql_db_conn.prepare.return_value.run.side_effect = pg8000.DatabaseError(
+            {"S": "ERROR", "C": "23505", "M": "duplicate key"}
+        )
+
+        # Action and Expected Result
+        with self.assertRaises(pg8000.DatabaseError):
+            logger.store_sensor_data(SAMPLE_SENSOR_DATA)
+        psql_db_conn_factory.assert_not_called()
+
+    def test_store_sensor_data_binds_native_timestamps(self):
+        """
+        Test that timestamps are bound as aware datetimes and that data_time_stamp is
+        converted once per distinct value.
+        """
+
+        # Setup
+        psql_db_conn = make_psql_db_conn()
+        logger = self._make_psql_logger(psql_db_conn)
+        prepared_statement = psql_db_conn.prepare.return_value
+
+        # Action
+        with patch.object(
+            logger,
+            "_convert_unix_epoch_timestamp_to_psql_timestamp",
+            wraps=logger._convert_unix_epoch_timestamp_to_psql_timestamp,
+        ) as mock_convert:
+            logger.store_sensor_data(SAMPLE_SENSOR_DATA)
+            logger.store_sensor_data(dict(SAMPLE_SENSOR_DATA, sensor_index=2))
+
+        # Expected Result
+        expected_data_time_stamp = datetime.fromtimestamp(
+            SAMPLE_SENSOR_DATA["data_time_stamp"], timezone.utc
+        )
+        for call in prepared_statement.run.call_args_list:
+            self.assertEqual(call.kwargs["data_time_stamp"], expected_data_time_stamp)
+
+        # One data_time_stamp plus last_seen/last_modified/date_created for each row
+        self.assertEqual(mock_convert.call_count, 1 + 3 * 2)
+
+    def test_wide_table_layout_bootstraps_one_hypertable_and_views(self):
+        """
+        Test that the wide table layout creates a single hypertable for the readings
+        plus the compatibility views.
+        """
+
+        # Setup
+        psql_db_conn = make_psql_db_conn(schema_version=None)
+
+        # Action
+        self._make_psql_logger(psql_db_conn, table_layout="wide")
+
+        # Expected Result
+        run_sql_list = [call.args[0] for call in psql_db_conn.run.call_args_list]
+        self.assertIn(CREATE_PURPLEAIR_SENSOR_DATA_TABLE, run_sql_list)
+        self.assertIn(PSQL_CREATE_COMPATIBILITY_VIEWS, run_sql_list)
+        hypertable_sql_list = [
+            run_sql for run_sql in run_sql_list if "create_hypertable" in run_sql
+        ]
+        self.assertEqual(len(hypertable_sql_list), 2)
+        self.assertIn("purpleair_sensor_data", hypertable_sql_list[0])
+        self.assertIn("window_statistics_fields", hypertable_sql_list[1])
+
+    def test_wide_table_layout_stores_one_row_per_reading(self):
+        """
+        Test that the wide table layout runs a single insert with every field. The
+        window statistics statement is prepared too but only runs for window rows.
+        """
+
+        # Setup
+        psql_db_conn = make_psql_db_conn(table_layout="wide")
+        logger = self._make_psql_logger(psql_db_conn, table_layout="wide")
+        prepared_statement = psql_db_conn.prepare.return_value
+
+        # Action
+        logger.store_sensor_data(SAMPLE_SENSOR_DATA)
+
+        # Expected Result
+        self.assertEqual(psql_db_conn.prepare.call_count, 2)
+        prepared_statement.run.assert_called_once()
+        run_kwargs = prepared_statement.run.call_args.kwargs
+        self.assertEqual(run_kwargs["sensor_index"], SAMPLE_SENSOR_DATA["sensor_index"])
+        self.assertEqual(run_kwargs["pm2_5"], SAMPLE_SENSOR_DATA["pm2.5"])
+        self.assertEqual(run_kwargs["temperature"], SAMPLE_SENSOR_DATA["temperature"])
+
+    def test_table_layout_mismatch_raises(self):
+        """
+        Test that a bootstrapped database can't be opened with another table layout.
+        """
+
+        with self.assertRaises(PurpleAirDataLoggerError):
+            self._make_psql_logger(make_psql_db_conn(), table_layout="wide")
+
+        with self.assertRaises(PurpleAirDataLoggerError):
+            self._make_psql_logger(
+                make_psql_db_conn(table_layout="wide"), table_layout="split"
+            )
+
+    def test_unknown_table_layout_raises(self):
+        """
+        Test that an unknown table layout is rejected.
+        """
+
+        with self.assertRaises(PurpleAirDataLoggerError):
+            self._make_psql_logger(make_psql_db_conn(), table_layout="tall")
+
+    def test_multi_resolution_continuous_aggregates_are_created(self):
+        """
+        Test that a v1 database gets the 5m/1h/1d continuous aggregates with their
+        refresh and retention policies, without being bootstrapped again.
+        """
+
+        # Setup
+        psql_db_conn = make_psql_db_conn(schema_version=1)
+
+        # Action
+        self._make_psql_logger(psql_db_conn)
+
+        # Expected Result
+        run_sql_list = [call.args[0] for call in psql_db_conn.run.call_args_list]
+        self.assertFalse(
+            any(
+                "create_hypertable" in run_sql
+                and "window_statistics_fields" not in run_sql
+                for run_sql in run_sql_list
+            )
+        )
+        for (
+            key,
+            create_statement,
+        ) in PSQL_CREATE_CONTINUOUS_AGGREGATE_STATEMENTS.items():
+            self.assertIn(create_statement, run_sql_list)
+            self.assertIn(
+                PSQL_CREATE_CONTINUOUS_AGGREGATE_REFRESH_POLICY_STATEMENTS[key],
+                run_sql_list,
+            )
+
+        self.assertIn(
+            PSQL_CREATE_CONTINUOUS_AGGREGATE_RETENTION_POLICY_STATEMENTS[
+                ("pm2_5_fields", "5m")
+            ],
+            run_sql_list,
+        )
+        self.assertNotIn(
+            ("pm2_5_fields", "1d"),
+            PSQL_CREATE_CONTINUOUS_AGGREGATE_RETENTION_POLICY_STATEMENTS,
+        )
+        psql_db_conn.run.assert_any_call(
+            PSQL_INSERT_SCHEMA_VERSION, version=PSQL_SCHEMA_VERSION
+        )
+
+    def test_continuous_aggregate_resolutions_are_configurable(self):
+        """
+        Test that only the requested continuous aggregate resolutions are created and
+        that unknown ones are rejected.
+        """
+
+        # Setup
+        psql_db_conn = make_psql_db_conn(schema_version=None)
+
+        # Action
+        self._make_psql_logger(psql_db_conn, continuous_aggregate_resolutions=("1h",))
+
+        # Expected Result
+        run_sql_list = [call.args[0] for call in psql_db_conn.run.call_args_list]
+        self.assertIn(
+            PSQL_CREATE_CONTINUOUS_AGGREGATE_STATEMENTS[("pm10_0_fields", "1h")],
+            run_sql_list,
+        )
+        self.assertNotIn(
+            PSQL_CREATE_CONTINUOUS_AGGREGATE_STATEMENTS[("pm10_0_fields", "5m")],
+            run_sql_list,
+        )
+        with self.assertRaises(PurpleAirDataLoggerError):
+            self._make_psql_logger(
+                make_psql_db_conn(), continuous_aggregate_resolutions=("15m",)
+            )
+
+    def test_enrichment_columns_are_added_to_v2_databases(self):
+        """
+        Test that a v2 database gets the enrichment columns, and that a wide table
+        layout database also gets its views replaced.
+        """
+
+        # Setup
+        psql_db_conn = make_psql_db_conn(schema_version=2)
+        wide_psql_db_conn = make_psql_db_conn(schema_version=2, table_layout="wide")
+
+        # Action
+        self._make_psql_logger(psql_db_conn)
+        self._make_psql_logger(wide_psql_db_conn, table_layout="wide")
+
+        # Expected Result
+        run_sql_list = [call.args[0] for call in psql_db_conn.run.call_args_list]
+        self.assertIn(PSQL_ADD_ENRICHMENT_COLUMNS, run_sql_list)
+        self.assertFalse(
+            any(
+                "create_hypertable" in run_sql
+                and "window_statistics_fields" not in run_sql
+                for run_sql in run_sql_list
+            )
+        )
+        wide_run_sql_list = [
+            call.args[0] for call in wide_psql_db_conn.run.call_args_list
+        ]
+        self.assertIn(PSQL_ADD_ENRICHMENT_COLUMNS_WIDE, wide_run_sql_list)
+        self.assertIn(PSQL_CREATE_COMPATIBILITY_VIEWS, wide_run_sql_list)
+
+    def test_wide_table_layout_v2_database_is_upgraded(self):
+        """
+        Test that a wide table layout v2 database gets every missing column before its
+        views, which select them, are replaced once.
+        """
+
+        # Setup
+        psql_db_conn = make_psql_db_conn(schema_version=2, table_layout="wide")
+        run_without_views = psql_db_conn.run.side_effect
+        run_sql_list = []
+
+        def run(sql, **params):
+            if (
+                sql == PSQL_CREATE_COMPATIBILITY_VIEWS
+                and PSQL_ADD_QUALITY_CONTROL_COLUMNS_WIDE not in run_sql_list
+            ):
+                raise pg8000.DatabaseError(
+                    {
+                        "S": "ERROR",
+                        "C": "42703",
+                        "M": 'column "qc_flags" does not exist',
+                    }
+                )
+
+            run_sql_list.append(sql)
+            return run_without_views(sql, **params)
+
+        psql_db_conn.run.side_effect = run
+
+        # Action
+        self._make_psql_logger(psql_db_conn, table_layout="wide")
+
+        # Expected Result
+        self.assertEqual(run_sql_list.count(PSQL_CREATE_COMPATIBILITY_VIEWS), 1)
+        self.assertLess(
+            run_sql_list.index(PSQL_ADD_ENRICHMENT_COLUMNS_WIDE),
+            run_sql_list.index(PSQL_CREATE_COMPATIBILITY_VIEWS),
+        )
+        psql_db_conn.run.assert_any_call(
+            PSQL_INSERT_SCHEMA_VERSION, version=PSQL_SCHEMA_VERSION
+        )
+
+    def test_quality_control_columns_are_added_to_v3_databases(self):
+        """
+        Test that a v3 database only gets the quality control columns.
+        """
+
+        # Setup
+        psql_db_conn = make_psql_db_conn(schema_version=3)
+
+        # Action
+        self._make_psql_logger(psql_db_conn)
+
+        # Expected Result
+        run_sql_list = [call.args[0] for call in psql_db_conn.run.call_args_list]
+        self.assertIn(PSQL_ADD_QUALITY_CONTROL_COLUMNS, run_sql_list)
+        self.assertNotIn(PSQL_ADD_ENRICHMENT_COLUMNS, run_sql_list)
+        psql_db_conn.run.assert_any_call(
+            PSQL_INSERT_SCHEMA_VERSION, version=PSQL_SCHEMA_VERSION
+        )
+
+    def test_window_statistics_table_is_added_to_v4_databases(self):
+        """
+        Test that a v4 database only gets the window_statistics_fields table.
+        """
+
+        # Setup
+        psql_db_conn = make_psql_db_conn(schema_version=4)
+
+        # Action
+        self._make_psql_logger(psql_db_conn)
+
+        # Expected Result
+        run_sql_list = [call.args[0] for call in psql_db_conn.run.call_args_list]
+        self.assertIn(CREATE_WINDOW_STATISTICS_FIELDS, run_sql_list)
+        self.assertNotIn(PSQL_ADD_QUALITY_CONTROL_COLUMNS, run_sql_list)
+        psql_db_conn.run.assert_any_call(
+            PSQL_INSERT_SCHEMA_VERSION, version=PSQL_SCHEMA_VERSION
+        )
+
+    def test_store_sensor_data_inserts_the_window_statistics(self):
+        """
+        Test that a downsampled row also stores its window statistics.
+        """
+
+        # Setup
+        psql_db_conn = make_psql_db_conn()
+        logger = self._make_psql_logger(psql_db_conn)
+        prepared_statement = psql_db_conn.prepare.return_value
+        downsampler = PurpleAirDataLoggerDownsampler(60)
+        downsampler.add_sample(dict(SAMPLE_SENSOR_DATA, data_time_stamp=1200))
+        downsampler.add_sample(
+            dict(SAMPLE_SENSOR_DATA, data_time_stamp=1230, humidity=50)
+        )
+
+        # Action
+        logger.store_sensor_data(downsampler.flush()[0])
+
+        # Expected Result
+        self.assertEqual(prepared_statement.run.call_count, 10)
+        run_kwargs = prepared_statement.run.call_args.kwargs
+        self.assertEqual(run_kwargs["sample_count"], 2)
+        self.assertEqual(run_kwargs["humidity_max"], 50)
+        self.assertIn("pm2_5_atm_stddev", run_kwargs)
+
+    def test_async_writer_stores_each_batch_in_one_transaction(self):
+        """
+        Test that the async writer stores a whole batch in the background and commits
+        it once.
+        """
+
+        # Setup
+        psql_db_conn = make_psql_db_conn()
+        logger = self._make_psql_logger(psql_db_conn, async_writer=True)
+        prepared_statement = psql_db_conn.prepare.return_value
+        psql_db_conn.commit.reset_mock()
+
+        # Action
+        logger.store_sensor_data(SAMPLE_SENSOR_DATA)
+        logger.store_sensor_data(dict(SAMPLE_SENSOR_DATA, sensor_index=2))
+        self.assertEqual(prepared_statement.run.call_count, 0)
+        logger.finish_storing_sensor_data()
+        logger.wait_for_pending_writes()
+
+        # Expected Result
+        self.assertEqual(prepared_statement.run.call_count, 9 * 2)
+        psql_db_conn.commit.assert_called_once()
+
+    def test_async_writer_connection_errors_are_raised_and_the_batch_is_retried(
+        self,
+    ):
+        """
+        Test that a batch the writer thread couldn't reach the database for is reported
+        to the caller, that it is stored on a later attempt and that it is only
+        remembered as stored once it is committed.
+        """
+
+        # Setup
+        psql_db_conn = make_psql_db_conn()
+        logger = self._make_psql_logger(psql_db_conn, async_writer=True)
+        logger.configure_ring_buffer()
+        prepared_statement = psql_db_conn.prepare.return_value
+        prepared_statement.run.side_effect = pg8000.DatabaseError(
+            {"S": "FATAL", "C": "08006", "M": "connection failure"}
+        )
+        psql_db_conn.commit.reset_mock()
+        key = logger._deduplication_cache.make_key(SAMPLE_SENSOR_DATA)
+
+        # Action
+        self.assertEqual(store_new_sensor_data(logger, [SAMPLE_SENSOR_DATA]), 1)
+
+        # Expected Result
+        with self.assertRaises(PurpleAirDataLoggerError):
+            logger.wait_for_pending_writes()
+        psql_db_conn.rollback.assert_called_once()
+        psql_db_conn.commit.assert_not_called()
+        self.assertFalse(logger._deduplication_cache.contains(key))
+        self.assertNotIn(SAMPLE_SENSOR_DATA["sensor_index"], logger.ring_buffer)
+
+        # The database recovered so the kept batch is stored by the next attempt
+        prepared_statement.run.side_effect = None
+        prepared_statement.run.reset_mock()
+        logger.wait_for_pending_writes()
+        self.assertEqual(prepared_statement.run.call_count, 9)
+        psql_db_conn.commit.assert_called_once()
+        self.assertTrue(logger._deduplication_cache.contains(key))
+        self.assertIn(SAMPLE_SENSOR_DATA["sensor_index"], logger.ring_buffer)
+        self.assertEqual(store_new_sensor_data(logger, [SAMPLE_SENSOR_DATA]), 0)
+
+    def test_async_writer_drops_only_the_rows_that_fail(self):
+        """
+        Test that a batch that fails for another reason than the connection is stored
+        row by row, that only the bad row is dropped and that nothing is retried.
+        """
+
+        # Setup
+        psql_db_conn = make_psql_db_conn()
+        logger = self._make_psql_logger(psql_db_conn, async_writer=True)
+        prepared_statement = psql_db_conn.prepare.return_value
+
+        def run(**params):
+            if params["sensor_index"] == 2:
+                raise pg8000.DatabaseError(
+                    {"S": "ERROR", "C": "23505", "M": "duplicate key"}
+                )
+
+        prepared_statement.run.side_effect = run
+        psql_db_conn.commit.reset_mock()
+        sensor_data_list = [
+            dict(SAMPLE_SENSOR_DATA, sensor_index=sensor_index)
+            for sensor_index in (1, 2, 3)
+        ]
+
+        # Action
+        store_new_sensor_data(logger, sensor_data_list)
+        with self.assertRaises(PurpleAirDataLoggerError):
+            logger.wait_for_pending_writes()
+        prepared_statement.run.reset_mock()
+        logger.wait_for_pending_writes()
+
+        # Expected Result
+        self.assertEqual(psql_db_conn.commit.call_count, 2)
+        prepared_statement.run.assert_not_called()
+        self.assertEqual(logger._failed_sensor_data, [])
+        for sensor_index, is_stored in ((1, True), (2, False), (3, True)):
+            self.assertEqual(
+                logger._deduplication_cache.contains(
+                    (sensor_index, SAMPLE_SENSOR_DATA["data_time_stamp"])
+                ),
+                is_stored,
+            )
+
+    @patch(
+        "purpleair_data_logger.PurpleAirPSQLDataLogger.PSQL_MAX_WRITER_RETRY_ROWS", 2
+    )
+    def test_async_writer_keeps_a_bounded_number_of_rows_to_retry(self):
+        """
+        Test that the oldest rows are dropped once more rows than
+        PSQL_MAX_WRITER_RETRY_ROWS are kept to retry.
+        """
+
+        # Setup
+        psql_db_conn = make_psql_db_conn()
+        logger = self._make_psql_logger(psql_db_conn, async_writer=True)
+        psql_db_conn.prepare.return_value.run.side_effect = pg8000.InterfaceError(
+            "network error"
+        )
+
+        # Action
+        for sensor_index in (1, 2, 3):
+            logger.store_sensor_data(
+                dict(SAMPLE_SENSOR_DATA, sensor_index=sensor_index)
+            )
+        with self.assertRaises(PurpleAirDataLoggerError):
+            logger.wait_for_pending_writes()
+
+        # Expected Result
+        self.assertEqual(
+            [
+                single_sensor_data_dict["sensor_index"]
+                for single_sensor_data_dict in logger._failed_sensor_data
+            ],
+            [2, 3],
+        )
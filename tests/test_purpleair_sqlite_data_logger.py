@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+"""
+
+import unittest
+import requests_mock as requests_mock_module
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.append("../")
+
+from purpleair_data_logger.PurpleAirDataLogger import PurpleAirDataLoggerError
+from purpleair_data_logger.PurpleAirSQLiteDataLogger import (
+    PurpleAirSQLiteDataLogger,
+    connect_sqlite_data_base_read_only,
+    connect_sqlite_partitions_read_only,
+    get_sqlite_partition_name,
+)
+
+from purpleair_data_logger.PurpleAirDataLoggerDownsampler import (
+    PurpleAirDataLoggerDownsampler,
+)
+
+from helpers import DATA_OUT_1
+
+PURPLEAIR_KEYS_URL = "https://api.purpleair.com/v1/keys"
+
+# A full sensor data dict (borrowed from helpers.DATA_OUT_1[0])
+SAMPLE_SENSOR_DATA = DATA_OUT_1[0]
+
+
+class PurpleAirSQLiteDataLoggerTest(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def _make_sqlite_logger(self, sqlite_data_base_name=":memory:", **kwargs):
+        """Helper to create an in memory PurpleAirSQLiteDataLogger with mocked PurpleAir API key validation."""
+        with requests_mock_module.Mocker() as m:
+            m.get(
+                PURPLEAIR_KEYS_URL,
+                text='{"api_version": "1.1.1", "time_stamp": 123456789, "api_key_type": "READ"}',
+                status_code=200,
+            )
+            logger = PurpleAirSQLiteDataLogger(
+                "test-read-key", None, sqlite_data_base_name, **kwargs
+            )
+        return logger
+
+    def test_store_sensor_data_inserts_one_row_per_table(self):
+        """
+        Test that store_sensor_data writes the sensor data into every table.
+        """
+
+        # Setup
+        logger = self._make_sqlite_logger()
+
+        # Action
+        logger.store_sensor_data(SAMPLE_SENSOR_DATA)
+
+        # Expected Result
+        for table_name in logger._db_insert_statements:
+            row_count = logger._db_conn.execute(
+                f"SELECT COUNT(*) FROM {table_name}"
+            ).fetchone()[0]
+            self.assertEqual(
+                row_count, 0 if table_name == "window_statistics_fields" else 1
+            )
+
+    def test_store_sensor_data_inserts_the_window_statistics(self):
+        """
+        Test that a downsampled row stores its window statistics next to the means.
+        """
+
+        # Setup
+        logger = self._make_sqlite_logger()
+        downsampler = PurpleAirDataLoggerDownsampler(60)
+        downsampler.add_sample(dict(SAMPLE_SENSOR_DATA, data_time_stamp=1200))
+        downsampler.add_sample(
+            dict(SAMPLE_SENSOR_DATA, data_time_stamp=1230, humidity=50)
+        )
+        window_row = downsampler.flush()[0]
+
+        # Action
+        logger.store_sensor_data(window_row)
+
+        # Expected Result
+        rows = logger._db_conn.execute(
+            "SELECT data_time_stamp, sensor_index, sample_count, humidity_min, humidity_max FROM window_statistics_fields"
+        ).fetchall()
+        self.assertEqual(
+            rows,
+            [
+                (
+                    "1200",
+                    SAMPLE_SENSOR_DATA["sensor_index"],
+                    2,
+                    min(SAMPLE_SENSOR_DATA["humidity"], 50),
+                    max(SAMPLE_SENSOR_DATA["humidity"], 50),
+                )
+            ],
+        )
+
+    def test_conflict_mode_insert_raises_on_duplicate(self):
+        """
+        Test that the default conflict mode keeps raising on a duplicate row.
+        """
+
+        # Setup
+        logger = self._make_sqlite_logger()
+        logger.store_sensor_data(SAMPLE_SENSOR_DATA)
+
+        # Action and Expected Result
+        with self.assertRaises(sqlite3.IntegrityError):
+            logger.store_sensor_data(SAMPLE_SENSOR_DATA)
+
+    def test_conflict_mode_ignore_keeps_the_stored_row(self):
+        """
+        Test that the 'ignore' conflict mode makes a retried row a no-op.
+        """
+
+        # Setup
+        logger = self._make_sqlite_logger(conflict_mode="ignore")
+        logger.store_sensor_data(SAMPLE_SENSOR_DATA)
+        retried_sensor_data = dict(SAMPLE_SENSOR_DATA, humidity=99)
+
+        # Action
+        logger.store_sensor_data(retried_sensor_data)
+
+        # Expected Result
+        rows = logger._db_conn.execute(
+            "SELECT humidity FROM environmental_fields"
+        ).fetchall()
+        self.assertEqual(rows, [(SAMPLE_SENSOR_DATA["humidity"],)])
+
+    def test_conflict_mode_update_overwrites_the_stored_row(self):
+        """
+        Test that the 'update' conflict mode overwrites the stored row.
+        """
+
+        # Setup
+        logger = self._make_sqlite_logger(conflict_mode="update")
+        logger.store_sensor_data(SAMPLE_SENSOR_DATA)
+        retried_sensor_data = dict(SAMPLE_SENSOR_DATA, humidity=99)
+
+        # Action
+        logger.store_sensor_data(retried_sensor_data)
+
+        # Expected Result
+        rows = logger._db_conn.execute(
+            "SELECT humidity FROM environmental_fields"
+        ).fetchall()
+        self.assertEqual(rows, [(99,)])
+
+    def test_unknown_conflict_mode_raises(self):
+        """
+        Test that an unknown conflict mode is rejected.
+        """
+
+        # Action and Expected Result
+        with self.assertRaises(PurpleAirDataLoggerError):
+            self._make_sqlite_logger(conflict_mode="replace")
+
+    def test_wal_performance_profile_sets_pragmas(self):
+        """
+        Test that the 'wal' performance profile switches the journal mode and
+        synchronous level.
+        """
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Setup
+            db_path = os.path.join(temp_dir, "test.db")
+
+            # Action
+            logger = self._make_sqlite_logger(db_path, performance_profile="wal")
+
+            # Expected Result
+            journal_mode = logger._db_conn.execute("PRAGMA journal_mode").fetchone()
+            synchronous = logger._db_conn.execute("PRAGMA synchronous").fetchone()
+            self.assertEqual(journal_mode, ("wal",))
+            self.assertEqual(synchronous, (1,))
+            logger._db_conn.close()
+
+    def test_wal_checkpoint_runs_every_interval(self):
+        """
+        Test that the WAL is checkpointed after wal_checkpoint_interval commits.
+        """
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Setup
+            db_path = os.path.join(temp_dir, "test.db")
+            logger = self._make_sqlite_logger(
+                db_path, performance_profile="wal", wal_checkpoint_interval=2
+            )
+
+            # Action
+            logger.store_sensor_data(SAMPLE_SENSOR_DATA)
+            commits_after_first_store = logger._commits_since_wal_checkpoint
+            logger.store_sensor_data(dict(SAMPLE_SENSOR_DATA, data_time_stamp=1))
+
+            # Expected Result
+            self.assertEqual(commits_after_first_store, 1)
+            self.assertEqual(logger._commits_since_wal_checkpoint, 0)
+            logger._db_conn.close()
+
+    def test_read_only_connection_reads_but_cannot_write(self):
+        """
+        Test that a read only connection sees the logger's rows and refuses writes.
+        """
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Setup
+            db_path = os.path.join(temp_dir, "test.db")
+            logger = self._make_sqlite_logger(db_path, performance_profile="wal")
+            logger.store_sensor_data(SAMPLE_SENSOR_DATA)
+
+            # Action
+            read_only_conn = connect_sqlite_data_base_read_only(db_path, "wal")
+
+            # Expected Result
+            row_count = read_only_conn.execute(
+                "SELECT COUNT(*) FROM environmental_fields"
+            ).fetchone()[0]
+            self.assertEqual(row_count, 1)
+            with self.assertRaises(sqlite3.OperationalError):
+                read_only_conn.execute("DELETE FROM environmental_fields")
+
+            read_only_conn.close()
+            logger._db_conn.close()
+
+    def test_unknown_performance_profile_raises(self):
+        """
+        Test that an unknown performance profile is rejected.
+        """
+
+        # Action and Expected Result
+        with self.assertRaises(PurpleAirDataLoggerError):
+            self._make_sqlite_logger(performance_profile="fast")
+
+    def test_schema_version_2_stores_integer_timestamps(self):
+        """
+        Test that schema version 2 stores timestamps as integers in WITHOUT ROWID tables.
+        """
+
+        # Setup
+        logger = self._make_sqlite_logger(schema_version=2)
+
+        # Action
+        logger.store_sensor_data(SAMPLE_SENSOR_DATA)
+
+        # Expected Result
+        row = logger._db_conn.execute(
+            "SELECT typeof(data_time_stamp), typeof(last_seen) FROM station_information_and_status_fields"
+        ).fetchone()
+        self.assertEqual(row, ("integer", "integer"))
+        self.assertEqual(
+            logger._db_conn.execute("PRAGMA user_version").fetchone(), (2,)
+        )
+        table_sql = logger._db_conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'environmental_fields'"
+        ).fetchone()[0]
+        self.assertIn("WITHOUT ROWID", table_sql)
+
+    def test_schema_version_mismatch_raises(self):
+        """
+        Test that opening a v1 file with schema version 2 is rejected.
+        """
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Setup
+            db_path = os.path.join(temp_dir, "test.db")
+            self._make_sqlite_logger(db_path)._db_conn.close()
+
+            # Action and Expected Result
+            with self.assertRaises(PurpleAirDataLoggerError):
+                self._make_sqlite_logger(db_path, schema_version=2)
+
+    def test_get_sqlite_partition_name(self):
+        """
+        Test that partition names carry the month or ISO week of the timestamp.
+        """
+
+        # 2023-01-01T12:00:00Z is a Sunday in ISO week 52 of 2022
+        self.assertEqual(
+            get_sqlite_partition_name("data/test.db", "month", 1672574400),
+            "data/test_2023_01.db",
+        )
+        self.assertEqual(
+            get_sqlite_partition_name("data/test.db", "week", 1672574400),
+            "data/test_2022_W52.db",
+        )
+
+    def test_partitioned_logger_writes_one_file_per_month(self):
+        """
+        Test that rows land in the partition file of their data_time_stamp and that
+        the reader helper attaches every partition in a time range.
+        """
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Setup
+            db_path = os.path.join(temp_dir, "test.db")
+            logger = self._make_sqlite_logger(db_path, partition_period="month")
+            january_time_stamp = 1672574400
+            february_time_stamp = 1675252800
+
+            # Action
+            logger.store_sensor_data(
+                dict(SAMPLE_SENSOR_DATA, data_time_stamp=january_time_stamp)
+            )
+            logger.store_sensor_data(
+                dict(SAMPLE_SENSOR_DATA, data_time_stamp=february_time_stamp)
+            )
+
+            # Expected Result
+            for time_stamp in (january_time_stamp, february_time_stamp):
+                partition_conn = connect_sqlite_data_base_read_only(
+                    get_sqlite_partition_name(db_path, "month", time_stamp)
+                )
+                rows = partition_conn.execute(
+                    "SELECT data_time_stamp FROM pm2_5_fields"
+                ).fetchall()
+                self.assertEqual(rows, [(str(time_stamp),)])
+                partition_conn.close()
+
+            # At most two partitions stay open, so the current month's file was closed
+            self.assertEqual(len(logger._db_partition_conns), 2)
+
+            reader_conn = connect_sqlite_partitions_read_only(
+                db_path, "month", january_time_stamp, february_time_stamp
+            )
+            row_count = reader_conn.execute(
+                "SELECT COUNT(*) FROM pm2_5_fields"
+            ).fetchone()[0]
+            self.assertEqual(row_count, 2)
+            reader_conn.close()
+
+            for partition_conn in logger._db_partition_conns.values():
+                partition_conn.close()
+
+    def test_rollups_are_refreshed_for_touched_buckets(self):
+        """
+        Test that finish_storing_sensor_data recomputes the rollup buckets of the
+        stored rows, including a bucket that gets a new row in a later batch.
+        """
+
+        for schema_version in (1, 2):
+            with self.subTest(schema_version=schema_version):
+                # Setup
+                logger = self._make_sqlite_logger(
+                    schema_version=schema_version, rollups=True
+                )
+                hour_time_stamp = 1672574400
+
+                # Action
+                for offset, pm2_5 in ((0, 10.0), (120, 20.0)):
+                    logger.store_sensor_data(
+                        dict(
+                            SAMPLE_SENSOR_DATA,
+                            data_time_stamp=hour_time_stamp + offset,
+                            **{"pm2.5": pm2_5},
+                        )
+                    )
+                logger.finish_storing_sensor_data()
+
+                logger.store_sensor_data(
+                    dict(
+                        SAMPLE_SENSOR_DATA,
+                        data_time_stamp=hour_time_stamp + 600,
+                        **{"pm2.5": 60.0},
+                    )
+                )
+                logger.finish_storing_sensor_data()
+
+                # Expected Result
+                five_minute_rows = logger._db_conn.execute(
+                    "SELECT bucket_time_stamp, sample_count, pm2_5_avg, pm2_5_min, pm2_5_max FROM pm2_5_fields_rollup_5m ORDER BY 1"
+                ).fetchall()
+                self.assertEqual(
+                    five_minute_rows,
+                    [
+                        (hour_time_stamp, 2, 15.0, 10.0, 20.0),
+                        (hour_time_stamp + 600, 1, 60.0, 60.0, 60.0),
+                    ],
+                )
+                hour_row = logger._db_conn.execute(
+                    "SELECT bucket_time_stamp, sample_count, pm2_5_avg, pm2_5_min, pm2_5_max FROM pm2_5_fields_rollup_1h"
+                ).fetchone()
+                self.assertEqual(hour_row, (hour_time_stamp, 3, 30.0, 10.0, 60.0))
+                self.assertEqual(len(logger._rollup_pending_keys), 0)
+
+    def test_retention_deletes_expired_rows_in_chunks(self):
+        """
+        Test that expired rows are deleted a chunk at a time after each batch and that
+        rollups can be kept longer than the raw rows.
+        """
+
+        # Setup
+        logger = self._make_sqlite_logger(
+            schema_version=2,
+            rollups=True,
+            retention_days=1,
+            rollup_retention_days=30,
+            retention_chunk_size=2,
+        )
+        two_days_ago = int(time.time()) - 2 * 86400
+        for offset in range(3):
+            logger.store_sensor_data(
+                dict(SAMPLE_SENSOR_DATA, data_time_stamp=two_days_ago + offset * 600)
+            )
+        logger.store_sensor_data(dict(SAMPLE_SENSOR_DATA, data_time_stamp=time.time()))
+
+        # Action
+        logger.finish_storing_sensor_data()
+        row_count_after_first_batch = logger._db_conn.execute(
+            "SELECT COUNT(*) FROM pm2_5_fields"
+        ).fetchone()[0]
+        logger.finish_storing_sensor_data()
+
+        # Expected Result
+        self.assertEqual(row_count_after_first_batch, 2)
+        self.assertEqual(
+            logger._db_conn.execute("SELECT COUNT(*) FROM pm2_5_fields").fetchone()[0],
+            1,
+        )
+        self.assertEqual(
+            logger._db_conn.execute(
+                "SELECT COUNT(*) FROM pm2_5_fields_rollup_5m"
+            ).fetchone()[0],
+            4,
+        )
+        self.assertEqual(logger._db_conn.execute("PRAGMA auto_vacuum").fetchone(), (2,))
+
+    def test_retention_frees_pages_with_the_wal_performance_profile(self):
+        """
+        Test that a new file under the 'wal' performance profile still gets incremental
+        auto vacuum, so the pages of expired rows are handed back to the file system.
+        """
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Setup
+            db_path = os.path.join(temp_dir, "test.db")
+            logger = self._make_sqlite_logger(
+                db_path, performance_profile="wal", retention_days=1
+            )
+            two_days_ago = int(time.time()) - 2 * 86400
+            for offset in range(200):
+                logger.store_sensor_data(
+                    dict(SAMPLE_SENSOR_DATA, data_time_stamp=two_days_ago + offset)
+                )
+            logger._db_conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            page_count_before_retention = logger._db_conn.execute(
+                "PRAGMA page_count"
+            ).fetchone()[0]
+
+            # Action
+            logger.finish_storing_sensor_data()
+            logger._db_conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+            # Expected Result
+            self.assertEqual(
+                logger._db_conn.execute("PRAGMA journal_mode").fetchone(), ("wal",)
+            )
+            self.assertEqual(
+                logger._db_conn.execute("PRAGMA auto_vacuum").fetchone(), (2,)
+            )
+            self.assertEqual(
+                logger._db_conn.execute("SELECT COUNT(*) FROM pm2_5_fields").fetchone()[
+                    0
+                ],
+                0,
+            )
+            self.assertLess(
+                logger._db_conn.execute("PRAGMA page_count").fetchone()[0],
+                page_count_before_retention,
+            )
+            logger._db_conn.close()
+
+    def test_retention_removes_expired_partition_files(self):
+        """
+        Test that partition files that only hold expired rows are deleted.
+        """
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Setup
+            db_path = os.path.join(temp_dir, "test.db")
+            logger = self._make_sqlite_logger(
+                db_path, partition_period="month", retention_days=31
+            )
+            old_time_stamp = 1672574400
+            logger.store_sensor_data(
+                dict(SAMPLE_SENSOR_DATA, data_time_stamp=old_time_stamp)
+            )
+            old_partition_name = get_sqlite_partition_name(
+                db_path, "month", old_time_stamp
+            )
+            self.assertTrue(os.path.exists(old_partition_name))
+
+            # Action
+            logger.finish_storing_sensor_data()
+
+            # Expected Result
+            self.assertFalse(os.path.exists(old_partition_name))
+            self.assertEqual(
+                os.listdir(temp_dir),
+                [
+                    os.path.basename(
+                        get_sqlite_partition_name(db_path, "month", time.time())
+                    )
+                ],
+            )
+            for partition_conn in logger._db_partition_conns.values():
+                partition_conn.close()
+
+    def test_invalid_retention_raises(self):
+        """
+        Test that retention on unknown tables or of less than a day is rejected.
+        """
+
+        with self.assertRaises(PurpleAirDataLoggerError):
+            self._make_sqlite_logger(retention_days={"not_a_table": 1})
+
+        with self.assertRaises(PurpleAirDataLoggerError):
+            self._make_sqlite_logger(retention_days=0)
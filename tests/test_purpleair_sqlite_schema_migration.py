@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+"""
+Copyright 2026 carlkidcrypto, All rights reserved.
+"""
+
+import unittest
+import requests_mock as requests_mock_module
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.append("../")
+
+from purpleair_data_logger.PurpleAirDataLogger import PurpleAirDataLoggerError
+from purpleair_data_logger.PurpleAirSQLiteDataLogger import (
+    PurpleAirSQLiteDataLogger,
+)
+from purpleair_data_logger.PurpleAirSQLiteSchemaMigration import (
+    migrate_sqlite_data_base_to_v2,
+)
+
+from helpers import DATA_OUT_1
+
+PURPLEAIR_KEYS_URL = "https://api.purpleair.com/v1/keys"
+
+
+class PurpleAirSQLiteSchemaMigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "test.db")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _make_sqlite_logger(self, **kwargs):
+        """Helper to create a PurpleAirSQLiteDataLogger with mocked PurpleAir API key validation."""
+        with requests_mock_module.Mocker() as m:
+            m.get(
+                PURPLEAIR_KEYS_URL,
+                text='{"api_version": "1.1.1", "time_stamp": 123456789, "api_key_type": "READ"}',
+                status_code=200,
+            )
+            logger = PurpleAirSQLiteDataLogger(
+                "test-read-key", None, self.db_path, **kwargs
+            )
+        return logger
+
+    def test_migrate_sqlite_data_base_to_v2(self):
+        """
+        Test that a v1 file is migrated to integer timestamps and can then be
+        opened with schema version 2.
+        """
+
+        # Setup
+        v1_logger = self._make_sqlite_logger()
+        for sensor_data in DATA_OUT_1:
+            v1_logger.store_sensor_data(sensor_data)
+        v1_logger._db_conn.close()
+
+        # Action
+        migrated_row_count = migrate_sqlite_data_base_to_v2(self.db_path)
+
+        # Expected Result
+        self.assertEqual(migrated_row_count, len(DATA_OUT_1) * 9)
+        v2_logger = self._make_sqlite_logger(schema_version=2)
+        rows = v2_logger._db_conn.execute(
+            "SELECT typeof(data_time_stamp), data_time_stamp, sensor_index FROM pm2_5_fields"
+        ).fetchall()
+        self.assertEqual(
+            sorted(rows),
+            sorted(
+                ("integer", sensor_data["data_time_stamp"], sensor_data["sensor_index"])
+                for sensor_data in DATA_OUT_1
+            ),
+        )
+        v2_logger._db_conn.close()
+
+    def test_migrate_sqlite_data_base_to_v2_twice_raises(self):
+        """
+        Test that migrating a v2 file is rejected.
+        """
+
+        # Setup
+        self._make_sqlite_logger(schema_version=2)._db_conn.close()
+
+        # Action and Expected Result
+        with self.assertRaises(PurpleAirDataLoggerError):
+            migrate_sqlite_data_base_to_v2(self.db_path)